@@ -1,9 +1,10 @@
 from fastapi import APIRouter, HTTPException
 from models.schemas import QueryRequest, QueryResponse
-from services.aiservice import AIService
+from services.model_provider import model_provider
+from services.concurrency import ingest_pool
 
 router = APIRouter()
-ai_service = AIService()
+ai_service = model_provider.get_ai_service()
 
 @router.post("/query", response_model=QueryResponse)
 async def query_assistant(request: QueryRequest):
@@ -11,7 +12,7 @@ async def query_assistant(request: QueryRequest):
     Endpoint para fazer perguntas à assistente.
     """
     try:
-        response = ai_service.answer_query(request.query, request.conversation_history)
+        response = await ai_service.answer_query_async(request.query, request.conversation_history, request.where)
         return response
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro ao processar consulta: {str(e)}")
@@ -23,7 +24,7 @@ async def train_assistant(documents: list[str]):
     Endpoint para adicionar novos documentos à base de conhecimento.
     """
     try:
-        count = ai_service.seed_knowledge_base(documents)
+        count = await ingest_pool.run(ai_service.seed_knowledge_base, documents)
         return {"status": "success", "documents_added": count}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro ao treinar assistente: {str(e)}")
\ No newline at end of file
@@ -0,0 +1 @@
+# Pacote para os benchmarks de desempenho
\ No newline at end of file
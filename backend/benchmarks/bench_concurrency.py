@@ -0,0 +1,115 @@
+"""
+Benchmark da latência das buscas durante uma inclusão grande.
+
+Mede a latência (p50 e p99) de buscas feitas por várias threads, primeiro com a
+coleção parada e depois enquanto outra thread inclui `--ingest` documentos. Como
+os embeddings são calculados sem trava e a gravação acontece em lotes de
+`--ingest-batch-rows` linhas, cada busca espera no máximo a gravação de um lote:
+a latência durante a inclusão deve ficar próxima da latência de referência.
+
+Os embeddings das consultas são calculados uma única vez antes da medição, de
+modo que o tempo medido é o da busca (trava, pontuação e montagem da resposta).
+Usa o modelo de embeddings da coleção (sentence-transformers).
+
+Uso (a partir de backend/):
+    python -m benchmarks.bench_concurrency --rows 20000 --ingest 20000
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+import numpy as np
+from services.vectordb import VectorDBService
+
+WORDS = (
+    "matrícula edital curso técnico campus professor disciplina horário biblioteca "
+    "estágio bolsa auxílio calendário inscrição prova resultado recurso laboratório "
+    "pesquisa extensão coordenação secretaria documento certificado diploma transferência"
+).split()
+
+
+def synthetic_documents(rng, count, prefix):
+    return [
+        f"{prefix} {i}: " + " ".join(rng.choice(WORDS, size=40))
+        for i in range(count)
+    ]
+
+
+def query_load(vector_db, query_texts, query_embeddings, threads, duration, k):
+    """Executa buscas em `threads` threads por `duration` segundos e retorna as latências (ms)."""
+    latencies, lock = [], threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def worker(offset):
+        local = []
+        i = offset
+        while time.perf_counter() < deadline:
+            j = i % len(query_texts)
+            start = time.perf_counter()
+            vector_db.query_many([query_texts[j]], k, query_embeddings=query_embeddings[j:j + 1])
+            local.append((time.perf_counter() - start) * 1000)
+            i += threads
+        with lock:
+            latencies.extend(local)
+
+    workers = [threading.Thread(target=worker, args=(t,)) for t in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return np.array(latencies)
+
+
+def report(label, latencies):
+    print(f"{label:>16} | {len(latencies):>8} | {np.percentile(latencies, 50):>8.2f} | {np.percentile(latencies, 99):>8.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=20000, help="documentos já presentes na coleção")
+    parser.add_argument("--ingest", type=int, default=20000, help="documentos incluídos durante a medição")
+    parser.add_argument("--ingest-batch-rows", type=int, default=1024)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--duration", type=float, default=10.0, help="duração da medição de referência (s)")
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("-k", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    with tempfile.TemporaryDirectory() as workdir:
+        # A coleção grava em ./data/vectors
+        os.chdir(workdir)
+        vector_db = VectorDBService("bench_concurrency", ingest_batch_rows=args.ingest_batch_rows)
+        vector_db.add_documents(synthetic_documents(rng, args.rows, "Documento"))
+
+        query_texts = [" ".join(rng.choice(WORDS, size=6)) for _ in range(args.queries)]
+        query_embeddings = vector_db.model.encode(query_texts)
+        new_documents = synthetic_documents(rng, args.ingest, "Novo documento")
+
+        print(f"{'cenário':>16} | {'buscas':>8} | {'p50 (ms)':>8} | {'p99 (ms)':>8}")
+        report("referência", query_load(vector_db, query_texts, query_embeddings, args.threads, args.duration, args.k))
+
+        # Mede enquanto a inclusão acontece; a medição termina junto com ela
+        ingest_time = {}
+
+        def ingest():
+            start = time.perf_counter()
+            vector_db.add_documents(new_documents)
+            ingest_time["seconds"] = time.perf_counter() - start
+
+        ingest_thread = threading.Thread(target=ingest)
+        ingest_thread.start()
+        latencies = []
+        while ingest_thread.is_alive():
+            latencies.append(query_load(vector_db, query_texts, query_embeddings, args.threads, 1.0, args.k))
+        ingest_thread.join()
+        report("durante inclusão", np.concatenate(latencies))
+
+        print(f"\nInclusão de {args.ingest} documentos: {ingest_time['seconds']:.1f} s "
+              f"(coleção final: {len(vector_db.ids)} documentos)")
+        vector_db.checkpoint()
+
+
+if __name__ == "__main__":
+    main()
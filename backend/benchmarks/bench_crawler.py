@@ -0,0 +1,115 @@
+"""
+Benchmark do rastreamento de sites contra um servidor HTTP local.
+
+Sobe um servidor (http.server, em threads) com um site sintético: `--pages`
+páginas ligadas entre si pelo menu e por links no texto, um robots.txt que
+proíbe /privado/ e um sitemap.xml com parte das páginas. Cada resposta demora
+`--latency-ms`, simulando a rede. Compara o rastreamento assíncrono
+(WebScraperService.crawl_site_chunked) com o mesmo rastreamento feito uma
+página por vez (max_concurrency=1) e confere que o limite de páginas e o
+robots.txt foram respeitados.
+
+Uso (a partir de backend/):
+    python -m benchmarks.bench_crawler --pages 200 --latency-ms 50
+"""
+import argparse
+import asyncio
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from services.webscraper import WebScraperService
+
+PARAGRAPH = (
+    "O campus oferece cursos técnicos integrados e subsequentes, graduações e pós-graduações, "
+    "com inscrições pelo edital publicado no portal. A biblioteca funciona de segunda a sexta."
+)
+
+
+def page_html(page, pages):
+    links = "".join(f'<a href="/pagina/{(page * 7 + i) % pages}">Página {(page * 7 + i) % pages}</a>' for i in range(1, 4))
+    return (
+        f"<html><head><title>Página {page}</title></head><body>"
+        f'<nav><a href="/">Início</a><a href="/pagina/{(page + 1) % pages}">Próxima</a>'
+        f'<a href="/privado/{page}">Área restrita</a></nav>'
+        f"<main><h1>Página {page}</h1><p>{PARAGRAPH} Página {page}.</p><p>{links}</p></main>"
+        "<footer>Instituto Federal - todos os direitos reservados</footer></body></html>"
+    ).encode("utf-8")
+
+
+def make_handler(pages, latency, visits):
+    class SiteHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            time.sleep(latency)
+            visits.append(self.path)
+            if self.path == "/robots.txt":
+                body, content_type = b"User-agent: *\nDisallow: /privado/\n", "text/plain"
+            elif self.path == "/sitemap.xml":
+                urls = "".join(
+                    f"<url><loc>http://{self.headers['Host']}/pagina/{i}</loc></url>" for i in range(0, pages, 5)
+                )
+                body = f'<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{urls}</urlset>'.encode("utf-8")
+                content_type = "application/xml"
+            elif self.path == "/" or self.path.startswith(("/pagina/", "/privado/")):
+                page = int(self.path.rsplit("/", 1)[-1] or 0)
+                body, content_type = page_html(page, pages), "text/html; charset=utf-8"
+            else:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    return SiteHandler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=200, help="páginas do site sintético")
+    parser.add_argument("--max-pages", type=int, default=100, help="limite de páginas do rastreamento")
+    parser.add_argument("--latency-ms", type=float, default=50)
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+
+    visits = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(args.pages, args.latency_ms / 1000, visits))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}/"
+    scraper = WebScraperService()
+
+    async def crawl(concurrency):
+        return [
+            result async for result in scraper.crawl_site_chunked(
+                base_url, args.max_pages, max_concurrency=concurrency, max_per_host=concurrency
+            )
+        ]
+
+    start = time.perf_counter()
+    results = asyncio.run(crawl(args.concurrency))
+    crawl_seconds = time.perf_counter() - start
+
+    crawled = [result["url"] for result in results]
+    assert len(crawled) <= args.max_pages, "limite de páginas excedido"
+    assert not any(path.startswith("/privado/") for path in visits), "robots.txt desrespeitado"
+
+    start = time.perf_counter()
+    sequential = asyncio.run(crawl(1))
+    sequential_seconds = time.perf_counter() - start
+    server.shutdown()
+    assert len(sequential) == len(crawled), "rastreamentos com páginas diferentes"
+
+    print(f"\n{'modo':>12} | {'páginas':>8} | {'tempo (s)':>9} | {'páginas/s':>9}")
+    print(f"{'sequencial':>12} | {len(crawled):>8} | {sequential_seconds:>9.2f} | {len(crawled) / sequential_seconds:>9.1f}")
+    print(f"{'assíncrono':>12} | {len(crawled):>8} | {crawl_seconds:>9.2f} | {len(crawled) / crawl_seconds:>9.1f}")
+    print(f"\nChunks: {sum(result['total_chunks'] for result in results)} | "
+          f"falhas: {sum(not result['success'] for result in results)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""
+Benchmark dos extratores de texto de páginas HTML (WebScraperService).
+
+Compara o extrator "bs4" (BeautifulSoup com html.parser, a página inteira)
+com o "lxml" (conteúdo principal) em vazão (páginas/s e MB/s) e em qualidade
+do texto extraído: precisão e revocação das palavras em relação ao texto
+esperado da página (o conteúdo principal, sem menus, rodapés e avisos).
+
+Por padrão usa páginas sintéticas no formato de portais institucionais
+(barra do governo, menu com dezenas de links, menu lateral, trilha, aviso de
+cookies, scripts embutidos e rodapé), em quatro modelos: com <main>, com
+<article>, com <div>s nomeados (como no Plone) e com <div>s sem classe nem
+id. Com `--fixtures`, usa os arquivos .html salvos no diretório; a qualidade
+é medida nos que tiverem o texto esperado num .txt de mesmo nome.
+`--save-fixtures` grava as páginas sintéticas (.html e .txt).
+
+Uso (a partir de backend/):
+    python -m benchmarks.bench_html_extraction --pages 200
+    python -m benchmarks.bench_html_extraction --fixtures caminho/das/paginas
+"""
+import argparse
+import os
+import random
+import re
+import time
+from collections import Counter
+from services.html_extraction import extract_html
+from services.webscraper import WebScraperService
+
+WORDS = (
+    "matrícula edital curso técnico campus professor disciplina horário biblioteca estágio bolsa "
+    "auxílio calendário inscrição prova resultado recurso laboratório pesquisa extensão coordenação "
+    "secretaria documento certificado diploma transferência estudante servidor reitoria projeto"
+).split()
+MENU = (
+    "Institucional Reitoria Campi Ensino Pesquisa Extensão Assistência Estudantil Editais Concursos "
+    "Ouvidoria Transparência Notícias Eventos Biblioteca Processos Seletivos Contato Acesso à Informação"
+).split()
+COOKIES = (
+    "Este site utiliza cookies para melhorar a sua experiência de navegação. Ao continuar navegando "
+    "você concorda com a nossa política de privacidade. Aceitar Configurações"
+)
+FOOTER = "Instituto Federal - Rua das Flores, 123, Centro - CEP 12345-000 - Telefone (00) 3333-4444"
+
+
+def sentence(rng):
+    words = rng.choices(WORDS, k=rng.randint(10, 25))
+    return " ".join(words).capitalize() + ", conforme o edital publicado."
+
+
+def synthetic_page(rng, page, template):
+    """HTML de uma página institucional e o texto esperado (título e parágrafos do conteúdo)."""
+    title = f"Notícia {page}: " + " ".join(rng.choices(WORDS, k=4))
+    paragraphs = [" ".join(sentence(rng) for _ in range(rng.randint(2, 5))) for _ in range(rng.randint(3, 12))]
+    menu = "".join(
+        f'<li><a href="/{item.lower()}/{i}">{item} {i}</a></li>' for i in range(8) for item in MENU
+    )
+    sidebar = "".join(f'<li><a href="/pagina/{i}">{rng.choice(WORDS).capitalize()} {i}</a></li>' for i in range(30))
+    script = "<script>var config = {" + ",".join(f'"k{i}": {i}' for i in range(400)) + "};</script>"
+    content = f"<h1>{title}</h1>" + "".join(f"<p>{paragraph}</p>" for paragraph in paragraphs)
+    related = "".join(f'<a href="/noticia/{i}">Notícia relacionada {i}</a> ' for i in range(10))
+
+    if template == 0:
+        body = f'<main id="main"><div class="content">{content}</div></main>'
+    elif template == 1:
+        body = f'<div id="wrapper"><article class="post">{content}</article></div>'
+    elif template == 2:
+        body = f'<div id="portal-column-content"><div id="content-core">{content}</div></div>'
+    else:
+        body = f"<div><div>{content}</div></div>"
+
+    html = (
+        f"<!DOCTYPE html><html lang=\"pt-br\"><head><meta charset=\"utf-8\"><title>{title}</title>{script}"
+        "<style>body { font-family: sans-serif; }</style></head><body>"
+        '<div id="barra-brasil"><a href="https://www.gov.br">gov.br</a> Órgãos do Governo Acesso à Informação Legislação</div>'
+        f'<header><div class="logo">Instituto Federal</div><nav><ul class="menu">{menu}</ul></nav></header>'
+        '<div class="breadcrumb"><a href="/">Página inicial</a> &gt; <a href="/noticias">Notícias</a></div>'
+        f'<div class="cookie-consent">{COOKIES}</div>'
+        f'<div class="menu-lateral"><ul>{sidebar}</ul></div>'
+        f"{body}"
+        f'<div class="related-links"><h2>Veja também as notícias relacionadas</h2>{related}</div>'
+        f"<footer><p>{FOOTER}</p></footer>{script}</body></html>"
+    )
+    return html.encode("utf-8"), "\n".join([title] + paragraphs)
+
+
+def load_fixtures(path):
+    fixtures = []
+    for filename in sorted(os.listdir(path)):
+        if not filename.endswith(".html"):
+            continue
+        with open(os.path.join(path, filename), "rb") as f:
+            content = f.read()
+        expected_path = os.path.join(path, filename[:-5] + ".txt")
+        expected = None
+        if os.path.exists(expected_path):
+            with open(expected_path, encoding="utf-8") as f:
+                expected = f.read()
+        fixtures.append((filename, content, expected))
+    return fixtures
+
+
+def words(text):
+    return Counter(re.findall(r"\w+", text.lower()))
+
+
+def quality(extracted, expected):
+    """Precisão e revocação das palavras extraídas em relação ao texto esperado."""
+    extracted, expected = words(extracted), words(expected)
+    common = sum((extracted & expected).values())
+    precision = common / sum(extracted.values()) if extracted else 0.0
+    recall = common / sum(expected.values()) if expected else 0.0
+    return precision, recall
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=200, help="páginas sintéticas (sem --fixtures)")
+    parser.add_argument("--fixtures", help="diretório com páginas .html salvas (e .txt esperados)")
+    parser.add_argument("--save-fixtures", help="grava as páginas sintéticas neste diretório")
+    parser.add_argument("--repeat", type=int, default=3, help="repetições da medida de vazão")
+    args = parser.parse_args()
+
+    if args.fixtures:
+        fixtures = load_fixtures(args.fixtures)
+    else:
+        rng = random.Random(42)
+        fixtures = [(f"pagina_{i:04d}.html", *synthetic_page(rng, i, i % 4)) for i in range(args.pages)]
+    if args.save_fixtures:
+        os.makedirs(args.save_fixtures, exist_ok=True)
+        for filename, content, expected in fixtures:
+            with open(os.path.join(args.save_fixtures, filename), "wb") as f:
+                f.write(content)
+            if expected is not None:
+                with open(os.path.join(args.save_fixtures, filename[:-5] + ".txt"), "w", encoding="utf-8") as f:
+                    f.write(expected)
+
+    total_mb = sum(len(content) for _, content, _ in fixtures) / (1024 * 1024)
+    print(f"{len(fixtures)} páginas, {total_mb:.1f} MB")
+
+    scraper = WebScraperService()
+    extractors = {
+        "bs4": lambda url, content: scraper._parse_with_bs4(url, content),
+        "lxml": lambda url, content: extract_html(content, url),
+    }
+
+    print(f"\n{'extrator':>8} | {'páginas/s':>9} | {'MB/s':>6} | {'precisão':>8} | {'revocação':>9} | {'links':>7}")
+    for name, extract in extractors.items():
+        best = float("inf")
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            outputs = []
+            for filename, content, _ in fixtures:
+                title, text, links = extract(f"https://www.exemplo.edu.br/{filename}", content)
+                outputs.append((scraper._clean_text(text), len(links)))
+            best = min(best, time.perf_counter() - start)
+
+        scored = [quality(text, expected) for (text, _), (_, _, expected) in zip(outputs, fixtures) if expected]
+        precision = sum(p for p, _ in scored) / len(scored) if scored else float("nan")
+        recall = sum(r for _, r in scored) / len(scored) if scored else float("nan")
+        links = sum(count for _, count in outputs)
+        print(f"{name:>8} | {len(fixtures) / best:>9.1f} | {total_mb / best:>6.2f} | "
+              f"{precision:>8.3f} | {recall:>9.3f} | {links:>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Benchmark da detecção de quase duplicatas (MinHash/LSH).
+
+Simula as páginas de um site: cada página tem trechos próprios e repete um
+rodapé (com pequenas variações, como o número da página) e um aviso de cookies.
+Mede o tempo das assinaturas e das consultas por trecho e compara o resultado
+com a similaridade de Jaccard exata: quase duplicatas encontradas (revocação)
+e falsos positivos. Não usa o modelo de embeddings; cada trecho descartado
+aqui é um embedding a menos na inclusão.
+
+Uso (a partir de backend/):
+    python -m benchmarks.bench_near_duplicates --pages 2000 --threshold 0.9
+"""
+import argparse
+import time
+import numpy as np
+from services.near_duplicates import MinHashIndex
+
+WORDS = (
+    "matrícula edital curso técnico campus professor disciplina horário biblioteca "
+    "estágio bolsa auxílio calendário inscrição prova resultado recurso laboratório "
+    "pesquisa extensão coordenação secretaria documento certificado diploma transferência"
+).split()
+
+FOOTER = (
+    "Instituto Federal Rua das Flores 123 Centro CEP 12345-000 telefone 3333-4444 "
+    "ouvidoria acesso à informação mapa do site transparência contato redes sociais "
+    "portal do aluno sistema acadêmico biblioteca virtual calendário acadêmico editais"
+)
+COOKIES = (
+    "Este site utiliza cookies para melhorar a sua experiência de navegação. Ao continuar "
+    "navegando você concorda com a nossa política de privacidade e o uso de cookies "
+    "conforme a Lei Geral de Proteção de Dados. Aceitar todos Configurações de cookies"
+)
+
+
+def site_chunks(rng, pages, chunks_per_page):
+    """Trechos das páginas: os próprios de cada página, o rodapé e o aviso de cookies."""
+    chunks = []
+    for page in range(pages):
+        for _ in range(chunks_per_page):
+            chunks.append(" ".join(rng.choice(WORDS, size=60)))
+        chunks.append(f"{FOOTER} Página {page}")
+        chunks.append(COOKIES)
+    return chunks
+
+
+def jaccard(index, a, b):
+    a, b = set(index._shingles(a).tolist()), set(index._shingles(b).tolist())
+    return len(a & b) / len(a | b) if a | b else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=2000)
+    parser.add_argument("--chunks-per-page", type=int, default=3)
+    parser.add_argument("--threshold", type=float, default=0.9)
+    parser.add_argument("--num-perm", type=int, default=128)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    chunks = site_chunks(rng, args.pages, args.chunks_per_page)
+    index = MinHashIndex(threshold=args.threshold, num_perm=args.num_perm)
+    print(f"{len(chunks)} trechos, {index.bands} faixas de {index.rows} valores")
+
+    start = time.perf_counter()
+    signatures = index.signatures(chunks)
+    signature_time = time.perf_counter() - start
+
+    # Inclusão trecho a trecho, como na política "skip"
+    start = time.perf_counter()
+    kept, dropped = [], []
+    for i, signature in enumerate(signatures):
+        match = index.match(signature[None])[0]
+        if match is None:
+            index.add([i], signatures=signature[None])
+            kept.append(i)
+        else:
+            dropped.append((i, match[0]))
+    match_time = time.perf_counter() - start
+
+    # Verificação exata: descartados abaixo do limiar e cópias do rodapé ou do aviso
+    # mantidas além da primeira (as variações do rodapé ficam acima de 0.9)
+    false_positives = sum(jaccard(index, chunks[i], chunks[j]) < args.threshold for i, j in dropped)
+    missed = sum(
+        max(sum(chunks[i].startswith(boilerplate) for i in kept) - 1, 0)
+        for boilerplate in (FOOTER, COOKIES)
+    )
+
+    per_chunk = 1e6 / len(chunks)
+    print(f"assinaturas: {signature_time * per_chunk:.0f} µs/trecho | consultas: {match_time * per_chunk:.0f} µs/trecho")
+    print(f"mantidos: {len(kept)} | descartados: {len(dropped)} | falsos positivos: {false_positives} | não detectados: {missed}")
+
+
+if __name__ == "__main__":
+    main()
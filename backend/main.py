@@ -1,6 +1,10 @@
+import asyncio
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from routes.api import router as api_router
+from services.model_provider import model_provider
+from services.concurrency import shutdown_pools
+from services.ingestion_jobs import job_queue
 
 app = FastAPI(
     title="Mango API",
@@ -20,6 +24,31 @@ app.add_middleware(
 # Inclui as rotas da API
 app.include_router(api_router, prefix="/api")
 
+@app.on_event("startup")
+async def warm_up_model():
+    """
+    Aquece o modelo e a coleção padrão em segundo plano; /api/ready indica
+    quando terminou.
+    """
+    loop = asyncio.get_running_loop()
+    loop.run_in_executor(None, model_provider.warm_up)
+
+@app.on_event("startup")
+def resume_jobs():
+    """Retoma as tarefas de inclusão que estavam na fila ou em execução quando o servidor parou."""
+    job_queue.start()
+
+@app.on_event("shutdown")
+def checkpoint_collections():
+    """
+    Incorpora os logs de escrita das coleções aos segmentos ao encerrar. As
+    tarefas de inclusão em execução são interrompidas antes e retomadas na
+    próxima inicialização.
+    """
+    job_queue.stop()
+    model_provider.shutdown()
+    shutdown_pools()
+
 @app.get("/")
 async def root():
     return {"message": "Bem-vindo à API do Tango! Acesse /docs para a documentação."}
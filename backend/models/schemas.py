@@ -4,11 +4,26 @@ from typing import List, Optional, Dict, Any, Union
 class QueryRequest(BaseModel):
     query: str
     conversation_history: Optional[List[dict]] = []
+    # Filtro por fonte, ex.: {"filename": "edital.pdf", "page": {"$gte": 2, "$lte": 5}}
+    where: Optional[Dict[str, Any]] = None
 
 class QueryResponse(BaseModel):
     response: str
     sources: List[str] = []
 
+class ReadinessResponse(BaseModel):
+    ready: bool
+    models: Dict[str, bool] = {}
+    collections: Dict[str, Dict[str, Any]] = {}
+    warmup_seconds: Optional[float] = None
+    error: Optional[str] = None
+
+class BatchQueryRequest(BaseModel):
+    queries: List[QueryRequest]
+
+class BatchQueryResponse(BaseModel):
+    results: List[QueryResponse]
+
 class Document(BaseModel):
     text: str
     metadata: Optional[Dict[str, Any]] = None
@@ -16,6 +31,19 @@ class Document(BaseModel):
 class DocumentBatch(BaseModel):
     documents: List[Union[str, Document]]
     metadata: Optional[List[Dict[str, Any]]] = None
+    skip_duplicates: Optional[bool] = False
+    # Tratamento dos trechos quase iguais a outros: "keep", "skip" ou "merge"
+    near_duplicates: Optional[str] = None
+
+# Resultado da inclusão de documentos (ver VectorDBService.add_documents)
+class AddDocumentsResponse(BaseModel):
+    ids: List[int]
+    duplicates: List[int] = []
+    near_duplicates: List[int] = []
+    # Posição, na lista enviada, de cada ID de `ids`
+    positions: List[int] = []
+    # ID do trecho que guarda cada documento enviado (None se não houver)
+    resolved_ids: List[Optional[int]] = []
 
 class DeleteRequest(BaseModel):
     ids: List[int]
@@ -36,19 +64,94 @@ class WebScrapingResponse(BaseModel):
     documents_added: int
     failed_urls: List[str] = []
     scraped_urls: List[str] = []
+    # Rastreamento incremental: páginas respondidas com 304 ou com o mesmo
+    # conteúdo não são reindexadas; nas alteradas, só os seus chunks são trocados
+    pages_fetched: int = 0
+    pages_not_modified: int = 0
+    pages_unchanged: int = 0
+    pages_new: int = 0
+    pages_replaced: int = 0
+    pages_failed: int = 0
+    chunks_deleted: int = 0
+    chunks_reused: int = 0
+    embeddings_saved: int = 0
 
 # Schema para documento individual na listagem
 class DocumentItem(BaseModel):
     id: int
     content: str
-    full_content: str
+    # Texto completo, apenas com include_content=true
+    full_content: Optional[str] = None
     url: str
     title: str
+    group_key: Optional[str] = None
     metadata: Optional[Dict[str, Any]] = None
 
-# Schema para resposta da listagem de documentos
+# Schema para resposta da listagem de documentos (uma página)
 class DocumentListResponse(BaseModel):
     documents: List[DocumentItem]
-    grouped_by_url: Dict[str, List[DocumentItem]]
+    # ID a ser passado em `cursor` para obter a próxima página (None na última)
+    next_cursor: Optional[int] = None
     total_documents: int
-    unique_sources: int
\ No newline at end of file
+    unique_sources: int
+
+# Schema para o resumo por fonte da listagem (mode=groups)
+class DocumentGroup(BaseModel):
+    group_key: str
+    title: str
+    url: str
+    type: str
+    documents: int
+
+class DocumentGroupsResponse(BaseModel):
+    groups: List[DocumentGroup]
+    total_documents: int
+    unique_sources: int
+
+# Schemas das coleções (uma base de conhecimento por campus ou instituição)
+class CollectionCreateRequest(BaseModel):
+    name: str
+    # "flat", "hnsw" ou "ivf" e precisão dos vetores ("float32", "float16" ou "int8")
+    index_type: Optional[str] = None
+    precision: Optional[str] = None
+
+class CollectionInfo(BaseModel):
+    name: str
+    loaded: bool
+    documents: Optional[int] = None
+    memory_mb: float = 0.0
+    load_seconds: Optional[float] = None
+    index_type: Optional[str] = None
+    last_used: Optional[float] = None
+    evictions: int = 0
+
+class CollectionListResponse(BaseModel):
+    collections: List[CollectionInfo]
+    memory_budget_mb: Optional[int] = None
+    resident_memory_mb: float
+
+# Schemas das tarefas de inclusão em segundo plano
+class JobInfo(BaseModel):
+    id: str
+    kind: str
+    # "queued", "running", "completed", "failed" ou "cancelled"
+    status: str
+    params: Dict[str, Any] = {}
+    # Contadores do handler (ex.: done/total páginas, chunks_indexed), com
+    # elapsed_seconds, chunks_per_second e eta_seconds
+    progress: Dict[str, Any] = {}
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    error_type: Optional[str] = None
+    # Execuções iniciadas (mais de uma se a tarefa foi retomada após um reinício)
+    attempts: int = 0
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    updated_at: float
+    # Processo que executa (ou executou) a tarefa e a última renovação da sua posse
+    owner: Optional[str] = None
+    heartbeat: Optional[float] = None
+
+class JobListResponse(BaseModel):
+    jobs: List[JobInfo]
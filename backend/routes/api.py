@@ -1,18 +1,44 @@
-from fastapi import APIRouter, HTTPException, Depends, UploadFile, File
+from fastapi import APIRouter, HTTPException, Depends, UploadFile, File, Response, Request, Query
+from fastapi.responses import StreamingResponse
 from models.schemas import (
-    QueryRequest, QueryResponse, DocumentBatch, DeleteRequest, ResetRequest, 
-    Document, WebScrapingRequest, WebScrapingResponse, DocumentItem, DocumentListResponse
+    QueryRequest, QueryResponse, BatchQueryRequest, BatchQueryResponse, DocumentBatch, DeleteRequest, ResetRequest, 
+    Document, WebScrapingRequest, WebScrapingResponse, DocumentItem, DocumentListResponse, DocumentGroupsResponse, ReadinessResponse,
+    CollectionCreateRequest, CollectionInfo, CollectionListResponse, JobInfo, JobListResponse, AddDocumentsResponse
 )
+from services.model_provider import model_provider, DEFAULT_COLLECTION
 from services.aiservice import AIService
-from services.webscraper import WebScraperService
-from services.pdf_processor import PDFProcessorService
-from typing import List, Dict, Any, Union
+from services.document_listing import DocumentListing
+from services.ingestion_jobs import job_queue, SCRAPE_WEBSITE, UPLOAD_PDF, UPLOADS_DIR
+from services.concurrency import query_pool, ingest_pool
+from typing import List, Dict, Any, Optional, Union
 from datetime import datetime
+import asyncio
+import os
+import shutil
+import uuid
 
 router = APIRouter()
-ai_service = AIService()
-web_scraper = WebScraperService()
-pdf_processor = PDFProcessorService()
+ai_service = model_provider.get_ai_service()
+document_listing = DocumentListing()
+
+@router.get("/ready", response_model=ReadinessResponse)
+async def readiness(response: Response):
+    """
+    Informa se o modelo de embeddings e as coleções já foram carregados.
+    Retorna 503 enquanto o aquecimento não terminar.
+    """
+    status = model_provider.status()
+    if not status["ready"]:
+        response.status_code = 503
+    return status
+
+@router.get("/cache/stats", response_model=Dict[str, Any])
+async def cache_stats():
+    """
+    Métricas dos caches de consultas: embeddings (por modelo) e respostas,
+    com acertos, falhas, taxa de acerto e ocupação.
+    """
+    return model_provider.cache_stats()
 
 @router.post("/query", response_model=QueryResponse)
 async def query(request: QueryRequest):
@@ -20,15 +46,38 @@ async def query(request: QueryRequest):
     Endpoint para consultar o assistente Tango.
     """
     try:
-        result = ai_service.answer_query(
+        result = await ai_service.answer_query_async(
             query=request.query,
-            conversation_history=request.conversation_history
+            conversation_history=request.conversation_history,
+            where=request.where
         )
         return result
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Filtro inválido: {str(e)}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro ao processar consulta: {str(e)}")
 
-@router.post("/documents", response_model=Dict[str, List[int]])
+@router.post("/query/batch", response_model=BatchQueryResponse)
+async def query_batch(request: BatchQueryRequest):
+    """
+    Endpoint para enviar várias consultas ao assistente Tango de uma vez.
+    As consultas são codificadas e buscadas em um único lote.
+    """
+    try:
+        # A busca em lote roda no pool de buscas, sem bloquear o event loop
+        results = await query_pool.run(
+            ai_service.answer_queries,
+            queries=[item.query for item in request.queries],
+            conversation_histories=[item.conversation_history for item in request.queries],
+            wheres=[item.where for item in request.queries]
+        )
+        return BatchQueryResponse(results=results)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Filtro inválido: {str(e)}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erro ao processar consultas: {str(e)}")
+
+@router.post("/documents", response_model=AddDocumentsResponse)
 async def add_documents(request: DocumentBatch):
     """
     Adiciona documentos à base de conhecimento.
@@ -54,85 +103,57 @@ async def add_documents(request: DocumentBatch):
         if request.metadata:
             metadata_list = request.metadata
         
-        result = ai_service.seed_knowledge_base(documents)
+        result = await ingest_pool.run(
+            ai_service.seed_knowledge_base, documents, metadata_list,
+            skip_duplicates=request.skip_duplicates, near_duplicates=request.near_duplicates
+        )
         return result
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Metadados inválidos: {str(e)}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro ao adicionar documentos: {str(e)}")
 
+def _scrape_params(request: WebScrapingRequest):
+    if request.scrape_multiple:
+        # Scraping de múltiplas páginas
+        print("Modo: múltiplas páginas")
+        max_pages, respect_robots = request.max_pages, True
+    else:
+        # Scraping de uma única URL, pedida explicitamente: o robots.txt não é consultado
+        print("Modo: URL única")
+        max_pages, respect_robots = 1, False
+    return {"url": request.url, "max_pages": max_pages, "respect_robots": respect_robots, "collection": DEFAULT_COLLECTION}
+
+def _job_failure(job, action):
+    # Erros de validação da tarefa (ValueError) são do pedido; os demais, do servidor
+    status_code = 400 if job["error_type"] == "ValueError" else 500
+    detail = job["error"] if status_code == 400 else f"Erro {action}: {job['error'] or job['status']}"
+    return HTTPException(status_code=status_code, detail=detail)
+
 @router.post("/scrape-website", response_model=WebScrapingResponse)
 async def scrape_website(request: WebScrapingRequest):
     """
     Extrai conteúdo de um site em chunks e adiciona à base de conhecimento.
+    Um novo scraping do mesmo site é incremental: páginas que não mudaram
+    desde o anterior são puladas e, nas alteradas, apenas os seus chunks são
+    substituídos (ver SiteIndexer).
+    
+    Roda como uma tarefa em segundo plano (ver /jobs/scrape-website) e
+    aguarda o seu fim; se a conexão cair, a tarefa continua.
     """
     try:
         print(f"Iniciando web scraping para: {request.url}")
-        
-        documents_to_add = []
-        failed_urls = []
-        scraped_urls = []
-        total_chunks = 0
-        
-        if request.scrape_multiple:
-            # Scraping de múltiplas páginas
-            print("Modo: múltiplas páginas")
-            results = web_scraper.scrape_sitemap_chunked(request.url, request.max_pages)
-        else:
-            # Scraping de uma única URL
-            print("Modo: URL única")
-            results = [web_scraper.scrape_url_chunked(request.url)]
-        
-        print(f"Resultados do scraping: {len(results)} URLs processadas")
-        
-        # Processa os resultados
-        for result in results:
-            print(f"Processando resultado para {result['url']}")
-            print(f"Sucesso: {result['success']}, Chunks: {len(result.get('chunks', []))}")
-            
-            if result['success'] and result.get('chunks'):
-                scraped_urls.append(result['url'])
-                
-                # Processa cada chunk individualmente
-                for chunk in result['chunks']:
-                    # Cria documento otimizado para busca
-                    document_text = f"""Fonte: {chunk['title']}
-URL: {chunk['url']}
-Tipo: {chunk['content_type']}
-Palavras-chave: {', '.join(chunk['keywords'])}
-
-{chunk['text']}"""
-                    
-                    documents_to_add.append(document_text)
-                    total_chunks += 1
-                    print(f"Chunk {total_chunks} adicionado: {len(chunk['text'])} caracteres")
-            else:
-                print(f"URL falhou: {result['url']}, Erro: {result.get('error', 'Desconhecido')}")
-                failed_urls.append(result['url'])
-        
-        print(f"Total de documentos para adicionar: {len(documents_to_add)}")
-        
-        # Adiciona os documentos à base de conhecimento
-        documents_added = 0
-        if documents_to_add:
-            print("Adicionando documentos à base de conhecimento...")
-            add_result = ai_service.seed_knowledge_base(documents_to_add)
-            documents_added = len(add_result.get('ids', []))
-            print(f"Documentos adicionados com sucesso: {documents_added}")
-        else:
-            print("Nenhum documento para adicionar")
-        
-        return WebScrapingResponse(
-            success=True,
-            message=f"Web scraping concluído. {documents_added} chunks de {len(scraped_urls)} páginas adicionados.",
-            documents_added=documents_added,
-            failed_urls=failed_urls,
-            scraped_urls=scraped_urls
-        )
-        
+        job = await asyncio.to_thread(job_queue.submit, SCRAPE_WEBSITE, _scrape_params(request))
+        job = await job_queue.wait(job["id"])
     except Exception as e:
         print(f"Erro durante web scraping: {str(e)}")
         import traceback
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"Erro durante web scraping: {str(e)}")
+    
+    if job["status"] != "completed":
+        raise _job_failure(job, "durante web scraping")
+    return WebScrapingResponse(**job["result"])
 
 @router.delete("/documents", response_model=Dict[str, bool])
 async def delete_documents(request: DeleteRequest):
@@ -140,7 +161,7 @@ async def delete_documents(request: DeleteRequest):
     Remove documentos da base de conhecimento pelos IDs.
     """
     try:
-        result = ai_service.vector_db.delete(request.ids)
+        result = await ingest_pool.run(ai_service.vector_db.delete, request.ids)
         return result
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro ao remover documentos: {str(e)}")
@@ -154,117 +175,180 @@ async def reset_knowledge_base(request: ResetRequest):
         raise HTTPException(status_code=400, detail="Confirmação necessária para reiniciar a base de conhecimento")
     
     try:
-        result = ai_service.vector_db.reset()
+        result = await ingest_pool.run(ai_service.vector_db.reset)
         return result
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro ao reiniciar a base de conhecimento: {str(e)}")
 
-@router.get("/documents/list", response_model=DocumentListResponse)
-async def list_documents():
+@router.get("/collections", response_model=CollectionListResponse)
+async def list_collections():
     """
-    Lista todos os documentos da base de conhecimento com agrupamento melhorado.
+    Lista as coleções com a situação de cada uma: se está carregada, número de
+    documentos, memória estimada, tempo da última carga e descargas pelo limite de memória.
     """
     try:
-        # Obtém os documentos e seus metadados do serviço VectorDB
-        documents = ai_service.vector_db.documents
-        metadata = ai_service.vector_db.metadata
-        
-        # Agrupa documentos por fonte para melhor visualização
-        grouped_docs = {}
-        doc_list = []
-        
-        for i, doc in enumerate(documents):
-            # Extrai informações da fonte (URL, PDF, ou documento manual)
-            source_info = _extract_source_info(doc)
-            
-            # Prepara prévia do conteúdo (primeiras 200 chars)
-            content_preview = doc[:200] + "..." if len(doc) > 200 else doc
-            
-            doc_item = DocumentItem(
-                id=i,
-                content=content_preview,
-                full_content=doc,
-                url=source_info['url'],
-                title=source_info['title'],
-                metadata=metadata[i] if metadata and i < len(metadata) else None
-            )
-            
-            doc_list.append(doc_item)
-            
-            # Agrupa por fonte (URL para websites, nome do arquivo para PDFs)
-            group_key = source_info['group_key']
-            if group_key not in grouped_docs:
-                grouped_docs[group_key] = []
-            grouped_docs[group_key].append(doc_item)
-        
-        return DocumentListResponse(
-            documents=doc_list,
-            grouped_by_url=grouped_docs,
-            total_documents=len(doc_list),
-            unique_sources=len(grouped_docs)
+        collections = model_provider.collections
+        # Estimar a memória percorre os índices: roda fora do event loop
+        infos = await query_pool.run(collections.describe)
+        return {
+            "collections": infos,
+            "memory_budget_mb": collections.memory_budget_mb,
+            "resident_memory_mb": round(sum(info["memory_mb"] for info in infos), 2)
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erro ao listar coleções: {str(e)}")
+
+@router.post("/collections", response_model=CollectionInfo)
+async def create_collection(request: CollectionCreateRequest):
+    """
+    Cria uma coleção vazia, com índice e precisão próprios.
+    """
+    try:
+        return await ingest_pool.run(
+            model_provider.collections.create, request.name,
+            index_type=request.index_type, precision=request.precision
         )
-        
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Coleção inválida: {str(e)}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erro ao criar coleção: {str(e)}")
+
+@router.delete("/collections/{name}", response_model=Dict[str, bool])
+async def drop_collection(name: str):
+    """
+    Remove uma coleção e todos os seus arquivos. A coleção padrão não pode ser removida.
+    """
+    try:
+        return {"success": await ingest_pool.run(model_provider.collections.drop, name)}
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Coleção não encontrada: {name}")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erro ao remover coleção: {str(e)}")
+
+async def _collection_service(name):
+    """AIService da coleção `name`, carregada (e registrada como acessada) no pool de buscas."""
+    try:
+        vector_db = await query_pool.run(model_provider.collections.get, name)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Coleção não encontrada: {name}")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return AIService(vector_db, retrieval_mode=ai_service.retrieval_mode)
+
+@router.post("/collections/{name}/documents", response_model=AddDocumentsResponse)
+async def add_collection_documents(name: str, request: DocumentBatch):
+    """
+    Adiciona documentos a uma coleção (mesmo formato de POST /documents).
+    """
+    collection_service = await _collection_service(name)
+    try:
+        documents = [doc if isinstance(doc, str) else doc.text for doc in request.documents]
+        metadata_list = request.metadata or [None if isinstance(doc, str) else doc.metadata for doc in request.documents]
+        return await ingest_pool.run(
+            collection_service.seed_knowledge_base, documents, metadata_list,
+            skip_duplicates=request.skip_duplicates, near_duplicates=request.near_duplicates
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Metadados inválidos: {str(e)}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erro ao adicionar documentos: {str(e)}")
+
+@router.post("/collections/{name}/query", response_model=QueryResponse)
+async def query_collection(name: str, request: QueryRequest):
+    """
+    Consulta o assistente Tango usando apenas a base de conhecimento da coleção.
+    """
+    collection_service = await _collection_service(name)
+    try:
+        return await collection_service.answer_query_async(
+            query=request.query,
+            conversation_history=request.conversation_history,
+            where=request.where
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Filtro inválido: {str(e)}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erro ao processar consulta: {str(e)}")
+
+@router.get("/documents/list", response_model=Union[DocumentListResponse, DocumentGroupsResponse])
+async def list_documents(
+    request: Request,
+    cursor: Optional[int] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    mode: str = "documents",
+    include_content: bool = False
+):
+    """
+    Lista os documentos da base de conhecimento em páginas.
+    
+    A página começa no primeiro documento com ID maior que `cursor`; a resposta
+    traz em `next_cursor` o valor para a próxima página. Com `mode=groups` retorna
+    apenas o resumo por fonte (URL ou PDF) com a quantidade de documentos, e com
+    `include_content=true` inclui o texto completo de cada documento.
+    
+    A resposta é enviada em streaming e fica em cache até a coleção mudar; o
+    cabeçalho ETag traz a versão da coleção (If-None-Match responde 304).
+    """
+    try:
+        version, body = await query_pool.run(document_listing.render, mode, cursor, limit, include_content)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         print(f"Erro ao listar documentos: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Erro ao listar documentos: {str(e)}")
+    
+    etag = f'"{version}"'
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    return StreamingResponse(
+        (part.encode('utf-8') for part in body), media_type="application/json", headers={"ETag": etag}
+    )
+
+async def _submit_pdf(file: UploadFile, chunk_size: int):
+    # Verifica se é um arquivo PDF
+    if not file.filename.lower().endswith('.pdf'):
+        raise HTTPException(status_code=400, detail="Apenas arquivos PDF são aceitos")
+    
+    # Copia o arquivo para o disco em blocos, sem carregá-lo inteiro na memória: os
+    # processos de extração leem dali apenas as suas páginas, e a tarefa pode ser
+    # retomada após um reinício. O arquivo é apagado quando a tarefa termina
+    os.makedirs(UPLOADS_DIR, exist_ok=True)
+    path = os.path.join(UPLOADS_DIR, f"{uuid.uuid4().hex}.pdf")
+    with open(path, "wb") as pdf_file:
+        await asyncio.to_thread(shutil.copyfileobj, file.file, pdf_file)
+        file_size = pdf_file.tell()
+    
+    if file_size == 0:
+        os.remove(path)
+        raise HTTPException(status_code=400, detail="Arquivo PDF está vazio")
+    
+    print(f"Processando PDF: {file.filename} ({file_size} bytes)")
+    return await asyncio.to_thread(job_queue.submit, UPLOAD_PDF, {
+        "path": path,
+        "filename": file.filename,
+        "chunk_size": chunk_size,
+        "file_size": file_size,
+        "collection": DEFAULT_COLLECTION
+    })
 
 @router.post("/upload-pdf", response_model=Dict[str, Any])
 async def upload_pdf(file: UploadFile = File(...), chunk_size: int = 1000):
     """
     Upload e processamento de arquivo PDF com organização similar ao web scraping.
+    O PDF é processado em fluxo: as páginas são extraídas por faixas e os
+    chunks são incluídos em lotes à medida que ficam prontos.
+    
+    Roda como uma tarefa em segundo plano (ver /jobs/upload-pdf) e aguarda o
+    seu fim; se a conexão cair, a tarefa continua.
     """
     try:
-        # Verifica se é um arquivo PDF
-        if not file.filename.lower().endswith('.pdf'):
-            raise HTTPException(status_code=400, detail="Apenas arquivos PDF são aceitos")
-        
-        # Lê o conteúdo do arquivo
-        file_content = await file.read()
-        
-        if len(file_content) == 0:
-            raise HTTPException(status_code=400, detail="Arquivo PDF está vazio")
-        
-        print(f"Processando PDF: {file.filename} ({len(file_content)} bytes)")
-        
-        # Processa o PDF
-        chunks = pdf_processor.process_pdf(file_content, file.filename, chunk_size)
-        
-        if not chunks:
-            raise HTTPException(status_code=400, detail="Não foi possível extrair texto do PDF")
-        
-        print(f"PDF processado: {len(chunks)} chunks extraídos")
-        
-        # Prepara documentos para adicionar à base de conhecimento (formato similar ao web scraping)
-        documents_to_add = []
-        
-        for chunk in chunks:
-            # Formato consistente com web scraping para melhor agrupamento
-            document_text = f"""Fonte: {chunk['title']}
-Arquivo: {chunk['filename']}
-Tipo: PDF
-Página: {chunk['page_reference']} de {chunk['total_pages']}
-Palavras-chave: {', '.join(chunk['keywords'])}
-
-{chunk['text']}"""
-            
-            documents_to_add.append(document_text)
-        
-        # Adiciona à base de conhecimento
-        if documents_to_add:
-            result = ai_service.seed_knowledge_base(documents_to_add)
-            documents_added = len(result.get('ids', []))
-        else:
-            documents_added = 0
-        
-        return {
-            "success": True,
-            "message": f"PDF processado com sucesso! {documents_added} chunks adicionados.",
-            "filename": file.filename,
-            "chunks_extracted": len(chunks),
-            "documents_added": documents_added,
-            "total_pages": chunks[0]['total_pages'] if chunks else 0,
-            "title": chunks[0]['title'] if chunks else file.filename
-        }
+        job = await _submit_pdf(file, chunk_size)
+        job = await job_queue.wait(job["id"])
+        if job["status"] != "completed":
+            raise _job_failure(job, "ao processar PDF")
+        return job["result"]
         
     except HTTPException:
         raise
@@ -274,50 +358,68 @@ Palavras-chave: {', '.join(chunk['keywords'])}
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"Erro ao processar PDF: {str(e)}")
 
-# Função auxiliar para extrair informações da fonte
-def _extract_source_info(doc: str) -> Dict[str, str]:
+@router.post("/jobs/scrape-website", response_model=JobInfo, status_code=202)
+async def submit_scrape_website_job(request: WebScrapingRequest):
     """
-    Extrai informações da fonte do documento para agrupamento.
+    Enfileira um web scraping (como em /scrape-website) e retorna a tarefa
+    imediatamente; o progresso é consultado em /jobs/{job_id}.
     """
-    lines = doc.split('\n')
-    
-    # Valores padrão
-    source_info = {
-        'url': 'Documento manual',
-        'title': 'Documento sem título',
-        'group_key': 'Documentos manuais',
-        'type': 'manual'
-    }
-    
-    # Processa cada linha para extrair metadados
-    for line in lines:
-        line = line.strip()
-        
-        if line.startswith('Fonte:'):
-            title = line.replace('Fonte:', '').strip()
-            source_info['title'] = title
-            
-        elif line.startswith('URL:'):
-            url = line.replace('URL:', '').strip()
-            source_info['url'] = url
-            source_info['group_key'] = url
-            source_info['type'] = 'website'
-            
-        elif line.startswith('Arquivo:'):
-            filename = line.replace('Arquivo:', '').strip()
-            source_info['url'] = f"📄 {filename}"
-            source_info['group_key'] = f"PDF: {filename}"
-            source_info['type'] = 'pdf'
-            
-        elif line.startswith('Tipo: PDF'):
-            source_info['type'] = 'pdf'
-            # Se não temos título ainda, usa o nome do arquivo
-            if source_info['title'] == 'Documento sem título':
-                # Tenta extrair do grupo ou da próxima linha
-                if 'Arquivo:' in doc:
-                    filename_line = [l for l in lines if l.startswith('Arquivo:')]
-                    if filename_line:
-                        filename = filename_line[0].replace('Arquivo:', '').strip()
-                        source_info['title'] = filename.replace('.pdf', '')
-    
-    return source_info
\ No newline at end of file
+    try:
+        return await asyncio.to_thread(job_queue.submit, SCRAPE_WEBSITE, _scrape_params(request))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erro ao enfileirar web scraping: {str(e)}")
+
+@router.post("/jobs/upload-pdf", response_model=JobInfo, status_code=202)
+async def submit_upload_pdf_job(file: UploadFile = File(...), chunk_size: int = 1000):
+    """
+    Recebe um PDF (como em /upload-pdf), enfileira o seu processamento e
+    retorna a tarefa imediatamente; o progresso é consultado em /jobs/{job_id}.
+    """
+    try:
+        return await _submit_pdf(file, chunk_size)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erro ao enfileirar PDF: {str(e)}")
+
+@router.get("/jobs", response_model=JobListResponse)
+async def list_jobs(status: Optional[str] = None, limit: int = Query(50, ge=1, le=500)):
+    """
+    Lista as tarefas de inclusão, da mais recente para a mais antiga,
+    opcionalmente só as de um status (queued, running, completed, failed ou cancelled).
+    """
+    try:
+        return {"jobs": await asyncio.to_thread(job_queue.list, status, limit)}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erro ao listar tarefas: {str(e)}")
+
+@router.get("/jobs/{job_id}", response_model=JobInfo)
+async def get_job(job_id: str):
+    """
+    Estado de uma tarefa: status, progresso (páginas processadas, chunks
+    incluídos, vazão dos embeddings e tempo restante estimado) e, ao fim, o
+    resultado ou o erro.
+    """
+    try:
+        return await asyncio.to_thread(job_queue.get, job_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Tarefa não encontrada")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erro ao consultar tarefa: {str(e)}")
+
+@router.post("/jobs/{job_id}/cancel", response_model=JobInfo)
+async def cancel_job(job_id: str):
+    """
+    Cancela uma tarefa na fila ou em execução. Os lotes já incluídos
+    permanecem na coleção.
+    """
+    try:
+        return await asyncio.to_thread(job_queue.cancel, job_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Tarefa não encontrada")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erro ao cancelar tarefa: {str(e)}")
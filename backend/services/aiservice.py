@@ -1,15 +1,36 @@
-from services.vectordb import VectorDBService
-from sentence_transformers import SentenceTransformer
+from services.model_provider import model_provider
+from services.metadata_index import source_header
+from services.query_cache import normalize_query
+from services.concurrency import query_pool
+import json
 import random
 import re
 
 class AIService:
-    def __init__(self):
-        self.vector_db = VectorDBService()
+    def __init__(self, vector_db=None, retrieval_mode="hybrid", answer_cache=None):
+        self._vector_db = vector_db
+        # Busca usada nas respostas: "dense", "lexical" ou "hybrid" (ver VectorDBService.query)
+        self.retrieval_mode = retrieval_mode
+        # Respostas já montadas, compartilhadas por todos os AIService (ver `_answer_key`)
+        self.answer_cache = answer_cache if answer_cache is not None else model_provider.answer_cache
         
-    def seed_knowledge_base(self, documents):
+    @property
+    def vector_db(self):
         """
-        Adiciona documentos à base de conhecimento.
+        Coleção usada nas respostas: a informada na criação ou a padrão, obtida
+        do registro compartilhado a cada uso (o que conta como acesso recente
+        para o limite de memória das coleções).
+        """
+        if self._vector_db is not None:
+            return self._vector_db
+        return model_provider.get_vector_db()
+        
+    def seed_knowledge_base(self, documents, metadatas=None, skip_duplicates=False, near_duplicates=None):
+        """
+        Adiciona documentos à base de conhecimento. Os metadados (URL, arquivo,
+        páginas...) alimentam os filtros de busca. Com `skip_duplicates`,
+        trechos já existentes não são inseridos novamente; `near_duplicates`
+        escolhe o tratamento dos trechos quase iguais (ver VectorDBService.add_documents).
         """
         print(f"Adicionando {len(documents)} documentos à base de conhecimento")
         
@@ -18,24 +39,110 @@ class AIService:
             return {"ids": []}
         
         try:
-            result = self.vector_db.add_documents(documents)
+            result = self.vector_db.add_documents(
+                documents, metadatas, skip_duplicates=skip_duplicates, near_duplicates=near_duplicates
+            )
             print(f"Documentos adicionados com sucesso. IDs: {result.get('ids', [])}")
+            if result.get('duplicates'):
+                print(f"Duplicatas ignoradas: {len(result['duplicates'])}")
+            if result.get('near_duplicates'):
+                print(f"Quase duplicatas não incluídas: {len(result['near_duplicates'])}")
             return result
         except Exception as e:
             print(f"Erro ao adicionar documentos: {str(e)}")
             raise e
 
     # ... resto da classe mantém igual ...
-    def answer_query(self, query, conversation_history=None):
+    def answer_query(self, query, conversation_history=None, where=None):
         """
         Responde à consulta do usuário, considerando o histórico de conversas
-        e buscando informações relevantes na base de conhecimento.
+        e buscando informações relevantes na base de conhecimento. `where`
+        restringe a busca a uma fonte (ver VectorDBService.query).
         """
         if conversation_history is None:
             conversation_history = []
             
+        # Perguntas frequentes são respondidas do cache enquanto a coleção não mudar
+        key = self._answer_key(query, where)
+        cached = self.answer_cache.get(key)
+        if cached is not None:
+            return dict(cached)
+        
         # Busca informações relevantes na base de conhecimento
-        results = self.vector_db.query(query, n_results=5)
+        results = self.vector_db.query(query, n_results=5, where=where, mode=self.retrieval_mode)
+        
+        return self._cache_answer(key, self._answer_from_results(query, results))
+        
+    async def answer_query_async(self, query, conversation_history=None, where=None):
+        """
+        Versão assíncrona de `answer_query`. O embedding da consulta é gerado em
+        micro-lotes numa thread dedicada, liberando o event loop enquanto isso.
+        """
+        # A versão da coleção pode exigir atualizar os índices: fora do event loop
+        key = await query_pool.run(self._answer_key, query, where)
+        cached = self.answer_cache.get(key)
+        if cached is not None:
+            return dict(cached)
+        
+        results = await self.vector_db.query_async(query, n_results=5, where=where, mode=self.retrieval_mode)
+        
+        return self._cache_answer(key, self._answer_from_results(query, results))
+        
+    def answer_queries(self, queries, conversation_histories=None, wheres=None):
+        """
+        Responde a várias consultas de uma vez. A busca na base de conhecimento
+        é feita em um lote por filtro (uma codificação e um produto matriz-matriz).
+        """
+        if conversation_histories is None:
+            conversation_histories = [[] for _ in queries]
+        if wheres is None:
+            wheres = [None] * len(queries)
+        
+        # Respostas em cache saem direto; as demais são agrupadas pelo filtro usado
+        version = self.vector_db.version
+        keys = [self._answer_key(query, where, version) for query, where in zip(queries, wheres)]
+        answers = [self.answer_cache.get(key) for key in keys]
+        groups = {}
+        for i, where in enumerate(wheres):
+            if answers[i] is None:
+                groups.setdefault(json.dumps(where, sort_keys=True), []).append(i)
+        
+        for positions in groups.values():
+            batch = self.vector_db.query_many(
+                [queries[i] for i in positions], n_results=5, where=wheres[positions[0]], mode=self.retrieval_mode
+            )
+            for i, result in zip(positions, batch):
+                answers[i] = self._cache_answer(keys[i], self._answer_from_results(queries[i], result))
+        
+        return [dict(answer) for answer in answers]
+        
+    def _answer_key(self, query, where, version=None):
+        """
+        Chave do cache de respostas: coleção, versão da coleção (muda a cada
+        inclusão, remoção ou reinício, invalidando as respostas anteriores),
+        modo de busca, consulta normalizada e filtro.
+        """
+        vector_db = self.vector_db
+        if version is None:
+            version = vector_db.version
+        return (
+            vector_db.collection_name, version, self.retrieval_mode,
+            normalize_query(query), json.dumps(where, sort_keys=True)
+        )
+        
+    def _cache_answer(self, key, response):
+        self.answer_cache.put(key, response)
+        return dict(response)
+        
+    def _answer_from_results(self, query, results):
+        """
+        Monta a resposta a partir dos documentos encontrados para a consulta.
+        """
+        if results and results.get('documents') and results.get('metadatas'):
+            # Os trechos guardam só o texto: a fonte (título, URL/arquivo, página) vem dos metadados
+            results = {**results, 'documents': [
+                self._with_source(doc, metadata) for doc, metadata in zip(results['documents'], results['metadatas'])
+            ]}
         
         if results and 'documents' in results and results['documents'] and 'distances' in results:
             # Analisa os resultados por relevância e conteúdo
@@ -118,6 +225,14 @@ class AIService:
             }
             
         return response
+        
+    @staticmethod
+    def _with_source(document, metadata):
+        """Acrescenta ao trecho o cabeçalho da fonte (trechos antigos já o trazem no texto)."""
+        header = source_header(metadata)
+        if not header or document.startswith('Fonte:'):
+            return document
+        return f"{header}\n\n{document}"
 
     def _format_response(self, prompt, documents, query):
         """
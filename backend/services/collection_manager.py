@@ -0,0 +1,207 @@
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+# Nomes de coleção viram nomes de arquivos e diretórios
+_COLLECTION_NAME = re.compile(r'^[A-Za-z0-9_-]{1,64}$')
+_CONFIG_SUFFIX = "_config.json"
+
+
+def validate_collection_name(name):
+    if not _COLLECTION_NAME.match(name or ""):
+        raise ValueError(f"Nome de coleção inválido: {name!r} (use letras, números, '_' e '-', até 64 caracteres)")
+    return name
+
+
+class CollectionManager:
+    """
+    Coleções abertas pelo processo (um VectorDBService por nome), com limite
+    de memória.
+
+    Cada acesso marca a coleção como a mais recente. Quando a memória estimada
+    das coleções carregadas passa de `memory_budget_mb`, as usadas há mais
+    tempo são descarregadas (VectorDBService.unload) até voltar ao limite; a
+    mais recente nunca é descarregada. O objeto continua registrado, então
+    quem guardou uma referência (como o AIService) segue funcionando e a
+    coleção é carregada de novo no próximo acesso.
+
+    A estimativa de memória de cada coleção é refeita apenas quando a sua
+    versão muda, de modo que verificar o limite a cada acesso é barato. Além
+    de `get` e `create`, cada carga e inclusão de uma coleção aberta aqui
+    (inclusive a padrão, obtida por `open`) agenda uma verificação do limite
+    em segundo plano (ver VectorDBService.on_resize).
+    """
+
+    def __init__(self, default_collection, memory_budget_mb=4096):
+        self.default_collection = default_collection
+        self.memory_budget_mb = memory_budget_mb
+        self._lock = threading.RLock()
+        self._collections = OrderedDict()
+        self._memory = {}
+        self._last_used = {}
+        self._evictions = {}
+        self._budget_thread = None
+        self._budget_check_pending = False
+
+    @property
+    def data_dir(self):
+        from services.vectordb import DATA_DIR
+
+        return DATA_DIR
+
+    def exists(self, name):
+        """Indica se a coleção está aberta ou existe em disco."""
+        return name in self._collections or os.path.exists(os.path.join(self.data_dir, f"{name}{_CONFIG_SUFFIX}"))
+
+    def names(self):
+        """Nomes das coleções abertas e das gravadas em disco."""
+        names = set(self._collections)
+        if os.path.isdir(self.data_dir):
+            names.update(
+                filename[:-len(_CONFIG_SUFFIX)] for filename in os.listdir(self.data_dir)
+                if filename.endswith(_CONFIG_SUFFIX)
+            )
+        return sorted(names)
+
+    def opened(self):
+        """Coleções abertas (carregadas ou não), da menos para a mais recente."""
+        with self._lock:
+            return dict(self._collections)
+
+    def open(self, name, **options):
+        """
+        Retorna o VectorDBService da coleção, criando-o no primeiro acesso, sem
+        carregar os dados (isso acontece no primeiro uso). Apenas registra o
+        acesso: é barato o bastante para ser chamado a cada requisição, inclusive
+        no event loop. O limite de memória é aplicado em `get`, `create` e
+        `enforce_budget`, e em segundo plano depois de cada carga e inclusão.
+        """
+        with self._lock:
+            vector_db = self._collections.get(name)
+            if vector_db is None:
+                from services.vectordb import VectorDBService
+
+                vector_db = self._collections[name] = VectorDBService(validate_collection_name(name), **options)
+                vector_db.on_resize = self.schedule_budget_check
+            self._collections.move_to_end(name)
+            self._last_used[name] = time.time()
+            return vector_db
+
+    def get(self, name, **options):
+        """
+        Retorna a coleção já carregada e com os índices em dia. KeyError se ela
+        não existir (use `create` para criar).
+        """
+        if not self.exists(name):
+            raise KeyError(name)
+        vector_db = self.open(name, **options)
+        vector_db._sync()
+        self.enforce_budget()
+        return vector_db
+
+    def create(self, name, **options):
+        """Cria uma coleção vazia (`options` como em VectorDBService). ValueError se já existir."""
+        validate_collection_name(name)
+        with self._lock:
+            if self.exists(name):
+                raise ValueError(f"A coleção '{name}' já existe")
+            vector_db = self.open(name, **options)
+        vector_db._sync()
+        self.enforce_budget()
+        return self.describe(name)
+
+    def drop(self, name):
+        """Apaga a coleção do disco e a remove do registro. A coleção padrão não pode ser apagada."""
+        if name == self.default_collection:
+            raise ValueError("A coleção padrão não pode ser removida")
+        if not self.exists(name):
+            raise KeyError(name)
+
+        vector_db = self.open(name)
+        with self._lock:
+            self._collections.pop(name, None)
+            for stats in (self._memory, self._last_used, self._evictions):
+                stats.pop(name, None)
+        return vector_db.drop()
+
+    def _memory_usage(self, name, vector_db):
+        # Estimativa refeita apenas quando a coleção muda (ou é carregada/descarregada)
+        key = (vector_db.loaded, vector_db.store.version)
+        cached = self._memory.get(name)
+        if cached is None or cached[0] != key:
+            cached = self._memory[name] = (key, vector_db.memory_usage())
+        return cached[1]
+
+    def resident_bytes(self):
+        return sum(self._memory_usage(name, vector_db) for name, vector_db in self.opened().items())
+
+    def enforce_budget(self):
+        """Descarrega as coleções usadas há mais tempo enquanto o total passar do limite."""
+        if self.memory_budget_mb is None:
+            return
+        budget = self.memory_budget_mb * 1024 * 1024
+
+        collections = list(self.opened().items())
+        usage = {name: self._memory_usage(name, vector_db) for name, vector_db in collections}
+        total = sum(usage.values())
+        # A mais recente (a última) fica sempre carregada
+        for name, vector_db in collections[:-1]:
+            if total <= budget:
+                break
+            if not usage[name]:
+                continue
+            if vector_db.unload():
+                total -= usage[name]
+                with self._lock:
+                    self._evictions[name] = self._evictions.get(name, 0) + 1
+                print(f"Coleção '{name}' descarregada pelo limite de memória ({self.memory_budget_mb} MB)")
+
+    def schedule_budget_check(self):
+        """
+        Agenda `enforce_budget` numa thread própria: pode ser chamado de dentro
+        das travas de uma coleção (descarregar outra exige a trava dela) e
+        não bloqueia quem carregou ou incluiu documentos.
+        """
+        with self._lock:
+            self._budget_check_pending = True
+            if self._budget_thread is not None:
+                return
+            self._budget_thread = threading.Thread(target=self._check_budget_in_background, daemon=True)
+            self._budget_thread.start()
+
+    def _check_budget_in_background(self):
+        # Pedidos feitos durante uma verificação disparam mais uma, em seguida
+        while True:
+            with self._lock:
+                if not self._budget_check_pending:
+                    self._budget_thread = None
+                    return
+                self._budget_check_pending = False
+            try:
+                self.enforce_budget()
+            except Exception as e:
+                print(f"Erro ao aplicar o limite de memória das coleções: {str(e)}")
+
+    def describe(self, name=None):
+        """
+        Situação de uma coleção (ou de todas, se `name` for None): se está
+        carregada, documentos, memória estimada, tempo da última carga, último
+        acesso e quantas vezes foi descarregada pelo limite de memória.
+        """
+        if name is None:
+            return [self.describe(collection) for collection in self.names()]
+
+        vector_db = self._collections.get(name)
+        loaded = vector_db is not None and vector_db.loaded
+        return {
+            "name": name,
+            "loaded": loaded,
+            "documents": vector_db.store.live_count if loaded else None,
+            "memory_mb": round(self._memory_usage(name, vector_db) / (1024 * 1024), 2) if vector_db else 0.0,
+            "load_seconds": vector_db.load_seconds if vector_db else None,
+            "index_type": vector_db.index_type if vector_db else None,
+            "last_used": self._last_used.get(name),
+            "evictions": self._evictions.get(name, 0)
+        }
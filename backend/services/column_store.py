@@ -0,0 +1,289 @@
+import os
+import json
+from bisect import bisect_right
+import numpy as np
+
+# Tipos de linha da coluna de metadados
+_NONE, _DICT, _VALUE = 0, 1, 2
+_SCALARS = (str, int, float, bool, type(None))
+
+
+def _fsync(f):
+    f.flush()
+    os.fsync(f.fileno())
+
+
+def _write_atomic(path, write):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        write(f)
+        _fsync(f)
+    os.replace(tmp_path, path)
+
+
+def _open_bytes(path, mmap):
+    """Conteúdo do arquivo como array uint8 (mapeado em memória quando `mmap` está ativo)."""
+    if os.path.getsize(path) == 0:
+        return np.zeros(0, dtype=np.uint8)
+    if mmap:
+        return np.memmap(path, dtype=np.uint8, mode='r')
+    return np.fromfile(path, dtype=np.uint8)
+
+
+def _pack_texts(texts):
+    """Codifica os textos em UTF-8: (blob, offsets), com offsets[i]:offsets[i + 1] delimitando a linha i."""
+    encoded = [text.encode('utf-8') for text in texts]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(data) for data in encoded], out=offsets[1:])
+    return np.frombuffer(b''.join(encoded), dtype=np.uint8), offsets
+
+
+class TextColumn:
+    """
+    Coluna de textos armazenada como um único blob UTF-8 mais um array de
+    offsets. As linhas são decodificadas apenas quando acessadas, então abrir
+    um segmento não cria nenhum objeto Python por linha; com mmap o blob fica
+    no cache de páginas do sistema, compartilhado entre os workers.
+    """
+
+    def __init__(self, blob, offsets):
+        self.blob = blob
+        self.offsets = offsets
+
+    @classmethod
+    def from_texts(cls, texts):
+        return cls(*_pack_texts(texts))
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        start, end = self.offsets[index], self.offsets[index + 1]
+        return self.blob[start:end].tobytes().decode('utf-8')
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def take(self, positions):
+        """Nova coluna (em memória) com as linhas informadas, copiando bytes sem decodificá-los."""
+        positions = np.asarray(positions, dtype=np.int64)
+        starts, ends = self.offsets[positions], self.offsets[positions + 1]
+        offsets = np.zeros(len(positions) + 1, dtype=np.int64)
+        np.cumsum(ends - starts, out=offsets[1:])
+        # Posição no blob de cada byte copiado: início da linha + deslocamento dentro dela
+        source = np.repeat(starts - offsets[:-1], ends - starts) + np.arange(offsets[-1], dtype=np.int64)
+        return TextColumn(np.asarray(self.blob[source], dtype=np.uint8), offsets)
+
+    @staticmethod
+    def concat(columns):
+        """Une colunas (ou listas de textos) em sequência, também sem decodificar as colunas."""
+        columns = [column if isinstance(column, TextColumn) else TextColumn.from_texts(column) for column in columns]
+        offsets, blobs, size = [np.zeros(1, dtype=np.int64)], [np.zeros(0, dtype=np.uint8)], 0
+        for column in columns:
+            base = column.offsets[0]
+            offsets.append(column.offsets[1:] - base + size)
+            blobs.append(np.asarray(column.blob[base:column.offsets[-1]], dtype=np.uint8))
+            size += int(column.offsets[-1] - base)
+        return TextColumn(np.concatenate(blobs), np.concatenate(offsets))
+
+
+def write_text_column(path, texts):
+    """
+    Grava `path` (blob UTF-8) e `path`.offsets.npy. Aceita uma lista de textos
+    ou uma TextColumn (cujos bytes são copiados diretamente).
+    """
+    column = texts if isinstance(texts, TextColumn) else TextColumn.from_texts(texts)
+    base = column.offsets[0]
+    _write_atomic(path, lambda f: f.write(np.asarray(column.blob[base:column.offsets[-1]]).tobytes()))
+    _write_atomic(f"{path}.offsets.npy", lambda f: np.save(f, column.offsets - base))
+
+
+def open_text_column(path, mmap=True):
+    offsets = np.load(f"{path}.offsets.npy", mmap_mode='r' if mmap else None)
+    return TextColumn(_open_bytes(path, mmap), offsets)
+
+
+class MetadataColumn:
+    """
+    Coluna binária de metadados. Os nomes dos campos e os valores distintos
+    (codificados em JSON) são guardados uma única vez; cada linha é apenas uma
+    sequência de pares (campo, valor) em um array uint32. Como os trechos de
+    uma mesma página ou PDF repetem URL, título e tipo, cada valor repetido
+    ocupa 8 bytes por linha. Os dicionários são montados apenas no acesso.
+    """
+
+    def __init__(self, keys, values, pairs, row_offsets, kinds):
+        self.keys = keys
+        self.values = values
+        self.pairs = pairs
+        self.row_offsets = row_offsets
+        self.kinds = kinds
+        self._scalars = {}
+
+    @classmethod
+    def from_rows(cls, rows):
+        keys, key_index, values, value_index = [], {}, [], {}
+        pairs, row_offsets, kinds = [], [0], []
+
+        def intern(value):
+            encoded = json.dumps(value, ensure_ascii=False, sort_keys=True)
+            position = value_index.get(encoded)
+            if position is None:
+                position = value_index[encoded] = len(values)
+                values.append(encoded)
+            return position
+
+        for row in rows:
+            if row is None:
+                kinds.append(_NONE)
+            elif isinstance(row, dict):
+                kinds.append(_DICT)
+                for key, value in row.items():
+                    key = str(key)
+                    if key not in key_index:
+                        key_index[key] = len(keys)
+                        keys.append(key)
+                    pairs.append((key_index[key], intern(value)))
+            else:
+                kinds.append(_VALUE)
+                pairs.append((0, intern(row)))
+            row_offsets.append(len(pairs))
+
+        return cls(
+            keys, TextColumn.from_texts(values),
+            np.array(pairs, dtype=np.uint32).reshape(-1, 2),
+            np.array(row_offsets, dtype=np.int64), np.array(kinds, dtype=np.uint8)
+        )
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def _value(self, position):
+        # Valores escalares repetidos são decodificados uma única vez; listas e
+        # dicionários, sempre de novo (o chamador pode alterá-los)
+        value = self._scalars.get(position, self)
+        if value is self:
+            value = json.loads(self.values[position])
+            if isinstance(value, _SCALARS):
+                self._scalars[position] = value
+        return value
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+
+        kind = self.kinds[index]
+        if kind == _NONE:
+            return None
+        pairs = self.pairs[self.row_offsets[index]:self.row_offsets[index + 1]]
+        if kind == _VALUE:
+            return self._value(int(pairs[0][1]))
+        return {self.keys[key]: self._value(int(value)) for key, value in pairs.tolist()}
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def field(self, name):
+        """
+        Valores de um campo em todas as linhas (None onde não existe), lidos
+        direto dos pares, sem montar os dicionários. Cada valor distinto é
+        decodificado uma única vez e compartilhado entre as linhas (somente leitura).
+        """
+        codes = np.full(len(self), -1, dtype=np.int64)
+        if name in self.keys and len(self.pairs):
+            selected = np.flatnonzero(self.pairs[:, 0] == self.keys.index(name))
+            rows = np.searchsorted(self.row_offsets, selected, side='right') - 1
+            codes[rows] = self.pairs[selected, 1]
+            codes[self.kinds != _DICT] = -1
+
+        distinct, inverse = np.unique(codes, return_inverse=True)
+        values = [None if code < 0 else json.loads(self.values[int(code)]) for code in distinct.tolist()]
+        return [values[i] for i in inverse.tolist()]
+
+
+def write_metadata_column(path, rows):
+    column = rows if isinstance(rows, MetadataColumn) else MetadataColumn.from_rows(rows)
+    _write_atomic(path, lambda f: np.savez(
+        f,
+        keys=np.frombuffer(json.dumps(column.keys, ensure_ascii=False).encode('utf-8'), dtype=np.uint8),
+        values=np.asarray(column.values.blob, dtype=np.uint8),
+        value_offsets=np.asarray(column.values.offsets),
+        pairs=column.pairs,
+        row_offsets=column.row_offsets,
+        kinds=column.kinds
+    ))
+
+
+def open_metadata_column(path):
+    # Os arrays são pequenos (8 bytes por campo e linha) e ficam inteiros na memória
+    with np.load(path) as data:
+        return MetadataColumn(
+            json.loads(data['keys'].tobytes().decode('utf-8')),
+            TextColumn(data['values'], data['value_offsets']),
+            data['pairs'], data['row_offsets'], data['kinds']
+        )
+
+
+class ConcatColumn:
+    """
+    Visão somente leitura de várias colunas (ou listas) em sequência, usada
+    para expor os documentos e metadados de todos os segmentos como uma única
+    sequência indexável sem copiá-los. `lengths` fixa o tamanho de cada parte,
+    de modo que listas que continuam crescendo não mudam uma visão já publicada.
+    """
+
+    def __init__(self, parts, lengths=None):
+        self.parts = parts
+        lengths = [len(part) for part in parts] if lengths is None else lengths
+        self._starts = np.cumsum([0] + list(lengths), dtype=np.int64)
+        self._start_list = self._starts.tolist()
+
+    def __len__(self):
+        return int(self._starts[-1])
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                return [self[i] for i in range(start, stop, step)]
+            rows = []
+            for part, part_start, part_end in zip(self.parts, self._start_list, self._start_list[1:]):
+                if part_end > start and part_start < stop:
+                    rows.extend(part[max(start, part_start) - part_start:min(stop, part_end) - part_start])
+            return rows
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        part = bisect_right(self._start_list, index) - 1
+        return self.parts[part][index - self._start_list[part]]
+
+    def __iter__(self):
+        for part, part_start, part_end in zip(self.parts, self._start_list, self._start_list[1:]):
+            for i in range(part_end - part_start):
+                yield part[i]
+
+    def field(self, name, start=0):
+        """
+        Valores do campo `name` a partir da linha `start`, para visões de
+        metadados: colunas são lidas com MetadataColumn.field e listas de
+        dicionários (linhas do log), linha a linha.
+        """
+        values = []
+        for part, part_start, part_end in zip(self.parts, self._start_list, self._start_list[1:]):
+            if part_end <= start:
+                continue
+            if isinstance(part, MetadataColumn):
+                column = part.field(name)
+            else:
+                column = [row.get(name) if isinstance(row, dict) else None for row in part[:part_end - part_start]]
+            values.extend(column[max(start - part_start, 0):part_end - part_start])
+        return values
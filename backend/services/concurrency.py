@@ -0,0 +1,136 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+import weakref
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import partial
+
+
+class ReadWriteLock:
+    """
+    Trava de leitores/escritores com preferência para escritores: várias
+    leituras simultâneas, escritas exclusivas, e novas leituras aguardam
+    enquanto houver um escritor esperando (escritas não passam fome).
+
+    A escrita é reentrante na mesma thread, e uma thread que já escreve
+    também pode ler.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._readers = 0
+        self._writer = None
+        self._writer_depth = 0
+        self._waiting_writers = 0
+
+    @contextmanager
+    def read(self):
+        me = threading.get_ident()
+        if self._writer == me:
+            yield
+            return
+
+        with self._condition:
+            while self._writer is not None or self._waiting_writers:
+                self._condition.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._readers -= 1
+                if self._readers == 0:
+                    self._condition.notify_all()
+
+    @contextmanager
+    def write(self):
+        me = threading.get_ident()
+        with self._condition:
+            if self._writer == me:
+                self._writer_depth += 1
+            else:
+                self._waiting_writers += 1
+                try:
+                    while self._writer is not None or self._readers:
+                        self._condition.wait()
+                finally:
+                    self._waiting_writers -= 1
+                self._writer = me
+                self._writer_depth = 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._writer_depth -= 1
+                if self._writer_depth == 0:
+                    self._writer = None
+                    self._condition.notify_all()
+
+
+class BlockingPool:
+    """
+    Executor limitado para trabalho bloqueante chamado pelas rotas assíncronas.
+
+    No máximo `max_workers` tarefas executam ao mesmo tempo e no máximo
+    `max_pending` aguardam na fila; as demais esperam sem bloquear o event loop.
+    Com `processes=True` as tarefas rodam em processos separados (para código
+    Python puro que segura o GIL, como a extração de texto de PDFs); nesse caso
+    a função e os argumentos precisam ser serializáveis.
+
+    O executor é compartilhado, mas a fila de espera é por event loop: o pool
+    pode ser usado pelas rotas e pelas tarefas em segundo plano (JobQueue),
+    que rodam no seu próprio loop.
+    """
+
+    def __init__(self, name, max_workers, max_pending=None, processes=False):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_pending = max_pending if max_pending is not None else 4 * max_workers
+        self.processes = processes
+        self._executor = None
+        self._slots = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                if self.processes:
+                    # "spawn" evita herdar as threads e o modelo carregados no processo principal
+                    self._executor = ProcessPoolExecutor(
+                        self.max_workers, mp_context=multiprocessing.get_context("spawn")
+                    )
+                else:
+                    self._executor = ThreadPoolExecutor(self.max_workers, thread_name_prefix=self.name)
+            return self._executor
+
+    async def run(self, fn, *args, **kwargs):
+        """Executa `fn(*args, **kwargs)` no pool e aguarda o resultado."""
+        loop = asyncio.get_running_loop()
+        slots = self._slots.get(loop)
+        if slots is None:
+            slots = self._slots[loop] = asyncio.Semaphore(self.max_workers + self.max_pending)
+        async with slots:
+            return await loop.run_in_executor(self._get_executor(), partial(fn, *args, **kwargs))
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+
+_CPUS = os.cpu_count() or 2
+
+# Buscas (pontuação dos vetores e montagem das respostas): numpy e faiss liberam o GIL
+query_pool = BlockingPool("query", max_workers=max(2, _CPUS))
+# Inclusões e remoções: poucas por vez, já que a escrita na coleção é exclusiva
+ingest_pool = BlockingPool("ingest", max_workers=2)
+# Extração de texto de PDFs em processos separados
+pdf_pool = BlockingPool("pdf", max_workers=max(1, min(4, _CPUS // 2)), processes=True)
+
+
+def shutdown_pools():
+    for pool in (query_pool, ingest_pool, pdf_pool):
+        pool.shutdown()
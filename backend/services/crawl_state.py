@@ -0,0 +1,100 @@
+import json
+import sqlite3
+import threading
+import time
+from collections import Counter
+
+
+class CrawlState:
+    """
+    Estado do último rastreamento de cada página de uma coleção, em SQLite:
+    validadores HTTP (ETag e Last-Modified), hash do conteúdo extraído, IDs
+    dos trechos que a página incluiu na coleção e links encontrados nela.
+
+    Com ele, um novo rastreamento do site faz requisições condicionais, pula
+    as páginas que não mudaram (e segue pelos links guardados) e, nas que
+    mudaram, substitui apenas os trechos daquela página (ver SiteIndexer).
+
+    Um trecho pode ser citado por várias páginas (conteúdo repetido é incluído
+    uma só vez); `shared_ids` indica quais ainda são citados por outras.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+        self._lock = threading.Lock()
+        self._references = None
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS pages ("
+            "url TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, content_hash TEXT NOT NULL, "
+            "chunk_ids TEXT NOT NULL, links TEXT NOT NULL, fetched_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM pages").fetchone()[0]
+
+    @staticmethod
+    def _row(row):
+        url, etag, last_modified, digest, chunk_ids, links, fetched_at = row
+        return {
+            "url": url,
+            "etag": etag,
+            "last_modified": last_modified,
+            "content_hash": digest,
+            "chunk_ids": json.loads(chunk_ids),
+            "links": json.loads(links),
+            "fetched_at": fetched_at
+        }
+
+    def get(self, url):
+        """Estado da página, ou None se ela nunca foi incluída."""
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM pages WHERE url = ?", (url,)).fetchone()
+        return self._row(row) if row else None
+
+    def pages(self):
+        """Estado de todas as páginas, por URL."""
+        with self._lock:
+            rows = self._conn.execute("SELECT * FROM pages").fetchall()
+        return {row[0]: self._row(row) for row in rows}
+
+    def _reference_counts(self):
+        # Quantas páginas citam cada trecho; montado na primeira consulta (com a trava)
+        if self._references is None:
+            self._references = Counter()
+            for (chunk_ids,) in self._conn.execute("SELECT chunk_ids FROM pages"):
+                self._references.update(set(json.loads(chunk_ids)))
+        return self._references
+
+    def _chunk_ids(self, url):
+        row = self._conn.execute("SELECT chunk_ids FROM pages WHERE url = ?", (url,)).fetchone()
+        return set(json.loads(row[0])) if row else set()
+
+    def shared_ids(self, url, chunk_ids):
+        """IDs de `chunk_ids` que outras páginas, além de `url`, também citam."""
+        with self._lock:
+            references = self._reference_counts()
+            own = self._chunk_ids(url)
+            return [i for i in chunk_ids if references[i] - (i in own) > 0]
+
+    def put(self, url, content_hash, chunk_ids, links, etag=None, last_modified=None):
+        """Registra (ou substitui) o estado da página após incluí-la ou conferi-la."""
+        chunk_ids = list(dict.fromkeys(int(i) for i in chunk_ids))
+        with self._lock:
+            if self._references is not None:
+                self._references.subtract(self._chunk_ids(url))
+                self._references.update(chunk_ids)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (url, etag, last_modified, content_hash, json.dumps(chunk_ids),
+                 json.dumps(list(links)), time.time())
+            )
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,240 @@
+import asyncio
+import xml.etree.ElementTree as ElementTree
+from collections import deque
+from urllib.parse import urljoin, urldefrag, urlparse
+from urllib.robotparser import RobotFileParser
+import httpx
+
+# Links para arquivos que não são páginas HTML não entram na fila
+SKIPPED_EXTENSIONS = (
+    ".pdf", ".jpg", ".jpeg", ".png", ".gif", ".svg", ".webp", ".ico", ".css", ".js", ".zip", ".rar",
+    ".doc", ".docx", ".xls", ".xlsx", ".ppt", ".pptx", ".mp3", ".mp4", ".avi", ".xml", ".json"
+)
+
+
+def normalize_url(url, base=None):
+    """URL absoluta, sem fragmento (#...), ou None se não for http(s)."""
+    url = urldefrag(urljoin(base, url) if base else url)[0]
+    parsed = urlparse(url)
+    if parsed.scheme not in ("http", "https") or not parsed.netloc:
+        return None
+    if not parsed.path:
+        url = parsed._replace(path="/").geturl()
+    return url
+
+
+def site_key(url):
+    """Domínio usado para restringir o rastreamento ("www." é ignorado)."""
+    host = urlparse(url).netloc.lower()
+    return host[4:] if host.startswith("www.") else host
+
+
+class SiteCrawler:
+    """
+    Rastreador assíncrono de um site.
+
+    Começa pela URL informada e pelas URLs do sitemap (os indicados no
+    robots.txt ou /sitemap.xml) e segue os links do mesmo domínio em largura,
+    até `max_pages` páginas. Respeita o robots.txt (regras e Crawl-delay) e
+    usa um único cliente httpx com conexões keep-alive, com no máximo
+    `max_concurrency` downloads ao todo e `max_per_host` por host.
+
+    Cada página baixada é entregue a `parse(url, conteúdo)`, executada numa
+    thread, que retorna (resultado, links); os resultados são produzidos por
+    `crawl` à medida que as páginas chegam, com os links e os validadores HTTP
+    ("etag" e "last_modified") da resposta.
+
+    `known_pages` ({url: {"etag", "last_modified", "links"}}) tem o estado de
+    um rastreamento anterior: essas páginas são pedidas com If-None-Match e
+    If-Modified-Since e, se o servidor responder 304, não são baixadas nem
+    processadas; o resultado vem com "not_modified" e o rastreamento segue
+    pelos links guardados.
+    """
+
+    def __init__(self, parse, max_pages=10, max_concurrency=8, max_per_host=4, timeout=30,
+                 user_agent="Mozilla/5.0", respect_robots=True, max_sitemaps=10, known_pages=None):
+        self.parse = parse
+        self.max_pages = max_pages
+        self.max_concurrency = max_concurrency
+        self.max_per_host = max_per_host
+        self.timeout = timeout
+        self.user_agent = user_agent
+        self.respect_robots = respect_robots
+        self.max_sitemaps = max_sitemaps
+        self.known_pages = known_pages or {}
+
+    async def crawl(self, start_url):
+        """
+        Gerador assíncrono: produz o resultado de `parse` (ou um erro) de cada
+        página. A fila de resultados é limitada: se o consumidor atrasa, os
+        downloads param até ele voltar a consumir.
+        """
+        results = asyncio.Queue(maxsize=self.max_concurrency)
+        done = object()
+
+        async def run():
+            try:
+                await self._crawl(start_url, results)
+            except asyncio.CancelledError:
+                # Cancelado pelo consumidor, que não espera mais resultados (e a fila pode estar cheia)
+                raise
+            except Exception:
+                await results.put(done)
+                raise
+            await results.put(done)
+
+        task = asyncio.create_task(run())
+        try:
+            while True:
+                result = await results.get()
+                if result is done:
+                    break
+                yield result
+            await task
+        finally:
+            # Consumidor interrompido: cancela os downloads restantes
+            task.cancel()
+
+    async def _crawl(self, start_url, results):
+        start_url = normalize_url(start_url)
+        site = site_key(start_url)
+        limits = httpx.Limits(max_connections=self.max_concurrency, max_keepalive_connections=self.max_concurrency)
+
+        async with httpx.AsyncClient(
+            headers={"User-Agent": self.user_agent}, timeout=self.timeout, limits=limits, follow_redirects=True
+        ) as client:
+            robots = await self._read_robots(client, start_url)
+            delay = robots.crawl_delay(self.user_agent) if robots else None
+            host_limits = {}
+
+            frontier = asyncio.Queue()
+            seen = set()
+
+            def enqueue(url):
+                # A fila é limitada pelo total de páginas: cada URL aceita é baixada uma vez
+                if url in seen or len(seen) >= self.max_pages or site_key(url) != site:
+                    return
+                if urlparse(url).path.lower().endswith(SKIPPED_EXTENSIONS):
+                    return
+                if robots and not robots.can_fetch(self.user_agent, url):
+                    return
+                seen.add(url)
+                frontier.put_nowait(url)
+
+            enqueue(start_url)
+            if len(seen) < self.max_pages:
+                for url in await self._read_sitemaps(client, start_url, robots):
+                    enqueue(url)
+            print(f"Rastreamento de {start_url}: {len(seen)} URLs iniciais (limite de {self.max_pages} páginas)")
+
+            async def worker():
+                while True:
+                    url = await frontier.get()
+                    try:
+                        host = urlparse(url).netloc
+                        # Com Crawl-delay, um download por vez no host, espaçados pelo intervalo
+                        semaphore = host_limits.setdefault(host, asyncio.Semaphore(1 if delay else self.max_per_host))
+                        result, links = await self._fetch_page(client, url, semaphore, delay)
+                        for link in links:
+                            enqueue(link)
+                        await results.put(result)
+                    finally:
+                        frontier.task_done()
+
+            workers = [asyncio.create_task(worker()) for _ in range(self.max_concurrency)]
+            try:
+                await frontier.join()
+            finally:
+                for task in workers:
+                    task.cancel()
+                await asyncio.gather(*workers, return_exceptions=True)
+
+    async def _fetch_page(self, client, url, semaphore, delay):
+        known = self.known_pages.get(url)
+        headers = {}
+        if known and known.get("etag"):
+            headers["If-None-Match"] = known["etag"]
+        if known and known.get("last_modified"):
+            headers["If-Modified-Since"] = known["last_modified"]
+        try:
+            async with semaphore:
+                response = await client.get(url, headers=headers)
+                if delay:
+                    await asyncio.sleep(delay)
+            if response.status_code == 304 and known:
+                links = known.get("links", [])
+                return {
+                    "url": url,
+                    "title": None,
+                    "chunks": [],
+                    "total_chunks": 0,
+                    "success": True,
+                    "not_modified": True,
+                    "links": links,
+                    "error": None
+                }, links
+            response.raise_for_status()
+
+            content_type = response.headers.get("content-type", "text/html")
+            if "html" not in content_type:
+                raise ValueError(f"Conteúdo não é HTML: {content_type}")
+
+            # Depois de redirecionamentos, os links são relativos à URL final
+            result, links = await asyncio.to_thread(self.parse, str(response.url), response.content)
+            result.update(
+                not_modified=False, links=links,
+                etag=response.headers.get("etag"), last_modified=response.headers.get("last-modified")
+            )
+            return result, links
+        except Exception as e:
+            print(f"Erro durante scraping de {url}: {str(e)}")
+            return {
+                "url": url,
+                "title": None,
+                "chunks": [],
+                "total_chunks": 0,
+                "success": False,
+                "error": str(e)
+            }, []
+
+    async def _read_robots(self, client, start_url):
+        """robots.txt do site, ou None se não existir (ou se `respect_robots` estiver desativado)."""
+        if not self.respect_robots:
+            return None
+        robots_url = urljoin(start_url, "/robots.txt")
+        try:
+            response = await client.get(robots_url)
+        except httpx.HTTPError:
+            return None
+        if response.status_code != 200:
+            return None
+
+        robots = RobotFileParser(robots_url)
+        robots.parse(response.text.splitlines())
+        return robots
+
+    async def _read_sitemaps(self, client, start_url, robots):
+        """URLs listadas nos sitemaps do site (índices de sitemaps são seguidos)."""
+        pending = deque((robots.site_maps() if robots else None) or [urljoin(start_url, "/sitemap.xml")])
+        visited, urls = set(), []
+
+        while pending and len(visited) < self.max_sitemaps and len(urls) < self.max_pages:
+            sitemap_url = pending.popleft()
+            if sitemap_url in visited:
+                continue
+            visited.add(sitemap_url)
+            try:
+                response = await client.get(sitemap_url)
+                if response.status_code != 200:
+                    continue
+                root = ElementTree.fromstring(response.content)
+            except (httpx.HTTPError, ElementTree.ParseError):
+                continue
+
+            # <sitemapindex> aponta para outros sitemaps; <urlset>, para as páginas
+            locations = [element.text.strip() for element in root.iterfind(".//{*}loc") if element.text]
+            if root.tag.endswith("sitemapindex"):
+                pending.extend(locations)
+            else:
+                urls.extend(url for url in map(normalize_url, locations) if url)
+        return urls
@@ -0,0 +1,214 @@
+import json
+import threading
+from array import array
+from collections import OrderedDict
+from typing import Dict
+import numpy as np
+from services.model_provider import model_provider
+
+# Modos da listagem: página de documentos ou apenas o resumo por fonte
+LIST_MODES = ("documents", "groups")
+
+
+def extract_source_info(doc: str) -> Dict[str, str]:
+    """
+    Extrai informações da fonte do documento para agrupamento.
+    """
+    lines = doc.split('\n')
+
+    # Valores padrão
+    source_info = {
+        'url': 'Documento manual',
+        'title': 'Documento sem título',
+        'group_key': 'Documentos manuais',
+        'type': 'manual'
+    }
+
+    # Processa cada linha para extrair metadados
+    for line in lines:
+        line = line.strip()
+
+        if line.startswith('Fonte:'):
+            title = line.replace('Fonte:', '').strip()
+            source_info['title'] = title
+
+        elif line.startswith('URL:'):
+            url = line.replace('URL:', '').strip()
+            source_info['url'] = url
+            source_info['group_key'] = url
+            source_info['type'] = 'website'
+
+        elif line.startswith('Arquivo:'):
+            filename = line.replace('Arquivo:', '').strip()
+            source_info['url'] = f"📄 {filename}"
+            source_info['group_key'] = f"PDF: {filename}"
+            source_info['type'] = 'pdf'
+
+        elif line.startswith('Tipo: PDF'):
+            source_info['type'] = 'pdf'
+            # Se não temos título ainda, usa o nome do arquivo
+            if source_info['title'] == 'Documento sem título':
+                # Tenta extrair do grupo ou da próxima linha
+                if 'Arquivo:' in doc:
+                    filename_line = [l for l in lines if l.startswith('Arquivo:')]
+                    if filename_line:
+                        filename = filename_line[0].replace('Arquivo:', '').strip()
+                        source_info['title'] = filename.replace('.pdf', '')
+
+    return source_info
+
+
+def source_info_from_fields(url=None, filename=None, title=None):
+    """
+    Mesmas informações de `extract_source_info`, a partir dos campos de fonte
+    gravados nos metadados. Retorna None se o trecho não tem URL nem arquivo.
+    """
+    if filename:
+        return {
+            'url': f"📄 {filename}",
+            'title': title or filename.replace('.pdf', ''),
+            'group_key': f"PDF: {filename}",
+            'type': 'pdf'
+        }
+    if url:
+        return {'url': url, 'title': title or 'Documento sem título', 'group_key': url, 'type': 'website'}
+    return None
+
+
+class DocumentListing:
+    """
+    Listagem paginada dos documentos de uma coleção.
+
+    As páginas usam um cursor (o último ID entregue): como os IDs só crescem,
+    a página seguinte continua estável mesmo com inclusões e remoções entre as
+    chamadas. A fonte de cada linha é lida das colunas de metadados (URL,
+    arquivo e título) uma única vez e guardada num catálogo, atualizado apenas
+    com as linhas novas enquanto o epoch da coleção não muda; só trechos sem
+    esses campos (manuais ou antigos) têm o cabeçalho do texto analisado. As
+    respostas já codificadas ficam num cache LRU indexado pela versão da
+    coleção, então recarregar a mesma página sem mudanças não toca nos documentos.
+    """
+
+    def __init__(self, vector_db=None, cache_size=64, preview_chars=200):
+        self._vector_db = vector_db
+        self.cache_size = cache_size
+        self.preview_chars = preview_chars
+        self._lock = threading.Lock()
+        self._responses = OrderedDict()
+
+        # Catálogo: grupo de cada linha do armazenamento e dados de cada grupo
+        self._epoch = None
+        self._row_groups = array('i')
+        self._group_index = {}
+        self._groups = []
+        self._live_version = None
+        self._live_mask = None
+        self._group_counts = None
+
+    @property
+    def vector_db(self):
+        """Coleção padrão, obtida do registro compartilhado a cada uso (ver AIService.vector_db)."""
+        if self._vector_db is not None:
+            return self._vector_db
+        return model_provider.get_vector_db()
+
+    def render(self, mode="documents", cursor=None, limit=100, include_content=False):
+        """
+        Retorna (versão, partes) da resposta JSON, para ser enviada em streaming.
+        Na listagem de documentos a página começa no primeiro ID maior que `cursor`
+        e `next_cursor` indica onde continuar (None na última página).
+        """
+        if mode not in LIST_MODES:
+            raise ValueError(f"Modo de listagem desconhecido: {mode}. Opções: {', '.join(LIST_MODES)}")
+
+        with self.vector_db.reading() as store:
+            version = store.version
+            key = (version, mode, cursor, limit, include_content)
+            with self._lock:
+                cached = self._responses.get(key)
+                if cached is not None:
+                    self._responses.move_to_end(key)
+                    return version, cached
+
+                self._update_catalog(store, version)
+                if mode == "groups":
+                    body = self._render_groups()
+                else:
+                    body = self._render_page(store, cursor, limit, include_content)
+                body.append(
+                    f', "total_documents": {int(self._live_mask.sum())}, '
+                    f'"unique_sources": {int(np.count_nonzero(self._group_counts))}}}'
+                )
+
+                self._responses[key] = body
+                if len(self._responses) > self.cache_size:
+                    self._responses.popitem(last=False)
+        return version, body
+
+    def _update_catalog(self, store, version):
+        if self._epoch != store.epoch:
+            # Compactação ou reinício: as posições mudaram, o catálogo é refeito
+            self._epoch = store.epoch
+            self._row_groups = array('i')
+            self._group_index = {}
+            self._groups = []
+            self._responses.clear()
+
+        start = len(self._row_groups)
+        columns = [store.metadata.field(field, start) for field in ("url", "filename", "title")]
+        for i, (url, filename, title) in enumerate(zip(*columns)):
+            source_info = source_info_from_fields(url, filename, title) or extract_source_info(store.documents[start + i])
+            group = self._group_index.get(source_info['group_key'])
+            if group is None:
+                group = self._group_index[source_info['group_key']] = len(self._groups)
+                self._groups.append(source_info)
+            self._row_groups.append(group)
+
+        if self._live_version != version:
+            # Respostas de versões anteriores não serão mais pedidas
+            self._responses.clear()
+            self._live_version = version
+            self._live_mask = store.live_mask()
+            row_groups = np.array(self._row_groups, dtype=np.int32)
+            self._group_counts = np.bincount(row_groups[self._live_mask], minlength=len(self._groups))
+
+    def _render_groups(self):
+        body = ['{"groups": [']
+        first = True
+        for group, count in enumerate(self._group_counts.tolist()):
+            if not count:
+                continue
+            source_info = self._groups[group]
+            body.append(("" if first else ", ") + json.dumps({
+                "group_key": source_info['group_key'],
+                "title": source_info['title'],
+                "url": source_info['url'],
+                "type": source_info['type'],
+                "documents": count
+            }, ensure_ascii=False))
+            first = False
+        body.append(']')
+        return body
+
+    def _render_page(self, store, cursor, limit, include_content):
+        start = int(np.searchsorted(store.all_ids, cursor, side='right')) if cursor is not None else 0
+        # Uma linha a mais indica se existe próxima página
+        positions = np.flatnonzero(self._live_mask[start:])[:limit + 1] + start
+        next_cursor = int(store.all_ids[positions[limit - 1]]) if len(positions) > limit else None
+
+        body = ['{"documents": [']
+        for i, position in enumerate(positions[:limit].tolist()):
+            doc = store.documents[position]
+            source_info = self._groups[self._row_groups[position]]
+            item = {
+                "id": int(store.all_ids[position]),
+                "content": doc[:self.preview_chars] + "..." if len(doc) > self.preview_chars else doc,
+                "full_content": doc if include_content else None,
+                "url": source_info['url'],
+                "title": source_info['title'],
+                "group_key": source_info['group_key'],
+                "metadata": store.metadata[position]
+            }
+            body.append(("" if i == 0 else ", ") + json.dumps(item, ensure_ascii=False))
+        body.append(f'], "next_cursor": {json.dumps(next_cursor)}')
+        return body
@@ -0,0 +1,98 @@
+import hashlib
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+import numpy as np
+
+
+def normalize_text(text):
+    """Normaliza o texto para comparação: Unicode NFC e espaços colapsados."""
+    return re.sub(r'\s+', ' ', unicodedata.normalize('NFC', text)).strip()
+
+
+def content_hash(text, model_name=""):
+    """Hash SHA-256 do texto normalizado (e do modelo, quando informado)."""
+    return hashlib.sha256(f"{model_name}\0{normalize_text(text)}".encode('utf-8')).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Cache persistente de embeddings em SQLite, indexado pelo hash do texto
+    normalizado e do nome do modelo.
+
+    Reprocessar a mesma página ou o mesmo PDF deixa de recalcular os embeddings
+    dos trechos já vistos. O cache tem tamanho limitado: ao passar de
+    `max_entries`, as entradas usadas há mais tempo são descartadas.
+    """
+
+    def __init__(self, path, model_name, max_entries=100000):
+        self.path = path
+        self.model_name = model_name
+        self.max_entries = max_entries
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "key TEXT PRIMARY KEY, vector BLOB NOT NULL, last_used INTEGER NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)")
+        self._conn.commit()
+
+    def key(self, text):
+        return content_hash(text, self.model_name)
+
+    def get_many(self, texts):
+        """Retorna {posição: embedding} para os textos encontrados no cache."""
+        keys = [self.key(text) for text in texts]
+        found = {}
+        with self._lock:
+            # Consulta em blocos para respeitar o limite de parâmetros do SQLite
+            for start in range(0, len(keys), 500):
+                chunk = list(set(keys[start:start + 500]))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(chunk))})", chunk
+                ).fetchall()
+                found.update((key, np.frombuffer(vector, dtype=np.float32)) for key, vector in rows)
+
+            if found:
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE key = ?",
+                    [(time.time_ns(), key) for key in found]
+                )
+                self._conn.commit()
+
+        return {i: found[key] for i, key in enumerate(keys) if key in found}
+
+    def put_many(self, texts, embeddings):
+        """Guarda os embeddings dos textos e aplica o limite de tamanho."""
+        now = time.time_ns()
+        rows = [
+            (self.key(text), np.asarray(embedding, dtype=np.float32).tobytes(), now)
+            for text, embedding in zip(texts, embeddings)
+        ]
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?)", rows)
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+        if count > self.max_entries:
+            self._conn.execute(
+                "DELETE FROM embeddings WHERE key IN "
+                "(SELECT key FROM embeddings ORDER BY last_used LIMIT ?)",
+                (count - self.max_entries,)
+            )
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM embeddings")
+            self._conn.commit()
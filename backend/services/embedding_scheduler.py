@@ -0,0 +1,77 @@
+import asyncio
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+
+class EmbeddingScheduler:
+    """
+    Agendador de micro-lotes para embeddings de consultas.
+
+    Textos enviados dentro de uma pequena janela de tempo (`max_wait_ms`) são
+    agrupados (até `max_batch_size`) e codificados juntos numa thread dedicada,
+    de modo que várias requisições concorrentes compartilham uma única passada
+    do modelo em vez de serializar uma passada por requisição.
+    """
+
+    def __init__(self, model, max_batch_size=32, max_wait_ms=5):
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, text):
+        """Enfileira um texto e retorna um Future com o seu embedding."""
+        self._ensure_worker()
+        future = Future()
+        self._queue.put((text, future))
+        return future
+
+    async def encode(self, text):
+        """Versão assíncrona de `submit`, para uso dentro do event loop."""
+        return await asyncio.wrap_future(self.submit(text))
+
+    def _ensure_worker(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="embedding-scheduler", daemon=True)
+                self._thread.start()
+
+    def _collect_batch(self):
+        """Espera o primeiro texto e junta os que chegarem até o fim da janela."""
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+
+        # Descarta pedidos cancelados antes de gastar tempo de modelo com eles
+        return [(text, future) for text, future in batch if future.set_running_or_notify_cancel()]
+
+    def _run(self):
+        while True:
+            batch = self._collect_batch()
+            if not batch:
+                continue
+
+            texts = [text for text, _ in batch]
+            try:
+                embeddings = self.model.encode(texts, batch_size=len(texts))
+            except Exception as e:
+                print(f"Erro ao gerar embeddings em lote: {str(e)}")
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            for (_, future), embedding in zip(batch, embeddings):
+                future.set_result(embedding)
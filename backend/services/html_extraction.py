@@ -0,0 +1,153 @@
+import re
+from lxml import etree
+from lxml import html as lxml_html
+from services.crawler import normalize_url
+
+# Removidos antes da extração (os links já foram coletados)
+REMOVED_TAGS = (
+    "script", "style", "noscript", "template", "iframe", "svg", "form", "button", "select",
+    "nav", "footer", "header", "aside"
+)
+# Elementos de bloco: terminam uma linha no texto extraído
+BLOCK_TAGS = frozenset((
+    "address", "article", "blockquote", "br", "dd", "div", "dl", "dt", "figcaption", "h1", "h2", "h3",
+    "h4", "h5", "h6", "hr", "li", "main", "ol", "p", "pre", "section", "table", "td", "th", "tr", "ul"
+))
+
+# Nomes de classe/id que indicam (ou descartam) o conteúdo principal, em inglês e português
+_POSITIVE = re.compile(
+    r"article|body|content|entry|main|post|story|text|conteudo|materia|noticia|texto|corpo", re.I
+)
+_NEGATIVE = re.compile(
+    r"banner|breadcrumb|comment|cookie|footer|masthead|menu|modal|nav|popup|related|share|sidebar|"
+    r"social|sponsor|widget|rodape|cabecalho|lateral|compartilh|barra|acessibilidade", re.I
+)
+_PARAGRAPH_TAGS = ("p", "pre", "td", "blockquote")
+# Abaixo disso, o candidato a conteúdo principal é descartado e a página inteira é usada
+MIN_MAIN_CHARS = 200
+
+
+def _class_weight(element):
+    weight = 0
+    for name in (element.get("class"), element.get("id")):
+        if name:
+            weight -= 25 if _NEGATIVE.search(name) else 0
+            weight += 25 if _POSITIVE.search(name) else 0
+    return weight
+
+
+def _text_length(element):
+    return len(" ".join(element.text_content().split()))
+
+
+def _link_density(element, length):
+    link_length = sum(_text_length(link) for link in element.iter("a"))
+    return link_length / length if length else 1.0
+
+
+def _drop_unlikely(root):
+    # Blocos cujo nome indica menu, banner, rodapé etc. (e nenhum indício de conteúdo)
+    for element in list(root.iter(etree.Element)):
+        if element.getparent() is None or element.tag in ("html", "body", "main", "article"):
+            continue
+        names = f"{element.get('class', '')} {element.get('id', '')}"
+        if names.strip() and _NEGATIVE.search(names) and not _POSITIVE.search(names):
+            element.drop_tree()
+
+
+def _best_candidate(root):
+    """
+    Elemento com o conteúdo principal: <main>, <article> ou role="main", se
+    houver; senão, o bloco mais bem pontuado pelos parágrafos que contém
+    (texto, vírgulas, nomes de classe e densidade de links), como no Readability.
+    """
+    explicit = root.xpath("//main | //article | //*[@role='main']")
+    if explicit:
+        best = max(explicit, key=_text_length)
+        if _text_length(best) >= MIN_MAIN_CHARS:
+            return best
+
+    scores = {}
+    for paragraph in root.iter(*_PARAGRAPH_TAGS):
+        text = " ".join(paragraph.text_content().split())
+        if len(text) < 25:
+            continue
+        score = 1 + text.count(",") + min(len(text) // 100, 3)
+        parent = paragraph.getparent()
+        for ancestor, share in ((parent, 1.0), (parent.getparent() if parent is not None else None, 0.5)):
+            if ancestor is None or ancestor.tag in ("html",):
+                continue
+            if ancestor not in scores:
+                scores[ancestor] = _class_weight(ancestor) + (5 if ancestor.tag in ("div", "section") else 0)
+            scores[ancestor] += score * share
+
+    best, best_score = None, 0
+    for element, score in scores.items():
+        score *= 1 - _link_density(element, _text_length(element))
+        if score > best_score:
+            best, best_score = element, score
+    if best is None or _text_length(best) < MIN_MAIN_CHARS:
+        return None
+    return best
+
+
+def _block_text(element):
+    # Quebra de linha ao fim de cada bloco, como a separação visual da página
+    for block in element.iter(*BLOCK_TAGS):
+        block.tail = "\n" + (block.tail or "")
+    return element.text_content()
+
+
+def _heading(root):
+    # Primeiro <h1> com texto, lido antes da limpeza: ele costuma ficar num <header> ou fora do conteúdo principal
+    for heading in root.iter("h1"):
+        text = " ".join(heading.text_content().split())
+        if text:
+            return text
+    return None
+
+
+def extract_html(content, url, main_content=True):
+    """
+    Extrai (título, texto, links) de uma página HTML com o lxml.
+
+    Os links (URLs absolutas, inclusive os de menus e rodapés) são coletados
+    antes da limpeza. Scripts, estilos, menus, cabeçalhos, rodapés e
+    formulários são removidos e, com `main_content`, o texto vem apenas do
+    conteúdo principal (ver `_best_candidate`), sem as listas de links e
+    avisos que se repetem em todas as páginas; se ele não for encontrado,
+    o texto é o da página inteira. O texto mantém uma linha por bloco.
+
+    O título da página (<h1>) abre o texto quando a limpeza o deixou de fora
+    e substitui o <title> quando este não existe.
+    """
+    try:
+        # Sem declaração de charset, o lxml assumiria Latin-1: UTF-8 válido é decodificado como tal
+        content.decode("utf-8")
+        parser = lxml_html.HTMLParser(encoding="utf-8", remove_comments=True)
+    except UnicodeDecodeError:
+        parser = lxml_html.HTMLParser(remove_comments=True)
+    try:
+        root = lxml_html.document_fromstring(content, parser=parser)
+    except (etree.ParserError, ValueError):
+        return None, "", []
+
+    links = [link for link in (normalize_url(href, url) for href in root.xpath("//a/@href")) if link]
+
+    title = root.findtext(".//title")
+    title = " ".join(title.split()) if title else None
+    heading = _heading(root)
+
+    etree.strip_elements(root, *REMOVED_TAGS, with_tail=False)
+    body = root.find("body")
+    if body is None:
+        body = root
+
+    main = None
+    if main_content:
+        _drop_unlikely(body)
+        main = _best_candidate(body)
+    text = _block_text(main if main is not None else body)
+    if heading and heading not in " ".join(text.split()):
+        text = heading + "\n" + text
+    return title or heading, text, links
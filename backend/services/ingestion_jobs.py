@@ -0,0 +1,120 @@
+import os
+from services.ingestion_pipeline import IngestionPipeline
+from services.job_queue import JobQueue
+from services.model_provider import model_provider, DEFAULT_COLLECTION
+from services.pdf_processor import iter_pdf_chunks
+from services.site_indexer import SiteIndexer
+from services.webscraper import WebScraperService
+
+JOBS_DIR = "./data/jobs"
+UPLOADS_DIR = os.path.join(JOBS_DIR, "uploads")
+
+SCRAPE_WEBSITE = "scrape-website"
+UPLOAD_PDF = "upload-pdf"
+
+web_scraper = WebScraperService()
+
+
+async def scrape_website(context):
+    """
+    Rastreia um site e atualiza a coleção (ver SiteIndexer). Retomada após um
+    reinício, a tarefa recomeça o rastreamento, mas as páginas já incluídas
+    são puladas pelo estado incremental.
+    """
+    params = context.params
+    vector_db = model_provider.get_vector_db(params.get("collection", DEFAULT_COLLECTION))
+    context.update(unit="páginas", done=0, total=params["max_pages"], chunks_indexed=0)
+
+    def on_progress(report):
+        context.update(
+            done=report["pages_fetched"] + report["pages_not_modified"] + report["pages_failed"],
+            chunks_indexed=report["chunks_added"],
+            pages_failed=report["pages_failed"]
+        )
+
+    # Menus e rodapés repetidos entre as páginas ficam num único trecho, que cita todas elas
+    indexer = SiteIndexer(web_scraper, vector_db, near_duplicates="merge")
+    report = await indexer.index_site(
+        params["url"], params["max_pages"], respect_robots=params["respect_robots"], on_progress=on_progress
+    )
+
+    documents_added = report["chunks_added"]
+    skipped = report["pages_not_modified"] + report["pages_unchanged"]
+    print(f"Documentos adicionados com sucesso: {documents_added}")
+    return {
+        "success": True,
+        "message": (
+            f"Web scraping concluído. {documents_added} chunks de {len(report['scraped_urls'])} páginas adicionados "
+            f"({skipped} páginas sem alterações, {report['pages_replaced']} atualizadas)."
+        ),
+        "documents_added": documents_added,
+        **report
+    }
+
+
+async def upload_pdf(context):
+    """
+    Extrai os chunks do PDF gravado em `params["path"]` e os inclui na coleção
+    em lotes. Retomada após um reinício, a tarefa processa o arquivo de novo;
+    os chunks já incluídos são ignorados como duplicatas, sem novos embeddings.
+    """
+    params = context.params
+    if not os.path.exists(params["path"]):
+        raise FileNotFoundError(f"Arquivo da tarefa não encontrado: {params['filename']}")
+    vector_db = model_provider.get_vector_db(params.get("collection", DEFAULT_COLLECTION))
+    context.update(unit="páginas", done=0, total=None, chunks_indexed=0)
+
+    extracted = {"chunks": 0, "title": params["filename"], "total_pages": 0}
+
+    async def pdf_chunks():
+        # A extração roda em processos separados (segura o GIL), várias faixas de páginas em paralelo
+        async for chunks in iter_pdf_chunks(
+            params["path"], params["filename"], params["chunk_size"],
+            on_pages=lambda done, total: context.update(done=done, total=total)
+        ):
+            if not extracted["chunks"]:
+                extracted.update(title=chunks[0]['title'], total_pages=chunks[0]['total_pages'])
+            extracted["chunks"] += len(chunks)
+            context.update(chunks_extracted=extracted["chunks"])
+            # Só o texto é indexado; título, arquivo, páginas e palavras-chave vão para os metadados
+            yield [chunk['text'] for chunk in chunks], [
+                {
+                    **chunk['metadata'],
+                    "title": chunk['title'],
+                    "content_type": "pdf",
+                    "keywords": chunk['keywords']
+                }
+                for chunk in chunks
+            ], None
+
+    pipeline = IngestionPipeline(
+        vector_db, near_duplicates="merge",
+        on_batch=lambda report: context.update(chunks_indexed=len(report["ids"]))
+    )
+    result = await pipeline.run(pdf_chunks())
+
+    if not extracted["chunks"]:
+        raise ValueError("Não foi possível extrair texto do PDF")
+
+    documents_added = len(result["ids"])
+    print(f"PDF processado: {extracted['chunks']} chunks extraídos, {documents_added} adicionados em {result['batches']} lotes")
+    return {
+        "success": True,
+        "message": f"PDF processado com sucesso! {documents_added} chunks adicionados.",
+        "filename": params["filename"],
+        "chunks_extracted": extracted["chunks"],
+        "documents_added": documents_added,
+        "total_pages": extracted["total_pages"],
+        "title": extracted["title"]
+    }
+
+
+def remove_upload(job):
+    """Apaga o PDF enviado quando a tarefa termina (não quando é interrompida, para poder ser retomada)."""
+    if os.path.exists(job["params"]["path"]):
+        os.remove(job["params"]["path"])
+
+
+job_queue = JobQueue(os.path.join(JOBS_DIR, "jobs.sqlite3"))
+job_queue.register(SCRAPE_WEBSITE, scrape_website)
+job_queue.register(UPLOAD_PDF, upload_pdf, on_finish=remove_upload)
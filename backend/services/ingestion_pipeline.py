@@ -0,0 +1,137 @@
+import asyncio
+from services.concurrency import ingest_pool
+
+
+class _Batch:
+    """Lote de chunks a incluir, com o grupo de origem de cada um e os grupos que terminam nele."""
+
+    def __init__(self):
+        self.documents = []
+        self.metadatas = []
+        self.groups = []
+        self.closing = []
+
+    def __len__(self):
+        return len(self.documents)
+
+
+class _Group:
+    def __init__(self, callback):
+        self.callback = callback
+        self.ids = []
+
+
+class IngestionPipeline:
+    """
+    Inclusão em fluxo na coleção, em estágios ligados por filas limitadas:
+    a fonte (download, limpeza e divisão em chunks, que rodam no event loop,
+    em threads ou em processos) produz grupos de chunks; os chunks são
+    reunidos em lotes de `batch_size`; e cada lote passa pelos embeddings e
+    pela gravação (VectorDBService.add_documents, no `ingest_pool`) enquanto
+    a fonte já prepara os próximos.
+
+    No máximo `max_pending_batches` lotes esperam pelos embeddings: quando esse
+    estágio atrasa, a fonte deixa de ser consumida (e o rastreamento ou a
+    extração param de produzir), de modo que a memória não cresce com o
+    tamanho da entrada. Cada lote gravado é durável e já aparece nas buscas,
+    sem esperar o fim da entrada.
+
+    A fonte é um iterador assíncrono de (documentos, metadados, callback), um
+    grupo por página, trecho de PDF etc. Quando todos os chunks de um grupo
+    foram gravados, `callback(ids)` é chamado na thread de inclusão com os IDs
+    dos trechos que guardam o conteúdo do grupo: os incluídos e os das
+    duplicatas e quase duplicatas que os representam (ver "resolved_ids" em
+    VectorDBService.add_documents); `callback` pode ser None.
+
+    `on_batch(report)`, se informado, é chamado na thread de inclusão após
+    cada lote gravado, com o relatório parcial (ver `run`), para o
+    acompanhamento do progresso.
+    """
+
+    def __init__(
+        self, vector_db, batch_size=64, max_pending_batches=2, skip_duplicates=True, near_duplicates=None,
+        on_batch=None
+    ):
+        self.vector_db = vector_db
+        self.batch_size = batch_size
+        self.max_pending_batches = max_pending_batches
+        self.skip_duplicates = skip_duplicates
+        self.near_duplicates = near_duplicates
+        self.on_batch = on_batch
+
+    async def run(self, groups):
+        """
+        Consome a fonte até o fim e retorna o relatório: chunks recebidos, lotes
+        gravados, IDs incluídos, duplicatas e quase duplicatas não incluídas.
+        Um erro na gravação interrompe a fonte e é propagado; os lotes já
+        gravados permanecem.
+        """
+        report = {"documents": 0, "batches": 0, "ids": [], "duplicates": 0, "near_duplicates": 0}
+        batches = asyncio.Queue(maxsize=self.max_pending_batches)
+        done = object()
+
+        async def index():
+            while True:
+                batch = await batches.get()
+                if batch is done:
+                    return
+                await ingest_pool.run(self._index_batch, batch, report)
+
+        indexer = asyncio.create_task(index())
+
+        async def put(item):
+            # Espera por espaço na fila, a menos que a gravação tenha falhado
+            put_task = asyncio.ensure_future(batches.put(item))
+            await asyncio.wait({put_task, indexer}, return_when=asyncio.FIRST_COMPLETED)
+            if indexer.done() and item is not done:
+                put_task.cancel()
+                indexer.result()
+                raise RuntimeError("Estágio de gravação encerrado antes do fim da fonte")
+
+        try:
+            batch = _Batch()
+            async for documents, metadatas, callback in groups:
+                metadatas = metadatas if metadatas is not None else [None] * len(documents)
+                group = _Group(callback)
+                report["documents"] += len(documents)
+                if not documents:
+                    batch.closing.append(group)
+                for i, (doc, meta) in enumerate(zip(documents, metadatas)):
+                    batch.documents.append(doc)
+                    batch.metadatas.append(meta)
+                    batch.groups.append(group)
+                    if i == len(documents) - 1:
+                        batch.closing.append(group)
+                    if len(batch) >= self.batch_size:
+                        await put(batch)
+                        batch = _Batch()
+            if len(batch) or batch.closing:
+                await put(batch)
+            await put(done)
+            await indexer
+        finally:
+            indexer.cancel()
+            # Interrompida (erro na gravação ou cancelamento), a fonte é encerrada: o rastreamento para
+            if hasattr(groups, "aclose"):
+                await groups.aclose()
+        return report
+
+    def _index_batch(self, batch, report):
+        if len(batch):
+            result = self.vector_db.add_documents(
+                batch.documents, batch.metadatas,
+                skip_duplicates=self.skip_duplicates, near_duplicates=self.near_duplicates
+            )
+            for group, doc_id in zip(batch.groups, result["resolved_ids"]):
+                if doc_id is not None and doc_id not in group.ids:
+                    group.ids.append(doc_id)
+            report["batches"] += 1
+            report["ids"].extend(result["ids"])
+            report["duplicates"] += len(result["duplicates"])
+            report["near_duplicates"] += len(result["near_duplicates"])
+            if self.on_batch is not None:
+                self.on_batch(report)
+
+        for group in batch.closing:
+            if group.callback is not None:
+                group.callback(group.ids)
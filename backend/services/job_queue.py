@@ -0,0 +1,502 @@
+import asyncio
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import Future
+
+JOB_STATUSES = ("queued", "running", "completed", "failed", "cancelled")
+FINISHED_STATUSES = ("completed", "failed", "cancelled")
+
+_COLUMNS = (
+    "id", "kind", "status", "params", "progress", "result", "error", "error_type", "attempts",
+    "created_at", "started_at", "finished_at", "updated_at", "owner", "heartbeat"
+)
+_JSON_COLUMNS = ("params", "progress", "result")
+# Colunas incluídas depois da primeira versão da tabela
+_ADDED_COLUMNS = {"owner": "TEXT", "heartbeat": "REAL"}
+
+
+class JobStore:
+    """
+    Estado das tarefas em SQLite, que sobrevive a reinícios do processo e é
+    compartilhado pelos processos do servidor (ex.: workers do uvicorn): uma
+    tarefa é assumida por um só deles (`claim`), que renova a posse enquanto
+    a executa (`renew`).
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id TEXT PRIMARY KEY, kind TEXT NOT NULL, status TEXT NOT NULL, params TEXT NOT NULL, "
+            "progress TEXT NOT NULL, result TEXT, error TEXT, error_type TEXT, attempts INTEGER NOT NULL, "
+            "created_at REAL NOT NULL, started_at REAL, finished_at REAL, updated_at REAL NOT NULL, "
+            "owner TEXT, heartbeat REAL)"
+        )
+        existing = {row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        for column, column_type in _ADDED_COLUMNS.items():
+            if column not in existing:
+                self._conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {column_type}")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)")
+        self._conn.commit()
+
+    @staticmethod
+    def _job(row):
+        job = dict(zip(_COLUMNS, row))
+        for column in _JSON_COLUMNS:
+            job[column] = json.loads(job[column]) if job[column] is not None else None
+        return job
+
+    def insert(self, job):
+        values = [json.dumps(job[column]) if column in _JSON_COLUMNS else job[column] for column in _COLUMNS]
+        with self._lock:
+            self._conn.execute(f"INSERT INTO jobs VALUES ({','.join('?' * len(_COLUMNS))})", values)
+            self._conn.commit()
+
+    def update(self, job_id, claimed_by=None, **fields):
+        """
+        Atualiza os campos da tarefa. Com `claimed_by`, só se ela ainda
+        pertencer a esse dono; retorna se a tarefa foi atualizada.
+        """
+        fields["updated_at"] = time.time()
+        assignments = ", ".join(f"{column} = ?" for column in fields)
+        values = [json.dumps(value) if column in _JSON_COLUMNS else value for column, value in fields.items()]
+        query, values = f"UPDATE jobs SET {assignments} WHERE id = ?", values + [job_id]
+        if claimed_by is not None:
+            query, values = query + " AND owner = ?", values + [claimed_by]
+        with self._lock:
+            updated = self._conn.execute(query, values).rowcount
+            self._conn.commit()
+        return updated > 0
+
+    def claim(self, job_id, owner):
+        """
+        Assume a tarefa para `owner`, se ela ainda estiver na fila, numa única
+        instrução: entre vários processos, só um a assume. Retorna a tarefa
+        (já "running"), ou None.
+        """
+        now = time.time()
+        with self._lock:
+            claimed = self._conn.execute(
+                "UPDATE jobs SET status = 'running', owner = ?, heartbeat = ?, started_at = ?, "
+                "attempts = attempts + 1, progress = '{}', updated_at = ? WHERE id = ? AND status = 'queued'",
+                (owner, now, now, now, job_id)
+            ).rowcount
+            self._conn.commit()
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone() if claimed else None
+        return self._job(row) if row else None
+
+    def renew(self, owner, job_ids):
+        """
+        Renova a posse das tarefas de `owner` em execução e retorna o status e
+        o dono atuais de cada uma de `job_ids` (canceladas por outro processo,
+        ou assumidas por outro dono depois de a posse expirar).
+        """
+        if not job_ids:
+            return {}
+        marks = ",".join("?" * len(job_ids))
+        with self._lock:
+            self._conn.execute(
+                f"UPDATE jobs SET heartbeat = ? WHERE owner = ? AND status = 'running' AND id IN ({marks})",
+                [time.time(), owner] + list(job_ids)
+            )
+            self._conn.commit()
+            rows = self._conn.execute(f"SELECT id, status, owner FROM jobs WHERE id IN ({marks})", list(job_ids))
+            return {job_id: (status, job_owner) for job_id, status, job_owner in rows.fetchall()}
+
+    def requeue_expired(self, lease_seconds):
+        """
+        Devolve à fila as tarefas "running" cuja posse não é renovada há mais
+        de `lease_seconds` (o processo que as executava parou) e as retorna.
+        """
+        deadline = time.time() - lease_seconds
+        expired = "status = 'running' AND (heartbeat IS NULL OR heartbeat < ?)"
+        with self._lock:
+            rows = self._conn.execute(f"SELECT * FROM jobs WHERE {expired}", (deadline,)).fetchall()
+            requeued = []
+            for row in rows:
+                # A condição é repetida: a tarefa pode ter sido renovada ou devolvida nesse meio tempo
+                if self._conn.execute(
+                    f"UPDATE jobs SET status = 'queued', owner = NULL, updated_at = ? WHERE id = ? AND {expired}",
+                    (time.time(), row[0], deadline)
+                ).rowcount:
+                    requeued.append(self._job(row))
+            self._conn.commit()
+        return requeued
+
+    def queued(self):
+        """IDs das tarefas na fila, da mais antiga para a mais recente."""
+        with self._lock:
+            rows = self._conn.execute("SELECT id FROM jobs WHERE status = 'queued' ORDER BY created_at").fetchall()
+        return [row[0] for row in rows]
+
+    def get(self, job_id):
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._job(row) if row else None
+
+    def list(self, status=None, limit=50):
+        """Tarefas da mais recente para a mais antiga, opcionalmente só as de um status."""
+        query, values = "SELECT * FROM jobs", []
+        if status is not None:
+            query, values = query + " WHERE status = ?", [status]
+        with self._lock:
+            rows = self._conn.execute(f"{query} ORDER BY created_at DESC LIMIT ?", values + [limit]).fetchall()
+        return [self._job(row) for row in rows]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class JobContext:
+    """
+    Parâmetros de uma tarefa em execução e registro do seu progresso, para
+    uso do handler.
+
+    `update` aceita contadores livres; alguns têm significado próprio:
+    "done" e "total" (unidades de trabalho, como páginas, descritas em "unit")
+    dão a estimativa de tempo restante ("eta_seconds"), e "chunks_indexed", a
+    vazão dos embeddings ("chunks_per_second").
+    """
+
+    def __init__(self, queue, job):
+        self.queue = queue
+        self.id = job["id"]
+        self.params = job["params"]
+        self.progress = {}
+        self._started = time.time()
+        self._saved = 0.0
+        self._lock = threading.Lock()
+
+    def update(self, **counters):
+        """Atualiza o progresso (de qualquer thread); é gravado no máximo a cada `progress_interval` segundos."""
+        with self._lock:
+            self.progress.update(counters)
+            now = time.time()
+            elapsed = now - self._started
+            self.progress["elapsed_seconds"] = round(elapsed, 1)
+            indexed = self.progress.get("chunks_indexed", 0)
+            self.progress["chunks_per_second"] = round(indexed / elapsed, 2) if elapsed > 0 else 0.0
+            done, total = self.progress.get("done", 0), self.progress.get("total")
+            self.progress["eta_seconds"] = (
+                round(max(total - done, 0) * elapsed / done, 1) if total and done else None
+            )
+            if now - self._saved < self.queue.progress_interval:
+                return
+            self._saved = now
+            progress = dict(self.progress)
+        self.queue.store.update(self.id, claimed_by=self.queue.owner, progress=progress)
+
+
+class JobQueue:
+    """
+    Fila local de tarefas em segundo plano (sem broker externo).
+
+    As tarefas rodam num event loop próprio, numa thread do processo, com no
+    máximo `max_workers` ao mesmo tempo; o trabalho pesado continua nos pools
+    de services.concurrency. O estado de cada tarefa (parâmetros, status,
+    progresso, resultado ou erro) fica num SQLite em `path`: as rotas
+    consultam o progresso enquanto a tarefa roda e, se o processo parar no
+    meio, as tarefas na fila ou em execução são retomadas (do início: os
+    handlers precisam ser idempotentes, como a inclusão incremental de sites
+    e a inclusão que ignora chunks duplicados).
+
+    Vários processos (ex.: workers do uvicorn) podem usar o mesmo `path`:
+    cada tarefa é assumida por um só deles (JobStore.claim), que renova a
+    posse a cada `lease_seconds / 3` segundos. As tarefas em execução cuja
+    posse não é renovada há mais de `lease_seconds` (o processo parou) voltam
+    para a fila; a cada renovação, cada processo também procura tarefas
+    enfileiradas pelos outros e devolvidas à fila.
+
+    Cada tipo de tarefa tem um handler (`register`): uma corrotina que recebe
+    o JobContext e retorna o resultado (serializável em JSON). `on_finish`,
+    se informado, é chamado com a tarefa quando ela termina de vez (concluída,
+    com falha ou cancelada), por exemplo para apagar arquivos temporários.
+    """
+
+    def __init__(self, path, max_workers=2, progress_interval=1.0, lease_seconds=60.0):
+        self.path = path
+        self.max_workers = max_workers
+        self.progress_interval = progress_interval
+        self.lease_seconds = lease_seconds
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.store = None
+        self._handlers = {}
+        self._lock = threading.RLock()
+        self._loop = None
+        self._thread = None
+        self._queue = None
+        self._queued = set()
+        self._workers = []
+        self._running = {}
+        self._cancelled = set()
+        self._lost = set()
+        self._waiters = {}
+
+    def register(self, kind, handler, on_finish=None):
+        self._handlers[kind] = (handler, on_finish)
+
+    def start(self):
+        """Inicia o loop das tarefas (se ainda não estiver rodando) e retoma as interrompidas."""
+        with self._lock:
+            if self._thread is not None:
+                return
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self.store = JobStore(self.path)
+            self._loop = asyncio.new_event_loop()
+            self._queue = asyncio.Queue()
+            self._queued = set()
+            started = threading.Event()
+            self._thread = threading.Thread(target=self._run_loop, args=(started,), name="jobs", daemon=True)
+            self._thread.start()
+            started.wait()
+
+    def _run_loop(self, started):
+        asyncio.set_event_loop(self._loop)
+        # Antes das tarefas: `start` espera por isso segurando a trava
+        self._loop.call_soon(started.set)
+        self._workers = [self._loop.create_task(self._worker()) for _ in range(self.max_workers)]
+        self._workers.append(self._loop.create_task(self._maintain()))
+        self._loop.run_forever()
+
+    def stop(self, timeout=30):
+        """
+        Interrompe as tarefas em execução, que voltam para a fila e são
+        retomadas na próxima inicialização, e encerra a thread.
+        """
+        with self._lock:
+            if self._thread is None:
+                return
+            thread, loop = self._thread, self._loop
+            self._thread = None
+        try:
+            asyncio.run_coroutine_threadsafe(self._shutdown(), loop).result(timeout)
+        finally:
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join(timeout)
+            self.store.close()
+
+    async def _shutdown(self):
+        tasks = self._workers + list(self._running.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def _enqueue(self, job_id):
+        # No loop das tarefas: cada ID entra uma vez na fila local
+        if job_id not in self._queued:
+            self._queued.add(job_id)
+            self._queue.put_nowait(job_id)
+
+    async def _maintain(self):
+        """Renova a posse das tarefas em execução, retoma as abandonadas e busca as enfileiradas por outros processos."""
+        while True:
+            try:
+                self._renew()
+                for job in self.store.requeue_expired(self.lease_seconds):
+                    print(f"Retomando a tarefa {job['id']} ({job['kind']}), interrompida em {job['owner'] or 'outro processo'}")
+                for job_id in self.store.queued():
+                    self._enqueue(job_id)
+            except Exception as e:
+                print(f"Erro na manutenção da fila de tarefas: {str(e)}")
+            await asyncio.sleep(self.lease_seconds / 3)
+
+    def _renew(self):
+        with self._lock:
+            running = dict(self._running)
+        states = self.store.renew(self.owner, list(running))
+        for job_id, task in running.items():
+            status, owner = states.get(job_id, (None, None))
+            if status == "running" and owner == self.owner:
+                continue
+            with self._lock:
+                # Cancelada por outro processo, ou assumida por outro depois de a posse expirar
+                (self._cancelled if status == "cancelled" and owner == self.owner else self._lost).add(job_id)
+            task.cancel()
+
+    def submit(self, kind, params):
+        """Enfileira uma tarefa e retorna o seu estado (com o ID). ValueError para tipos desconhecidos."""
+        if kind not in self._handlers:
+            raise ValueError(f"Tipo de tarefa desconhecido: {kind}. Opções: {', '.join(self._handlers)}")
+        self.start()
+        now = time.time()
+        job = {
+            "id": uuid.uuid4().hex,
+            "kind": kind,
+            "status": "queued",
+            "params": params,
+            "progress": {},
+            "result": None,
+            "error": None,
+            "error_type": None,
+            "attempts": 0,
+            "created_at": now,
+            "started_at": None,
+            "finished_at": None,
+            "updated_at": now,
+            "owner": None,
+            "heartbeat": None
+        }
+        self.store.insert(job)
+        self._loop.call_soon_threadsafe(self._enqueue, job["id"])
+        print(f"Tarefa {job['id']} ({kind}) na fila")
+        return job
+
+    def get(self, job_id):
+        """Estado da tarefa. KeyError se ela não existir."""
+        self.start()
+        job = self.store.get(job_id)
+        if job is None:
+            raise KeyError(job_id)
+        return job
+
+    def list(self, status=None, limit=50):
+        if status is not None and status not in JOB_STATUSES:
+            raise ValueError(f"Status desconhecido: {status}. Opções: {', '.join(JOB_STATUSES)}")
+        self.start()
+        return self.store.list(status, limit)
+
+    def cancel(self, job_id):
+        """
+        Cancela a tarefa: se estiver na fila, ela não é executada; se estiver
+        rodando, é interrompida (os lotes já gravados permanecem), também em
+        outro processo, na próxima renovação da posse. KeyError se não
+        existir, ValueError se já tiver terminado.
+        """
+        job = self.get(job_id)
+        with self._lock:
+            if job["status"] in FINISHED_STATUSES:
+                raise ValueError(f"A tarefa já terminou ({job['status']})")
+            self._cancelled.add(job_id)
+            task = self._running.get(job_id)
+            if task is None and job["status"] == "running":
+                # O processo que a executa encerra a tarefa (e chama on_finish) ao ver o status
+                self.store.update(job_id, status="cancelled", finished_at=time.time())
+                self._cancelled.discard(job_id)
+            elif task is None:
+                self._finish(job, "cancelled")
+        if task is not None:
+            self._loop.call_soon_threadsafe(task.cancel)
+        return self.get(job_id)
+
+    async def wait(self, job_id, poll_interval=1.0):
+        """
+        Aguarda o fim da tarefa (de qualquer event loop) e retorna o seu estado
+        final. As tarefas assumidas por outro processo são acompanhadas pelo
+        SQLite, a cada `poll_interval` segundos.
+        """
+        future = Future()
+        with self._lock:
+            job = self.get(job_id)
+            if job["status"] in FINISHED_STATUSES:
+                return job
+            self._waiters.setdefault(job_id, []).append(future)
+        finished = asyncio.wrap_future(future)
+        try:
+            while True:
+                try:
+                    return await asyncio.wait_for(asyncio.shield(finished), poll_interval)
+                except asyncio.TimeoutError:
+                    job = self.store.get(job_id)
+                    if job["status"] in FINISHED_STATUSES:
+                        return job
+        finally:
+            with self._lock:
+                waiters = self._waiters.get(job_id, [])
+                if future in waiters:
+                    waiters.remove(future)
+                if not waiters:
+                    self._waiters.pop(job_id, None)
+
+    async def _worker(self):
+        while True:
+            job_id = await self._queue.get()
+            with self._lock:
+                self._queued.discard(job_id)
+                job = self.store.claim(job_id, self.owner) if job_id not in self._cancelled else None
+                if job is None:
+                    # Terminada, cancelada ou assumida por outro processo
+                    continue
+                self._lost.discard(job_id)
+                task = self._running[job_id] = asyncio.ensure_future(self._execute(job))
+            try:
+                await asyncio.shield(task)
+            except asyncio.CancelledError:
+                # Encerramento: a tarefa também é cancelada e volta para a fila
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+                raise
+            finally:
+                with self._lock:
+                    self._running.pop(job_id, None)
+
+    async def _execute(self, job):
+        handler, _ = self._handlers[job["kind"]]
+        context = JobContext(self, job)
+        print(f"Tarefa {job['id']} ({job['kind']}) iniciada (tentativa {job['attempts']})")
+        try:
+            result = await handler(context)
+        except asyncio.CancelledError:
+            if job["id"] in self._lost:
+                self._lost.discard(job["id"])
+                print(f"Tarefa {job['id']} ({job['kind']}) assumida por outro processo")
+                return
+            if job["id"] in self._cancelled:
+                self._finish(job, "cancelled", claimed=True, progress=context.progress)
+                return
+            # Interrompida pelo encerramento: fica na fila para a próxima inicialização
+            self.store.update(
+                job["id"], claimed_by=self.owner, status="queued", owner=None, heartbeat=None,
+                progress=context.progress
+            )
+            self._notify(job["id"], error=RuntimeError("Tarefa interrompida pelo encerramento do servidor"))
+            raise
+        except Exception as e:
+            print(f"Erro na tarefa {job['id']} ({job['kind']}): {str(e)}")
+            traceback.print_exc()
+            self._finish(
+                job, "failed", claimed=True, progress=context.progress, error=str(e), error_type=type(e).__name__
+            )
+        else:
+            self._finish(job, "completed", claimed=True, progress=context.progress, result=result)
+
+    def _finish(self, job, status, claimed=False, **fields):
+        """Registra o fim da tarefa; com `claimed`, só se ela ainda pertencer a este processo."""
+        with self._lock:
+            finished = self.store.update(
+                job["id"], claimed_by=self.owner if claimed else None, status=status, finished_at=time.time(),
+                **fields
+            )
+            self._cancelled.discard(job["id"])
+        if not finished:
+            print(f"Tarefa {job['id']} ({job['kind']}) assumida por outro processo; resultado descartado")
+            return
+        print(f"Tarefa {job['id']} ({job['kind']}): {status}")
+
+        _, on_finish = self._handlers.get(job["kind"], (None, None))
+        if on_finish is not None:
+            try:
+                on_finish(job)
+            except Exception as e:
+                print(f"Erro ao finalizar a tarefa {job['id']}: {str(e)}")
+        self._notify(job["id"])
+
+    def _notify(self, job_id, error=None):
+        with self._lock:
+            waiters = self._waiters.pop(job_id, [])
+            job = self.store.get(job_id) if waiters and error is None else None
+        for future in waiters:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(job)
@@ -0,0 +1,160 @@
+import os
+import sys
+from array import array
+from collections import Counter
+import numpy as np
+from services.tokenizer import tokenize
+from services.vector_index import top_k
+
+
+class BM25Index:
+    """
+    Índice invertido com pontuação BM25 sobre os trechos da coleção.
+
+    Cada termo guarda a lista de IDs que o contêm e a frequência em cada um.
+    Como os IDs crescem a cada inclusão, as listas já nascem ordenadas e as
+    novas linhas são apenas acrescentadas (em `array`). Remoções
+    são tratadas na consulta, excluindo as lápides, até a próxima compactação,
+    quando o índice é refeito.
+    """
+
+    def __init__(self, k1=1.2, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.clear()
+
+    def clear(self):
+        self.epoch = None
+        self._ids = array('q')
+        self._lengths = array('i')
+        self._total_length = 0
+        self._postings = {}
+        self._arrays = None
+
+    def __len__(self):
+        return len(self._ids)
+
+    def memory_usage(self):
+        """Bytes aproximados das listas invertidas e das colunas por linha."""
+        total = sys.getsizeof(self._ids) + sys.getsizeof(self._lengths) + sys.getsizeof(self._postings)
+        for term, (ids, frequencies) in self._postings.items():
+            total += sys.getsizeof(term) + sys.getsizeof(ids) + sys.getsizeof(frequencies)
+        return total
+
+    def add(self, ids, documents):
+        """Indexa novas linhas (com IDs maiores que os já indexados)."""
+        for doc_id, document in zip(ids, documents):
+            terms = Counter(tokenize(document))
+            doc_id = int(doc_id)
+            for term, count in terms.items():
+                postings = self._postings.get(term)
+                if postings is None:
+                    postings = self._postings[term] = (array('q'), array('i'))
+                postings[0].append(doc_id)
+                postings[1].append(count)
+
+            length = sum(terms.values())
+            self._ids.append(doc_id)
+            self._lengths.append(length)
+            self._total_length += length
+        self._arrays = None
+
+    def _columns(self):
+        # Cópias em numpy das colunas, refeitas só após novas inclusões
+        if self._arrays is None:
+            self._arrays = (np.array(self._ids, dtype=np.int64), np.array(self._lengths, dtype=np.int32))
+        return self._arrays
+
+    def search_many(self, queries, k, exclude=None, include=None):
+        """
+        Retorna (pontuações, IDs) dos k trechos com maior pontuação BM25 para
+        cada consulta. `exclude` e `include` são IDs ordenados, como nos
+        índices vetoriais.
+        """
+        ids, lengths = self._columns()
+        average_length = self._total_length / len(ids) if len(ids) else 1.0
+
+        results = []
+        for query in queries:
+            candidates, contributions = [], []
+            for term in set(tokenize(query)):
+                postings = self._postings.get(term)
+                if postings is None:
+                    continue
+                # Cópias (e não visões) das listas, que continuam crescendo com novas inclusões
+                term_ids = np.array(postings[0], dtype=np.int64)
+                frequencies = np.array(postings[1], dtype=np.float32)
+                idf = np.log(1 + (len(ids) - len(term_ids) + 0.5) / (len(term_ids) + 0.5))
+
+                positions = np.searchsorted(ids, term_ids)
+                norm = self.k1 * (1 - self.b + self.b * lengths[positions] / average_length)
+                candidates.append(positions)
+                contributions.append(idf * frequencies * (self.k1 + 1) / (frequencies + norm))
+
+            if not candidates:
+                results.append((np.array([], dtype=np.float32), np.array([], dtype=np.int64)))
+                continue
+
+            # Soma as contribuições dos termos por trecho
+            positions, inverse = np.unique(np.concatenate(candidates), return_inverse=True)
+            scores = np.bincount(inverse, weights=np.concatenate(contributions)).astype(np.float32)
+            candidate_ids = ids[positions]
+
+            keep = np.ones(len(candidate_ids), dtype=bool)
+            if exclude is not None and len(exclude):
+                keep &= ~np.isin(candidate_ids, exclude, assume_unique=True)
+            if include is not None:
+                keep &= np.isin(candidate_ids, include, assume_unique=True)
+
+            best_scores, best = top_k(scores[keep], k)
+            results.append((best_scores, candidate_ids[keep][best]))
+        return results
+
+    def save(self, path):
+        """Grava o índice num único arquivo .npz (escrita atômica)."""
+        ids, lengths = self._columns()
+        terms = list(self._postings)
+        offsets = np.cumsum([0] + [len(self._postings[term][0]) for term in terms], dtype=np.int64)
+        posting_ids = np.concatenate(
+            [np.array(self._postings[term][0], dtype=np.int64) for term in terms]
+        ) if terms else np.zeros(0, dtype=np.int64)
+        posting_frequencies = np.concatenate(
+            [np.array(self._postings[term][1], dtype=np.int32) for term in terms]
+        ) if terms else np.zeros(0, dtype=np.int32)
+
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            np.savez(
+                f,
+                ids=ids,
+                lengths=lengths,
+                terms=np.frombuffer('\n'.join(terms).encode('utf-8'), dtype=np.uint8),
+                offsets=offsets,
+                posting_ids=posting_ids,
+                posting_frequencies=posting_frequencies
+            )
+        os.replace(tmp_path, path)
+
+    def load(self, path):
+        """Carrega um índice gravado por `save`; retorna False se não existir."""
+        if not os.path.exists(path):
+            return False
+
+        with np.load(path) as data:
+            self.clear()
+            self._ids = array('q', data['ids'].tobytes())
+            self._lengths = array('i', data['lengths'].tobytes())
+            self._total_length = int(data['lengths'].sum())
+
+            terms = data['terms'].tobytes().decode('utf-8')
+            terms = terms.split('\n') if terms else []
+            offsets = data['offsets']
+            posting_ids = data['posting_ids']
+            posting_frequencies = data['posting_frequencies']
+            for i, term in enumerate(terms):
+                start, end = offsets[i], offsets[i + 1]
+                self._postings[term] = (
+                    array('q', posting_ids[start:end].tobytes()),
+                    array('i', posting_frequencies[start:end].tobytes())
+                )
+        return True
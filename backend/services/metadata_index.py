@@ -0,0 +1,273 @@
+import re
+from datetime import datetime
+import numpy as np
+
+# Campos com igualdade (listas invertidas) e campos numéricos (faixas)
+CATEGORICAL_FIELDS = ("url", "filename", "content_type")
+RANGE_FIELDS = ("page", "ingested_at")
+
+_PAGE_HEADER = re.compile(r'^Página:\s*(\d+)(?:\s*-\s*(\d+))?')
+
+# Campos de fonte gravados nos metadados de cada trecho, com o tipo de cada um.
+# Os trechos guardam apenas o texto; título, URL, arquivo e páginas ficam aqui.
+SOURCE_FIELDS = {
+    "url": str,
+    "title": str,
+    "filename": str,
+    "content_type": str,
+    "category": str,
+    "page": int,
+    "page_start": int,
+    "total_pages": int,
+    "chunk_index": int,
+    "keywords": list,
+    "ingested_at": str
+}
+
+# Campos lidos das colunas de metadados para montar o índice
+INDEXED_METADATA = ("url", "filename", "content_type", "type", "page_start", "page", "ingested_at")
+
+
+def to_timestamp(value):
+    """Converte datas ISO (ou números) em segundos desde a época; None se inválido."""
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return datetime.fromisoformat(str(value)).timestamp()
+    except ValueError:
+        return None
+
+
+def filter_timestamp(value):
+    """Como `to_timestamp`, para condições de filtro: datas inválidas são um erro (ValueError)."""
+    timestamp = to_timestamp(value)
+    if timestamp is None:
+        raise ValueError(f"Data inválida no filtro: {value!r}. Use o formato ISO (ex.: 2024-03-01) ou um timestamp")
+    return timestamp
+
+
+def coerce_source_fields(metadata):
+    """
+    Valida e converte os campos de fonte conhecidos para o tipo de SOURCE_FIELDS
+    (por exemplo, página "3" -> 3), de modo que cada campo tenha um único tipo
+    na coluna. Campos desconhecidos são mantidos como vieram.
+    """
+    if not metadata:
+        return metadata
+    if not isinstance(metadata, dict):
+        raise ValueError("Os metadados de cada documento devem ser um objeto")
+
+    coerced = dict(metadata)
+    for field, kind in SOURCE_FIELDS.items():
+        value = coerced.get(field)
+        if value is None:
+            continue
+        try:
+            if kind is int:
+                if isinstance(value, bool) or float(value) != int(float(value)):
+                    raise ValueError
+                coerced[field] = int(float(value))
+            elif kind is list:
+                if isinstance(value, (str, dict)) or not hasattr(value, '__iter__'):
+                    raise ValueError
+                coerced[field] = [str(item) for item in value]
+            else:
+                if isinstance(value, (dict, list)):
+                    raise ValueError
+                coerced[field] = str(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"Campo de metadados '{field}' deve ser do tipo {kind.__name__}: {value!r}")
+    if coerced.get("content_type"):
+        coerced["content_type"] = coerced["content_type"].lower()
+    return coerced
+
+
+def source_header(metadata):
+    """
+    Cabeçalho "Fonte:/URL:/Arquivo:/Página:" de um trecho, montado a partir dos
+    metadados (usado para exibir as fontes; não faz parte do texto indexado).
+    """
+    if not isinstance(metadata, dict) or not (metadata.get("url") or metadata.get("filename")):
+        return ""
+
+    lines = [f"Fonte: {metadata.get('title') or metadata.get('filename') or metadata.get('url')}"]
+    if metadata.get("filename"):
+        lines.append(f"Arquivo: {metadata['filename']}")
+        lines.append("Tipo: PDF")
+        if metadata.get("page") is not None:
+            pages = f" de {metadata['total_pages']}" if metadata.get("total_pages") else ""
+            lines.append(f"Página: {metadata['page']}{pages}")
+    else:
+        lines.append(f"URL: {metadata['url']}")
+        if metadata.get("category"):
+            lines.append(f"Tipo: {metadata['category']}")
+    return '\n'.join(lines)
+
+
+def extract_source_fields(document, metadata=None):
+    """
+    Extrai os campos de fonte de um trecho: dos metadados quando presentes e,
+    para documentos antigos, do cabeçalho "Fonte:/URL:/Arquivo:/Tipo:/Página:".
+    """
+    metadata = metadata if isinstance(metadata, dict) else {}
+    fields = {
+        "url": metadata.get("url"),
+        "filename": metadata.get("filename"),
+        "content_type": metadata.get("content_type") or metadata.get("type"),
+        "page_start": metadata.get("page_start", metadata.get("page")),
+        "page_end": metadata.get("page"),
+        "ingested_at": to_timestamp(metadata.get("ingested_at"))
+    }
+
+    # Só o cabeçalho (antes da primeira linha em branco) é considerado
+    for line in document.split('\n\n', 1)[0].split('\n'):
+        line = line.strip()
+        if line.startswith('URL:') and not fields["url"]:
+            fields["url"] = line.replace('URL:', '').strip()
+        elif line.startswith('Arquivo:') and not fields["filename"]:
+            fields["filename"] = line.replace('Arquivo:', '').strip()
+        elif line.startswith('Tipo:') and not fields["content_type"]:
+            fields["content_type"] = line.replace('Tipo:', '').strip()
+        elif line.startswith('Página:') and fields["page_end"] is None:
+            match = _PAGE_HEADER.match(line)
+            if match:
+                fields["page_start"] = int(match.group(1))
+                fields["page_end"] = int(match.group(2) or match.group(1))
+
+    if fields["content_type"]:
+        fields["content_type"] = str(fields["content_type"]).lower()
+    elif fields["filename"]:
+        fields["content_type"] = "pdf"
+    elif fields["url"]:
+        fields["content_type"] = "website"
+    else:
+        fields["content_type"] = "manual"
+
+    if fields["page_start"] is None:
+        fields["page_start"] = fields["page_end"]
+    return fields
+
+
+class MetadataIndex:
+    """
+    Índice dos campos de fonte dos trechos (URL, arquivo, tipo de conteúdo,
+    faixa de páginas e data de inclusão), usado para restringir a busca vetorial
+    a um subconjunto de linhas antes do top-k.
+
+    Campos de igualdade usam listas invertidas de IDs; páginas e datas ficam em
+    colunas alinhadas aos IDs. Como os IDs crescem a cada inclusão, as listas já
+    nascem ordenadas e as novas linhas são apenas acrescentadas.
+    """
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.epoch = None
+        self._ids = []
+        self._postings = {field: {} for field in CATEGORICAL_FIELDS}
+        self._page_start = []
+        self._page_end = []
+        self._ingested_at = []
+        self._arrays = None
+
+    def __len__(self):
+        return len(self._ids)
+
+    def add(self, ids, columns, document=None):
+        """
+        Indexa novas linhas (com IDs maiores que os já indexados). `columns` traz,
+        para cada campo de INDEXED_METADATA, os valores das linhas (lidos das colunas
+        de metadados); `document(i)` retorna o texto da linha i e só é chamado para
+        trechos antigos, sem os campos de fonte nos metadados, cujo cabeçalho é lido.
+        """
+        for i, doc_id in enumerate(ids):
+            metadata = {field: columns[field][i] for field in INDEXED_METADATA if columns[field][i] is not None}
+            legacy = document is not None and not (
+                metadata.get("url") or metadata.get("filename") or metadata.get("content_type")
+            )
+            fields = extract_source_fields(document(i) if legacy else "", metadata)
+            doc_id = int(doc_id)
+            self._ids.append(doc_id)
+            for field in CATEGORICAL_FIELDS:
+                if fields[field]:
+                    self._postings[field].setdefault(fields[field], []).append(doc_id)
+            self._page_start.append(np.nan if fields["page_start"] is None else fields["page_start"])
+            self._page_end.append(np.nan if fields["page_end"] is None else fields["page_end"])
+            self._ingested_at.append(np.nan if fields["ingested_at"] is None else fields["ingested_at"])
+        self._arrays = None
+
+    def values(self, field):
+        """Valores distintos de um campo de igualdade, com a contagem de linhas."""
+        return {value: len(ids) for value, ids in self._postings[field].items()}
+
+    def _columns(self):
+        if self._arrays is None:
+            self._arrays = (
+                np.asarray(self._ids, dtype=np.int64),
+                np.asarray(self._page_start, dtype=np.float64),
+                np.asarray(self._page_end, dtype=np.float64),
+                np.asarray(self._ingested_at, dtype=np.float64)
+            )
+        return self._arrays
+
+    def select(self, where):
+        """
+        Retorna os IDs (ordenados) que atendem a todas as condições de `where`.
+
+        Campos de igualdade aceitam um valor ou uma lista de valores; "page" aceita
+        um número (páginas que o contêm) ou uma faixa {"$gte": a, "$lte": b}; e
+        "ingested_at" aceita uma faixa com datas ISO ou timestamps.
+        """
+        ids, page_start, page_end, ingested_at = self._columns()
+        mask = np.ones(len(ids), dtype=bool)
+        selected = None
+
+        for field, condition in where.items():
+            if field in CATEGORICAL_FIELDS:
+                values = condition.get("$in", []) if isinstance(condition, dict) else condition
+                values = values if isinstance(values, (list, tuple, set)) else [values]
+                postings = [np.asarray(self._postings[field].get(value, []), dtype=np.int64) for value in values]
+                matches = np.unique(np.concatenate(postings)) if postings else np.zeros(0, dtype=np.int64)
+                selected = matches if selected is None else np.intersect1d(selected, matches, assume_unique=True)
+            elif field == "page":
+                low, high = self._range(condition, float)
+                # Trechos cuja faixa de páginas cruza a faixa pedida
+                mask &= (page_end >= low) & (page_start <= high)
+            elif field == "ingested_at":
+                low, high = self._range(condition, filter_timestamp)
+                mask &= (ingested_at >= low) & (ingested_at <= high)
+            else:
+                raise ValueError(
+                    f"Campo de filtro desconhecido: {field}. "
+                    f"Opções: {', '.join(CATEGORICAL_FIELDS + RANGE_FIELDS)}"
+                )
+
+        result = ids[mask] if not mask.all() else ids
+        if selected is not None:
+            result = np.intersect1d(result, selected, assume_unique=True)
+        return result
+
+    @staticmethod
+    def _range(condition, convert):
+        """Converte uma condição (valor ou {"$gte", "$gt", "$lte", "$lt"}) em [mín, máx]."""
+        if not isinstance(condition, dict):
+            value = convert(condition)
+            return value, value
+
+        low, high = -np.inf, np.inf
+        for operator, value in condition.items():
+            value = convert(value)
+            if operator == "$gte":
+                low = max(low, value)
+            elif operator == "$gt":
+                low = max(low, np.nextafter(value, np.inf))
+            elif operator == "$lte":
+                high = min(high, value)
+            elif operator == "$lt":
+                high = min(high, np.nextafter(value, -np.inf))
+            else:
+                raise ValueError(f"Operador de filtro desconhecido: {operator}")
+        return low, high
@@ -0,0 +1,134 @@
+import threading
+import time
+from services.collection_manager import CollectionManager
+from services.query_cache import LRUCache
+
+DEFAULT_MODEL = 'intfloat/multilingual-e5-large'
+DEFAULT_COLLECTION = "tango_knowledge"
+
+
+class ModelProvider:
+    """
+    Registro único por processo do modelo de embeddings, das coleções e do
+    AIService compartilhado pelas rotas.
+
+    Nada é carregado na importação: o modelo e as coleções são criados no
+    primeiro uso (ou em `warm_up()`, chamado na inicialização da API), e todos
+    os routers reaproveitam as mesmas instâncias. As coleções ficam num
+    CollectionManager, que descarrega as menos usadas quando a memória passa
+    de `collection_memory_mb`.
+
+    Também guarda os caches de consultas repetidas: embeddings das consultas
+    (um LRU por modelo, compartilhado pelas coleções) e respostas do AIService
+    (chaveadas pela versão da coleção, ver AIService.answer_query).
+    """
+
+    def __init__(self, collection_memory_mb=4096, query_cache_size=10000, answer_cache_size=1000):
+        self._lock = threading.RLock()
+        self._models = {}
+        self.collections = CollectionManager(DEFAULT_COLLECTION, memory_budget_mb=collection_memory_mb)
+        self.query_cache_size = query_cache_size
+        self._query_caches = {}
+        self.answer_cache = LRUCache(answer_cache_size)
+        self._ai_service = None
+        self._ready = False
+        self._warmup_error = None
+        self._warmup_seconds = None
+
+    def get_model(self, model_name=DEFAULT_MODEL):
+        """Retorna o modelo de embeddings, carregando-o apenas uma vez."""
+        model = self._models.get(model_name)
+        if model is not None:
+            return model
+
+        with self._lock:
+            if model_name not in self._models:
+                from sentence_transformers import SentenceTransformer
+
+                print(f"Carregando modelo de embeddings '{model_name}'")
+                self._models[model_name] = SentenceTransformer(model_name)
+            return self._models[model_name]
+
+    def get_query_cache(self, model_name=DEFAULT_MODEL):
+        """Cache LRU dos embeddings de consultas do modelo (chave: consulta normalizada)."""
+        with self._lock:
+            if model_name not in self._query_caches:
+                self._query_caches[model_name] = LRUCache(self.query_cache_size)
+            return self._query_caches[model_name]
+
+    def cache_stats(self):
+        """Acertos, falhas e ocupação dos caches de consultas e de respostas."""
+        return {
+            "query_embeddings": {name: cache.stats() for name, cache in self._query_caches.items()},
+            "answers": self.answer_cache.stats()
+        }
+
+    def get_vector_db(self, collection_name=DEFAULT_COLLECTION, **options):
+        """Retorna o VectorDBService da coleção, criando-o no primeiro acesso (ver CollectionManager.open)."""
+        return self.collections.open(collection_name, **options)
+
+    def get_ai_service(self):
+        """Retorna o AIService compartilhado por todos os routers."""
+        with self._lock:
+            if self._ai_service is None:
+                from services.aiservice import AIService
+
+                self._ai_service = AIService()
+            return self._ai_service
+
+    def warm_up(self, collection_name=DEFAULT_COLLECTION):
+        """
+        Carrega o modelo (com uma codificação de teste, que inicializa os kernels)
+        e a coleção padrão com seu índice, para que a primeira consulta não pague
+        esse custo.
+        """
+        start = time.perf_counter()
+        try:
+            vector_db = self.get_vector_db(collection_name)
+            vector_db.model.encode(["query: aquecimento do modelo"])
+            vector_db.warm_up()
+        except Exception as e:
+            self._warmup_error = str(e)
+            print(f"Erro ao aquecer o modelo: {str(e)}")
+            raise
+
+        self._warmup_seconds = time.perf_counter() - start
+        self._ready = True
+        print(f"Modelo e coleção '{collection_name}' prontos em {self._warmup_seconds:.1f}s")
+
+    def shutdown(self):
+        """
+        Faz o checkpoint das coleções abertas, para que a próxima inicialização
+        não precise reaplicar o log de escrita.
+        """
+        for name, vector_db in self.collections.opened().items():
+            try:
+                vector_db.checkpoint()
+            except Exception as e:
+                print(f"Erro ao finalizar a coleção '{name}': {str(e)}")
+
+    @property
+    def ready(self):
+        return self._ready
+
+    def status(self):
+        """Situação do modelo e das coleções, usada pelo endpoint de prontidão."""
+        collections = {}
+        for name, vector_db in self.collections.opened().items():
+            collections[name] = {
+                "loaded": vector_db.loaded,
+                "documents": vector_db.store.live_count if vector_db.loaded else None,
+                "index_type": vector_db.index_type
+            }
+
+        return {
+            "ready": self._ready,
+            "models": {name: True for name in self._models},
+            "collections": collections,
+            "warmup_seconds": self._warmup_seconds,
+            "error": self._warmup_error
+        }
+
+
+# Instância única compartilhada pelo processo
+model_provider = ModelProvider()
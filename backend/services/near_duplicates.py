@@ -0,0 +1,260 @@
+import os
+import sys
+import json
+import threading
+import zlib
+from array import array
+import numpy as np
+from services.tokenizer import tokenize
+
+# Políticas para quase duplicatas na inclusão: manter, descartar ou descartar
+# registrando a fonte do trecho descartado no trecho já existente
+NEAR_DUPLICATE_POLICIES = ("keep", "skip", "merge")
+
+# Campos de fonte registrados no trecho existente pela política "merge"
+REFERENCE_FIELDS = ("url", "title", "filename", "page")
+
+# Primo logo acima de 2^32 (os shingles têm hashes de 32 bits): com a < 2^31,
+# os produtos a * x + b cabem em uint64
+_PRIME = np.uint64(4294967311)
+_EMPTY = np.uint32(0xFFFFFFFF)
+
+
+def _lsh_bands(num_perm, threshold, recall=0.99):
+    """
+    Divide a assinatura em `bands` faixas de `rows` valores. Um par com
+    similaridade s vira candidato com probabilidade 1 - (1 - s^rows)^bands;
+    escolhe o maior `rows` (menos candidatos falsos) que ainda encontra com
+    probabilidade `recall` os pares exatamente no limiar.
+    """
+    best = (num_perm, 1)
+    for rows in range(1, num_perm + 1):
+        bands = num_perm // rows
+        if 1 - (1 - threshold ** rows) ** bands >= recall:
+            best = (bands, rows)
+    return best
+
+
+def source_reference(metadata):
+    """Campos de fonte de um trecho (ver REFERENCE_FIELDS); None se não tiver URL nem arquivo."""
+    if not isinstance(metadata, dict) or not (metadata.get("url") or metadata.get("filename")):
+        return None
+    return {field: metadata[field] for field in REFERENCE_FIELDS if metadata.get(field) is not None}
+
+
+class MinHashIndex:
+    """
+    Índice MinHash/LSH para detectar trechos quase duplicados (menus, rodapés
+    e avisos de cookies repetidos entre as páginas de um site).
+
+    Cada trecho vira o conjunto dos seus shingles (sequências de `shingle_size`
+    termos do tokenizador, sem acentos nem stop words) e é resumido por uma
+    assinatura de `num_perm` mínimos de hashes, cuja fração de posições iguais
+    estima a similaridade de Jaccard entre dois trechos. As assinaturas são
+    divididas em faixas (LSH): só trechos que coincidem em alguma faixa são
+    comparados, e só os com similaridade estimada de pelo menos `threshold`
+    contam como quase duplicatas. Como os índices lexical e vetorial, as linhas
+    são apenas acrescentadas e as removidas são ignoradas na consulta.
+    """
+
+    def __init__(self, threshold=0.9, num_perm=128, shingle_size=3, seed=1):
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.seed = seed
+        self.bands, self.rows = _lsh_bands(num_perm, threshold)
+
+        # Permutações h(x) = (a * x + b) mod p, fixas para a mesma semente
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, 2 ** 31, size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, 2 ** 31, size=num_perm, dtype=np.uint64)
+        self.clear()
+
+    def clear(self):
+        self.epoch = None
+        self._ids = array('q')
+        self._signatures = array('I')
+        self._buckets = [{} for _ in range(self.bands)]
+
+    def __len__(self):
+        return len(self._ids)
+
+    def memory_usage(self):
+        """Bytes aproximados: assinaturas e IDs, mais uma referência por linha em cada faixa."""
+        total = sys.getsizeof(self._ids) + sys.getsizeof(self._signatures)
+        total += sum(sys.getsizeof(buckets) for buckets in self._buckets)
+        return total + len(self._ids) * self.bands * 8
+
+    def empty_copy(self):
+        """Índice vazio com os mesmos parâmetros (assinaturas compatíveis)."""
+        return MinHashIndex(self.threshold, self.num_perm, self.shingle_size, self.seed)
+
+    def _shingles(self, document):
+        terms = tokenize(document)
+        # Trechos curtos demais para um shingle usam os próprios termos
+        if len(terms) >= self.shingle_size:
+            terms = [" ".join(terms[i:i + self.shingle_size]) for i in range(len(terms) - self.shingle_size + 1)]
+        return np.array(sorted({zlib.crc32(term.encode('utf-8')) for term in terms}), dtype=np.uint64)
+
+    def signatures(self, documents):
+        """Assinaturas (uint32, uma linha por documento). Textos sem termos recebem uma assinatura vazia."""
+        signatures = np.full((len(documents), self.num_perm), _EMPTY, dtype=np.uint32)
+        for i, document in enumerate(documents):
+            shingles = self._shingles(document)
+            if len(shingles):
+                hashes = (np.outer(self._a, shingles) + self._b[:, None]) % _PRIME
+                signatures[i] = np.minimum(hashes.min(axis=1), _EMPTY - 1)
+        return signatures
+
+    def _band_keys(self, signature):
+        return [signature[band * self.rows:(band + 1) * self.rows].tobytes() for band in range(self.bands)]
+
+    def add(self, ids, documents=None, signatures=None):
+        """Indexa novas linhas, a partir dos textos ou de assinaturas já calculadas."""
+        if signatures is None:
+            signatures = self.signatures(documents)
+        for doc_id, signature in zip(ids, signatures):
+            position = len(self._ids)
+            self._ids.append(int(doc_id))
+            self._signatures.extend(signature.tolist())
+            # Assinaturas vazias nunca são candidatas
+            if signature[0] != _EMPTY:
+                for buckets, key in zip(self._buckets, self._band_keys(signature)):
+                    buckets.setdefault(key, []).append(position)
+
+    def match(self, signatures, exclude=None):
+        """
+        Para cada assinatura, retorna (ID, similaridade estimada) do trecho
+        indexado mais parecido acima do limiar, ou None. `exclude` são IDs
+        ordenados (lápides) que não contam.
+        """
+        matches = []
+        for signature in signatures:
+            candidates = set()
+            if signature[0] != _EMPTY:
+                for buckets, key in zip(self._buckets, self._band_keys(signature)):
+                    candidates.update(buckets.get(key, ()))
+            if not candidates:
+                matches.append(None)
+                continue
+
+            positions = np.array(sorted(candidates), dtype=np.int64)
+            ids = np.array([self._ids[position] for position in positions], dtype=np.int64)
+            if exclude is not None and len(exclude):
+                keep = ~np.isin(ids, exclude)
+                positions, ids = positions[keep], ids[keep]
+
+            stored = np.array(
+                [self._signatures[position * self.num_perm:(position + 1) * self.num_perm] for position in positions],
+                dtype=np.uint32
+            ).reshape(len(positions), self.num_perm)
+            similarities = (stored == signature).mean(axis=1)
+            best = int(np.argmax(similarities)) if len(similarities) else None
+            if best is None or similarities[best] < self.threshold:
+                matches.append(None)
+            else:
+                matches.append((int(ids[best]), float(similarities[best])))
+        return matches
+
+    def save(self, path):
+        """Grava IDs e assinaturas num arquivo .npz (escrita atômica); as faixas são refeitas na carga."""
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            np.savez(
+                f,
+                ids=np.array(self._ids, dtype=np.int64),
+                signatures=np.array(self._signatures, dtype=np.uint32).reshape(-1, self.num_perm),
+                params=np.array([self.num_perm, self.shingle_size, self.seed], dtype=np.int64)
+            )
+        os.replace(tmp_path, path)
+
+    def load(self, path):
+        """Carrega um índice gravado por `save`; retorna False se não existir ou tiver outros parâmetros."""
+        if not os.path.exists(path):
+            return False
+
+        with np.load(path) as data:
+            if data['params'].tolist() != [self.num_perm, self.shingle_size, self.seed]:
+                return False
+            self.clear()
+            self.add(data['ids'], signatures=data['signatures'])
+        return True
+
+
+class SourceReferences:
+    """
+    Fontes dos trechos descartados pela política "merge", associadas ao ID do
+    trecho que os absorveu. Ficam num log JSONL apenas de acréscimos ao lado dos
+    segmentos, relido a partir do ponto em que parou quando outro processo o
+    estende; a compactação reescreve o arquivo sem os IDs removidos.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._references = {}
+        self._offset = 0
+
+    def _refresh(self):
+        size = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+        if size < self._offset:
+            # Arquivo reescrito (compactação ou reinício): lê tudo de novo
+            self._references, self._offset = {}, 0
+        if size == self._offset:
+            return
+
+        with open(self.path, 'rb') as f:
+            f.seek(self._offset)
+            data = f.read(size - self._offset)
+        # Uma linha incompleta no fim (gravação em andamento) fica para a próxima leitura
+        complete = data.rfind(b'\n') + 1
+        for line in data[:complete].splitlines():
+            entry = json.loads(line)
+            references = self._references.setdefault(entry["id"], [])
+            if entry["source"] not in references:
+                references.append(entry["source"])
+        self._offset += complete
+
+    def get(self, doc_id):
+        return self.get_many([doc_id])[0]
+
+    def get_many(self, ids):
+        """Fontes registradas para cada ID (lista vazia se nenhuma)."""
+        with self._lock:
+            self._refresh()
+            return [list(self._references.get(int(doc_id), ())) for doc_id in ids]
+
+    def add(self, entries):
+        """Registra pares (ID, fonte), ignorando fontes já associadas ao mesmo ID."""
+        with self._lock:
+            self._refresh()
+            lines = []
+            for doc_id, source in entries:
+                references = self._references.setdefault(int(doc_id), [])
+                if source not in references:
+                    references.append(source)
+                    lines.append(json.dumps({"id": int(doc_id), "source": source}, ensure_ascii=False))
+            if lines:
+                with open(self.path, 'a', encoding='utf-8') as f:
+                    f.write("\n".join(lines) + "\n")
+                self._offset = os.path.getsize(self.path)
+
+    def prune(self, live_ids):
+        """Reescreve o arquivo mantendo apenas os IDs de `live_ids`."""
+        with self._lock:
+            self._refresh()
+            live = set(np.asarray(live_ids).tolist())
+            self._references = {doc_id: refs for doc_id, refs in self._references.items() if doc_id in live}
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                for doc_id, references in self._references.items():
+                    for source in references:
+                        f.write(json.dumps({"id": doc_id, "source": source}, ensure_ascii=False) + "\n")
+            os.replace(tmp_path, self.path)
+            self._offset = os.path.getsize(self.path)
+
+    def clear(self):
+        with self._lock:
+            if os.path.exists(self.path):
+                os.remove(self.path)
+            self._references, self._offset = {}, 0
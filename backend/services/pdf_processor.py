@@ -1,8 +1,11 @@
 import os
 import io
-from typing import List, Dict
+import asyncio
+from collections import deque
+from typing import Callable, List, Dict
 from PyPDF2 import PdfReader
 import re
+from services.tokenizer import extract_keywords
 
 class PDFProcessorService:
     def __init__(self):
@@ -10,43 +13,30 @@ class PDFProcessorService:
         
     def process_pdf(self, file_content: bytes, filename: str, chunk_size: int = None) -> List[Dict]:
         """
-        Processa um arquivo PDF e retorna chunks de texto organizados.
+        Processa um arquivo PDF (em memória) e retorna chunks de texto organizados,
+        os mesmos de `iter_pdf_chunks`.
         """
         try:
-            # Define o tamanho do chunk
-            if chunk_size is None:
-                chunk_size = self.chunk_size
-                
-            # Lê o PDF
             pdf_reader = PdfReader(io.BytesIO(file_content))
-            
-            # Extrai texto de todas as páginas
-            full_text = ""
             total_pages = len(pdf_reader.pages)
-            
-            for page_num, page in enumerate(pdf_reader.pages):
-                try:
-                    page_text = page.extract_text()
-                    if page_text:
-                        full_text += f"\n\n[Página {page_num + 1}]\n{page_text}"
-                except Exception as e:
-                    print(f"Erro ao extrair texto da página {page_num + 1}: {str(e)}")
-                    continue
-            
-            if not full_text.strip():
-                return []
-            
-            # Limpa o texto
-            cleaned_text = self._clean_text(full_text)
-            
-            # Cria chunks organizados
-            chunks = self._create_organized_chunks(cleaned_text, filename, chunk_size, total_pages)
-            
-            return chunks
-            
+            chunker = OrganizedChunker(self, filename, chunk_size or self.chunk_size, total_pages)
+            return self._chunk_pages(chunker, _extract_page_texts(pdf_reader, 0, total_pages)) + chunker.finish()
         except Exception as e:
             print(f"Erro ao processar PDF {filename}: {str(e)}")
             raise Exception(f"Erro ao processar PDF: {str(e)}")
+            
+    def _chunk_pages(self, chunker: "OrganizedChunker", texts) -> List[Dict]:
+        """Limpa o texto de cada página (número, texto) e o entrega ao `chunker`, em ordem."""
+        chunks = []
+        for page_num, page_text in texts:
+            text = self._clean_text(self._page_text(page_num, page_text))
+            if text:
+                chunks.extend(chunker.feed(text))
+        return chunks
+        
+    def _page_text(self, page_num: int, page_text: str) -> str:
+        """Texto de uma página com o marcador de página, como aparece no texto completo."""
+        return f"\n\n[Página {page_num + 1}]\n{page_text}" if page_text else ""
     
     def _clean_text(self, text: str) -> str:
         """
@@ -72,90 +62,31 @@ class PDFProcessorService:
         
         return '\n'.join(cleaned_lines).strip()
     
-    def _create_organized_chunks(self, text: str, filename: str, chunk_size: int, total_pages: int) -> List[Dict]:
-        """
-        Divide o texto em chunks organizados com metadados consistentes.
-        """
-        chunks = []
-        words = text.split()
-        
-        if not words:
-            return chunks
-        
-        current_chunk = []
-        current_page = 1
-        
-        # Extrai título do documento (primeiras palavras significativas)
-        document_title = self._extract_document_title(text, filename)
-        
-        for word in words:
-            # Detecta mudança de página
-            if word.startswith('[Página') and word.endswith(']'):
-                try:
-                    page_num = int(word.replace('[Página', '').replace(']', '').strip())
-                    current_page = page_num
-                    continue
-                except:
-                    pass
-            
-            current_chunk.append(word)
-            
-            # Se o chunk atual atingiu o tamanho desejado
-            if len(' '.join(current_chunk)) >= chunk_size:
-                chunk_text = ' '.join(current_chunk)
-                
-                chunk_data = {
-                    "text": chunk_text,
-                    "title": document_title,
-                    "filename": filename,
-                    "source": f"PDF: {filename}",
-                    "chunk_index": len(chunks),
-                    "page_reference": current_page,
-                    "total_pages": total_pages,
-                    "keywords": self._extract_keywords(chunk_text),
-                    "content_type": "pdf",
-                    "char_count": len(chunk_text),
-                    "word_count": len(current_chunk),
-                    "url": f"file:///{filename}",  # URL fictícia para agrupamento
-                    "metadata": {
-                        "type": "pdf",
-                        "filename": filename,
-                        "page": current_page,
-                        "total_pages": total_pages,
-                        "chunk_index": len(chunks)
-                    }
-                }
-                
-                chunks.append(chunk_data)
-                current_chunk = []
-        
-        # Adiciona o último chunk se houver conteúdo
-        if current_chunk:
-            chunk_text = ' '.join(current_chunk)
-            chunk_data = {
-                "text": chunk_text,
-                "title": document_title,
+    def _chunk_data(self, words: List[str], title: str, filename: str, chunk_index: int,
+                    current_page: int, chunk_start_page: int, total_pages: int) -> Dict:
+        chunk_text = ' '.join(words)
+        return {
+            "text": chunk_text,
+            "title": title,
+            "filename": filename,
+            "source": f"PDF: {filename}",
+            "chunk_index": chunk_index,
+            "page_reference": current_page,
+            "total_pages": total_pages,
+            "keywords": self._extract_keywords(chunk_text),
+            "content_type": "pdf",
+            "char_count": len(chunk_text),
+            "word_count": len(words),
+            "url": f"file:///{filename}",  # URL fictícia para agrupamento
+            "metadata": {
+                "type": "pdf",
                 "filename": filename,
-                "source": f"PDF: {filename}",
-                "chunk_index": len(chunks),
-                "page_reference": current_page,
+                "page_start": chunk_start_page,
+                "page": current_page,
                 "total_pages": total_pages,
-                "keywords": self._extract_keywords(chunk_text),
-                "content_type": "pdf",
-                "char_count": len(chunk_text),
-                "word_count": len(current_chunk),
-                "url": f"file:///{filename}",  # URL fictícia para agrupamento
-                "metadata": {
-                    "type": "pdf",
-                    "filename": filename,
-                    "page": current_page,
-                    "total_pages": total_pages,
-                    "chunk_index": len(chunks)
-                }
+                "chunk_index": chunk_index
             }
-            chunks.append(chunk_data)
-        
-        return chunks
+        }
     
     def _extract_document_title(self, text: str, filename: str) -> str:
         """
@@ -178,27 +109,148 @@ class PDFProcessorService:
     
     def _extract_keywords(self, text: str) -> List[str]:
         """
-        Extrai palavras-chave simples do texto.
+        Extrai palavras-chave simples do texto (com o mesmo tokenizador do índice lexical).
         """
-        # Remove pontuação e converte para minúsculas
-        clean_text = re.sub(r'[^\w\s]', '', text.lower())
-        words = clean_text.split()
+        # Até 10 palavras mais frequentes, com mais de 3 caracteres e sem stop words
+        return extract_keywords(text, limit=10, min_length=4)
+
+class OrganizedChunker:
+    """
+    Divisão incremental do texto de um PDF em chunks, com o mesmo resultado que
+    teria sobre o texto inteiro do documento: recebe o texto limpo aos
+    pedaços, em ordem (`feed`), e devolve os chunks já completos; `finish`
+    devolve o último. O título do documento vem das primeiras linhas, então os
+    pedaços ficam retidos até que elas tenham chegado.
+    """
+    
+    def __init__(self, service: PDFProcessorService, filename: str, chunk_size: int, total_pages: int):
+        self.service = service
+        self.filename = filename
+        self.chunk_size = chunk_size
+        self.total_pages = total_pages
+        self.title = None
+        self.chunk_index = 0
+        self._held = []
+        self._current_chunk = []
+        self._current_page = 1
+        self._chunk_start_page = 1
         
-        # Remove palavras muito comuns (stop words básicas)
-        stop_words = {
-            'o', 'a', 'os', 'as', 'um', 'uma', 'uns', 'umas', 'de', 'da', 'do', 'das', 'dos',
-            'e', 'ou', 'mas', 'que', 'para', 'por', 'com', 'sem', 'em', 'na', 'no', 'nas', 'nos',
-            'é', 'são', 'foi', 'será', 'ter', 'tem', 'tinha', 'pode', 'podem', 'muito', 'mais',
-            'como', 'quando', 'onde', 'porque', 'se', 'já', 'também', 'só', 'ainda', 'isso',
-            'este', 'esta', 'estes', 'estas', 'esse', 'essa', 'esses', 'essas', 'aquele', 'aquela'
-        }
+    def feed(self, text: str) -> List[Dict]:
+        if self.title is None:
+            self._held.append(text)
+            held = '\n'.join(self._held)
+            if held.count('\n') < 10:
+                return []
+            return self._start(held)
+        return self._words(text.split())
+        
+    def finish(self) -> List[Dict]:
+        chunks = self._start('\n'.join(self._held)) if self.title is None else []
+        if self._current_chunk:
+            chunks.append(self._chunk())
+        return chunks
         
-        # Filtra palavras relevantes (mais de 3 caracteres e não são stop words)
-        keywords = [word for word in words if len(word) > 3 and word not in stop_words]
+    def _start(self, held: str) -> List[Dict]:
+        if not held.split():
+            return []
+        self.title = self.service._extract_document_title(held, self.filename)
+        self._held = []
+        return self._words(held.split())
         
-        # Conta frequência e retorna as mais comuns
-        from collections import Counter
-        word_freq = Counter(keywords)
+    def _chunk(self) -> Dict:
+        chunk = self.service._chunk_data(
+            self._current_chunk, self.title, self.filename, self.chunk_index,
+            self._current_page, self._chunk_start_page, self.total_pages
+        )
+        self.chunk_index += 1
+        self._current_chunk = []
+        return chunk
         
-        # Retorna até 10 palavras mais frequentes
-        return [word for word, count in word_freq.most_common(10)]
\ No newline at end of file
+    def _words(self, words: List[str]) -> List[Dict]:
+        chunks = []
+        for word in words:
+            # Detecta mudança de página
+            if word.startswith('[Página') and word.endswith(']'):
+                try:
+                    page_num = int(word.replace('[Página', '').replace(']', '').strip())
+                    self._current_page = page_num
+                    continue
+                except:
+                    pass
+            
+            # Página em que o chunk começa (um chunk pode atravessar páginas)
+            if not self._current_chunk:
+                self._chunk_start_page = self._current_page
+            self._current_chunk.append(word)
+            
+            # Se o chunk atual atingiu o tamanho desejado
+            if len(' '.join(self._current_chunk)) >= self.chunk_size:
+                chunks.append(self._chunk())
+        return chunks
+
+
+def _extract_page_texts(pdf_reader, start: int, end: int):
+    """(número, texto) das páginas [start, end); páginas com erro de extração ficam vazias."""
+    texts = []
+    for page_num in range(start, end):
+        try:
+            texts.append((page_num, pdf_reader.pages[page_num].extract_text() or ""))
+        except Exception as e:
+            print(f"Erro ao extrair texto da página {page_num + 1}: {str(e)}")
+            texts.append((page_num, ""))
+    return texts
+
+
+def count_pdf_pages(path: str) -> int:
+    return len(PdfReader(path).pages)
+
+
+def extract_pdf_pages(path: str, start: int, end: int) -> List:
+    """
+    Texto das páginas [start, end) do PDF em `path`, para ser executada em
+    outro processo: cada processo lê apenas a sua faixa de páginas.
+    """
+    return _extract_page_texts(PdfReader(path), start, end)
+
+
+async def iter_pdf_chunks(
+    path: str, filename: str, chunk_size: int = None, pages_per_task: int = 16, on_pages: Callable = None
+):
+    """
+    Gerador assíncrono dos chunks de um PDF gravado em disco, em listas, à
+    medida que as faixas de `pages_per_task` páginas são extraídas no
+    `pdf_pool` (várias faixas em paralelo, entregues em ordem). Os chunks são
+    os mesmos de `PDFProcessorService.process_pdf`, sem manter o texto do
+    documento inteiro em memória; quem consome mais devagar segura a extração
+    das próximas faixas.
+    `on_pages(páginas_processadas, total_de_páginas)`, se informado, é chamado
+    ao início e após cada faixa, para o acompanhamento do progresso.
+    """
+    from services.concurrency import pdf_pool
+    
+    service = PDFProcessorService()
+    total_pages = await pdf_pool.run(count_pdf_pages, path)
+    chunker = OrganizedChunker(service, filename, chunk_size or service.chunk_size, total_pages)
+    if on_pages is not None:
+        on_pages(0, total_pages)
+    
+    starts = deque(range(0, total_pages, pages_per_task))
+    pending = deque()
+    try:
+        while starts or pending:
+            while starts and len(pending) < pdf_pool.max_workers:
+                start = starts.popleft()
+                end = min(start + pages_per_task, total_pages)
+                pending.append(asyncio.ensure_future(pdf_pool.run(extract_pdf_pages, path, start, end)))
+            texts = await pending.popleft()
+            chunks = await asyncio.to_thread(service._chunk_pages, chunker, texts)
+            if on_pages is not None and texts:
+                on_pages(texts[-1][0] + 1, total_pages)
+            if chunks:
+                yield chunks
+        chunks = chunker.finish()
+        if chunks:
+            yield chunks
+    finally:
+        for task in pending:
+            task.cancel()
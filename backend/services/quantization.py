@@ -0,0 +1,156 @@
+import os
+import numpy as np
+
+try:
+    import faiss
+except ImportError:  # sem faiss, a varredura usa o kernel em numpy
+    faiss = None
+
+PRECISIONS = ("float32", "float16", "int8")
+
+# Linhas convertidas por vez no kernel em numpy (~16 MB em float32 com 1024 dimensões)
+CONVERT_BUFFER_SIZE = 4 * 1024 * 1024
+
+
+def quantize(vectors, precision, chunk_rows=65536):
+    """
+    Converte vetores float32 para a precisão de armazenamento. Retorna
+    (códigos, escalas); no int8 cada dimensão tem sua escala, de modo que
+    `códigos * escalas` aproxima os vetores originais.
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if precision == "float16":
+        return vectors.astype(np.float16), None
+    if precision != "int8":
+        raise ValueError(f"Precisão desconhecida: {precision}. Opções: {', '.join(PRECISIONS)}")
+
+    scales = np.abs(vectors).max(axis=0) / 127 if len(vectors) else np.ones(vectors.shape[1], dtype=np.float32)
+    scales = np.where(scales > 0, scales, 1).astype(np.float32)
+    codes = np.empty(vectors.shape, dtype=np.int8)
+    for start in range(0, len(vectors), chunk_rows):
+        chunk = vectors[start:start + chunk_rows] / scales
+        np.clip(np.rint(chunk, out=chunk), -127, 127, out=chunk)
+        codes[start:start + chunk_rows] = chunk
+    return codes, scales
+
+
+def _empty_result(count):
+    return [(np.array([], dtype=np.float32), np.array([], dtype=np.int64))] * count
+
+
+class NumpyQuantizedBlock:
+    """
+    Vetores de um segmento em float16 ou int8 (com uma escala por dimensão),
+    pontuados em numpy: fatias convertidas para float32 num buffer reaproveitado
+    seguidas de um produto matriz-matriz.
+    """
+
+    def __init__(self, codes, scales=None):
+        self.codes = codes
+        self.scales = scales
+
+    def __len__(self):
+        return len(self.codes)
+
+    @property
+    def itemsize(self):
+        return self.codes.itemsize
+
+    def search(self, queries, k, dead, buffer_fn):
+        """Retorna (pontuações, posições no segmento) aproximadas por consulta."""
+        if k <= 0 or len(self.codes) == 0:
+            return _empty_result(len(queries))
+
+        # q · (códigos * escalas) = (q * escalas) · códigos
+        scaled_queries = queries * self.scales if self.scales is not None else queries
+        dimension = self.codes.shape[1]
+        rows = max(1, min(CONVERT_BUFFER_SIZE // dimension, CONVERT_BUFFER_SIZE // max(1, len(queries))))
+
+        all_scores = [[] for _ in range(len(queries))]
+        all_positions = [[] for _ in range(len(queries))]
+        for start in range(0, len(self.codes), rows):
+            chunk = self.codes[start:start + rows]
+            converted = buffer_fn("convert", chunk.size).reshape(chunk.shape)
+            np.copyto(converted, chunk)
+
+            scores = buffer_fn("scores", len(queries) * len(chunk)).reshape(len(queries), len(chunk))
+            np.dot(scaled_queries, converted.T, out=scores)
+            scores[:, dead[(dead >= start) & (dead < start + len(chunk))] - start] = -np.inf
+
+            for i, row in enumerate(scores):
+                k_chunk = min(k, len(row))
+                best = np.argpartition(row, -k_chunk)[-k_chunk:] if k_chunk < len(row) else np.arange(len(row))
+                alive = np.isfinite(row[best])
+                all_scores[i].append(row[best][alive])
+                all_positions[i].append(best[alive] + start)
+
+        return [(np.concatenate(s), np.concatenate(p)) for s, p in zip(all_scores, all_positions)]
+
+
+class FaissQuantizedBlock:
+    """
+    Vetores de um segmento num IndexScalarQuantizer do faiss (int8 com faixa por
+    dimensão, ou float16), pontuados pelos kernels SIMD do faiss. O arquivo é
+    mapeado em memória, compartilhando as páginas entre os workers.
+    """
+
+    def __init__(self, index):
+        self.index = index
+
+    def __len__(self):
+        return self.index.ntotal
+
+    @property
+    def itemsize(self):
+        return self.index.code_size // self.index.d
+
+    def search(self, queries, k, dead, buffer_fn=None):
+        """Retorna (pontuações, posições no segmento) aproximadas por consulta."""
+        if k <= 0 or self.index.ntotal == 0:
+            return _empty_result(len(queries))
+
+        params = None
+        if len(dead):
+            selector = faiss.IDSelectorNot(faiss.IDSelectorBatch(np.ascontiguousarray(dead, dtype=np.int64)))
+            params = faiss.SearchParameters(sel=selector)
+        scores, positions = self.index.search(queries, min(k, self.index.ntotal), params=params)
+        return [(s[p >= 0], p[p >= 0]) for s, p in zip(scores, positions)]
+
+
+def open_quantized_block(path_prefix, precision, vectors_fn, mmap=True):
+    """
+    Abre a cópia compacta dos vetores de um segmento, gravando-a a partir dos
+    vetores float32 (`vectors_fn()`) se ainda não existir. Usa o faiss quando
+    disponível e, sem ele, arquivos .npy pontuados em numpy.
+    """
+    if faiss is not None:
+        path = f"{path_prefix}_sq_{precision}.index"
+        if not os.path.exists(path):
+            vectors = np.ascontiguousarray(vectors_fn(), dtype=np.float32)
+            quantizer_type = faiss.ScalarQuantizer.QT_8bit if precision == "int8" else faiss.ScalarQuantizer.QT_fp16
+            index = faiss.IndexScalarQuantizer(vectors.shape[1], quantizer_type, faiss.METRIC_INNER_PRODUCT)
+            index.train(vectors)
+            index.add(vectors)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            faiss.write_index(index, tmp_path)
+            os.replace(tmp_path, path)
+        return FaissQuantizedBlock(faiss.read_index(path, faiss.IO_FLAG_MMAP_IFC if mmap else 0))
+
+    codes_path = f"{path_prefix}_vectors_{precision}.npy"
+    scales_path = f"{path_prefix}_scales.npy"
+    if not os.path.exists(codes_path) or (precision == "int8" and not os.path.exists(scales_path)):
+        codes, scales = quantize(vectors_fn(), precision)
+        if scales is not None:
+            _save_array(scales_path, scales)
+        _save_array(codes_path, codes)
+
+    codes = np.load(codes_path, mmap_mode='r' if mmap else None)
+    scales = np.load(scales_path) if precision == "int8" else None
+    return NumpyQuantizedBlock(codes, scales)
+
+
+def _save_array(path, array):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        np.save(f, array)
+    os.replace(tmp_path, path)
@@ -0,0 +1,63 @@
+import threading
+import unicodedata
+from collections import OrderedDict
+
+_MISSING = object()
+
+
+def normalize_query(text):
+    """
+    Forma canônica de uma consulta, usada como chave dos caches: minúsculas,
+    espaços simples e sem pontuação no fim ("Quais cursos o campus oferece? "
+    e "quais cursos o campus oferece" resultam na mesma chave).
+    """
+    text = unicodedata.normalize('NFC', text).lower()
+    return " ".join(text.split()).rstrip("?!.;:, ")
+
+
+class LRUCache:
+    """
+    Cache LRU em memória, seguro entre threads, que conta acertos e falhas
+    para as métricas de uso (`stats`).
+    """
+
+    def __init__(self, max_entries=1000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, default=None):
+        with self._lock:
+            value = self._entries.get(key, _MISSING)
+            if value is _MISSING:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+        }
@@ -0,0 +1,950 @@
+import os
+import json
+import pickle
+import threading
+from contextlib import contextmanager
+import numpy as np
+from services.column_store import (
+    ConcatColumn, TextColumn, open_metadata_column, open_text_column, write_metadata_column, write_text_column
+)
+from services.quantization import PRECISIONS, open_quantized_block
+from services.write_ahead_log import (
+    OP_ADD, OP_DELETE, WriteAheadLog, decode_add, decode_delete, encode_add, encode_delete, read_records
+)
+
+try:
+    import fcntl
+except ImportError:  # Windows: sem trava entre processos, apenas entre threads
+    fcntl = None
+
+
+def normalize_rows(vectors):
+    """
+    Retorna os vetores como matriz float32 contígua com linhas de norma 1
+    (linhas nulas permanecem nulas).
+    """
+    vectors = np.array(vectors, dtype=np.float32, order='C', ndmin=2)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    np.divide(vectors, norms, out=vectors, where=norms != 0)
+    return vectors
+
+
+def _fsync(f):
+    f.flush()
+    os.fsync(f.fileno())
+
+
+def _fsync_dir(path):
+    """Garante que as renomeações no diretório sobrevivam a uma queda (POSIX)."""
+    if not hasattr(os, 'O_DIRECTORY'):
+        return
+    fd = os.open(path, os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class SegmentStore:
+    """
+    Armazenamento da coleção em segmentos imutáveis descritos por um manifesto.
+
+    Inclusões e remoções são primeiro registradas num log de escrita antecipada
+    (WAL) com group commit, e as linhas novas ficam num bloco em memória no fim
+    da coleção. Ao atingir `checkpoint_rows` linhas (ou `checkpoint_bytes` de log)
+    um checkpoint grava esse bloco como um segmento imutável (com fsync), publica
+    o manifesto de forma atômica e inicia um novo log. Ao carregar, o log do
+    manifesto é reaplicado; um registro incompleto no fim (queda durante a
+    escrita) é descartado. Uma thread em segundo plano consolida segmentos
+    pequenos preservando a ordem das linhas.
+
+    Cada documento recebe um ID estável que nunca é reutilizado. Remoções apenas
+    acrescentam o ID às lápides (tombstones); as linhas removidas são ignoradas
+    nas buscas até que `compact()` regrave os segmentos afetados.
+
+    Todo segmento guarda uma matriz float32 contígua já normalizada, o que permite
+    calcular a similaridade coseno com um único produto matriz-vetor. Segmentos
+    antigos são verificados (e corrigidos) uma única vez ao carregar.
+
+    Os textos de cada segmento ficam em colunas (blob UTF-8 + offsets, ver
+    column_store), decodificadas linha a linha no acesso; `documents` e
+    `metadata` são visões que encadeiam as colunas dos segmentos. Segmentos
+    gravados com pickle/JSON são convertidos uma única vez ao serem abertos.
+
+    Com `precision` "float16" ou "int8", cada segmento ganha também uma cópia
+    compacta dos vetores (int8 com uma escala por dimensão), usada na varredura
+    da busca exata; o arquivo float32 continua sendo a fonte de verdade e só tem
+    lidas as linhas usadas na repontuação dos melhores candidatos.
+
+    Com `mmap=True` os vetores dos segmentos são mapeados somente leitura, de modo
+    que vários workers compartilham as mesmas páginas do cache do sistema. O
+    manifesto funciona como sinal de mudança: `refresh()` detecta gravações de
+    outros processos e abre apenas os segmentos novos, e o tamanho do log, as
+    inclusões e remoções ainda não incorporadas aos segmentos.
+    """
+
+    def __init__(self, data_dir, collection_name, dimension,
+                 small_segment_rows=10000, max_small_segments=8, mmap=True, precision="float32",
+                 checkpoint_rows=None, checkpoint_bytes=64 * 1024 * 1024, commit_delay_ms=0):
+        if precision not in PRECISIONS:
+            raise ValueError(f"Precisão desconhecida: {precision}. Opções: {', '.join(PRECISIONS)}")
+
+        self.data_dir = data_dir
+        self.collection_name = collection_name
+        self.dimension = dimension
+        self.small_segment_rows = small_segment_rows
+        self.max_small_segments = max_small_segments
+        self.mmap = mmap
+        self.precision = precision
+        self.checkpoint_rows = checkpoint_rows or small_segment_rows
+        self.checkpoint_bytes = checkpoint_bytes
+        self.commit_delay_ms = commit_delay_ms
+
+        self.segments_dir = os.path.join(data_dir, collection_name)
+        self.manifest_path = os.path.join(self.segments_dir, "manifest.json")
+        self.lock_path = os.path.join(self.segments_dir, ".lock")
+
+        # Arquivos do formato antigo (arquivo único por tipo de dado)
+        self.legacy_vectors_path = os.path.join(data_dir, f"{collection_name}_vectors.npy")
+        self.legacy_documents_path = os.path.join(data_dir, f"{collection_name}_documents.pkl")
+        self.legacy_metadata_path = os.path.join(data_dir, f"{collection_name}_metadata.json")
+
+        self._lock = threading.RLock()
+        self._lock_depth = 0
+        self._lock_file = None
+        self._merge_thread = None
+        self._checkpoint_thread = None
+        self._manifest_signature = None
+        self._segment_cache = {}
+        self._codes_cache = {}
+
+        self.segments = []
+        self.blocks = []
+        self.block_ids = []
+        self.block_dead = []
+        self.block_codes = []
+        self.views = []
+        self.documents = ConcatColumn([])
+        self.metadata = ConcatColumn([])
+        self._segment_documents = []
+        self._segment_metadata = []
+        self.all_ids = np.zeros(0, dtype=np.int64)
+        self.tombstones = np.zeros(0, dtype=np.int64)
+        self.epoch = 0
+        self._offsets = np.zeros(0, dtype=np.int64)
+        self._next_segment = 1
+        self._next_id = 0
+
+        # Log de escrita antecipada e o que ele contém além dos segmentos: linhas
+        # num buffer que cresce por duplicação e lápides ainda não publicadas
+        self.wal = None
+        self._wal_generation = 0
+        self._wal_offset = 0
+        self._wal_signature = None
+        self._pending_buffer = np.zeros((0, dimension), dtype=np.float32)
+        self._pending_ids = np.zeros(0, dtype=np.int64)
+        self._pending_documents = []
+        self._pending_metadata = []
+        self._pending_deletes = []
+        self._published_tombstones = 0
+
+    def load(self):
+        """Carrega o manifesto e os segmentos da coleção."""
+        os.makedirs(self.segments_dir, exist_ok=True)
+        with self._write_lock(refresh=False):
+            if not os.path.exists(self.manifest_path):
+                self._migrate_legacy_files()
+            self._load_manifest()
+            self._recover_wal()
+            self._assign_missing_ids()
+            self._check_normalized_segments()
+
+    def refresh(self):
+        """
+        Recarrega a coleção se o manifesto ou o log foram alterados por outro
+        processo. Retorna True quando houve mudança.
+        """
+        signature = self._read_signature()
+        if signature is None:
+            return False
+        if signature == self._manifest_signature and self._read_wal_signature() == self._wal_signature:
+            return False
+
+        with self._lock:
+            if self._read_signature() != self._manifest_signature:
+                self._load_manifest()
+                return True
+            if self._read_wal_signature() != self._wal_signature:
+                self._replay_wal()
+                return True
+        return False
+
+    def has_external_changes(self):
+        """Indica, sem recarregar nada, se outro processo alterou o manifesto ou o log."""
+        return (self._read_signature() != self._manifest_signature
+                or self._read_wal_signature() != self._wal_signature)
+
+    def _read_signature(self):
+        try:
+            stat = os.stat(self.manifest_path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+    def _load_manifest(self, attempts=3):
+        """Lê o manifesto reaproveitando os segmentos já abertos (são imutáveis)."""
+        for attempt in range(attempts):
+            signature = self._read_signature()
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+
+            try:
+                cache = {}
+                for segment in manifest.get("segments", []):
+                    name = segment["name"]
+                    cache[name] = self._segment_cache.get(name) or self._read_segment(name)
+                tombstones = self._read_tombstones(manifest.get("epoch", 0), manifest.get("tombstones", 0))
+                break
+            except FileNotFoundError:
+                # Um segmento foi consolidado por outro processo durante a leitura
+                if attempt == attempts - 1:
+                    raise
+
+        self._manifest_signature = signature
+        self._segment_cache = cache
+        self._next_segment = manifest.get("next_segment", 1)
+        self._next_id = manifest.get("next_id", 0)
+        self.epoch = manifest.get("epoch", 0)
+        self.segments = manifest.get("segments", [])
+        self.tombstones = tombstones
+        self._published_tombstones = manifest.get("tombstones", 0)
+
+        # O log do manifesto contém tudo o que foi gravado depois do último checkpoint
+        self._wal_generation = manifest.get("wal_generation", 0)
+        self._clear_pending()
+        self._rebuild_views()
+        self._replay_wal()
+
+    def _wal_path(self, generation):
+        return os.path.join(self.segments_dir, f"wal_{generation:06d}.log")
+
+    def _read_wal_signature(self):
+        try:
+            stat = os.stat(self._wal_path(self._wal_generation))
+        except FileNotFoundError:
+            return None
+        return (stat.st_ino, stat.st_size)
+
+    def _replay_wal(self):
+        """Aplica em memória os registros do log ainda não aplicados."""
+        path = self._wal_path(self._wal_generation)
+        signature = self._read_wal_signature()
+        records, self._wal_offset = read_records(path, self._wal_offset)
+        self._wal_signature = signature
+
+        for op, payload in records:
+            if op == OP_ADD:
+                ids, vectors, documents, metadatas = decode_add(payload, self.dimension)
+                self._next_id = max(self._next_id, int(ids[-1]) + 1) if len(ids) else self._next_id
+                self._extend_pending(ids, vectors, documents, metadatas)
+            elif op == OP_DELETE:
+                self._apply_deletes(decode_delete(payload))
+
+    def _recover_wal(self):
+        """
+        Descarta um registro incompleto no fim do log (queda durante a escrita)
+        e remove logs de gerações anteriores. Executado com a trava de escrita.
+        """
+        path = self._wal_path(self._wal_generation)
+        if os.path.exists(path) and os.path.getsize(path) > self._wal_offset:
+            print(f"Coleção '{self.collection_name}': descartando registro incompleto no fim do log")
+            with open(path, 'r+b') as f:
+                f.truncate(self._wal_offset)
+                os.fsync(f.fileno())
+            self._wal_signature = self._read_wal_signature()
+
+        if self._pending_rows or self._pending_deletes:
+            print(f"Coleção '{self.collection_name}': {self._pending_rows} inclusões e "
+                  f"{sum(len(ids) for ids in self._pending_deletes)} remoções recuperadas do log")
+
+        current = os.path.basename(path)
+        for filename in os.listdir(self.segments_dir):
+            if filename.startswith("wal_") and filename.endswith(".log") and filename != current:
+                os.remove(os.path.join(self.segments_dir, filename))
+
+    def _open_wal(self):
+        """Abre (ou reabre, após um checkpoint de outro processo) o log da geração atual."""
+        if self.wal is None or self.wal.generation != self._wal_generation:
+            if self.wal is not None:
+                self.wal.close()
+            self.wal = WriteAheadLog(
+                self._wal_path(self._wal_generation), self._wal_generation, commit_delay_ms=self.commit_delay_ms
+            )
+        return self.wal
+
+    @property
+    def _pending_rows(self):
+        return len(self._pending_ids)
+
+    def _clear_pending(self):
+        self._pending_buffer = np.zeros((0, self.dimension), dtype=np.float32)
+        self._pending_ids = np.zeros(0, dtype=np.int64)
+        self._pending_documents = []
+        self._pending_metadata = []
+        self._pending_deletes = []
+        self._wal_offset = 0
+        self._wal_signature = None
+
+    def _extend_pending(self, ids, vectors, documents, metadatas):
+        """
+        Acrescenta linhas ao bloco em memória do fim da coleção. O buffer cresce
+        por duplicação e o bloco publicado é uma visão das linhas preenchidas,
+        então as buscas em andamento continuam vendo um estado consistente.
+        """
+        rows = self._pending_rows
+        if rows + len(ids) > len(self._pending_buffer):
+            capacity = max(1024, 2 * len(self._pending_buffer), rows + len(ids))
+            buffer = np.empty((capacity, self.dimension), dtype=np.float32)
+            buffer[:rows] = self._pending_buffer[:rows]
+            self._pending_buffer = buffer
+        self._pending_buffer[rows:rows + len(ids)] = vectors
+
+        self._pending_ids = np.concatenate([self._pending_ids, ids])
+        self._pending_documents.extend(documents)
+        self._pending_metadata.extend(metadatas)
+
+        if rows == 0:
+            self._offsets = np.append(self._offsets, len(self.documents))
+            self.blocks.append(None)
+            self.block_ids.append(None)
+            self.block_dead.append(np.zeros(0, dtype=np.int64))
+            self.block_codes.append(None)
+        self.blocks[-1] = self._pending_buffer[:self._pending_rows]
+        self.block_ids[-1] = self._pending_ids
+        self.all_ids = np.concatenate([self.all_ids, ids])
+        self._publish_rows()
+        self._publish_views()
+
+    def _apply_deletes(self, ids):
+        """Aplica lápides em memória (as posições já foram validadas ao registrá-las)."""
+        ids = np.setdiff1d(ids, self.tombstones)
+        positions = self.positions_of(ids)
+        ids, positions = ids[positions >= 0], positions[positions >= 0]
+        if len(ids) == 0:
+            return 0
+
+        self._pending_deletes.append(ids)
+        self.tombstones = np.union1d(self.tombstones, ids)
+        segment_indexes = np.searchsorted(self._offsets, positions, side='right') - 1
+        for i in np.unique(segment_indexes):
+            local = positions[segment_indexes == i] - self._offsets[i]
+            self.block_dead[i] = np.union1d(self.block_dead[i], local)
+        self._publish_views()
+        return len(ids)
+
+    def _rebuild_views(self):
+        """
+        Remonta as listas e os arrays globais a partir dos segmentos em cache.
+        As listas novas são montadas à parte e só então substituem as atuais.
+        """
+        blocks, block_ids, block_dead, block_codes = [], [], [], []
+        documents, metadata = [], []
+
+        for segment in self.segments:
+            vectors, ids, segment_documents, segment_metadata = self._segment_cache[segment["name"]]
+            blocks.append(vectors)
+            block_ids.append(ids)
+            block_codes.append(self._segment_codes(segment["name"]))
+            documents.append(segment_documents)
+            metadata.append(segment_metadata)
+
+            if ids is not None and len(self.tombstones):
+                block_dead.append(np.nonzero(np.isin(ids, self.tombstones))[0])
+            else:
+                block_dead.append(np.zeros(0, dtype=np.int64))
+
+        # Linhas do log ainda não incorporadas a um segmento ficam no último bloco
+        if self._pending_rows:
+            blocks.append(self._pending_buffer[:self._pending_rows])
+            block_ids.append(self._pending_ids)
+            block_codes.append(None)
+            block_dead.append(np.nonzero(np.isin(self._pending_ids, self.tombstones))[0])
+
+        ids = [block for block in block_ids if block is not None]
+        self.blocks, self.block_ids, self.block_dead, self.block_codes = blocks, block_ids, block_dead, block_codes
+        self._segment_documents, self._segment_metadata = documents, metadata
+        self.all_ids = np.concatenate(ids) if ids else np.zeros(0, dtype=np.int64)
+        self._offsets = np.cumsum([0] + [len(block) for block in blocks], dtype=np.int64)[:-1]
+        self._publish_rows()
+        self._publish_views()
+
+    def _publish_rows(self):
+        """Publica as visões de documentos e metadados: colunas dos segmentos seguidas das linhas do log."""
+        lengths = [len(column) for column in self._segment_documents] + [self._pending_rows]
+        self.documents = ConcatColumn(self._segment_documents + [self._pending_documents], lengths)
+        self.metadata = ConcatColumn(self._segment_metadata + [self._pending_metadata], lengths)
+
+    def _publish_views(self):
+        # Uma única atribuição: quem lê `views` nunca vê blocos, IDs e lápides de estados diferentes
+        self.views = list(zip(self.blocks, self.block_ids, self.block_dead, self.block_codes))
+
+    def _migrate_legacy_files(self):
+        """Converte a coleção do formato antigo em um único segmento, sem copiar dados."""
+        segments = []
+        if os.path.exists(self.legacy_vectors_path) and os.path.exists(self.legacy_documents_path):
+            name = self._new_segment_name()
+            os.replace(self.legacy_vectors_path, self._segment_path(name, "vectors.npy"))
+            os.replace(self.legacy_documents_path, self._segment_path(name, "documents.pkl"))
+
+            if os.path.exists(self.legacy_metadata_path):
+                os.replace(self.legacy_metadata_path, self._segment_path(name, "metadata.json"))
+
+            vectors = np.load(self._segment_path(name, "vectors.npy"), mmap_mode='r')
+            segments.append({"name": name, "count": len(vectors)})
+            print(f"Coleção '{self.collection_name}' migrada para o formato em segmentos")
+
+        self.segments = segments
+        self._write_manifest()
+
+    def _assign_missing_ids(self):
+        """
+        Atribui IDs estáveis a segmentos gravados antes deles existirem. Os IDs
+        antigos eram as posições das linhas, e a numeração sequencial os preserva.
+        """
+        changed = False
+        for segment in self.segments:
+            vectors, ids, documents, metadata = self._segment_cache[segment["name"]]
+            if ids is not None:
+                continue
+
+            ids = np.arange(self._next_id, self._next_id + segment["count"], dtype=np.int64)
+            self._write_array(self._segment_path(segment["name"], "ids.npy"), ids)
+            self._segment_cache[segment["name"]] = (vectors, ids, documents, metadata)
+            self._next_id += segment["count"]
+            changed = True
+
+        if changed:
+            self._rebuild_views()
+            self._write_manifest()
+
+    def _check_normalized_segments(self, tolerance=1e-3):
+        """
+        Garante a invariante de vetores float32 normalizados em segmentos gravados
+        antes dela existir; segmentos verificados ficam marcados no manifesto.
+        """
+        changed, obsolete = False, []
+        for i, segment in enumerate(self.segments):
+            if segment.get("normalized"):
+                continue
+
+            vectors = self.blocks[i]
+            norms = np.linalg.norm(vectors, axis=1)
+            valid = (np.abs(norms - 1.0) <= tolerance) | (norms == 0)
+            if vectors.dtype != np.float32 or not vectors.flags['C_CONTIGUOUS'] or not valid.all():
+                # Segmentos são imutáveis: a versão corrigida ganha um novo nome
+                print(f"Normalizando segmento '{segment['name']}' da coleção '{self.collection_name}'")
+                _, ids, documents, metadata = self._segment_cache[segment["name"]]
+                name = self._new_segment_name()
+                vectors = self._write_segment(name, normalize_rows(vectors), ids, documents, metadata)
+                self._add_to_cache(name, vectors, ids)
+                obsolete.append(segment["name"])
+                self.segments[i] = {"name": name, "count": segment["count"]}
+
+            self.segments[i]["normalized"] = True
+            changed = True
+
+        if obsolete:
+            # Os vetores mudaram, então os índices aproximados precisam ser refeitos
+            self.epoch += 1
+            self._rebuild_views()
+        if changed:
+            self._write_manifest()
+            self._remove_segment_files(obsolete)
+
+    def _read_segment(self, name):
+        vectors = self._open_vectors(name)
+        if not os.path.exists(self._segment_path(name, "metadata.npz")):
+            self._migrate_segment_columns(name)
+        documents, metadata = self._open_columns(name)
+
+        # Segmentos anteriores aos IDs estáveis não têm o arquivo de IDs
+        ids_path = self._segment_path(name, "ids.npy")
+        ids = np.load(ids_path) if os.path.exists(ids_path) else None
+
+        return vectors, ids, documents, metadata
+
+    def _open_columns(self, name):
+        documents = open_text_column(self._segment_path(name, "documents.utf8"), mmap=self.mmap)
+        metadata = open_metadata_column(self._segment_path(name, "metadata.npz"))
+        return documents, metadata
+
+    def _migrate_segment_columns(self, name):
+        """
+        Converte os documentos (pickle) e metadados (JSON) de um segmento antigo
+        para o formato em colunas. Os arquivos antigos só são removidos depois
+        que os novos estão gravados; a coluna de metadados é a última a ser
+        gravada e marca a conversão como concluída.
+        """
+        documents_path = self._segment_path(name, "documents.pkl")
+        metadata_path = self._segment_path(name, "metadata.json")
+        with open(documents_path, 'rb') as f:
+            documents = pickle.load(f)
+        if os.path.exists(metadata_path):
+            with open(metadata_path, 'r', encoding='utf-8') as f:
+                metadata = json.load(f)
+        else:
+            metadata = [None] * len(documents)
+
+        write_text_column(self._segment_path(name, "documents.utf8"), documents)
+        write_metadata_column(self._segment_path(name, "metadata.npz"), metadata)
+        for path in (documents_path, metadata_path):
+            if os.path.exists(path):
+                os.remove(path)
+        print(f"Segmento '{name}' da coleção '{self.collection_name}' convertido para o formato em colunas")
+
+    def _open_vectors(self, name):
+        """Abre os vetores do segmento, mapeados em memória quando `mmap` está ativo."""
+        vectors = np.load(self._segment_path(name, "vectors.npy"), mmap_mode='r' if self.mmap else None)
+        return vectors.reshape(-1, self.dimension)
+
+    def _segment_codes(self, name):
+        """
+        Retorna a cópia compacta dos vetores do segmento na precisão configurada,
+        ou None em float32. Segmentos gravados com outra precisão são convertidos aqui.
+        """
+        if self.precision == "float32":
+            return None
+        if name not in self._codes_cache:
+            self._codes_cache[name] = open_quantized_block(
+                os.path.join(self.segments_dir, name), self.precision,
+                lambda: self._segment_cache[name][0], mmap=self.mmap
+            )
+        return self._codes_cache[name]
+
+    def _read_tombstones(self, epoch, count):
+        """Lê as `count` primeiras lápides publicadas no manifesto."""
+        if count == 0:
+            return np.zeros(0, dtype=np.int64)
+        return np.unique(np.fromfile(self._tombstones_path(epoch), dtype=np.int64, count=count))
+
+    def __len__(self):
+        """Número total de linhas, incluindo as removidas ainda não compactadas."""
+        return len(self.documents)
+
+    @property
+    def live_count(self):
+        return len(self.documents) - len(self.tombstones)
+
+    @property
+    def version(self):
+        """Muda a cada inclusão, remoção, compactação ou reinício."""
+        return f"{self.epoch}.{len(self)}.{len(self.tombstones)}"
+
+    def dead_ratio(self):
+        return len(self.tombstones) / len(self.documents) if self.documents else 0.0
+
+    def memory_usage(self):
+        """
+        Bytes ocupados pelos vetores (e pela cópia compacta), documentos e
+        metadados carregados, estejam mapeados em memória ou não.
+        """
+        total = sum(block.nbytes for block in self.blocks)
+        total += sum(len(codes) * codes.itemsize * self.dimension for codes in self.block_codes if codes is not None)
+        for column in self._segment_documents:
+            total += column.blob.nbytes + column.offsets.nbytes
+        for column in self._segment_metadata:
+            total += column.values.blob.nbytes + column.pairs.nbytes + column.row_offsets.nbytes
+        total += sum(len(document) for document in self._pending_documents)
+        return int(total)
+
+    def live_mask(self):
+        """Máscara booleana das linhas que não foram removidas."""
+        views = self.views
+        offsets = self._view_offsets(views)
+        mask = np.ones(int(offsets[-1]) if len(views) else 0, dtype=bool)
+        for offset, (_, _, dead, _) in zip(offsets, views):
+            mask[offset + dead] = False
+        return mask
+
+    @staticmethod
+    def _view_offsets(views):
+        # Início de cada bloco (e, no fim, o total de linhas) de um retrato de `views`
+        return np.cumsum([0] + [len(vectors) for vectors, _, _, _ in views], dtype=np.int64)
+
+    def positions_of(self, ids):
+        """Converte IDs em posições globais; IDs inexistentes resultam em -1."""
+        ids = np.asarray(ids, dtype=np.int64)
+        positions = np.searchsorted(self.all_ids, ids)
+        found = positions < len(self.all_ids)
+        found[found] = self.all_ids[positions[found]] == ids[found]
+        return np.where(found, positions, -1)
+
+    def vectors_at(self, positions):
+        """Vetores das posições globais informadas, lidos dos blocos de cada segmento."""
+        positions = np.asarray(positions, dtype=np.int64)
+        views = self.views
+        offsets = self._view_offsets(views)
+        vectors = np.empty((len(positions), self.dimension), dtype=np.float32)
+        segment_indexes = np.searchsorted(offsets, positions, side='right') - 1
+        for i in np.unique(segment_indexes):
+            rows = segment_indexes == i
+            vectors[rows] = views[i][0][positions[rows] - offsets[i]]
+        return vectors
+
+    def stack_vectors(self, start=0):
+        """
+        Retorna os vetores a partir da linha `start` em uma única matriz
+        (usado apenas em reconstruções do índice).
+        """
+        tail, offset = [], 0
+        for block in self.blocks:
+            if offset + len(block) > start:
+                tail.append(block[max(0, start - offset):])
+            offset += len(block)
+
+        if not tail:
+            return np.zeros((0, self.dimension), dtype=np.float32)
+        return np.vstack(tail)
+
+    def append(self, vectors, documents, metadatas, wait_durable=True):
+        """
+        Registra os novos dados no log e retorna os IDs atribuídos, depois que o
+        registro estiver em disco (fsync compartilhado entre escritas concorrentes).
+        Com `wait_durable=False` o chamador deve chamar `wait_durable()` depois,
+        por exemplo após liberar suas próprias travas.
+        """
+        vectors = normalize_rows(vectors)
+        metadatas = list(metadatas)
+        with self._write_lock():
+            wal = self._open_wal()
+            ids = np.arange(self._next_id, self._next_id + len(documents), dtype=np.int64)
+            position = wal.append(OP_ADD, encode_add(self._next_id, vectors, documents, metadatas))
+            self._next_id += len(documents)
+
+            self._extend_pending(ids, vectors, documents, metadatas)
+            self._wal_offset = position
+            self._wal_signature = self._read_wal_signature()
+
+        # O fsync acontece fora da trava, para que outras escritas entrem no mesmo grupo
+        if wait_durable:
+            wal.sync(position)
+            self._schedule_checkpoint()
+        return ids.tolist()
+
+    def wait_durable(self):
+        """Aguarda o fsync de tudo o que este processo já escreveu no log."""
+        wal = self.wal
+        if wal is not None:
+            wal.sync(wal.written)
+        self._schedule_checkpoint()
+
+    def delete_ids(self, ids, wait_durable=True):
+        """
+        Marca documentos como removidos registrando seus IDs no log, sem regravar
+        segmentos. Retorna quantos foram removidos.
+        """
+        with self._write_lock():
+            ids = np.unique(np.asarray(list(ids), dtype=np.int64))
+            positions = self.positions_of(ids)
+            ids = ids[(positions >= 0) & ~np.isin(ids, self.tombstones)]
+            if len(ids) == 0:
+                return 0
+
+            wal = self._open_wal()
+            position = wal.append(OP_DELETE, encode_delete(ids))
+            self._apply_deletes(ids)
+            self._wal_offset = position
+            self._wal_signature = self._read_wal_signature()
+
+        if wait_durable:
+            wal.sync(position)
+            self._schedule_checkpoint()
+        return len(ids)
+
+    def _schedule_checkpoint(self):
+        if self._pending_rows < self.checkpoint_rows and self._wal_offset < self.checkpoint_bytes:
+            return
+        if self._checkpoint_thread is not None and self._checkpoint_thread.is_alive():
+            return
+
+        self._checkpoint_thread = threading.Thread(target=self.checkpoint, daemon=True)
+        self._checkpoint_thread.start()
+
+    def checkpoint(self):
+        """
+        Incorpora o log aos arquivos da coleção: as linhas em memória viram um
+        segmento, as lápides vão para o arquivo de lápides (ambos com fsync) e o
+        manifesto passa a apontar para um log novo, vazio. Retorna True se havia
+        algo a incorporar.
+        """
+        with self._write_lock():
+            if not self._pending_rows and not self._pending_deletes:
+                return False
+
+            if self._pending_rows:
+                name = self._new_segment_name()
+                vectors = self._write_segment(
+                    name, self._pending_buffer[:self._pending_rows], self._pending_ids,
+                    self._pending_documents, self._pending_metadata
+                )
+                self._add_to_cache(name, vectors, self._pending_ids)
+                self.segments.append({"name": name, "count": self._pending_rows, "normalized": True})
+
+            if self._pending_deletes:
+                # Todas as lápides estão em self.tombstones; o arquivo recebe as que faltam
+                deletes = np.concatenate(self._pending_deletes)
+                with open(self._tombstones_path(self.epoch), 'ab') as f:
+                    f.write(deletes.tobytes())
+                    f.flush()
+                    os.fsync(f.fileno())
+                self._published_tombstones += len(deletes)
+
+            self._rotate_wal()
+            self._rebuild_views()
+
+        self._schedule_merge()
+        return True
+
+    def _rotate_wal(self):
+        """
+        Publica o manifesto apontando para um log novo e descarta o anterior.
+        Até a troca do manifesto, uma queda mantém o log antigo como referência.
+        """
+        previous = self._wal_path(self._wal_generation)
+        self._wal_generation += 1
+        open(self._wal_path(self._wal_generation), 'ab').close()
+        self._write_manifest()
+
+        if self.wal is not None:
+            self.wal.close()
+            self.wal = None
+        self._clear_pending()
+        self._wal_signature = self._read_wal_signature()
+        if os.path.exists(previous):
+            os.remove(previous)
+
+    def compact(self):
+        """
+        Regrava os segmentos com linhas removidas, descartando-as de fato.
+        Retorna True se houve compactação (as posições mudam e o epoch avança).
+        """
+        with self._write_lock():
+            if len(self.tombstones) == 0:
+                return False
+
+            # Compactação trabalha só com segmentos: o log é incorporado antes
+            self.checkpoint()
+
+            segments, obsolete = [], []
+            for segment, dead in zip(self.segments, self.block_dead):
+                if len(dead) == 0:
+                    segments.append(segment)
+                    continue
+
+                obsolete.append(segment["name"])
+                mask = np.ones(segment["count"], dtype=bool)
+                mask[dead] = False
+                if not mask.any():
+                    continue
+
+                vectors, ids, documents, metadata = self._segment_cache[segment["name"]]
+                kept = np.nonzero(mask)[0]
+                # Os textos mantidos são copiados como bytes, sem decodificação
+                documents = documents.take(kept)
+                metadata = [metadata[i] for i in kept]
+                name = self._new_segment_name()
+                vectors = self._write_segment(name, vectors[mask], ids[mask], documents, metadata)
+                self._add_to_cache(name, vectors, ids[mask])
+                segments.append({"name": name, "count": int(mask.sum()), "normalized": True})
+
+            removed = len(self.tombstones)
+            tombstones_path = self._tombstones_path(self.epoch)
+            self.segments = segments
+            self.tombstones = np.zeros(0, dtype=np.int64)
+            self._published_tombstones = 0
+            self.epoch += 1
+            self._write_manifest()
+            self._remove_segment_files(obsolete)
+            if os.path.exists(tombstones_path):
+                os.remove(tombstones_path)
+            self._rebuild_views()
+
+        print(f"Coleção '{self.collection_name}' compactada: {removed} documentos removidos definitivamente")
+        return True
+
+    def reset(self):
+        """Remove todos os segmentos da coleção (os IDs já usados não são reaproveitados)."""
+        with self._write_lock():
+            obsolete = [segment["name"] for segment in self.segments]
+            tombstones_path = self._tombstones_path(self.epoch)
+            self.segments = []
+            self.tombstones = np.zeros(0, dtype=np.int64)
+            self._published_tombstones = 0
+            self.epoch += 1
+            # O log é descartado junto com os segmentos
+            self._rotate_wal()
+            self._remove_segment_files(obsolete)
+            if os.path.exists(tombstones_path):
+                os.remove(tombstones_path)
+            self._rebuild_views()
+
+    def close(self):
+        """
+        Fecha o log de escrita, aguardando a mesclagem e o checkpoint em
+        andamento. Depois disso o armazenamento não deve mais ser usado.
+        """
+        for thread in (self._merge_thread, self._checkpoint_thread):
+            if thread is not None:
+                thread.join()
+        with self._lock:
+            if self.wal is not None:
+                self.wal.close()
+                self.wal = None
+
+    def _schedule_merge(self):
+        small = [s for s in self.segments if s["count"] < self.small_segment_rows]
+        if len(small) <= self.max_small_segments:
+            return
+        if self._merge_thread is not None and self._merge_thread.is_alive():
+            return
+
+        self._merge_thread = threading.Thread(target=self.merge_small_segments, daemon=True)
+        self._merge_thread.start()
+
+    def merge_small_segments(self):
+        """Une sequências de segmentos pequenos e vizinhos em um segmento maior."""
+        with self._write_lock():
+            run = self._find_small_run()
+            if not run:
+                return
+            start, end = run
+            names = [s["name"] for s in self.segments[start:end]]
+            parts = [self._segment_cache[name] for name in names]
+            count = sum(s["count"] for s in self.segments[start:end])
+            vectors = np.vstack([part[0] for part in parts])
+            ids = np.concatenate([part[1] for part in parts])
+            documents = TextColumn.concat([part[2] for part in parts])
+            metadata = [m for part in parts for m in part[3]]
+
+            # Reserva o nome no manifesto para que outros processos não o reutilizem
+            name = self._new_segment_name()
+            self._write_manifest()
+
+        # A escrita do segmento consolidado não bloqueia novas inclusões
+        vectors = self._write_segment(name, vectors, ids, documents, metadata)
+
+        with self._write_lock():
+            current = [s["name"] for s in self.segments]
+            if current[start:end] != names:
+                # A coleção mudou durante a consolidação; descarta o resultado
+                self._remove_segment_files([name])
+                return
+
+            self._add_to_cache(name, vectors, ids)
+            self.segments[start:end] = [{"name": name, "count": count, "normalized": True}]
+            self._write_manifest()
+            self._remove_segment_files(names)
+            self._rebuild_views()
+
+        print(f"Coleção '{self.collection_name}': {len(names)} segmentos consolidados em '{name}'")
+
+    def _find_small_run(self):
+        """Encontra a maior sequência contígua de segmentos pequenos."""
+        best, start = None, None
+        for i, segment in enumerate(self.segments + [None]):
+            if segment is not None and segment["count"] < self.small_segment_rows:
+                if start is None:
+                    start = i
+                continue
+            if start is not None and i - start > 1 and (best is None or i - start > best[1] - best[0]):
+                best = (start, i)
+            start = None
+        return best
+
+    @contextmanager
+    def _write_lock(self, refresh=True):
+        """
+        Trava de escrita entre threads e entre processos. Ao adquiri-la, o estado
+        em memória é atualizado com o que outros processos gravaram.
+        """
+        with self._lock:
+            if self._lock_depth == 0 and fcntl is not None:
+                self._lock_file = open(self.lock_path, 'a')
+                fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+            self._lock_depth += 1
+            try:
+                if refresh and self._lock_depth == 1:
+                    self.refresh()
+                yield
+            finally:
+                self._lock_depth -= 1
+                if self._lock_depth == 0 and self._lock_file is not None:
+                    fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+                    self._lock_file.close()
+                    self._lock_file = None
+
+    def _new_segment_name(self):
+        name = f"seg_{self._next_segment:06d}"
+        self._next_segment += 1
+        return name
+
+    def _segment_path(self, name, suffix):
+        return os.path.join(self.segments_dir, f"{name}_{suffix}")
+
+    def _tombstones_path(self, epoch):
+        return os.path.join(self.segments_dir, f"tombstones_{epoch}.bin")
+
+    def _add_to_cache(self, name, vectors, ids):
+        # As colunas são reabertas do disco: o segmento não guarda cópias dos textos em memória
+        self._segment_cache[name] = (vectors, np.asarray(ids, dtype=np.int64), *self._open_columns(name))
+
+    def _write_array(self, path, array):
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            np.save(f, array)
+            _fsync(f)
+        os.replace(tmp_path, path)
+
+    def _write_segment(self, name, vectors, ids, documents, metadatas):
+        """Grava o segmento e retorna seus vetores (mapeados do arquivo quando `mmap` está ativo)."""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        self._write_array(self._segment_path(name, "vectors.npy"), vectors)
+        self._write_array(self._segment_path(name, "ids.npy"), np.asarray(ids, dtype=np.int64))
+
+        if self.precision != "float32":
+            self._codes_cache[name] = open_quantized_block(
+                os.path.join(self.segments_dir, name), self.precision, lambda: vectors, mmap=self.mmap
+            )
+
+        write_text_column(self._segment_path(name, "documents.utf8"), documents)
+        write_metadata_column(self._segment_path(name, "metadata.npz"), metadatas)
+
+        return self._open_vectors(name) if self.mmap else vectors
+
+    def _write_manifest(self):
+        manifest = {
+            "next_segment": self._next_segment,
+            "next_id": self._next_id,
+            "epoch": self.epoch,
+            "tombstones": self._published_tombstones,
+            "wal_generation": self._wal_generation,
+            "segments": self.segments
+        }
+        tmp_path = f"{self.manifest_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+            _fsync(f)
+        os.replace(tmp_path, self.manifest_path)
+        _fsync_dir(self.segments_dir)
+        self._manifest_signature = self._read_signature()
+
+    def _remove_segment_files(self, names):
+        for name in names:
+            self._segment_cache.pop(name, None)
+            self._codes_cache.pop(name, None)
+            for suffix in ("vectors.npy", "ids.npy", "documents.utf8", "documents.utf8.offsets.npy", "metadata.npz",
+                           "documents.pkl", "metadata.json", "scales.npy",
+                           "vectors_float16.npy", "vectors_int8.npy", "sq_float16.index", "sq_int8.index"):
+                path = self._segment_path(name, suffix)
+                if os.path.exists(path):
+                    os.remove(path)
@@ -0,0 +1,177 @@
+import asyncio
+import os
+from functools import partial
+from services.concurrency import ingest_pool
+from services.crawl_state import CrawlState
+from services.embedding_cache import content_hash
+from services.ingestion_pipeline import IngestionPipeline
+
+_STATE_FILENAME = "crawl_state.sqlite3"
+
+
+def page_hash(chunks):
+    """Hash do conteúdo extraído de uma página (o texto dos seus chunks, em ordem)."""
+    return content_hash("\n".join(chunk["text"] for chunk in chunks))
+
+
+def chunk_metadata(chunk):
+    """Metadados de um chunk de página: só o texto é indexado; título, URL e palavras-chave ficam aqui."""
+    return {
+        "url": chunk["url"],
+        "title": chunk["title"],
+        "content_type": "website",
+        "category": chunk["content_type"],
+        "keywords": chunk["keywords"]
+    }
+
+
+class SiteIndexer:
+    """
+    Inclusão incremental de um site numa coleção.
+
+    Guarda o estado de cada página (ver CrawlState) junto da coleção e, a cada
+    novo rastreamento do mesmo site:
+    - páginas respondidas com 304 (requisição condicional) não são baixadas
+      nem processadas;
+    - páginas baixadas com o mesmo conteúdo de antes não são reindexadas;
+    - páginas alteradas têm apenas os seus chunks substituídos (como em
+      VectorDBService.replace_documents), reaproveitando os que não mudaram;
+    - páginas novas são incluídas, e as que falharam ficam como estavam.
+
+    Se os chunks de uma página não existirem mais na coleção (coleção
+    reiniciada ou documentos removidos), ela é baixada e incluída de novo.
+    """
+
+    def __init__(self, web_scraper, vector_db, near_duplicates="merge"):
+        self.web_scraper = web_scraper
+        self.vector_db = vector_db
+        self.near_duplicates = near_duplicates
+
+    @property
+    def state_path(self):
+        return os.path.join(self.vector_db.store.segments_dir, _STATE_FILENAME)
+
+    def _open_state(self):
+        os.makedirs(self.vector_db.store.segments_dir, exist_ok=True)
+        state = CrawlState(self.state_path)
+        pages = state.pages()
+        # Só as páginas cujos chunks continuam na coleção podem ser puladas
+        live = set(self.vector_db.live_ids([doc_id for page in pages.values() for doc_id in page["chunk_ids"]]))
+        known_pages = {url: page for url, page in pages.items() if live.issuperset(page["chunk_ids"])}
+        return state, known_pages
+
+    async def index_site(
+        self, url, max_pages=10, chunk_size=500, respect_robots=True, batch_size=64, on_progress=None
+    ):
+        """
+        Rastreia o site a partir de `url` (até `max_pages` páginas) e atualiza
+        a coleção. Os chunks das páginas novas e alteradas seguem por um
+        IngestionPipeline (lotes de `batch_size`), enquanto o rastreamento
+        continua. Retorna o relatório do rastreamento: páginas baixadas, não
+        modificadas, inalteradas, novas, substituídas e com falha; chunks
+        incluídos, removidos e reaproveitados; e embeddings que deixaram de
+        ser calculados.
+
+        `on_progress(report)`, se informado, é chamado com o relatório parcial
+        a cada página processada e a cada lote gravado (este, na thread de
+        inclusão).
+        """
+        report = {
+            "pages_fetched": 0,
+            "pages_not_modified": 0,
+            "pages_unchanged": 0,
+            "pages_new": 0,
+            "pages_replaced": 0,
+            "pages_failed": 0,
+            "chunks_added": 0,
+            "chunks_deleted": 0,
+            "chunks_reused": 0,
+            "embeddings_saved": 0,
+            "scraped_urls": [],
+            "failed_urls": []
+        }
+
+        state, known_pages = await asyncio.to_thread(self._open_state)
+
+        def progress(indexed=None):
+            if indexed is not None:
+                report["chunks_added"] = len(indexed["ids"])
+            if on_progress is not None:
+                on_progress(report)
+
+        async def changed_pages():
+            async for result in self.web_scraper.crawl_site_chunked(
+                url, max_pages, chunk_size, known_pages=known_pages, respect_robots=respect_robots
+            ):
+                if result.get("not_modified"):
+                    report["pages_not_modified"] += 1
+                    report["embeddings_saved"] += len(known_pages[result["url"]]["chunk_ids"])
+                    report["scraped_urls"].append(result["url"])
+                    progress()
+                    continue
+                if not result["success"] or not result.get("chunks"):
+                    print(f"URL falhou: {result['url']}, Erro: {result.get('error', 'Desconhecido')}")
+                    report["pages_failed"] += 1
+                    report["failed_urls"].append(result["url"])
+                    progress()
+                    continue
+
+                report["pages_fetched"] += 1
+                report["scraped_urls"].append(result["url"])
+                page = await ingest_pool.run(self._prepare_page, state, result)
+                report[f"pages_{page['status']}"] += 1
+                report["chunks_deleted"] += len(page["deleted"])
+                report["chunks_reused"] += len(page["reused"])
+                report["embeddings_saved"] += len(page["reused"])
+                progress()
+                if page["status"] != "unchanged":
+                    chunks = [result["chunks"][i] for i in page["pending"]]
+                    yield (
+                        [chunk["text"] for chunk in chunks], [chunk_metadata(chunk) for chunk in chunks],
+                        partial(self._page_indexed, state, result, page)
+                    )
+
+        try:
+            pipeline = IngestionPipeline(
+                self.vector_db, batch_size=batch_size, near_duplicates=self.near_duplicates, on_batch=progress
+            )
+            indexed = await pipeline.run(changed_pages())
+            report["chunks_added"] = len(indexed["ids"])
+        finally:
+            await asyncio.to_thread(state.close)
+
+        print(
+            f"Rastreamento de {url} concluído: {report['pages_fetched']} páginas baixadas, "
+            f"{report['pages_not_modified']} não modificadas (304), {report['pages_unchanged']} inalteradas, "
+            f"{report['pages_new']} novas, {report['pages_replaced']} substituídas, {report['pages_failed']} falhas"
+        )
+        return report
+
+    def _prepare_page(self, state, result):
+        """
+        Compara a página baixada com o estado anterior. Se ela mudou, remove os
+        chunks antigos que não existem mais (VectorDBService.retire_documents)
+        e indica os chunks que ainda precisam ser incluídos ("pending"). Os
+        chunks antigos ainda citados por outras páginas não são removidos.
+        """
+        digest = page_hash(result["chunks"])
+        previous = state.get(result["url"])
+        old_ids = previous["chunk_ids"] if previous else []
+        page = {"hash": digest, "deleted": [], "reused": [], "pending": []}
+
+        if previous and previous["content_hash"] == digest and len(self.vector_db.live_ids(old_ids)) == len(old_ids):
+            # Conteúdo igual: só os validadores e os links são atualizados
+            self._page_indexed(state, result, {**page, "reused": old_ids}, [])
+            return {**page, "status": "unchanged", "reused": old_ids}
+
+        retired = self.vector_db.retire_documents(
+            old_ids, [chunk["text"] for chunk in result["chunks"]], shared_ids=state.shared_ids(result["url"], old_ids)
+        )
+        return {**page, **retired, "status": "replaced" if previous else "new"}
+
+    def _page_indexed(self, state, result, page, ids):
+        """Registra o estado da página quando todos os seus chunks foram gravados."""
+        state.put(
+            result["url"], page["hash"], page["reused"] + ids, result.get("links", []),
+            etag=result.get("etag"), last_modified=result.get("last_modified")
+        )
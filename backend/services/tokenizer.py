@@ -0,0 +1,63 @@
+import re
+import unicodedata
+from collections import Counter
+
+# Palavras muito comuns em português, ignoradas na indexação e nas palavras-chave
+STOP_WORDS = frozenset({
+    'a', 'o', 'as', 'os', 'um', 'uma', 'uns', 'umas', 'de', 'da', 'do', 'das', 'dos',
+    'e', 'ou', 'mas', 'que', 'para', 'pra', 'por', 'pelo', 'pela', 'pelos', 'pelas',
+    'com', 'sem', 'em', 'na', 'no', 'nas', 'nos', 'num', 'numa', 'ao', 'aos', 'à', 'às',
+    'é', 'são', 'foi', 'será', 'ser', 'ter', 'tem', 'têm', 'tinha', 'há', 'pode', 'podem',
+    'muito', 'mais', 'menos', 'como', 'quando', 'onde', 'porque', 'se', 'já', 'também',
+    'só', 'ainda', 'isso', 'isto', 'este', 'esta', 'estes', 'estas', 'esse', 'essa',
+    'esses', 'essas', 'aquele', 'aquela', 'seu', 'sua', 'seus', 'suas', 'me', 'te',
+    'lhe', 'eu', 'ele', 'ela', 'eles', 'elas', 'nós', 'você', 'vocês', 'qual', 'quais',
+    'não', 'sim', 'sobre', 'entre', 'até', 'após'
+})
+
+_WORD = re.compile(r'\w+')
+
+# Redução de plurais (regras do RSLP simplificadas), aplicada a palavras sem acento
+_PLURAL_RULES = (
+    ('oes', 'ao'), ('aes', 'ao'), ('ais', 'al'), ('eis', 'el'), ('ois', 'ol'),
+    ('ns', 'm'), ('res', 'r'), ('s', '')
+)
+
+
+def strip_accents(text):
+    """Remove acentos e cedilhas ("informação" -> "informacao")."""
+    decomposed = unicodedata.normalize('NFKD', text)
+    return ''.join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def words(text):
+    """Palavras do texto em minúsculas, sem as stop words."""
+    return [word for word in _WORD.findall(text.lower()) if word not in STOP_WORDS and word != '_']
+
+
+def stem(word):
+    """Reduz uma palavra sem acentos ao singular ("professores" -> "professor")."""
+    if len(word) < 4 or word.endswith(('ss', 'us', 'is')) and not word.endswith(('ais', 'eis', 'ois')):
+        return word
+    for suffix, replacement in _PLURAL_RULES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 2:
+            return word[:-len(suffix)] + replacement
+    return word
+
+
+def tokenize(text):
+    """
+    Termos usados no índice lexical: palavras em minúsculas, sem stop words,
+    sem acentos e no singular, de modo que "Informações" e "informacao"
+    resultem no mesmo termo.
+    """
+    return [stem(strip_accents(word)) for word in words(text)]
+
+
+def extract_keywords(text, limit=10, min_length=4):
+    """
+    Palavras-chave de um trecho: as palavras mais frequentes com pelo menos
+    `min_length` letras (números puros são ignorados).
+    """
+    keywords = [word for word in words(text) if len(word) >= min_length and not word.isdigit()]
+    return [word for word, count in Counter(keywords).most_common(limit)]
@@ -0,0 +1,337 @@
+import os
+import threading
+import numpy as np
+
+try:
+    import faiss
+except ImportError:  # faiss é opcional: sem ele apenas o índice exato fica disponível
+    faiss = None
+
+INDEX_TYPES = ("flat", "ivf", "hnsw")
+
+# Limite do buffer de pontuações da busca exata (em número de floats, ~16 MB)
+SCORE_BUFFER_SIZE = 4 * 1024 * 1024
+
+
+def top_k(scores, k):
+    """
+    Seleciona as k maiores pontuações com seleção parcial (argpartition),
+    ordenando apenas os k candidatos. Retorna (pontuações, índices).
+    """
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.array([], dtype=np.float32), np.array([], dtype=np.int64)
+    if k < len(scores):
+        candidates = np.argpartition(scores, -k)[-k:]
+    else:
+        candidates = np.arange(len(scores))
+    order = np.argsort(scores[candidates])[::-1]
+    best = candidates[order]
+    return scores[best], best
+
+
+class FlatIndex:
+    """
+    Índice exato (força bruta) que lê diretamente os blocos de vetores da coleção
+    (um por segmento), sem manter uma cópia própria em memória.
+
+    Os blocos já estão normalizados (invariante do armazenamento), então cada
+    busca é um único produto matriz-vetor por bloco, escrito num buffer de
+    pontuações reaproveitado entre consultas, seguido de seleção parcial.
+    `blocks_fn` fornece, para cada bloco, (vetores, IDs, posições removidas,
+    cópia compacta), em que a cópia compacta é None (float32) ou um bloco
+    quantizado de `services.quantization`.
+
+    Com a cópia compacta, a varredura usa o kernel do bloco quantizado e os
+    `rescore_factor * k` melhores candidatos são repontuados com os vetores
+    float32 exatos.
+    """
+    index_type = "flat"
+
+    def __init__(self, dimension, blocks_fn, rescore_factor=4):
+        self.dimension = dimension
+        self.rescore_factor = rescore_factor
+        self._blocks_fn = blocks_fn
+        self._buffers = threading.local()
+
+    @property
+    def ntotal(self):
+        return sum(len(block[0]) for block in self._blocks_fn())
+
+    def add(self, embeddings, ids):
+        # Os vetores já estão nos segmentos da coleção, nada a fazer
+        pass
+
+    def rebuild(self, vectors, ids):
+        pass
+
+    def _buffer(self, name, size):
+        """Buffer float32 por thread, realocado apenas quando precisa crescer."""
+        buffer = getattr(self._buffers, name, None)
+        if buffer is None or len(buffer) < size:
+            buffer = np.empty(size, dtype=np.float32)
+            setattr(self._buffers, name, buffer)
+        return buffer[:size]
+
+    def _score_buffer(self, size):
+        return self._buffer("scores", size)
+
+    def search(self, query_embedding, k, exclude=None, include=None):
+        """Retorna (similaridades, IDs) dos k vetores mais próximos."""
+        return self.search_many(np.asarray(query_embedding).reshape(1, -1), k, exclude, include)[0]
+
+    def search_many(self, query_embeddings, k, exclude=None, include=None):
+        """
+        Busca várias consultas de uma vez: um único produto matriz-matriz por
+        bloco (ou fatia de bloco). Retorna uma lista de (similaridades, IDs)
+        por consulta. As linhas removidas já vêm marcadas em cada bloco, então
+        `exclude` não é necessário aqui. Com `include` (IDs ordenados), apenas
+        essas linhas são pontuadas.
+        """
+        queries = np.ascontiguousarray(query_embeddings, dtype=np.float32)
+        blocks = list(self._blocks_fn())
+
+        # Candidatos por consulta: pontuação, bloco e linha dentro do bloco
+        candidates = [([], [], []) for _ in range(len(queries))]
+
+        if include is not None:
+            self._scan_subset(queries, k, blocks, np.asarray(include, dtype=np.int64), candidates)
+            return self._collect(queries, k, k, False, blocks, candidates)
+
+        quantized = any(block[3] is not None for block in blocks)
+        rescore = quantized and self.rescore_factor > 0
+        scan_k = k * self.rescore_factor if rescore else k
+
+        # Blocos grandes são processados em fatias para limitar o buffer
+        chunk_rows = max(1, SCORE_BUFFER_SIZE // max(1, len(queries)))
+
+        for block_no, (vectors, ids, dead, codes) in enumerate(blocks):
+            if codes is not None:
+                for i, (block_scores, block_positions) in enumerate(codes.search(queries, scan_k, dead, self._buffer)):
+                    candidates[i][0].append(block_scores)
+                    candidates[i][1].append(np.full(len(block_positions), block_no))
+                    candidates[i][2].append(block_positions)
+                continue
+
+            for start in range(0, len(vectors) if k > 0 else 0, chunk_rows):
+                chunk = vectors[start:start + chunk_rows]
+                scores = self._score_buffer(len(queries) * len(chunk)).reshape(len(queries), len(chunk))
+                np.dot(queries, chunk.T, out=scores)
+
+                # Linhas removidas nunca entram no resultado
+                chunk_dead = dead[(dead >= start) & (dead < start + len(chunk))] - start
+                scores[:, chunk_dead] = -np.inf
+
+                for i, row in enumerate(scores):
+                    chunk_scores, chunk_positions = top_k(row, scan_k)
+                    alive = np.isfinite(chunk_scores)
+                    candidates[i][0].append(chunk_scores[alive])
+                    candidates[i][1].append(np.full(alive.sum(), block_no))
+                    candidates[i][2].append(chunk_positions[alive] + start)
+
+        return self._collect(queries, k, scan_k, rescore, blocks, candidates)
+
+    def _scan_subset(self, queries, k, blocks, include, candidates):
+        """Pontua em float32 apenas as linhas com os IDs de `include`."""
+        rows_per_chunk = max(1, SCORE_BUFFER_SIZE // self.dimension)
+
+        for block_no, (vectors, ids, dead, _) in enumerate(blocks):
+            # Os IDs de cada bloco são crescentes, então a busca binária basta
+            local = np.searchsorted(ids, include)
+            found = local < len(ids)
+            found[found] = ids[local[found]] == include[found]
+            local = local[found]
+            if len(dead):
+                local = local[~np.isin(local, dead)]
+
+            for start in range(0, len(local) if k > 0 else 0, rows_per_chunk):
+                rows = local[start:start + rows_per_chunk]
+                scores = queries @ vectors[rows].T
+                for i, row in enumerate(scores):
+                    chunk_scores, chunk_positions = top_k(row, k)
+                    candidates[i][0].append(chunk_scores)
+                    candidates[i][1].append(np.full(len(chunk_positions), block_no))
+                    candidates[i][2].append(rows[chunk_positions])
+
+    def _collect(self, queries, k, scan_k, rescore, blocks, candidates):
+        """Combina os candidatos dos blocos, repontua se preciso e traduz para IDs."""
+        results = []
+        for query, (scores, block_nos, positions) in zip(queries, candidates):
+            if not scores:
+                results.append((np.array([], dtype=np.float32), np.array([], dtype=np.int64)))
+                continue
+
+            # Combina os melhores resultados de cada segmento
+            scores, best = top_k(np.concatenate(scores), scan_k)
+            block_nos, positions = np.concatenate(block_nos)[best], np.concatenate(positions)[best]
+
+            if rescore:
+                scores = np.empty(len(positions), dtype=np.float32)
+                for block_no in np.unique(block_nos):
+                    mask = block_nos == block_no
+                    scores[mask] = blocks[block_no][0][positions[mask]] @ query
+                scores, best = top_k(scores, k)
+                block_nos, positions = block_nos[best], positions[best]
+
+            ids = np.empty(len(positions), dtype=np.int64)
+            for block_no in np.unique(block_nos):
+                mask = block_nos == block_no
+                ids[mask] = blocks[block_no][1][positions[mask]]
+            results.append((scores, ids))
+        return results
+
+    def save(self, path):
+        pass
+
+    def load(self, path):
+        return True
+
+
+class _FaissIndex:
+    """Base para os índices aproximados construídos sobre o faiss."""
+    index_type = None
+
+    def __init__(self, dimension, **params):
+        if faiss is None:
+            raise ImportError(f"O índice '{self.index_type}' requer o pacote faiss-cpu")
+        self.dimension = dimension
+        self.params = params
+        self.index = self._create_index()
+
+    def _create_index(self):
+        raise NotImplementedError
+
+    @property
+    def ntotal(self):
+        return self.index.ntotal
+
+    def add(self, embeddings, ids):
+        if len(embeddings) == 0:
+            return
+        self.index.add_with_ids(
+            np.ascontiguousarray(embeddings, dtype=np.float32),
+            np.asarray(ids, dtype=np.int64)
+        )
+
+    def rebuild(self, vectors, ids):
+        """Reconstrói o índice do zero a partir dos vetores e IDs informados."""
+        self.index = self._create_index()
+        self.add(vectors, ids)
+
+    def _search_params(self, selector):
+        return faiss.SearchParameters(sel=selector)
+
+    def search(self, query_embedding, k, exclude=None, include=None):
+        return self.search_many(np.asarray(query_embedding).reshape(1, -1), k, exclude, include)[0]
+
+    def search_many(self, query_embeddings, k, exclude=None, include=None):
+        """
+        Busca várias consultas, ignorando os IDs em `exclude` (documentos removidos)
+        ou, com `include`, considerando apenas os IDs informados.
+        """
+        if self.ntotal == 0 or k <= 0:
+            return [(np.array([], dtype=np.float32), np.array([], dtype=np.int64))] * len(query_embeddings)
+
+        queries = np.ascontiguousarray(query_embeddings, dtype=np.float32)
+        if include is not None:
+            selector = faiss.IDSelectorBatch(np.ascontiguousarray(include, dtype=np.int64))
+            scores, ids = self.index.search(queries, min(k, self.ntotal), params=self._search_params(selector))
+        elif exclude is not None and len(exclude):
+            # O seletor filtra os removidos durante a busca, sem reduzir o número de resultados
+            exclude = np.ascontiguousarray(exclude, dtype=np.int64)
+            selector = faiss.IDSelectorNot(faiss.IDSelectorBatch(exclude))
+            scores, ids = self.index.search(queries, min(k, self.ntotal), params=self._search_params(selector))
+        else:
+            scores, ids = self.index.search(queries, min(k, self.ntotal))
+
+        # O faiss preenche com -1 quando há menos resultados que k
+        results = []
+        for row_scores, row_ids in zip(scores, ids):
+            valid = row_ids >= 0
+            results.append((row_scores[valid], row_ids[valid]))
+        return results
+
+    def save(self, path):
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        faiss.write_index(self.index, tmp_path)
+        os.replace(tmp_path, path)
+
+    def load(self, path):
+        if not os.path.exists(path):
+            return False
+        self.index = faiss.read_index(path)
+        return True
+
+
+class HNSWIndex(_FaissIndex):
+    """Grafo HNSW: busca aproximada rápida, com inserção incremental."""
+    index_type = "hnsw"
+
+    def _create_index(self):
+        hnsw = faiss.IndexHNSWFlat(self.dimension, self.params.get("m", 32), faiss.METRIC_INNER_PRODUCT)
+        hnsw.hnsw.efConstruction = self.params.get("ef_construction", 80)
+        hnsw.hnsw.efSearch = self.params.get("ef_search", 64)
+        return faiss.IndexIDMap2(hnsw)
+
+    def _search_params(self, selector):
+        return faiss.SearchParametersHNSW(sel=selector, efSearch=self.params.get("ef_search", 64))
+
+
+class IVFIndex(_FaissIndex):
+    """
+    Índice IVF (listas invertidas). Precisa de treino, então até a coleção ter
+    vetores suficientes as buscas são feitas num índice exato provisório.
+    """
+    index_type = "ivf"
+
+    def _create_index(self):
+        return faiss.IndexIDMap2(faiss.IndexFlatIP(self.dimension))
+
+    @property
+    def is_trained(self):
+        return isinstance(self.index, faiss.IndexIVF)
+
+    def _min_train_size(self):
+        return self.params.get("min_train_size", 4096)
+
+    def add(self, embeddings, ids):
+        super().add(embeddings, ids)
+        if not self.is_trained and self.ntotal >= self._min_train_size():
+            self._train_from_bootstrap()
+
+    def _train_from_bootstrap(self):
+        """Treina o IVF com os vetores acumulados no índice provisório."""
+        ids = faiss.vector_to_array(self.index.id_map).astype(np.int64)
+        vectors = self.index.index.reconstruct_n(0, self.index.ntotal)
+
+        nlist = self.params.get("nlist") or max(1, min(int(4 * np.sqrt(len(vectors))), len(vectors) // 39))
+        quantizer = faiss.IndexFlatIP(self.dimension)
+        ivf = faiss.IndexIVFFlat(quantizer, self.dimension, nlist, faiss.METRIC_INNER_PRODUCT)
+        ivf.train(vectors)
+        ivf.add_with_ids(vectors, ids)
+        ivf.nprobe = self.params.get("nprobe", 8)
+
+        self.index = ivf
+        print(f"Índice IVF treinado com {len(vectors)} vetores e {nlist} listas")
+
+    def _search_params(self, selector):
+        if self.is_trained:
+            return faiss.SearchParametersIVF(sel=selector, nprobe=self.params.get("nprobe", 8))
+        return super()._search_params(selector)
+
+    def load(self, path):
+        loaded = super().load(path)
+        if loaded and self.is_trained:
+            self.index.nprobe = self.params.get("nprobe", 8)
+        return loaded
+
+
+def create_index(index_type, dimension, blocks_fn, **params):
+    """Cria o índice do tipo solicitado para uma coleção."""
+    if index_type == "flat":
+        return FlatIndex(dimension, blocks_fn, **params)
+    if index_type == "hnsw":
+        return HNSWIndex(dimension, **params)
+    if index_type == "ivf":
+        return IVFIndex(dimension, **params)
+    raise ValueError(f"Tipo de índice desconhecido: {index_type}. Opções: {', '.join(INDEX_TYPES)}")
@@ -1,191 +1,1047 @@
 import os
 import json
-import pickle
+import shutil
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
 import numpy as np
-from sentence_transformers import SentenceTransformer
+from services.concurrency import ReadWriteLock, query_pool
+from services.embedding_cache import EmbeddingCache, content_hash
+from services.embedding_scheduler import EmbeddingScheduler
+from services.lexical_index import BM25Index
+from services.metadata_index import INDEXED_METADATA, MetadataIndex, coerce_source_fields
+from services.model_provider import model_provider, DEFAULT_MODEL
+from services.query_cache import normalize_query
+from services.near_duplicates import NEAR_DUPLICATE_POLICIES, MinHashIndex, SourceReferences, source_reference
+from services.segment_store import SegmentStore, normalize_rows
+from services.vector_index import create_index
+
+# Diretório das coleções (segmentos, índices e configuração de cada uma)
+DATA_DIR = "./data/vectors"
+
+# Modos de busca: semântica (embeddings), lexical (BM25) ou híbrida (fusão das duas)
+RETRIEVAL_MODES = ("dense", "lexical", "hybrid")
 
 class VectorDBService:
-    def __init__(self, collection_name="tango_knowledge"):
+    def __init__(self, collection_name="tango_knowledge", index_type=None, index_params=None,
+                 index_save_interval=5000, mmap=True, embedding_batch_size=32, embedding_max_wait_ms=5,
+                 compaction_threshold=0.2, model_name=DEFAULT_MODEL, embedding_cache_size=100000,
+                 precision=None, rescore_factor=None, exact_filter_rows=20000,
+                 hybrid_candidates=50, rrf_k=60, ingest_batch_rows=1024,
+                 near_duplicate_threshold=0.9, near_duplicate_policy="keep"):
         self.collection_name = collection_name
-        self.data_dir = "./data/vectors"
+        self.data_dir = DATA_DIR
+        self.index_save_interval = index_save_interval
+        
+        # Buscas leem sob a trava de leitura, em paralelo; inclusões calculam os
+        # embeddings sem trava e só gravam (em lotes de `ingest_batch_rows` linhas)
+        # sob a trava de escrita, de modo que as buscas esperam no máximo um lote
+        self._lock = ReadWriteLock()
+        self.ingest_batch_rows = ingest_batch_rows
+        
+        # Fração de documentos removidos a partir da qual a coleção é compactada
+        self.compaction_threshold = compaction_threshold
+        self._compaction_thread = None
         
         # Cria o diretório de dados se não existir
         os.makedirs(self.data_dir, exist_ok=True)
         
-        # Caminhos para os arquivos de armazenamento
-        self.vectors_path = os.path.join(self.data_dir, f"{collection_name}_vectors.npy")
-        self.documents_path = os.path.join(self.data_dir, f"{collection_name}_documents.pkl")
-        self.metadata_path = os.path.join(self.data_dir, f"{collection_name}_metadata.json")
+        # Caminho para a configuração da coleção
+        self.config_path = os.path.join(self.data_dir, f"{collection_name}_config.json")
         
-        # Inicializa o modelo de embeddings
-        self.model = SentenceTransformer('intfloat/multilingual-e5-large')
+        # Modelo de embeddings compartilhado pelo processo (carregado uma única vez)
+        self.model_name = model_name
+        self.model = model_provider.get_model(model_name)
         
-        # Inicializa os atributos
-        self._vectors = None
-        self._documents = None
-        self._metadata = None
+        # Cache persistente de embeddings, compartilhado entre as coleções do mesmo diretório
+        self.embedding_cache = EmbeddingCache(
+            os.path.join(self.data_dir, "embedding_cache.sqlite3"), model_name, max_entries=embedding_cache_size
+        )
         
-    @property
-    def vectors(self):
-        if self._vectors is None:
-            self._load_data()
-        return self._vectors
+        # Embeddings de consultas repetidas (LRU compartilhado pelas coleções do modelo)
+        self.query_cache = model_provider.get_query_cache(model_name)
+        
+        # Agrupa em micro-lotes os embeddings de consultas concorrentes
+        self.embedding_scheduler = EmbeddingScheduler(
+            self.model, max_batch_size=embedding_batch_size, max_wait_ms=embedding_max_wait_ms
+        )
+        
+        # Configura o índice de busca e a precisão escolhidos para a coleção
+        self._configure_index(index_type, index_params, precision, rescore_factor)
+        
+        # Armazenamento em segmentos (carregado apenas quando necessário); com mmap
+        # os vetores são compartilhados pelo cache de páginas entre os workers
+        self.mmap = mmap
+        self.store = self._open_store()
+        self._loaded = False
+        # Tempo da última carga (segmentos e índices), em segundos
+        self.load_seconds = None
+        # Chamado depois de cada carga e inclusão, quando a memória da coleção cresce
+        # (o CollectionManager o usa para aplicar o limite de memória); não deve bloquear
+        self.on_resize = None
+        
+        # Índice dos campos de fonte, usado nas buscas filtradas (`where`); filtros
+        # com até `exact_filter_rows` linhas são pontuados de forma exata
+        self.metadata_index = MetadataIndex()
+        self.exact_filter_rows = exact_filter_rows
+        
+        # Índice invertido BM25, mantido junto com o índice vetorial; na busca híbrida
+        # os `hybrid_candidates` melhores de cada lista são fundidos por RRF
+        self.lexical_index = BM25Index()
+        self._unsaved_lexical_rows = 0
+        self.hybrid_candidates = hybrid_candidates
+        self.rrf_k = rrf_k
+        
+        # Índice MinHash dos trechos, consultado antes dos embeddings: na inclusão,
+        # trechos com similaridade de Jaccard estimada de pelo menos
+        # `near_duplicate_threshold` com um já existente seguem `near_duplicate_policy`
+        if near_duplicate_policy not in NEAR_DUPLICATE_POLICIES:
+            raise ValueError(f"Política desconhecida: {near_duplicate_policy}. Opções: {', '.join(NEAR_DUPLICATE_POLICIES)}")
+        self.near_duplicate_index = MinHashIndex(threshold=near_duplicate_threshold)
+        self.near_duplicate_policy = near_duplicate_policy
+        self._unsaved_near_duplicate_rows = 0
+        self.source_references = self._open_source_references()
+        
+        # Hash do conteúdo -> ID dos documentos ativos, usado para detectar duplicatas
+        self._content_ids = {}
+        self._content_signature = None
+        
+    def _open_store(self):
+        return SegmentStore(
+            self.data_dir, self.collection_name, self.model.get_sentence_embedding_dimension(),
+            mmap=self.mmap, precision=self.precision
+        )
+        
+    def _open_source_references(self):
+        return SourceReferences(os.path.join(self.store.segments_dir, "merged_sources.jsonl"))
+        
+    def _configure_index(self, index_type, index_params, precision=None, rescore_factor=None):
+        """
+        Define o tipo de índice e a precisão de armazenamento da coleção,
+        persistindo a escolha em disco.
+        
+        `precision` ("float32", "float16" ou "int8") controla a cópia dos vetores
+        varrida pela busca exata; com precisão reduzida, os `rescore_factor * k`
+        melhores candidatos são repontuados em float32 (0 desativa).
+        """
+        config = {}
+        if os.path.exists(self.config_path):
+            with open(self.config_path, 'r', encoding='utf-8') as f:
+                config = json.load(f)
+        
+        # Sem tipo explícito, usa o que já estava salvo para a coleção
+        self.index_type = index_type or config.get("index_type", "flat")
+        self.index_params = index_params if index_params is not None else config.get("index_params", {})
+        self.precision = precision or config.get("precision", "float32")
+        self.rescore_factor = rescore_factor if rescore_factor is not None else config.get("rescore_factor", 4)
+        
+        self.index = self._create_index()
+        self._index_epoch = None
+        self._unsaved_index_rows = 0
+        
+        new_config = {
+            "index_type": self.index_type,
+            "index_params": self.index_params,
+            "precision": self.precision,
+            "rescore_factor": self.rescore_factor
+        }
+        if new_config != config:
+            with open(self.config_path, 'w', encoding='utf-8') as f:
+                json.dump(new_config, f, ensure_ascii=False, indent=2)
+                
+    def _create_index(self):
+        params = dict(self.index_params)
+        if self.index_type == "flat":
+            params["rescore_factor"] = self.rescore_factor
+        
+        # Busca exata auxiliar, usada em filtros com poucas linhas em qualquer tipo de índice
+        self._subset_index = create_index("flat", self.model.get_sentence_embedding_dimension(), self._blocks)
+        
+        return create_index(self.index_type, self.model.get_sentence_embedding_dimension(), self._blocks, **params)
+        
+    def _blocks(self):
+        return self.store.views
+        
+    def _index_path(self):
+        # O epoch do armazenamento muda a cada compactação/reinício, quando as posições mudam
+        return os.path.join(self.store.segments_dir, f"{self.index_type}_{self.store.epoch}.index")
     
-    @vectors.setter
-    def vectors(self, value):
-        self._vectors = value
+    def _save_index(self):
+        """Grava o índice do epoch atual e remove os arquivos de epochs anteriores."""
+        index_path = self._index_path()
+        self.index.save(index_path)
+        self._unsaved_index_rows = 0
+        
+        for filename in os.listdir(self.store.segments_dir):
+            path = os.path.join(self.store.segments_dir, filename)
+            if filename.startswith(f"{self.index_type}_") and filename.endswith(".index") and path != index_path:
+                os.remove(path)
     
+    def _ensure_index(self):
+        """
+        Mantém o índice alinhado com os segmentos, incorporando também as
+        inclusões e remoções gravadas por outros processos.
+        """
+        self._ensure_loaded()
+        self.store.refresh()
+        
+        load_start = time.perf_counter()
+        reopened = self._index_epoch != self.store.epoch
+        if reopened:
+            if not self.index.load(self._index_path()) or self.index.ntotal > len(self.store):
+                print(f"Reconstruindo índice '{self.index_type}' da coleção '{self.collection_name}'")
+                self.index.rebuild(self.store.stack_vectors(), self.store.all_ids)
+                self._save_index()
+            self._index_epoch = self.store.epoch
+            self._unsaved_index_rows = 0
+        
+        if self.index.ntotal < len(self.store):
+            # Inclusões só acrescentam linhas no fim, então basta indexar o que falta;
+            # o arquivo do índice é gravado periodicamente
+            start = self.index.ntotal
+            self.index.add(self.store.stack_vectors(start), self.store.all_ids[start:])
+            self._unsaved_index_rows += len(self.store) - start
+            if self._unsaved_index_rows >= self.index_save_interval:
+                self._save_index()
+        
+        self._ensure_lexical_index()
+        self._ensure_near_duplicate_index()
+        self._ensure_metadata_index()
+        if reopened:
+            # Abertura dos índices, somada à carga dos segmentos
+            self.load_seconds = (self.load_seconds or 0.0) + time.perf_counter() - load_start
+        
+    def _in_sync(self):
+        """Indica, sem alterar nada, se os índices já refletem tudo o que foi gravado."""
+        size = len(self.store)
+        return (
+            self._loaded and not self.store.has_external_changes()
+            and self._index_epoch == self.store.epoch and self.index.ntotal == size
+            and self.lexical_index.epoch == self.store.epoch and len(self.lexical_index) == size
+            and self.near_duplicate_index.epoch == self.store.epoch and len(self.near_duplicate_index) == size
+            and self.metadata_index.epoch == self.store.epoch and len(self.metadata_index) == size
+        )
+        
+    def _sync(self):
+        """Atualiza os índices sob a trava de escrita, apenas quando necessário."""
+        if not self._in_sync():
+            with self._lock.write():
+                self._ensure_index()
+        
+    def warm_up(self):
+        """
+        Carrega a coleção e os seus índices sob a trava de escrita, como na
+        primeira consulta, de modo que o aquecimento não concorre com as
+        inclusões e buscas que chegarem enquanto ele roda.
+        """
+        self._sync()
+        
+    def _lexical_index_path(self):
+        return os.path.join(self.store.segments_dir, f"bm25_{self.store.epoch}.npz")
+        
+    def _save_lexical_index(self):
+        """Grava o índice BM25 do epoch atual e remove os de epochs anteriores."""
+        index_path = self._lexical_index_path()
+        self.lexical_index.save(index_path)
+        self._unsaved_lexical_rows = 0
+        
+        for filename in os.listdir(self.store.segments_dir):
+            path = os.path.join(self.store.segments_dir, filename)
+            if filename.startswith("bm25_") and filename.endswith(".npz") and path != index_path:
+                os.remove(path)
+                
+    def _ensure_lexical_index(self):
+        """Mantém o índice BM25 alinhado com os segmentos, como `_ensure_index`."""
+        if self.lexical_index.epoch != self.store.epoch:
+            if not self.lexical_index.load(self._lexical_index_path()) or len(self.lexical_index) > len(self.store):
+                self.lexical_index.clear()
+            self.lexical_index.epoch = self.store.epoch
+            self._unsaved_lexical_rows = 0
+        
+        start = len(self.lexical_index)
+        if start < len(self.store):
+            self.lexical_index.add(self.store.all_ids[start:], self.store.documents[start:])
+            self._unsaved_lexical_rows += len(self.store) - start
+            if start == 0 or self._unsaved_lexical_rows >= self.index_save_interval:
+                self._save_lexical_index()
+                
+    def _near_duplicate_index_path(self):
+        return os.path.join(self.store.segments_dir, f"minhash_{self.store.epoch}.npz")
+        
+    def _save_near_duplicate_index(self):
+        """Grava as assinaturas MinHash do epoch atual e remove as de epochs anteriores."""
+        index_path = self._near_duplicate_index_path()
+        self.near_duplicate_index.save(index_path)
+        self._unsaved_near_duplicate_rows = 0
+        
+        for filename in os.listdir(self.store.segments_dir):
+            path = os.path.join(self.store.segments_dir, filename)
+            if filename.startswith("minhash_") and filename.endswith(".npz") and path != index_path:
+                os.remove(path)
+                
+    def _ensure_near_duplicate_index(self):
+        """Mantém o índice de quase duplicatas alinhado com os segmentos, como `_ensure_index`."""
+        index = self.near_duplicate_index
+        if index.epoch != self.store.epoch:
+            if not index.load(self._near_duplicate_index_path()) or len(index) > len(self.store):
+                index.clear()
+            index.epoch = self.store.epoch
+            self._unsaved_near_duplicate_rows = 0
+        
+        start = len(index)
+        if start < len(self.store):
+            index.add(self.store.all_ids[start:], self.store.documents[start:])
+            self._unsaved_near_duplicate_rows += len(self.store) - start
+            if start == 0 or self._unsaved_near_duplicate_rows >= self.index_save_interval:
+                self._save_near_duplicate_index()
+                
+    def _ensure_metadata_index(self):
+        """Mantém o índice de metadados alinhado com os segmentos, como `_ensure_index`."""
+        if self.metadata_index.epoch != self.store.epoch or len(self.metadata_index) > len(self.store):
+            self.metadata_index.clear()
+            self.metadata_index.epoch = self.store.epoch
+        
+        start = len(self.metadata_index)
+        if start < len(self.store):
+            # Os campos são lidos das colunas; o texto só é decodificado para trechos antigos
+            columns = {field: self.store.metadata.field(field, start) for field in INDEXED_METADATA}
+            documents = self.store.documents
+            self.metadata_index.add(self.store.all_ids[start:], columns, lambda i: documents[start + i])
+            
+    def filter_ids(self, where):
+        """IDs dos documentos ativos que atendem ao filtro `where` (ver MetadataIndex.select)."""
+        self._sync()
+        with self._lock.read():
+            return self._filter_ids(where)
+            
+    def _filter_ids(self, where):
+        ids = self.metadata_index.select(where)
+        if len(self.store.tombstones):
+            ids = np.setdiff1d(ids, self.store.tombstones, assume_unique=True)
+        return ids
+        
+    def live_ids(self, ids):
+        """Os IDs de `ids` que existem na coleção e não foram removidos."""
+        self._sync()
+        with self._lock.read():
+            return self._live_ids(ids)
+            
+    def _live_ids(self, ids):
+        ids = np.asarray(list(ids), dtype=np.int64)
+        found = self.store.positions_of(ids) >= 0
+        found &= ~np.isin(ids, self.store.tombstones)
+        return ids[found].tolist()
+        
+    @property
+    def vectors(self):
+        """Matriz com todos os vetores da coleção (monta uma cópia a partir dos segmentos)."""
+        self._sync()
+        with self._lock.read():
+            return self.store.stack_vectors()
+        
     @property
     def documents(self):
-        if self._documents is None:
-            self._load_data()
-        return self._documents
-    
-    @documents.setter
-    def documents(self, value):
-        self._documents = value
-    
+        """Documentos ativos (sem os removidos ainda não compactados)."""
+        self._sync()
+        with self._lock.read():
+            return self._live(self.store.documents)
+        
     @property
     def metadata(self):
-        if self._metadata is None:
-            self._load_data()
-        return self._metadata
-    
-    @metadata.setter
-    def metadata(self, value):
-        self._metadata = value
-    
-    def _load_data(self):
+        self._sync()
+        with self._lock.read():
+            return self._live(self.store.metadata)
+        
+    @property
+    def ids(self):
+        """IDs estáveis dos documentos ativos, na mesma ordem de `documents`."""
+        self._sync()
+        with self._lock.read():
+            return self._live(self.store.all_ids.tolist())
+        
+    def rows(self):
+        """Documentos, metadados e IDs ativos, lidos juntos (uma única leitura consistente)."""
+        self._sync()
+        with self._lock.read():
+            return (
+                self._live(self.store.documents), self._live(self.store.metadata),
+                self._live(self.store.all_ids.tolist())
+            )
+            
+    @property
+    def version(self):
+        """
+        Versão da coleção: muda a cada inclusão, remoção, compactação ou
+        reinício (também os feitos por outros processos). Usada como chave de cache.
+        """
+        self._sync()
+        return self.store.version
+        
+    @contextmanager
+    def reading(self):
+        """
+        Atualiza os índices e mantém a trava de leitura, para leituras
+        consistentes de `store` feitas fora deste serviço (ex.: listagem).
+        Não deve ser aninhado com outras leituras da coleção.
+        """
+        self._sync()
+        with self._lock.read():
+            yield self.store
+            
+    def _live(self, rows):
+        # As colunas do armazenamento são decodificadas aqui, linha a linha
+        if len(self.store.tombstones) == 0:
+            return list(rows)
+        return [row for row, alive in zip(rows, self.store.live_mask()) if alive]
+        
+    def _ensure_loaded(self):
         """Carrega os dados do disco apenas quando necessário."""
-        if os.path.exists(self.vectors_path) and os.path.exists(self.documents_path):
-            self._vectors = np.load(self.vectors_path)
-            with open(self.documents_path, 'rb') as f:
-                self._documents = pickle.load(f)
-                
-            if os.path.exists(self.metadata_path):
-                with open(self.metadata_path, 'r', encoding='utf-8') as f:
-                    self._metadata = json.load(f)
+        if self._loaded:
+            return
+        
+        with self._lock.write():
+            if self._loaded:
+                return
+            start = time.perf_counter()
+            self.store.load()
+            self._loaded = True
+            self.load_seconds = time.perf_counter() - start
+        
+            if len(self.store):
+                print(f"Coleção '{self.collection_name}' carregada com sucesso. Documentos: {self.store.live_count}")
             else:
-                self._metadata = [None] * len(self._documents)
-                
-            print(f"Coleção '{self.collection_name}' carregada com sucesso. Documentos: {len(self._documents)}")
-        else:
-            # Cria nova base vazia
-            self._vectors = np.array([]).reshape(0, self.model.get_sentence_embedding_dimension())
-            self._documents = []
-            self._metadata = []
-            print(f"Coleção '{self.collection_name}' criada com sucesso.")
-    
-    def add_documents(self, documents, metadatas=None):
-        """Adiciona documentos à coleção."""
+                print(f"Coleção '{self.collection_name}' criada com sucesso.")
+        self._notify_resize()
+        
+    def _notify_resize(self):
+        if self.on_resize is not None:
+            self.on_resize()
+            
+    def add_documents(self, documents, metadatas=None, skip_duplicates=False, near_duplicates=None):
+        """
+        Adiciona documentos à coleção. Com `skip_duplicates`, documentos cujo texto
+        normalizado já existe na coleção (ou se repete no lote) não são inseridos;
+        os IDs dos documentos já existentes são retornados em "duplicates".
+        
+        `near_duplicates` (padrão: `near_duplicate_policy`) trata os trechos quase
+        iguais a um já existente ou a um anterior do lote, antes de calcular os
+        embeddings: "keep" os inclui normalmente, "skip" os descarta e "merge" os
+        descarta registrando sua fonte no trecho existente (ver `source_references`).
+        Os IDs que absorveram quase duplicatas são retornados em "near_duplicates",
+        e "positions" traz a posição em `documents` de cada ID de "ids".
+        
+        "resolved_ids" traz, na ordem de `documents`, o ID do trecho que guarda o
+        conteúdo de cada documento: o próprio, se foi incluído, ou o da duplicata
+        ou quase duplicata que o representa (None se não houver).
+        """
+        policy = near_duplicates or self.near_duplicate_policy
+        if policy not in NEAR_DUPLICATE_POLICIES:
+            raise ValueError(f"Política desconhecida: {policy}. Opções: {', '.join(NEAR_DUPLICATE_POLICIES)}")
         if not documents:
-            return {"ids": []}
+            return {"ids": [], "duplicates": [], "near_duplicates": [], "positions": [], "resolved_ids": []}
         
         # Verifica se metadatas foi fornecido, se não, cria lista de None
         if metadatas is None:
             metadatas = [None] * len(documents)
         
-        # Gera embeddings para os novos documentos
-        new_embeddings = self.model.encode(documents)
+        # Registra a data de inclusão (usada nos filtros por data) e normaliza os tipos
+        # dos campos de fonte (ver SOURCE_FIELDS), que viram colunas de metadados
+        ingested_at = datetime.now().isoformat(timespec='seconds')
+        metadatas = [
+            coerce_source_fields({**(metadata or {}), "ingested_at": (metadata or {}).get("ingested_at", ingested_at)})
+            for metadata in metadatas
+        ]
         
-        # Normaliza os embeddings para distância coseno
-        norms = np.linalg.norm(new_embeddings, axis=1, keepdims=True)
-        normalized_embeddings = np.divide(new_embeddings, norms, where=norms!=0)
+        self._ensure_loaded()
+        submitted = documents
+        duplicates, positions = [], list(range(len(documents)))
+        if skip_duplicates:
+            with self._lock.write():
+                positions, documents, metadatas, duplicates = self._drop_duplicates(documents, metadatas, positions=True)
+            if not documents:
+                print(f"Nenhum documento novo: {len(duplicates)} duplicatas ignoradas")
+                return {
+                    "ids": [], "duplicates": duplicates, "near_duplicates": [], "positions": [],
+                    "resolved_ids": self._resolve_ids(submitted, [], [], [], [], {})
+                }
         
-        # Adiciona os novos documentos e embeddings à coleção
-        new_ids = list(range(len(self.documents), len(self.documents) + len(documents)))
+        near_matches, near_positions = [], []
+        if policy != "keep":
+            kept, documents, metadatas, near_matches = self._drop_near_duplicates(documents, metadatas)
+            kept_set = set(kept)
+            near_positions = [position for i, position in enumerate(positions) if i not in kept_set]
+            positions = [positions[i] for i in kept]
+            if not documents:
+                return {
+                    **self._merge_near_duplicates(policy, near_matches, [], {}, duplicates), "positions": [],
+                    "resolved_ids": self._resolve_ids(submitted, [], [], near_positions, near_matches, {})
+                }
         
-        if len(self.vectors) == 0:
-            self.vectors = normalized_embeddings
-        else:
-            self.vectors = np.vstack([self.vectors, normalized_embeddings])
+        # Gera (ou reaproveita do cache) os embeddings normalizados dos documentos,
+        # sem trava: as buscas continuam enquanto isso
+        normalized_embeddings = self._encode_documents(documents)
         
-        self.documents.extend(documents)
-        self.metadata.extend(metadatas)
+        # Grava e indexa em lotes, liberando a trava entre eles para as buscas
+        new_ids, position_ids, id_positions = [], {}, []
+        for start in range(0, len(documents), self.ingest_batch_rows):
+            end = start + self.ingest_batch_rows
+            batch_documents, batch_metadatas = documents[start:end], metadatas[start:end]
+            batch_embeddings = normalized_embeddings[start:end]
         
-        # Salva a coleção atualizada
-        self._save()
+            with self._lock.write():
+                if skip_duplicates:
+                    # Outra inclusão pode ter gravado o mesmo texto enquanto os embeddings eram calculados
+                    kept, batch_documents, batch_metadatas, repeated = self._drop_duplicates(
+                        batch_documents, batch_metadatas, positions=True
+                    )
+                    batch_embeddings = batch_embeddings[kept]
+                    duplicates.extend(repeated)
+                else:
+                    kept = range(len(batch_documents))
+                if not batch_documents:
+                    continue
+                
+                batch_ids = self.store.append(batch_embeddings, batch_documents, batch_metadatas, wait_durable=False)
+                self._ensure_index()
         
-        return {"ids": new_ids}
-    
-    def query(self, query_text, n_results=3):
-        """Realiza consulta de similaridade semântica."""
-        if not self.documents:
-            return {"documents": [], "ids": [], "metadatas": [], "distances": []}
+                if self._content_signature is not None:
+                    for doc, doc_id in zip(batch_documents, batch_ids):
+                        self._content_ids.setdefault(content_hash(doc), doc_id)
+                    self._content_signature = self._store_signature()
+            new_ids.extend(batch_ids)
+            position_ids.update((start + i, doc_id) for i, doc_id in zip(kept, batch_ids))
+            id_positions.extend(positions[start + i] for i in kept)
             
-        # Gera embedding para a consulta
-        query_embedding = self.model.encode(query_text)
-        
-        # Calcula similaridade coseno
-        if len(self.vectors) > 0:
-            # Normaliza vetores para cálculo de similaridade coseno
-            query_norm = np.linalg.norm(query_embedding)
-            if query_norm > 0:
-                query_embedding = query_embedding / query_norm
-            
-            # Normaliza vetores da base (se ainda não estiverem normalizados)
-            vector_norms = np.linalg.norm(self.vectors, axis=1, keepdims=True)
-            normalized_vectors = np.divide(self.vectors, vector_norms, 
-                                          where=vector_norms!=0)
+            # O fsync do log acontece fora da trava e é compartilhado com outras inclusões
+            self.store.wait_durable()
+        
+        print(f"Coleção '{self.collection_name}' salva com sucesso. Documentos: {self.store.live_count}")
+        self._notify_resize()
+        
+        return {
+            **self._merge_near_duplicates(policy, near_matches, new_ids, position_ids, duplicates),
+            "positions": id_positions,
+            "resolved_ids": self._resolve_ids(submitted, id_positions, new_ids, near_positions, near_matches, position_ids)
+        }
+        
+    def _resolve_ids(self, documents, id_positions, new_ids, near_positions, near_matches, position_ids):
+        """
+        "resolved_ids" de `add_documents`: os IDs incluídos, os das quase
+        duplicatas (`near_matches`, nas posições `near_positions`) e, para os
+        demais, o do trecho de mesmo texto, já existente ou repetido no lote.
+        """
+        resolved = [None] * len(documents)
+        for position, doc_id in zip(id_positions, new_ids):
+            resolved[position] = doc_id
+        for position, (in_batch, target, _) in zip(near_positions, near_matches):
+            resolved[position] = position_ids.get(target) if in_batch else target
+        
+        missing = [i for i, doc_id in enumerate(resolved) if doc_id is None]
+        if missing:
+            with self._lock.read():
+                if self._content_signature != self._store_signature():
+                    return resolved
+                for i in missing:
+                    resolved[i] = self._content_ids.get(content_hash(documents[i]))
+        return resolved
+        
+    def _drop_near_duplicates(self, documents, metadatas):
+        """
+        Separa os trechos quase duplicados de um já existente ou de um anterior
+        do lote. Retorna as posições e os trechos mantidos e, para cada
+        descartado, (no lote?, ID ou posição entre os mantidos, metadados). As
+        assinaturas são calculadas fora da trava; inclusões concorrentes não
+        são comparadas entre si.
+        """
+        signatures = self.near_duplicate_index.signatures(documents)
+        self._sync()
+        with self._lock.read():
+            matches = self.near_duplicate_index.match(signatures, exclude=self.store.tombstones)
+        
+        batch_index = self.near_duplicate_index.empty_copy()
+        kept, kept_documents, kept_metadatas, near_matches = [], [], [], []
+        for i, (doc, meta, signature, match) in enumerate(zip(documents, metadatas, signatures, matches)):
+            if match is not None:
+                near_matches.append((False, match[0], meta))
+                continue
+            batch_match = batch_index.match(signature[None])[0]
+            if batch_match is not None:
+                near_matches.append((True, batch_match[0], meta))
+                continue
+            batch_index.add([len(kept_documents)], signatures=signature[None])
+            kept.append(i)
+            kept_documents.append(doc)
+            kept_metadatas.append(meta)
+        return kept, kept_documents, kept_metadatas, near_matches
+        
+    def _merge_near_duplicates(self, policy, near_matches, new_ids, position_ids, duplicates):
+        """
+        Registra as fontes das quase duplicatas (política "merge") e monta o
+        resultado da inclusão. Quase duplicatas de um trecho do próprio lote
+        apontam para o ID que ele recebeu (`position_ids`).
+        """
+        near_matches = [
+            (position_ids.get(target) if in_batch else target, metadata)
+            for in_batch, target, metadata in near_matches
+        ]
+        targets = [doc_id for doc_id, _ in near_matches if doc_id is not None]
+        if policy == "merge":
+            references = [
+                (doc_id, source_reference(metadata)) for doc_id, metadata in near_matches
+                if doc_id is not None and source_reference(metadata)
+            ]
+            self.source_references.add(references)
+        if near_matches:
+            print(f"Quase duplicatas ({policy}): {len(near_matches)} trechos não incluídos")
+        return {"ids": new_ids, "duplicates": duplicates, "near_duplicates": targets}
+        
+    def merged_sources(self, doc_id):
+        """Fontes de trechos quase iguais absorvidos por `doc_id` (política "merge")."""
+        return self.source_references.get(doc_id)
+        
+    def replace_documents(self, old_ids, documents, metadatas=None, near_duplicates=None):
+        """
+        Substitui os trechos `old_ids` (a versão anterior de uma página, por
+        exemplo) por `documents`. Os trechos antigos com o mesmo texto de um novo
+        continuam, com o mesmo ID e sem novo embedding; os demais são removidos
+        antes da inclusão, para que os novos não sejam tomados por quase
+        duplicatas da versão anterior.
+        
+        Retorna o resultado de `add_documents` com "ids" (todos os trechos
+        atuais, reaproveitados e novos), "added", "reused" e "deleted".
+        """
+        retired = self.retire_documents(old_ids, documents)
+        pending = retired["pending"]
+        metadatas = metadatas or [None] * len(documents)
+        result = self.add_documents(
+            [documents[i] for i in pending], [metadatas[i] for i in pending],
+            skip_duplicates=True, near_duplicates=near_duplicates
+        )
+        return {
+            **result,
+            "ids": retired["reused"] + result["ids"],
+            "added": result["ids"],
+            "reused": retired["reused"],
+            "deleted": retired["deleted"],
+            "positions": [pending[i] for i in result["positions"]]
+        }
+        
+    def retire_documents(self, old_ids, documents, shared_ids=()):
+        """
+        Primeira etapa de `replace_documents`, para quem inclui os novos trechos
+        por outro caminho (ex.: IngestionPipeline): remove os trechos de
+        `old_ids` cujo texto não está em `documents`. Retorna "reused" (os IDs
+        mantidos), "deleted" e "pending" (as posições dos documentos que ainda
+        precisam ser incluídos).
+        
+        Os trechos de `shared_ids` (citados também por outras fontes, como
+        outras páginas do mesmo site) deixam de fazer parte de `old_ids` sem
+        serem removidos da coleção; eles vêm em "released".
+        """
+        new_hashes = [content_hash(doc) for doc in documents]
+        self._ensure_loaded()
+        self._sync()
+        with self._lock.write():
+            old_ids = self._live_ids(old_ids)
+            old_hashes = [
+                content_hash(self.store.documents[int(position)]) for position in self.store.positions_of(old_ids)
+            ]
+            wanted = set(new_hashes)
+            reused = [doc_id for doc_id, digest in zip(old_ids, old_hashes) if digest in wanted]
+            stale = [(doc_id, digest) for doc_id, digest in zip(old_ids, old_hashes) if digest not in wanted]
+            shared_ids = set(shared_ids)
+            released = [doc_id for doc_id, _ in stale if doc_id in shared_ids]
+            stale = [(doc_id, digest) for doc_id, digest in stale if doc_id not in shared_ids]
             
-            # Calcula similaridade coseno
-            similarities = np.dot(normalized_vectors, query_embedding)
+            hashes_current = self._content_signature == self._store_signature()
+            deleted = self.store.delete_ids([doc_id for doc_id, _ in stale], wait_durable=False) if stale else 0
+            if deleted and hashes_current:
+                # Atualiza o mapa de conteúdo em vez de recalculá-lo na próxima inclusão
+                for doc_id, digest in stale:
+                    if self._content_ids.get(digest) == doc_id:
+                        del self._content_ids[digest]
+                self._content_signature = self._store_signature()
+        if deleted:
+            self.store.wait_durable()
+            self._schedule_compaction()
+        
+        kept_hashes = set(old_hashes) & wanted
+        return {
+            "reused": reused,
+            "deleted": [doc_id for doc_id, _ in stale],
+            "released": released,
+            "pending": [i for i, digest in enumerate(new_hashes) if digest not in kept_hashes]
+        }
+        
+    def _encode_documents(self, documents):
+        """Calcula os embeddings normalizados, consultando antes o cache persistente."""
+        embeddings = np.zeros((len(documents), self.store.dimension), dtype=np.float32)
+        cached = self.embedding_cache.get_many(documents)
+        for i, embedding in cached.items():
+            embeddings[i] = embedding
+        
+        # Textos repetidos dentro do lote são codificados uma única vez
+        missing = {}
+        for i in range(len(documents)):
+            if i not in cached:
+                missing.setdefault(self.embedding_cache.key(documents[i]), []).append(i)
+        if missing:
+            texts = [documents[positions[0]] for positions in missing.values()]
+            new_embeddings = normalize_rows(self.model.encode(texts))
+            for positions, embedding in zip(missing.values(), new_embeddings):
+                embeddings[positions] = embedding
+            self.embedding_cache.put_many(texts, new_embeddings)
+        
+        print(f"Embeddings: {len(cached)} do cache, {len(missing)} calculados")
+        return embeddings
+        
+    def _store_signature(self):
+        return (self.store.epoch, len(self.store), len(self.store.tombstones))
+        
+    def _drop_duplicates(self, documents, metadatas, positions=False):
+        """
+        Separa os documentos cujo conteúdo já existe na coleção ou se repete no lote.
+        Com `positions`, retorna antes as posições mantidas. Chamado sob a trava de escrita.
+        """
+        self.store.refresh()
+        if self._content_signature != self._store_signature():
+            # A coleção mudou por outro caminho (remoção, outro processo): recalcula os hashes
+            self._content_ids = {}
+            for doc, doc_id in zip(self._live(self.store.documents), self._live(self.store.all_ids.tolist())):
+                self._content_ids.setdefault(content_hash(doc), doc_id)
+            self._content_signature = self._store_signature()
+        
+        kept, kept_documents, kept_metadatas, duplicates, seen = [], [], [], [], set()
+        for i, (doc, meta) in enumerate(zip(documents, metadatas)):
+            digest = content_hash(doc)
+            if digest in self._content_ids:
+                duplicates.append(self._content_ids[digest])
+            elif digest not in seen:
+                seen.add(digest)
+                kept.append(i)
+                kept_documents.append(doc)
+                kept_metadatas.append(meta)
+        if positions:
+            return kept, kept_documents, kept_metadatas, duplicates
+        return kept_documents, kept_metadatas, duplicates
+        
+    def query(self, query_text, n_results=3, query_embedding=None, where=None, mode="dense"):
+        """
+        Realiza consulta de similaridade semântica. `where` restringe a busca aos
+        documentos cujos campos de fonte atendem ao filtro, por exemplo
+        {"filename": "edital.pdf", "page": {"$gte": 2, "$lte": 5}}.
+        
+        `mode` escolhe a busca: "dense" (embeddings), "lexical" (BM25) ou "hybrid"
+        (fusão das duas listas por reciprocal rank fusion).
+        """
+        query_embeddings = None if query_embedding is None else [query_embedding]
+        return self.query_many([query_text], n_results, query_embeddings, where=where, mode=mode)[0]
+        
+    async def query_async(self, query_text, n_results=3, where=None, mode="dense"):
+        """
+        Versão assíncrona de `query`: o embedding da consulta é calculado pelo
+        agendador de micro-lotes, sem bloquear o event loop.
+        """
+        query_embedding = None
+        if mode != "lexical":
+            key = normalize_query(query_text)
+            query_embedding = self.query_cache.get(key)
+            if query_embedding is None:
+                query_embedding = await self.embedding_scheduler.encode(query_text)
+                self.query_cache.put(key, query_embedding)
+        
+        # A pontuação roda no pool de buscas, fora do event loop
+        return await query_pool.run(
+            self.query, query_text, n_results, query_embedding=query_embedding, where=where, mode=mode
+        )
+        
+    def query_many(self, query_texts, n_results=3, query_embeddings=None, where=None, mode="dense"):
+        """
+        Realiza várias consultas de uma vez: os textos são codificados em um único
+        lote e pontuados com um único produto matriz-matriz. Retorna um resultado
+        por consulta, no mesmo formato de `query`. Embeddings já calculados podem
+        ser informados em `query_embeddings`; `where` e `mode` funcionam como em `query`.
+        
+        Em "distances" vai a similaridade de cosseno com a consulta (no modo
+        "lexical", a pontuação BM25); em "scores", a pontuação usada na ordenação.
+        """
+        if mode not in RETRIEVAL_MODES:
+            raise ValueError(f"Modo de busca desconhecido: {mode}. Opções: {', '.join(RETRIEVAL_MODES)}")
+        if not query_texts:
+            return []
+        
+        # Gera e normaliza os embeddings das consultas em lote, antes de qualquer trava
+        if mode != "lexical":
+            if query_embeddings is None:
+                query_embeddings = self._encode_queries(query_texts)
+            query_embeddings = normalize_rows(query_embeddings)
+        
+        self._sync()
+        with self._lock.read():
+            return self._search(query_texts, n_results, query_embeddings, where, mode)
             
-            # Obtém os índices dos documentos mais similares
-            top_indices = np.argsort(similarities)[::-1][:n_results]
+    def _encode_queries(self, query_texts):
+        """
+        Embeddings das consultas: os já calculados vêm do cache LRU (chave:
+        consulta normalizada) e os demais são codificados num único lote.
+        """
+        keys = [normalize_query(text) for text in query_texts]
+        embeddings = [self.query_cache.get(key) for key in keys]
+        
+        missing = {}
+        for i, (key, embedding) in enumerate(zip(keys, embeddings)):
+            if embedding is None:
+                missing.setdefault(key, []).append(i)
+        if missing:
+            encoded = self.model.encode([query_texts[positions[0]] for positions in missing.values()])
+            for (key, positions), embedding in zip(missing.items(), encoded):
+                self.query_cache.put(key, embedding)
+                for i in positions:
+                    embeddings[i] = embedding
+        return np.array(embeddings)
             
-            return {
-                "documents": [self.documents[i] for i in top_indices],
-                "ids": top_indices.tolist(),
-                "metadatas": [self.metadata[i] for i in top_indices],
-                "distances": [float(similarities[i]) for i in top_indices]
-            }
-        
-        return {"documents": [], "ids": [], "metadatas": [], "distances": []}
-    
+    def _search(self, query_texts, n_results, query_embeddings, where, mode):
+        # O filtro é resolvido antes da busca: só as linhas selecionadas são pontuadas
+        include = self._filter_ids(where) if where else None
+        if not self.store.live_count or (include is not None and len(include) == 0):
+            return [{"documents": [], "ids": [], "metadatas": [], "distances": [], "scores": []} for _ in query_texts]
+        
+        # Na busca híbrida cada lista contribui com mais candidatos que o pedido
+        n_candidates = max(n_results, self.hybrid_candidates) if mode == "hybrid" else n_results
+        
+        lexical_matches = None
+        if mode != "dense":
+            exclude = self.store.tombstones if include is None else None
+            lexical_matches = self.lexical_index.search_many(query_texts, n_candidates, exclude=exclude, include=include)
+        
+        dense_matches = None
+        if mode != "lexical":
+            # Busca os documentos mais similares no índice, ignorando os removidos
+            if include is None:
+                dense_matches = self.index.search_many(query_embeddings, n_candidates, exclude=self.store.tombstones)
+            elif len(include) <= self.exact_filter_rows:
+                dense_matches = self._subset_index.search_many(query_embeddings, n_candidates, include=include)
+            else:
+                dense_matches = self.index.search_many(query_embeddings, n_candidates, include=include)
+        
+        if mode == "dense":
+            matches = [(scores, ids, scores) for scores, ids in dense_matches]
+        elif mode == "lexical":
+            matches = [(scores, ids, scores) for scores, ids in lexical_matches]
+        else:
+            matches = [
+                self._fuse(dense, lexical, query_embedding, n_results)
+                for dense, lexical, query_embedding in zip(dense_matches, lexical_matches, query_embeddings)
+            ]
+        
+        results = []
+        for scores, top_ids, similarities in matches:
+            positions = self.store.positions_of(top_ids)
+            merged_sources = self.source_references.get_many(top_ids.tolist())
+            results.append({
+                "documents": [self.store.documents[i] for i in positions],
+                "ids": top_ids.tolist(),
+                "metadatas": [
+                    self._with_merged_sources(self.store.metadata[i], sources)
+                    for i, sources in zip(positions, merged_sources)
+                ],
+                "distances": [float(score) for score in similarities],
+                "scores": [float(score) for score in scores]
+            })
+        return results
+        
+    def _with_merged_sources(self, metadata, sources):
+        # Trechos que absorveram quase duplicatas citam também as outras fontes
+        if not sources:
+            return metadata
+        return {**(metadata or {}), "merged_sources": sources}
+        
+    def _fuse(self, dense, lexical, query_embedding, n_results):
+        """
+        Funde as listas semântica e lexical por reciprocal rank fusion:
+        cada documento soma 1 / (rrf_k + posição) em cada lista em que aparece.
+        Retorna (pontuações RRF, IDs, similaridades de cosseno).
+        """
+        fused = {}
+        for _, ids in (dense, lexical):
+            for rank, doc_id in enumerate(ids.tolist()):
+                fused[doc_id] = fused.get(doc_id, 0.0) + 1.0 / (self.rrf_k + rank + 1)
+        
+        ranked = sorted(fused.items(), key=lambda item: item[1], reverse=True)[:n_results]
+        top_ids = np.array([doc_id for doc_id, _ in ranked], dtype=np.int64)
+        scores = np.array([score for _, score in ranked], dtype=np.float32)
+        
+        # Similaridade de cosseno de todos os escolhidos, inclusive os vindos só do BM25
+        similarities = self.store.vectors_at(self.store.positions_of(top_ids)) @ query_embedding
+        return scores, top_ids, similarities
+        
     def delete(self, ids):
-        """Remove documentos da coleção pelos IDs."""
-        if not ids or not self.documents:
+        """
+        Remove documentos da coleção pelos IDs. A remoção só registra lápides;
+        o espaço é recuperado por uma compactação em segundo plano.
+        """
+        if not ids:
             return {"success": False}
         
-        # Converte para conjunto para operações mais rápidas
-        ids_set = set(ids)
+        self._ensure_loaded()
+        with self._lock.write():
+            removed = self.store.delete_ids(ids, wait_durable=False)
+        if not removed:
+            return {"success": False}
+        self.store.wait_durable()
         
-        # Cria máscaras para remover os itens
-        mask = np.ones(len(self.documents), dtype=bool)
-        for idx in ids_set:
-            if 0 <= idx < len(self.documents):
-                mask[idx] = False
+        print(f"Coleção '{self.collection_name}' salva com sucesso. Documentos: {self.store.live_count}")
         
-        # Aplica as máscaras
-        self.vectors = self.vectors[mask]
-        self.documents = [doc for i, doc in enumerate(self.documents) if mask[i]]
-        self.metadata = [meta for i, meta in enumerate(self.metadata) if mask[i]]
+        self._schedule_compaction()
+        return {"success": True}
         
-        # Salva a coleção atualizada
-        self._save()
+    def _schedule_compaction(self):
+        if self.store.dead_ratio() < self.compaction_threshold:
+            return
+        if self._compaction_thread is not None and self._compaction_thread.is_alive():
+            return
         
-        return {"success": True}
-    
-    def _save(self):
-        """Salva a coleção no disco."""
-        np.save(self.vectors_path, self.vectors)
+        self._compaction_thread = threading.Thread(target=self._compact_in_background, daemon=True)
+        self._compaction_thread.start()
+        
+    def _compact_in_background(self):
+        # Descarregada (limite de memória) ou apagada enquanto esperava a trava, a
+        # coleção não é carregada de novo só para ser compactada
+        with self._lock.write():
+            if self._loaded:
+                self._compact()
         
-        with open(self.documents_path, 'wb') as f:
-            pickle.dump(self.documents, f)
+    def checkpoint(self):
+        """Incorpora o log de escrita aos segmentos (ver SegmentStore.checkpoint)."""
+        if not self._loaded:
+            return {"success": False}
+        with self._lock.write():
+            return {"success": self.store.checkpoint()}
+        
+    @property
+    def loaded(self):
+        return self._loaded
+        
+    def memory_usage(self):
+        """
+        Bytes aproximados ocupados pela coleção carregada: vetores, documentos e
+        metadados dos segmentos, mais os índices (0 se não estiver carregada).
+        """
+        if not self._loaded:
+            return 0
+        with self._lock.read():
+            total = self.store.memory_usage()
+            total += self.lexical_index.memory_usage() + self.near_duplicate_index.memory_usage()
+            if self.index_type != "flat":
+                # Os índices do faiss guardam mais uma cópia dos vetores
+                total += self.index.ntotal * self.store.dimension * 4
+            return total
             
-        with open(self.metadata_path, 'w', encoding='utf-8') as f:
-            json.dump(self.metadata, f, ensure_ascii=False, indent=2)
+    def unload(self):
+        """
+        Libera a memória da coleção sem apagar nada: o log é incorporado aos
+        segmentos, os índices com linhas ainda não gravadas são salvos e tudo é
+        descartado. O próximo acesso carrega a coleção de novo.
+        """
+        with self._lock.write():
+            if not self._loaded:
+                return False
+            self.store.checkpoint()
+            if self._unsaved_index_rows:
+                self._save_index()
+            if self._unsaved_lexical_rows:
+                self._save_lexical_index()
+            if self._unsaved_near_duplicate_rows:
+                self._save_near_duplicate_index()
+            self._release()
+        return True
+        
+    def drop(self):
+        """Apaga a coleção do disco: segmentos, índices, log e configuração."""
+        with self._lock.write():
+            segments_dir = self.store.segments_dir
+            self._release()
+            shutil.rmtree(segments_dir, ignore_errors=True)
+            for path in (self.config_path, self.store.legacy_vectors_path,
+                         self.store.legacy_documents_path, self.store.legacy_metadata_path):
+                if os.path.exists(path):
+                    os.remove(path)
+        print(f"Coleção '{self.collection_name}' removida")
+        return True
+        
+    def _release(self):
+        # Fecha o armazenamento e volta ao estado de uma coleção ainda não carregada
+        self.store.close()
+        self.store = self._open_store()
+        self._loaded = False
+        self.index = self._create_index()
+        self._index_epoch = None
+        self._unsaved_index_rows = 0
+        self.lexical_index.clear()
+        self._unsaved_lexical_rows = 0
+        self.near_duplicate_index.clear()
+        self._unsaved_near_duplicate_rows = 0
+        self.metadata_index.clear()
+        self.source_references = self._open_source_references()
+        self._content_ids = {}
+        self._content_signature = None
+        
+    def compact(self):
+        """
+        Descarta definitivamente os documentos removidos e refaz o índice. As
+        posições das linhas mudam, então tudo roda sob a trava de escrita.
+        """
+        self._ensure_loaded()
+        with self._lock.write():
+            return self._compact()
             
-        print(f"Coleção '{self.collection_name}' salva com sucesso. Documentos: {len(self.documents)}")
+    def _compact(self):
+        if not self.store.compact():
+            return {"success": False}
+        
+        # O novo índice é montado à parte e só então substitui o atual
+        index = self._create_index()
+        index.rebuild(self.store.stack_vectors(), self.store.all_ids)
+        self.index = index
+        self._index_epoch = self.store.epoch
+        self._save_index()
+        
+        lexical_index = BM25Index()
+        lexical_index.add(self.store.all_ids, self.store.documents)
+        lexical_index.epoch = self.store.epoch
+        self.lexical_index = lexical_index
+        self._save_lexical_index()
+        
+        near_duplicate_index = self.near_duplicate_index.empty_copy()
+        near_duplicate_index.add(self.store.all_ids, self.store.documents)
+        near_duplicate_index.epoch = self.store.epoch
+        self.near_duplicate_index = near_duplicate_index
+        self._save_near_duplicate_index()
+        self.source_references.prune(self.store.all_ids)
+        
+        return {"success": True}
         
     def reset(self):
         """Reinicia a coleção, removendo todos os documentos."""
-        self.vectors = np.array([]).reshape(0, self.model.get_sentence_embedding_dimension())
-        self.documents = []
-        self.metadata = []
+        self._ensure_loaded()
+        with self._lock.write():
+            return self._reset()
+            
+    def _reset(self):
+        self.store.reset()
+        
+        self.index.rebuild(self.store.stack_vectors(), self.store.all_ids)
+        self._index_epoch = self.store.epoch
+        self._save_index()
         
-        # Salva a coleção vazia
-        self._save()
+        self.lexical_index.clear()
+        self.lexical_index.epoch = self.store.epoch
+        self._save_lexical_index()
         
-        return {"success": True}
\ No newline at end of file
+        self.near_duplicate_index.clear()
+        self.near_duplicate_index.epoch = self.store.epoch
+        self._save_near_duplicate_index()
+        self.source_references.clear()
+        
+        return {"success": True}
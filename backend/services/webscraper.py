@@ -1,90 +1,78 @@
-import requests
 from bs4 import BeautifulSoup
-import html2text
 import validators
 from urllib.parse import urljoin, urlparse
 import time
 from typing import List, Dict, Optional
 import re
+from services.tokenizer import extract_keywords
+from services.crawler import SiteCrawler, normalize_url
+from services.html_extraction import extract_html
+
+# Extratores de texto: "lxml" (rápido, só o conteúdo principal) e "bs4" (BeautifulSoup, a página inteira)
+EXTRACTORS = ("lxml", "bs4")
 
 class WebScraperService:
-    def __init__(self):
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        })
-        self.html_converter = html2text.HTML2Text()
-        self.html_converter.ignore_links = True
-        self.html_converter.ignore_images = True
-        self.html_converter.ignore_emphasis = False
-        
-    def scrape_url_chunked(self, url: str, chunk_size: int = 500) -> Dict:
+    def __init__(self, extractor: str = "lxml"):
+        if extractor not in EXTRACTORS:
+            raise ValueError(f"Extrator desconhecido: {extractor}. Opções: {', '.join(EXTRACTORS)}")
+        self.extractor = extractor
+        self.user_agent = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+        
+    def _extract_page(self, url: str, content: bytes, chunk_size: int = 500):
         """
-        Extrai conteúdo de uma URL e divide em chunks menores.
+        Extrai título, texto e chunks de uma página HTML já baixada. Retorna
+        (resultado, links), com os links da página (inclusive os de menus e
+        rodapés, removidos do texto) como URLs absolutas.
         """
-        print(f"Iniciando scraping de: {url}")
-        try:
-            # Valida a URL
-            if not validators.url(url):
-                raise ValueError("URL inválida")
-            
-            # Faz a requisição
-            print(f"Fazendo requisição para: {url}")
-            response = self.session.get(url, timeout=30)
-            response.raise_for_status()
-            print(f"Resposta recebida. Status: {response.status_code}")
-            
-            # Parse do HTML
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            # Remove scripts, styles e outros elementos não relevantes
-            for script in soup(["script", "style", "nav", "footer", "header", "aside"]):
-                script.decompose()
-            
-            # Extrai título
-            title = soup.find('title')
-            title_text = title.get_text().strip() if title else urlparse(url).netloc
-            print(f"Título extraído: {title_text}")
+        if self.extractor == "lxml":
+            title, text_content, links = extract_html(content, url)
+        else:
+            title, text_content, links = self._parse_with_bs4(url, content)
+        title_text = title or urlparse(url).netloc
+        print(f"Título extraído: {title_text}")
             
-            # Extrai conteúdo principal
-            text_content = soup.get_text()
-            clean_text = self._clean_text(text_content)
-            print(f"Texto limpo extraído. Tamanho: {len(clean_text)} caracteres")
-            
-            if not clean_text or len(clean_text) < 50:
-                print("Conteúdo extraído é muito pequeno ou vazio")
-                return {
-                    "url": url,
-                    "title": title_text,
-                    "chunks": [],
-                    "total_chunks": 0,
-                    "success": False,
-                    "error": "Conteúdo extraído insuficiente"
-                }
-            
-            # Divide o conteúdo em chunks simples
-            chunks = self._create_simple_chunks(clean_text, title_text, url, chunk_size)
-            print(f"Criados {len(chunks)} chunks")
+        clean_text = self._clean_text(text_content)
+        print(f"Texto limpo extraído. Tamanho: {len(clean_text)} caracteres")
             
+        if not clean_text or len(clean_text) < 50:
+            print("Conteúdo extraído é muito pequeno ou vazio")
             return {
                 "url": url,
                 "title": title_text,
-                "chunks": chunks,
-                "total_chunks": len(chunks),
-                "success": True,
-                "error": None
-            }
-            
-        except Exception as e:
-            print(f"Erro durante scraping de {url}: {str(e)}")
-            return {
-                "url": url,
-                "title": None,
                 "chunks": [],
                 "total_chunks": 0,
                 "success": False,
-                "error": str(e)
-            }
+                "error": "Conteúdo extraído insuficiente"
+            }, links
+            
+        # Divide o conteúdo em chunks simples
+        chunks = self._create_simple_chunks(clean_text, title_text, url, chunk_size)
+        print(f"Criados {len(chunks)} chunks")
+            
+        return {
+            "url": url,
+            "title": title_text,
+            "chunks": chunks,
+            "total_chunks": len(chunks),
+            "success": True,
+            "error": None
+        }, links
+        
+    def _parse_with_bs4(self, url: str, content: bytes):
+        """Extrator "bs4": (título, texto da página inteira, links), com o html.parser do BeautifulSoup."""
+        # Parse do HTML
+        soup = BeautifulSoup(content, 'html.parser')
+        
+        # Os links são coletados antes da limpeza: a navegação é por onde o site é percorrido
+        links = [link for link in (normalize_url(a['href'], url) for a in soup.find_all('a', href=True)) if link]
+        
+        # Remove scripts, styles e outros elementos não relevantes
+        for script in soup(["script", "style", "nav", "footer", "header", "aside"]):
+            script.decompose()
+        
+        # Extrai título
+        title = soup.find('title')
+        return (title.get_text().strip() if title else None), soup.get_text(), links
     
     def _create_simple_chunks(self, text: str, title: str, url: str, chunk_size: int) -> List[Dict]:
         """
@@ -138,23 +126,8 @@ class WebScraperService:
         """
         Extrai palavras-chave simples do texto.
         """
-        # Palavras comuns a ignorar
-        stop_words = {
-            'a', 'o', 'e', 'é', 'da', 'do', 'de', 'para', 'com', 'em', 'no', 'na', 'um', 'uma',
-            'por', 'se', 'que', 'como', 'mais', 'ou', 'ao', 'aos', 'as', 'os', 'à', 'às'
-        }
-        
-        # Extrai palavras significativas
-        words = re.findall(r'\b[a-záàâãéêíóôõúç]{3,}\b', text.lower())
-        keywords = [word for word in words if word not in stop_words]
-        
-        # Retorna as 5 palavras mais comuns
-        word_freq = {}
-        for word in keywords:
-            word_freq[word] = word_freq.get(word, 0) + 1
-        
-        sorted_words = sorted(word_freq.items(), key=lambda x: x[1], reverse=True)
-        return [word for word, freq in sorted_words[:5]]
+        # Retorna as 5 palavras mais comuns (mesmo tokenizador do índice lexical)
+        return extract_keywords(text, limit=5, min_length=3)
     
     def _clean_text(self, text: str) -> str:
         """
@@ -180,9 +153,31 @@ class WebScraperService:
         
         return '\n'.join(cleaned_lines).strip()
     
-    def scrape_sitemap_chunked(self, base_url: str, max_pages: int = 10) -> List[Dict]:
+    async def crawl_site_chunked(self, base_url: str, max_pages: int = 10, chunk_size: int = 500,
+                                 max_concurrency: int = 8, max_per_host: int = 4,
+                                 known_pages: Optional[Dict] = None, respect_robots: bool = True):
         """
-        Simples fallback para múltiplas páginas - apenas scrape da URL principal.
+        Percorre o site a partir de `base_url` (sitemap, robots.txt e links do
+        mesmo domínio, em largura) e produz o resultado de cada página (URL,
+        título, chunks e erro, ver `_extract_page`) assim que ela é baixada e
+        dividida em chunks. No máximo `max_pages` páginas são visitadas (ver
+        SiteCrawler); para uma única página, use `max_pages=1` e
+        `respect_robots=False`.
+        
+        Com `known_pages` (estado de um rastreamento anterior), as páginas
+        conhecidas são pedidas com requisições condicionais e as que não
+        mudaram voltam com "not_modified", sem chunks.
         """
         print(f"Scraping de sitemap para: {base_url}")
-        return [self.scrape_url_chunked(base_url)]
\ No newline at end of file
+        if not validators.url(base_url):
+            yield {"url": base_url, "title": None, "chunks": [], "total_chunks": 0, "success": False, "error": "URL inválida"}
+            return
+        
+        crawler = SiteCrawler(
+            lambda url, content: self._extract_page(url, content, chunk_size),
+            max_pages=max_pages, max_concurrency=max_concurrency, max_per_host=max_per_host,
+            user_agent=self.user_agent, respect_robots=respect_robots,
+            known_pages=known_pages
+        )
+        async for result in crawler.crawl(base_url):
+            yield result
\ No newline at end of file
@@ -0,0 +1,143 @@
+import os
+import json
+import struct
+import threading
+import time
+import zlib
+import numpy as np
+
+# Operações registradas no log
+OP_ADD = 1
+OP_DELETE = 2
+
+# Cabeçalho de cada registro: tamanho do conteúdo, CRC32 (operação + conteúdo) e operação
+_HEADER = struct.Struct('<IIB')
+_ADD_HEADER = struct.Struct('<qII')
+
+
+def encode_add(first_id, vectors, documents, metadatas):
+    """Codifica uma inclusão: IDs consecutivos a partir de `first_id`, vetores float32 e textos."""
+    texts = json.dumps({"documents": list(documents), "metadata": list(metadatas)}, ensure_ascii=False).encode('utf-8')
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    return _ADD_HEADER.pack(first_id, len(vectors), len(texts)) + texts + vectors.tobytes()
+
+
+def decode_add(payload, dimension):
+    """Inverso de `encode_add`: retorna (ids, vetores, documentos, metadados)."""
+    first_id, count, texts_size = _ADD_HEADER.unpack_from(payload)
+    start = _ADD_HEADER.size
+    texts = json.loads(payload[start:start + texts_size].decode('utf-8'))
+    vectors = np.frombuffer(payload, dtype=np.float32, offset=start + texts_size).reshape(count, dimension)
+    ids = np.arange(first_id, first_id + count, dtype=np.int64)
+    return ids, vectors, texts["documents"], texts["metadata"]
+
+
+def encode_delete(ids):
+    return np.asarray(ids, dtype=np.int64).tobytes()
+
+
+def decode_delete(payload):
+    return np.frombuffer(payload, dtype=np.int64)
+
+
+def read_records(path, offset=0):
+    """
+    Lê os registros a partir de `offset`, parando no primeiro registro
+    incompleto ou corrompido (escrita interrompida). Retorna a lista de
+    (operação, conteúdo) e a posição logo após o último registro válido.
+    """
+    try:
+        with open(path, 'rb') as f:
+            f.seek(offset)
+            data = f.read()
+    except FileNotFoundError:
+        return [], offset
+
+    records, position = [], 0
+    while position + _HEADER.size <= len(data):
+        size, checksum, op = _HEADER.unpack_from(data, position)
+        start = position + _HEADER.size
+        if start + size > len(data):
+            break
+        payload = data[start:start + size]
+        if zlib.crc32(payload, zlib.crc32(bytes([op]))) != checksum:
+            break
+        records.append((op, payload))
+        position = start + size
+    return records, offset + position
+
+
+class WriteAheadLog:
+    """
+    Log de escrita antecipada (write-ahead log) de inclusões e remoções.
+
+    Os registros são acrescentados ao arquivo e só então aplicados em memória;
+    a durabilidade vem de `sync`, que implementa group commit: a primeira thread
+    a pedir sincronização faz um único fsync cobrindo tudo o que já foi escrito,
+    enquanto as demais aguardam e aproveitam o mesmo fsync. Com `commit_delay_ms`
+    o fsync espera um pouco para reunir mais registros.
+    """
+
+    def __init__(self, path, generation=0, commit_delay_ms=0):
+        self.path = path
+        self.generation = generation
+        self.commit_delay = commit_delay_ms / 1000
+        self._file = open(path, 'ab')
+        self._condition = threading.Condition()
+        self._written = self._file.tell()
+        self._durable = self._written
+        self._syncing = False
+        self._closed = False
+
+    def append(self, op, payload):
+        """
+        Escreve um registro (sem fsync) e retorna a posição do fim do arquivo,
+        a ser passada para `sync`. Deve ser chamado com a trava de escrita da coleção.
+        """
+        header = _HEADER.pack(len(payload), zlib.crc32(payload, zlib.crc32(bytes([op]))), op)
+        self._file.write(header + payload)
+        self._file.flush()
+        with self._condition:
+            self._written = self._file.tell()
+            return self._written
+
+    @property
+    def written(self):
+        """Posição do fim do que já foi escrito por este processo."""
+        with self._condition:
+            return self._written
+
+    def sync(self, position):
+        """Aguarda até que o log esteja gravado em disco pelo menos até `position`."""
+        with self._condition:
+            while self._durable < position and not self._closed:
+                if self._syncing:
+                    self._condition.wait()
+                    continue
+
+                # Esta thread faz o fsync do grupo; as demais esperam por ele
+                self._syncing = True
+                self._condition.release()
+                try:
+                    if self.commit_delay:
+                        time.sleep(self.commit_delay)
+                    with self._condition:
+                        target = self._written
+                    os.fsync(self._file.fileno())
+                finally:
+                    self._condition.acquire()
+                    self._syncing = False
+                self._durable = max(self._durable, target)
+                self._condition.notify_all()
+
+    def close(self):
+        """
+        Fecha o log após um checkpoint: os registros já estão nos segmentos,
+        então quem ainda aguarda `sync` é liberado.
+        """
+        with self._condition:
+            while self._syncing:
+                self._condition.wait()
+            self._closed = True
+            self._file.close()
+            self._condition.notify_all()
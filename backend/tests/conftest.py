@@ -0,0 +1,216 @@
+import hashlib
+import os
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.model_provider import model_provider, DEFAULT_MODEL, DEFAULT_COLLECTION
+from services.vectordb import VectorDBService
+
+
+class HashingEmbedder:
+    """
+    Modelo de embeddings determinístico para os testes: cada palavra soma um
+    vetor fixo (derivado do seu hash), de modo que textos com palavras em comum
+    ficam próximos. Evita baixar o modelo real.
+    """
+
+    dimension = 64
+
+    def get_sentence_embedding_dimension(self):
+        return self.dimension
+
+    def _embed(self, text):
+        vector = np.full(self.dimension, 0.01, dtype=np.float32)
+        for word in re.findall(r"\w+", text.lower()):
+            digest = int(hashlib.md5(word.encode("utf-8")).hexdigest(), 16)
+            vector[digest % self.dimension] += 1.0 + (digest >> 8) % 3
+        return vector
+
+    def encode(self, texts, batch_size=32, **kwargs):
+        if isinstance(texts, str):
+            return self._embed(texts)
+        if not texts:
+            return np.zeros((0, self.dimension), dtype=np.float32)
+        return np.stack([self._embed(text) for text in texts])
+
+
+@pytest.fixture(autouse=True)
+def workdir(tmp_path, monkeypatch):
+    """Cada teste roda num diretório próprio: ./data (coleções, caches, tarefas) fica nele."""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setitem(model_provider._models, DEFAULT_MODEL, HashingEmbedder())
+    return tmp_path
+
+
+@pytest.fixture
+def open_collection():
+    """Abre VectorDBServices (com o modelo de teste) e os descarrega ao fim do teste."""
+    opened = []
+
+    def open_collection(name="test_collection", **options):
+        vector_db = VectorDBService(name, **options)
+        opened.append(vector_db)
+        return vector_db
+
+    yield open_collection
+    for vector_db in opened:
+        vector_db.unload()
+
+
+@pytest.fixture
+def api_client(monkeypatch):
+    """
+    Cliente da API (sem os eventos de inicialização e encerramento), com um
+    registro de coleções próprio do teste; a fila de tarefas é encerrada ao fim.
+    """
+    from fastapi.testclient import TestClient
+    from main import app
+    from routes import api
+    from services.collection_manager import CollectionManager
+    from services.document_listing import DocumentListing
+    from services.ingestion_jobs import job_queue
+
+    monkeypatch.setattr(model_provider, "collections", CollectionManager(DEFAULT_COLLECTION))
+    # As respostas em cache da listagem são indexadas pela versão, que se repete entre coleções novas
+    monkeypatch.setattr(api, "document_listing", DocumentListing())
+    model_provider.answer_cache.clear()
+    yield TestClient(app)
+    job_queue.stop()
+    for vector_db in model_provider.collections.opened().values():
+        vector_db.unload()
+
+
+def make_pdf(pages):
+    """
+    PDF mínimo, sem dependências: uma página por lista de linhas de texto
+    (fonte Helvetica, WinAnsiEncoding, então acentos funcionam).
+    """
+    objects = []
+
+    def add(body):
+        objects.append(body)
+        return len(objects)
+
+    font = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>")
+    # Cada página ocupa dois objetos (conteúdo e página); o nó /Pages vem logo depois
+    pages_id = len(objects) + 2 * len(pages) + 1
+    kids = []
+    for lines in pages:
+        operators = ["BT /F1 11 Tf 14 TL 50 800 Td"]
+        operators += ["(" + line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)") + ") Tj T*" for line in lines]
+        stream = "\n".join(operators + ["ET"]).encode("cp1252")
+        content = add(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        kids.append(add(
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 595 842] /Contents %d 0 R "
+            b"/Resources << /Font << /F1 %d 0 R >> >> >>" % (pages_id, content, font)
+        ))
+    add(b"<< /Type /Pages /Kids [%s] /Count %d >>" % (" ".join(f"{kid} 0 R" for kid in kids).encode(), len(kids)))
+    catalog = add(b"<< /Type /Catalog /Pages %d 0 R >>" % pages_id)
+
+    pdf = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(pdf))
+        pdf += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(pdf)
+    pdf += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    pdf += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    pdf += b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, catalog, xref)
+    return bytes(pdf)
+
+
+class LocalSite:
+    """
+    Site servido por um http.server local, para testar o rastreamento:
+    `pages` mapeia caminhos para HTML (ou texto, em /robots.txt e
+    /sitemap.xml). As respostas têm ETag e atendem requisições condicionais
+    com 304; cada requisição é registrada em `requests` e `max_in_flight`
+    guarda o maior número de downloads simultâneos.
+    """
+
+    def __init__(self, delay=0.0):
+        self.pages = {}
+        self.delay = delay
+        self.requests = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, args=(0.05,), daemon=True)
+        self.thread.start()
+
+    def url(self, path="/"):
+        return f"http://127.0.0.1:{self.server.server_port}{path}"
+
+    def fetched(self, path):
+        return sum(1 for requested in self.requests if requested == path)
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _handler(self):
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                with site._lock:
+                    site.requests.append(self.path)
+                    site.in_flight += 1
+                    site.max_in_flight = max(site.max_in_flight, site.in_flight)
+                try:
+                    if site.delay:
+                        time.sleep(site.delay)
+                    self._respond(site.pages.get(self.path))
+                finally:
+                    with site._lock:
+                        site.in_flight -= 1
+
+            def _respond(self, content):
+                if content is None:
+                    self.send_response(404)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                body = content.encode("utf-8")
+                etag = '"' + hashlib.md5(body).hexdigest() + '"'
+                if self.headers.get("If-None-Match") == etag:
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.end_headers()
+                    return
+                content_type = {"/robots.txt": "text/plain", "/sitemap.xml": "application/xml"}.get(self.path, "text/html")
+                self.send_response(200)
+                self.send_header("Content-Type", f"{content_type}; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.send_header("ETag", etag)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+@pytest.fixture
+def serve_site():
+    """Cria sites locais (ver LocalSite), encerrados ao fim do teste."""
+    sites = []
+
+    def serve_site(delay=0.0):
+        site = LocalSite(delay)
+        sites.append(site)
+        return site
+
+    yield serve_site
+    for site in sites:
+        site.close()
@@ -0,0 +1,77 @@
+import asyncio
+from services.aiservice import AIService
+from services.query_cache import LRUCache
+
+QUESTION = "Qual o horário da biblioteca do campus Recife?"
+WEEKDAYS = "A biblioteca do campus Recife funciona das 7h às 21h"
+SATURDAYS = "Aos sábados a biblioteca do campus Recife funciona das 8h às 12h"
+
+
+def service(vector_db):
+    """AIService com cache de respostas próprio e contagem das buscas feitas na coleção."""
+    ai_service = AIService(vector_db, answer_cache=LRUCache(100))
+    searches = []
+    # As buscas síncronas e assíncronas terminam em `query_many`
+    query_many = vector_db.query_many
+
+    def counted(query_texts, *args, **kwargs):
+        searches.append(query_texts)
+        return query_many(query_texts, *args, **kwargs)
+
+    vector_db.query_many = counted
+    return ai_service, searches
+
+
+def test_repeated_question_is_answered_from_cache(open_collection):
+    vector_db = open_collection("respostas")
+    vector_db.add_documents([WEEKDAYS, "O restaurante abre ao meio-dia"])
+    ai_service, searches = service(vector_db)
+
+    first = ai_service.answer_query(QUESTION)
+    # Variações de caixa, espaços e pontuação final caem na mesma entrada
+    assert ai_service.answer_query("  qual o HORÁRIO da biblioteca do  campus recife ") == first
+    assert asyncio.run(ai_service.answer_query_async(QUESTION)) == first
+    assert ai_service.answer_queries([QUESTION]) == [first]
+    assert len(searches) == 1 and ai_service.answer_cache.hits == 3
+
+    # Um filtro diferente é outra pergunta
+    ai_service.answer_query(QUESTION, where={"url": "https://www.exemplo.edu.br"})
+    assert len(searches) == 2
+
+
+def test_changes_invalidate_cached_answers(open_collection):
+    # Sem compactação em segundo plano, que também muda a versão da coleção
+    vector_db = open_collection("respostas", compaction_threshold=1.0)
+    ids = vector_db.add_documents([WEEKDAYS])["ids"]
+    ai_service, searches = service(vector_db)
+    assert ai_service.answer_query(QUESTION)["sources"] == [WEEKDAYS]
+
+    # Inclusão: a nova informação aparece na resposta seguinte
+    vector_db.add_documents([SATURDAYS])
+    assert sorted(ai_service.answer_query(QUESTION)["sources"]) == sorted([WEEKDAYS, SATURDAYS])
+    assert len(searches) == 2
+
+    # Remoção: o trecho removido deixa de ser citado
+    vector_db.delete(ids)
+    assert ai_service.answer_query(QUESTION)["sources"] == [SATURDAYS]
+    assert len(searches) == 3
+    ai_service.answer_query(QUESTION)
+    assert len(searches) == 3
+
+    # Reinício: nenhuma resposta anterior sobrevive
+    vector_db.reset()
+    assert ai_service.answer_query(QUESTION)["sources"] == []
+    assert len(searches) == 4
+
+
+def test_changes_from_another_process_invalidate_cached_answers(open_collection):
+    vector_db = open_collection("respostas")
+    vector_db.add_documents([WEEKDAYS])
+    ai_service, searches = service(vector_db)
+    ai_service.answer_query(QUESTION)
+
+    # Outro processo (outra instância sobre os mesmos arquivos) inclui um documento
+    other = open_collection("respostas")
+    other.add_documents([SATURDAYS])
+    assert sorted(ai_service.answer_query(QUESTION)["sources"]) == sorted([WEEKDAYS, SATURDAYS])
+    assert len(searches) == 2
@@ -0,0 +1,123 @@
+import os
+
+
+def test_add_documents_response(api_client):
+    first = api_client.post("/api/documents", json={"documents": ["horário da biblioteca"]})
+    assert first.status_code == 200, first.text
+    existing = first.json()["ids"]
+
+    response = api_client.post("/api/documents", json={
+        "documents": ["calendário acadêmico", "horário da biblioteca", {"text": "calendário acadêmico"}],
+        "skip_duplicates": True
+    })
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert len(body["ids"]) == 1 and body["positions"] == [0]
+    assert body["duplicates"] == existing
+    assert body["resolved_ids"] == [body["ids"][0], existing[0], body["ids"][0]]
+
+
+def test_add_documents_response_accepts_unresolved_ids():
+    from models.schemas import AddDocumentsResponse
+
+    response = AddDocumentsResponse(ids=[], resolved_ids=[None, 3])
+    assert response.resolved_ids == [None, 3]
+
+
+def test_add_collection_documents(api_client):
+    assert api_client.post("/api/collections", json={"name": "editais"}).status_code == 200
+    response = api_client.post("/api/collections/editais/documents", json={"documents": ["edital de monitoria"]})
+    assert response.status_code == 200, response.text
+    assert response.json()["resolved_ids"] == response.json()["ids"]
+
+
+def _delete(api_client, ids):
+    return api_client.request("DELETE", "/api/documents", json={"ids": ids}).json()
+
+
+def _add(api_client, documents):
+    response = api_client.post("/api/documents", json={"documents": documents})
+    assert response.status_code == 200, response.text
+    return response.json()["ids"]
+
+
+def test_document_list_pagination(api_client):
+    ids = _add(api_client, [
+        {"text": f"Aviso {i} sobre o calendário do campus", "metadata": {"url": f"https://exemplo.edu.br/{i % 3}", "title": f"Página {i % 3}"}}
+        for i in range(7)
+    ])
+    assert _delete(api_client, [ids[2]]) == {"success": True}
+
+    pages, cursor = [], None
+    while True:
+        params = {"limit": 3} if cursor is None else {"limit": 3, "cursor": cursor}
+        body = api_client.get("/api/documents/list", params=params).json()
+        pages.append([item["id"] for item in body["documents"]])
+        assert body["total_documents"] == 6 and body["unique_sources"] == 3
+        cursor = body["next_cursor"]
+        if cursor is None:
+            break
+    live = [i for i in ids if i != ids[2]]
+    assert pages == [live[:3], live[3:]]
+
+    # Documentos incluídos entre as chamadas não deslocam a página seguinte
+    first = api_client.get("/api/documents/list", params={"limit": 2}).json()
+    added = _add(api_client, ["Resultado da seleção de monitoria"])
+    second = api_client.get("/api/documents/list", params={"limit": 10, "cursor": first["next_cursor"]}).json()
+    assert [item["id"] for item in second["documents"]] == live[2:] + added
+
+    item = second["documents"][0]
+    assert item["url"] == "https://exemplo.edu.br/0" and item["title"] == "Página 0" and item["full_content"] is None
+    with_content = api_client.get("/api/documents/list", params={"limit": 1, "include_content": True}).json()
+    assert with_content["documents"][0]["full_content"] == "Aviso 0 sobre o calendário do campus"
+
+    groups = api_client.get("/api/documents/list", params={"mode": "groups"}).json()
+    counts = {group["group_key"]: group["documents"] for group in groups["groups"]}
+    assert counts == {"https://exemplo.edu.br/0": 3, "https://exemplo.edu.br/1": 2, "https://exemplo.edu.br/2": 1,
+                      "Documentos manuais": 1}
+    assert api_client.get("/api/documents/list", params={"mode": "outro"}).status_code == 400
+
+
+def test_document_list_etag(api_client):
+    ids = _add(api_client, ["Horário da biblioteca", "Calendário acadêmico"])
+    response = api_client.get("/api/documents/list")
+    etag = response.headers["etag"]
+
+    cached = api_client.get("/api/documents/list", headers={"If-None-Match": etag})
+    assert cached.status_code == 304 and cached.headers["etag"] == etag and not cached.content
+
+    # Inclusões e remoções mudam a versão: a listagem é enviada de novo
+    added = _add(api_client, ["Resultado do vestibular"])
+    response = api_client.get("/api/documents/list", headers={"If-None-Match": etag})
+    assert response.status_code == 200 and response.headers["etag"] != etag
+    etag = response.headers["etag"]
+
+    _delete(api_client, [ids[0]])
+    response = api_client.get("/api/documents/list", headers={"If-None-Match": etag})
+    assert response.status_code == 200 and response.headers["etag"] != etag
+    assert [item["id"] for item in response.json()["documents"]] == [ids[1]] + added
+
+
+def test_upload_pdf(api_client, monkeypatch):
+    import time
+    from conftest import make_pdf
+    from routes import api
+
+    # Caminho absoluto: os processos de extração podem ter sido criados em outro diretório de trabalho
+    monkeypatch.setattr(api, "UPLOADS_DIR", os.path.abspath(api.UPLOADS_DIR))
+    pages = [[f"Edital {page}: inscrições para o curso técnico {line} do campus Recife" for line in range(20)] for page in range(3)]
+    files = {"file": ("edital.pdf", make_pdf(pages), "application/pdf")}
+    response = api_client.post("/api/upload-pdf", files=files, params={"chunk_size": 300})
+    assert response.status_code == 200, response.text
+    result = response.json()
+    assert result["total_pages"] == 3 and result["documents_added"] == result["chunks_extracted"] > 1
+
+    queued = api_client.post("/api/jobs/upload-pdf", files=files, params={"chunk_size": 300})
+    assert queued.status_code == 202 and queued.json()["status"] == "queued"
+    deadline = time.time() + 30
+    while (job := api_client.get(f"/api/jobs/{queued.json()['id']}").json())["status"] in ("queued", "running"):
+        assert time.time() < deadline
+        time.sleep(0.05)
+    # O mesmo PDF de novo: os chunks já incluídos são ignorados como duplicatas
+    assert job["status"] == "completed" and job["result"]["documents_added"] == 0
+    assert api_client.post("/api/jobs/upload-pdf", files={"file": ("edital.txt", b"texto", "text/plain")}).status_code == 400
@@ -0,0 +1,93 @@
+import time
+import pytest
+from services.aiservice import AIService
+from services.collection_manager import CollectionManager
+from services.model_provider import DEFAULT_COLLECTION, model_provider
+
+
+def test_least_recently_used_collection_is_unloaded():
+    manager = CollectionManager("a", memory_budget_mb=0.01)
+    for name in ("a", "b"):
+        manager.get(name) if manager.exists(name) else manager.create(name)
+        manager.open(name).add_documents([f"Documento {i} da coleção {name}" for i in range(40)])
+    manager.enforce_budget()
+
+    a, b = manager.open("a"), manager.open("b")
+    assert not a.loaded and b.loaded
+    assert manager.describe("a")["evictions"] == 1
+
+    # O próximo acesso carrega a coleção de novo (e descarrega a outra)
+    assert manager.get("a") is a
+    assert a.query("Documento 3 da coleção a", n_results=1)["documents"] == ["Documento 3 da coleção a"]
+    manager.enforce_budget()
+    assert a.loaded and not b.loaded
+    for vector_db in (a, b):
+        vector_db.unload()
+
+
+def test_background_compaction_skips_unloaded_collection(open_collection):
+    vector_db = open_collection("evicted", compaction_threshold=0.1)
+    ids = vector_db.add_documents([f"Documento {i}" for i in range(10)])["ids"]
+
+    # A compactação agendada pela remoção espera a trava enquanto a coleção é descarregada
+    with vector_db._lock.write():
+        vector_db.delete(ids[:5])
+        vector_db.unload()
+    vector_db._compaction_thread.join()
+
+    assert not vector_db.loaded
+    assert vector_db.store.segments == [] and len(vector_db.store.tombstones) == 0
+
+    # Os dados continuam no disco, e a compactação fica para a próxima carga
+    assert vector_db.store.live_count == 0
+    result = vector_db.query("Documento 7", n_results=10)
+    assert sorted(result["ids"]) == ids[5:]
+    assert len(vector_db.store.tombstones) == 5
+
+
+def test_load_seconds_with_stale_index(open_collection):
+    pytest.importorskip("faiss")
+    vector_db = open_collection("hnsw", index_type="hnsw", index_save_interval=1000)
+    vector_db.add_documents([f"Documento {i} da coleção" for i in range(50)])
+    vector_db.query("Documento 1 da coleção")
+    # Estas linhas ainda não chegaram ao arquivo do índice, que fica desatualizado
+    vector_db.add_documents([f"Documento {i} da coleção" for i in range(50, 80)])
+
+    # Outro processo abre a coleção e completa o índice salvo
+    reopened = open_collection("hnsw", index_type="hnsw", index_save_interval=1000)
+    assert reopened.query("Documento 65 da coleção", n_results=1)["documents"] == ["Documento 65 da coleção"]
+    assert reopened.index.ntotal == 80
+    assert 0 <= reopened.load_seconds < 30
+
+
+def wait_for(condition, timeout=10):
+    deadline = time.time() + timeout
+    while not condition():
+        assert time.time() < deadline, "condição não atingida"
+        time.sleep(0.01)
+
+
+def test_default_collection_path_enforces_budget(monkeypatch):
+    manager = CollectionManager(DEFAULT_COLLECTION, memory_budget_mb=0.01)
+    monkeypatch.setattr(model_provider, "collections", manager)
+    manager.create("campus")
+    other = manager.get("campus")
+    other.add_documents([f"Documento {i} do campus" for i in range(40)])
+    assert other.loaded
+
+    # A coleção padrão (usada por /query, /documents e pelas tarefas de ingestão)
+    # é obtida sem `get`: a inclusão agenda a verificação do limite
+    default = model_provider.get_vector_db()
+    default.add_documents([f"Documento {i} da base padrão" for i in range(40)])
+    wait_for(lambda: not other.loaded)
+    assert default.loaded and manager.describe("campus")["evictions"] == 1
+
+    # Uma carga pelo caminho padrão também descarrega a coleção usada há mais tempo
+    manager.get("campus")
+    wait_for(lambda: not default.loaded)
+    service = AIService()
+    assert service.vector_db.query("Documento 7 da base padrão", n_results=1)["documents"] == ["Documento 7 da base padrão"]
+    wait_for(lambda: not other.loaded)
+    assert default.loaded and manager.describe("campus")["evictions"] == 2
+    for vector_db in (default, other):
+        vector_db.unload()
@@ -0,0 +1,140 @@
+import json
+import os
+import pickle
+import numpy as np
+import pytest
+from conftest import HashingEmbedder
+from services.column_store import (
+    ConcatColumn, MetadataColumn, TextColumn, open_metadata_column, open_text_column,
+    write_metadata_column, write_text_column
+)
+from services.segment_store import SegmentStore
+from services.vectordb import DATA_DIR
+
+TEXTS = ["Edital nº 12/2024", "", "Inscrições até 15/03 — campus Recife", "ação, informação e seleção 📚", "fim"]
+
+ROWS = [
+    {"url": "https://exemplo.edu.br/a", "title": "Notícia", "chunk": 0},
+    None,
+    {"url": "https://exemplo.edu.br/a", "title": "Notícia", "chunk": 1, "tags": ["edital", "2024"]},
+    "texto solto",
+    {},
+    {"filename": "edital.pdf", "page": 3, "draft": False, "score": 0.5, "extra": {"nested": [1, None]}},
+    7,
+]
+
+
+@pytest.mark.parametrize("mmap", [True, False])
+def test_text_column_round_trip(tmp_path, mmap):
+    path = str(tmp_path / "documents.utf8")
+    write_text_column(path, TEXTS)
+    column = open_text_column(path, mmap=mmap)
+
+    assert len(column) == len(TEXTS) and list(column) == TEXTS
+    assert column[-1] == "fim" and column[1:4] == TEXTS[1:4]
+    assert list(column.take([3, 0, 3])) == [TEXTS[3], TEXTS[0], TEXTS[3]]
+    assert list(TextColumn.concat([column.take([4, 1]), ["extra"]])) == ["fim", "", "extra"]
+
+    # Uma coluna gravada a partir de outra (já recortada) tem os mesmos textos
+    write_text_column(path, column.take([2, 3]))
+    assert list(open_text_column(path, mmap=mmap)) == TEXTS[2:4]
+
+
+def test_metadata_column_round_trip(tmp_path):
+    path = str(tmp_path / "metadata.npz")
+    write_metadata_column(path, ROWS)
+    column = open_metadata_column(path)
+
+    assert len(column) == len(ROWS) and list(column) == ROWS
+    assert column[-1] == 7 and column[1:4] == ROWS[1:4]
+    # Os tipos dos valores são preservados (0 e False continuam distintos)
+    assert column[5]["draft"] is False and column[0]["chunk"] == 0 and type(column[0]["chunk"]) is int
+    assert column.field("url") == [row.get("url") if isinstance(row, dict) else None for row in ROWS]
+    assert column.field("page") == [None, None, None, None, None, 3, None]
+    assert column.field("inexistente") == [None] * len(ROWS)
+
+    # Listas e dicionários devolvidos podem ser alterados sem afetar a coluna
+    column[2]["tags"].append("alterado")
+    assert column[2]["tags"] == ["edital", "2024"]
+
+    write_metadata_column(path, [])
+    assert len(open_metadata_column(path)) == 0
+
+
+def test_concat_column():
+    texts = TextColumn.from_texts(TEXTS)
+    view = ConcatColumn([texts, ["log 1", "log 2"]])
+    assert len(view) == len(TEXTS) + 2
+    assert list(view) == TEXTS + ["log 1", "log 2"]
+    assert view[3:6] == TEXTS[3:] + ["log 1"] and view[-1] == "log 2" and view[::3] == [TEXTS[0], TEXTS[3], "log 2"]
+    with pytest.raises(IndexError):
+        view[len(view)]
+
+    rows = [{"url": "c", "page": 1}, None]
+    metadata = ConcatColumn([MetadataColumn.from_rows(ROWS), rows])
+    expected = [row.get("url") if isinstance(row, dict) else None for row in ROWS + rows]
+    assert metadata.field("url") == expected
+    assert metadata.field("url", start=5) == expected[5:]
+
+    # `lengths` fixa o tamanho das partes mesmo que a lista continue crescendo
+    fixed = ConcatColumn([texts, rows], lengths=[len(texts), 1])
+    rows.append({"url": "d"})
+    assert len(fixed) == len(TEXTS) + 1 and fixed.field("url", start=len(TEXTS)) == ["c"]
+
+
+def _write_legacy_collection(name, documents, metadata, dimension):
+    # Formato anterior aos segmentos: um arquivo de vetores, um pickle e um JSON por coleção
+    os.makedirs(DATA_DIR, exist_ok=True)
+    vectors = HashingEmbedder().encode(documents)
+    assert vectors.shape[1] == dimension
+    np.save(os.path.join(DATA_DIR, f"{name}_vectors.npy"), vectors)
+    with open(os.path.join(DATA_DIR, f"{name}_documents.pkl"), "wb") as f:
+        pickle.dump(documents, f)
+    if metadata is not None:
+        with open(os.path.join(DATA_DIR, f"{name}_metadata.json"), "w", encoding="utf-8") as f:
+            json.dump(metadata, f, ensure_ascii=False)
+
+
+def _segment_files(name):
+    segments_dir = os.path.join(DATA_DIR, name)
+    return {filename for _, _, files in os.walk(segments_dir) for filename in files}
+
+
+def test_legacy_files_are_migrated_to_columns():
+    documents = [f"Aviso {i}: resultado da seleção do campus {i}" for i in range(6)]
+    metadata = [{"url": f"https://exemplo.edu.br/{i}", "chunk": i} for i in range(5)] + [None]
+    _write_legacy_collection("antiga", documents, metadata, HashingEmbedder.dimension)
+
+    store = SegmentStore(DATA_DIR, "antiga", HashingEmbedder.dimension)
+    store.load()
+    assert list(store.documents) == documents and list(store.metadata) == metadata
+    # Os IDs antigos eram as posições das linhas
+    assert store.all_ids.tolist() == list(range(6))
+    np.testing.assert_allclose(np.linalg.norm(store.stack_vectors(), axis=1), 1.0, rtol=1e-5)
+    store.close()
+
+    files = _segment_files("antiga")
+    assert any(f.endswith("_metadata.npz") for f in files) and any(f.endswith("_documents.utf8") for f in files)
+    assert not [f for f in files if f.endswith(("_documents.pkl", "_metadata.json"))]
+    assert not [f for f in os.listdir(DATA_DIR) if f.startswith("antiga_")]
+
+    # Reabrir a coleção já convertida não muda nada
+    reloaded = SegmentStore(DATA_DIR, "antiga", HashingEmbedder.dimension)
+    reloaded.load()
+    assert list(reloaded.documents) == documents and list(reloaded.metadata) == metadata
+    reloaded.close()
+
+
+def test_legacy_collection_without_metadata(open_collection):
+    documents = ["Calendário acadêmico 2024", "Resultado do vestibular", "Horário dos ônibus do campus"]
+    _write_legacy_collection("sem_metadados", documents, None, HashingEmbedder.dimension)
+
+    vector_db = open_collection("sem_metadados")
+    result = vector_db.query("resultado do vestibular", n_results=1)
+    assert result["documents"] == ["Resultado do vestibular"]
+    assert vector_db.store.metadata[:] == [None, None, None]
+
+    ids = vector_db.add_documents(["Matrícula dos aprovados"], [{"url": "https://exemplo.edu.br/m"}])["ids"]
+    vector_db.checkpoint()
+    assert vector_db.query("matrícula aprovados", n_results=1)["ids"] == ids
+    assert not [f for f in _segment_files("sem_metadados") if f.endswith(("_documents.pkl", "_metadata.json"))]
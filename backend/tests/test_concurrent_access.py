@@ -0,0 +1,113 @@
+import threading
+from services.concurrency import ReadWriteLock
+
+BASE = [f"Documento fixo número {i} sobre tema{i} e assunto{i}" for i in range(20)]
+
+
+def _check_result(result):
+    assert len(result["ids"]) == len(result["documents"]) == len(result["metadatas"]) == len(result["scores"])
+    assert len(set(result["ids"])) == len(result["ids"])
+    # Cada ID vem com o seu próprio texto e metadados
+    for document, metadata in zip(result["documents"], result["metadatas"]):
+        assert document.endswith(metadata["key"])
+
+
+def test_queries_during_adds_and_deletes(open_collection):
+    vector_db = open_collection("concurrent", compaction_threshold=0.3)
+    vector_db.add_documents([f"{text} {i}" for i, text in enumerate(BASE)], [{"key": str(i)} for i in range(len(BASE))])
+    base_ids = set(vector_db.store.all_ids.tolist())
+
+    errors = []
+    added, deleted = [], []
+    stop = threading.Event()
+
+    def guarded(target):
+        def run():
+            try:
+                target()
+            except Exception as e:
+                errors.append(e)
+                stop.set()
+        return threading.Thread(target=run)
+
+    def writer(worker):
+        for batch in range(15):
+            if stop.is_set():
+                return
+            keys = [f"w{worker}-{batch}-{i}" for i in range(8)]
+            ids = vector_db.add_documents(
+                [f"Texto temporário {worker} {batch} {i} {key}" for i, key in enumerate(keys)],
+                [{"key": key} for key in keys]
+            )["ids"]
+            added.extend(ids)
+            # Metade de cada lote é removida logo depois (com compactações em segundo plano)
+            assert vector_db.delete(ids[::2]) == {"success": True}
+            deleted.extend(ids[::2])
+
+    def reader(worker):
+        while not stop.is_set():
+            for i in range(worker, len(BASE), 3):
+                for mode in ("dense", "hybrid"):
+                    # Removidos antes do início da consulta não podem aparecer nela
+                    deleted_before = set(deleted)
+                    result = vector_db.query(f"{BASE[i]} {i}", n_results=5, mode=mode)
+                    _check_result(result)
+                    # Os documentos fixos nunca são removidos e continuam sendo encontrados
+                    assert result["documents"][0] == f"{BASE[i]} {i}"
+                    assert not set(result["ids"]) & deleted_before
+            for result in vector_db.query_many(BASE[:4], n_results=3):
+                _check_result(result)
+
+    writers = [guarded(lambda worker=worker: writer(worker)) for worker in range(2)]
+    readers = [guarded(lambda worker=worker: reader(worker)) for worker in range(3)]
+    for thread in readers + writers:
+        thread.start()
+    for thread in writers:
+        thread.join()
+    stop.set()
+    for thread in readers:
+        thread.join()
+
+    assert errors == []
+    live = set(vector_db.ids)
+    assert live == base_ids | (set(added) - set(deleted))
+    assert vector_db.store.live_count == len(live)
+    for i, text in enumerate(BASE):
+        assert vector_db.query(f"{text} {i}", n_results=1)["documents"] == [f"{text} {i}"]
+
+
+def test_read_write_lock_excludes_writers():
+    lock = ReadWriteLock()
+    state = {"readers": 0, "writers": 0, "max_readers": 0}
+    guard = threading.Lock()
+    errors = []
+
+    def read():
+        for _ in range(200):
+            with lock.read():
+                with guard:
+                    state["readers"] += 1
+                    state["max_readers"] = max(state["max_readers"], state["readers"])
+                    if state["writers"]:
+                        errors.append("leitura durante escrita")
+                with guard:
+                    state["readers"] -= 1
+
+    def write():
+        for _ in range(100):
+            with lock.write():
+                # Escrita reentrante na mesma thread, e leitura dentro da escrita
+                with lock.write(), lock.read():
+                    with guard:
+                        state["writers"] += 1
+                        if state["readers"] or state["writers"] > 1:
+                            errors.append("escrita concorrente")
+                    with guard:
+                        state["writers"] -= 1
+
+    threads = [threading.Thread(target=read) for _ in range(4)] + [threading.Thread(target=write) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
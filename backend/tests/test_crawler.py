@@ -0,0 +1,109 @@
+import asyncio
+from services.crawler import SiteCrawler, normalize_url, site_key
+from services.html_extraction import extract_html
+
+
+def parse(url, content):
+    title, text, links = extract_html(content, url)
+    return {"url": url, "title": title, "chunks": [], "success": True, "error": None}, links
+
+
+def page(title, *links):
+    anchors = "".join(f'<a href="{link}">{link}</a> ' for link in links)
+    return f"<html><head><title>{title}</title></head><body><p>{title}</p>{anchors}</body></html>"
+
+
+def crawl(start_url, **options):
+    async def run():
+        return [result async for result in SiteCrawler(parse, **options).crawl(start_url)]
+    return asyncio.run(run())
+
+
+def test_normalize_url():
+    assert normalize_url("/a#secao", "http://exemplo.edu.br/x/") == "http://exemplo.edu.br/a"
+    assert normalize_url("http://exemplo.edu.br") == "http://exemplo.edu.br/"
+    assert normalize_url("mailto:contato@exemplo.edu.br") is None
+    assert site_key("http://WWW.Exemplo.edu.br/a") == site_key("http://exemplo.edu.br/") == "exemplo.edu.br"
+
+
+def test_concurrency_limit(serve_site):
+    site = serve_site(delay=0.05)
+    site.pages["/"] = page("Início", *[f"/p{i}" for i in range(12)])
+    for i in range(12):
+        site.pages[f"/p{i}"] = page(f"Página {i}")
+
+    results = crawl(site.url(), max_pages=20, max_concurrency=3, max_per_host=10)
+    assert len(results) == 13 and all(result["success"] for result in results)
+    # Vários downloads em paralelo, nunca mais que o limite (robots.txt e sitemap vêm antes)
+    assert 2 <= site.max_in_flight <= 3
+
+    site.max_in_flight = 0
+    crawl(site.url(), max_pages=20, max_concurrency=8, max_per_host=2)
+    assert site.max_in_flight == 2
+
+
+def test_same_domain_only(serve_site):
+    site, other = serve_site(), serve_site()
+    # "localhost" e "127.0.0.1" são domínios diferentes para o rastreador
+    external = other.url("/externa").replace("127.0.0.1", "localhost")
+    site.pages["/"] = page("Início", "/interna", external, "https://www.gov.br/", "mailto:contato@exemplo.edu.br")
+    site.pages["/interna"] = page("Interna")
+    other.pages["/externa"] = page("Externa")
+
+    results = crawl(site.url(), max_pages=10)
+    assert sorted(result["url"] for result in results) == [site.url("/"), site.url("/interna")]
+    assert other.requests == []
+
+
+def test_robots_txt(serve_site):
+    site = serve_site()
+    site.pages["/robots.txt"] = "User-agent: *\nDisallow: /privado\n"
+    site.pages["/"] = page("Início", "/publico", "/privado/dados", "/privado")
+    site.pages["/publico"] = page("Público")
+    site.pages["/privado"] = page("Privado")
+    site.pages["/privado/dados"] = page("Dados")
+
+    results = crawl(site.url(), max_pages=10)
+    assert sorted(result["url"] for result in results) == [site.url("/"), site.url("/publico")]
+    assert site.fetched("/privado") == site.fetched("/privado/dados") == 0
+
+    # Sem respeitar o robots.txt (URL pedida explicitamente), ele nem é lido
+    site.requests.clear()
+    results = crawl(site.url(), max_pages=10, respect_robots=False)
+    assert len(results) == 4 and site.fetched("/robots.txt") == 0
+
+
+def test_max_pages(serve_site):
+    site = serve_site()
+    site.pages["/"] = page("Início", *[f"/p{i}" for i in range(30)])
+    for i in range(30):
+        site.pages[f"/p{i}"] = page(f"Página {i}", f"/p{(i + 1) % 30}")
+
+    results = crawl(site.url(), max_pages=5, max_concurrency=4)
+    assert len(results) == 5
+    assert sum(1 for path in site.requests if path.startswith("/p") or path == "/") == 5
+
+
+def test_urls_are_fetched_once(serve_site):
+    site = serve_site()
+    site.pages["/"] = page("Início", "/a", "/a#topo", "/a#fim", site.url("/a"), "/b", "./b#x", "/")
+    site.pages["/a"] = page("A", "/", "/b", "/a")
+    site.pages["/b"] = page("B", "/a#b", "/")
+    site.pages["/sitemap.xml"] = (
+        '<?xml version="1.0"?><urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+        f"<url><loc>{site.url('/a')}</loc></url><url><loc>{site.url('/c')}</loc></url></urlset>"
+    )
+    site.pages["/c"] = page("C", "/a")
+
+    results = crawl(site.url(), max_pages=10)
+    assert sorted(result["url"] for result in results) == [site.url(path) for path in ("/", "/a", "/b", "/c")]
+    assert [site.fetched(path) for path in ("/", "/a", "/b", "/c")] == [1, 1, 1, 1]
+
+
+def test_failed_pages_are_reported(serve_site):
+    site = serve_site()
+    site.pages["/"] = page("Início", "/quebrada")
+
+    results = {result["url"]: result for result in crawl(site.url(), max_pages=10)}
+    assert results[site.url("/")]["success"]
+    assert not results[site.url("/quebrada")]["success"] and "404" in results[site.url("/quebrada")]["error"]
@@ -0,0 +1,105 @@
+import asyncio
+import threading
+from concurrent.futures import CancelledError
+import numpy as np
+import pytest
+from services.embedding_scheduler import EmbeddingScheduler
+
+
+class RecordingModel:
+    """Modelo que registra cada chamada a `encode`; com `gate`, a primeira fica presa até ele ser liberado."""
+
+    def __init__(self, fail=False):
+        self.calls = []
+        self.fail = fail
+        self.gate = threading.Event()
+        self.entered = threading.Event()
+
+    def encode(self, texts, batch_size=32):
+        self.calls.append(list(texts))
+        if len(self.calls) == 1:
+            self.entered.set()
+            self.gate.wait(5)
+        if self.fail:
+            raise RuntimeError("falha no modelo")
+        return np.array([[len(text), i] for i, text in enumerate(texts)], dtype=np.float32)
+
+
+def _hold_worker(scheduler, model):
+    # Ocupa a thread do agendador, para que os próximos pedidos se acumulem na fila
+    first = scheduler.submit("aquecimento")
+    assert model.entered.wait(5)
+    return first
+
+
+def test_concurrent_submits_share_one_encode_call():
+    model = RecordingModel()
+    scheduler = EmbeddingScheduler(model, max_batch_size=32, max_wait_ms=50)
+    first = _hold_worker(scheduler, model)
+
+    texts = [f"consulta {'x' * i}" for i in range(8)]
+    futures = [None] * len(texts)
+
+    def submit(i):
+        futures[i] = scheduler.submit(texts[i])
+
+    threads = [threading.Thread(target=submit, args=(i,)) for i in range(len(texts))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    model.gate.set()
+
+    first.result(5)
+    results = {text: future.result(5) for text, future in zip(texts, futures)}
+    assert len(model.calls) == 2 and sorted(model.calls[1]) == sorted(texts)
+    # Cada pedido recebe o embedding do seu próprio texto
+    assert all(embedding[0] == len(text) for text, embedding in results.items())
+
+
+def test_batches_respect_max_batch_size():
+    model = RecordingModel()
+    scheduler = EmbeddingScheduler(model, max_batch_size=4, max_wait_ms=50)
+    first = _hold_worker(scheduler, model)
+    futures = [scheduler.submit(f"consulta {i}") for i in range(10)]
+    model.gate.set()
+
+    first.result(5)
+    for future in futures:
+        future.result(5)
+    assert [len(call) for call in model.calls[1:]] == [4, 4, 2]
+
+
+def test_encode_error_reaches_every_caller():
+    model = RecordingModel(fail=True)
+    scheduler = EmbeddingScheduler(model, max_wait_ms=50)
+
+    async def run():
+        first = asyncio.wrap_future(_hold_worker(scheduler, model))
+        waiting = [scheduler.encode(f"consulta {i}") for i in range(5)]
+        model.gate.set()
+        return await asyncio.gather(first, *waiting, return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert len(results) == 6
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+    # A thread do agendador continua atendendo depois do erro
+    model.fail = False
+    assert scheduler.submit("nova consulta").result(5)[0] == len("nova consulta")
+
+
+def test_cancelled_requests_are_not_encoded():
+    model = RecordingModel()
+    scheduler = EmbeddingScheduler(model, max_wait_ms=50)
+    first = _hold_worker(scheduler, model)
+    cancelled = scheduler.submit("cancelada")
+    kept = scheduler.submit("mantida")
+    assert cancelled.cancel()
+    model.gate.set()
+
+    first.result(5)
+    assert kept.result(5)[0] == len("mantida")
+    with pytest.raises(CancelledError):
+        cancelled.result(0)
+    assert model.calls[1:] == [["mantida"]]
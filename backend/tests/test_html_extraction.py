@@ -0,0 +1,44 @@
+from services.html_extraction import extract_html
+
+URL = "https://www.exemplo.edu.br/noticias/1"
+
+PARAGRAPHS = "".join(
+    f"<p>O campus publicou o resultado da seleção {i}, com a lista de aprovados, os prazos de matrícula "
+    f"e os documentos exigidos para o curso técnico.</p>"
+    for i in range(3)
+)
+
+
+def extract(body, head="<title>Notícias - Instituto</title>"):
+    html = f"<html><head>{head}</head><body>{body}</body></html>"
+    return extract_html(html.encode("utf-8"), URL)
+
+
+def lines(text):
+    return [line.strip() for line in text.splitlines() if line.strip()]
+
+
+def test_heading_outside_main_content():
+    title, text, _ = extract(
+        '<nav><a href="/">Início</a></nav>'
+        "<header><h1>Resultado da seleção de 2024</h1></header>"
+        f"<main>{PARAGRAPHS}</main>"
+    )
+    assert title == "Notícias - Instituto"
+    assert lines(text)[0] == "Resultado da seleção de 2024"
+
+
+def test_heading_before_scored_block():
+    _, text, _ = extract(f'<div id="topo"><h1>Resultado da seleção de 2024</h1></div><div>{PARAGRAPHS}</div>')
+    assert lines(text)[0] == "Resultado da seleção de 2024"
+    assert "seleção 2," in text
+
+
+def test_heading_inside_main_content_is_kept_once():
+    _, text, _ = extract(f"<article><h1>Resultado da seleção de 2024</h1>{PARAGRAPHS}</article>")
+    assert text.count("Resultado da seleção de 2024") == 1
+
+
+def test_heading_as_title_fallback():
+    title, _, _ = extract(f"<main><h1>Resultado da seleção de 2024</h1>{PARAGRAPHS}</main>", head="")
+    assert title == "Resultado da seleção de 2024"
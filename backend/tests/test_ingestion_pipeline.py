@@ -0,0 +1,168 @@
+import asyncio
+import os
+import random
+import threading
+import pytest
+from PyPDF2 import PdfReader
+from conftest import make_pdf
+from services.collection_manager import CollectionManager
+from services.ingestion_jobs import UPLOAD_PDF, upload_pdf
+from services.ingestion_pipeline import IngestionPipeline
+from services.job_queue import JobQueue
+from services.model_provider import DEFAULT_COLLECTION, model_provider
+from services.pdf_processor import OrganizedChunker, PDFProcessorService, _extract_page_texts, iter_pdf_chunks
+
+WORDS = "edital inscrição matrícula campus curso técnico prazo resultado seleção biblioteca ônibus calendário".split()
+
+
+def pdf_pages(count=12, seed=1):
+    # Páginas de tamanhos variados, inclusive vazias, com linhas curtas (removidas na limpeza) e longas
+    rng = random.Random(seed)
+    return [
+        [" ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 14))) for _ in range(rng.randint(0, 30))]
+        for _ in range(count)
+    ]
+
+
+def write_pdf(path, pages):
+    # Caminho absoluto: os processos do pdf_pool podem ter sido criados em outro diretório de trabalho
+    path = os.path.abspath(path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(make_pdf(pages))
+    return path
+
+
+def full_text_chunks(path, filename, chunk_size):
+    """Chunks calculados sobre o texto limpo do documento inteiro, de uma vez."""
+    service = PDFProcessorService()
+    reader = PdfReader(path)
+    total_pages = len(reader.pages)
+    text = "".join(service._page_text(n, t) for n, t in _extract_page_texts(reader, 0, total_pages))
+    chunker = OrganizedChunker(service, filename, chunk_size, total_pages)
+    return chunker.feed(service._clean_text(text)) + chunker.finish()
+
+
+async def collect(generator):
+    return [item async for item in generator]
+
+
+@pytest.mark.parametrize("chunk_size, pages_per_task", [(100, 1), (500, 3), (1000, 16)])
+def test_iter_pdf_chunks_matches_full_text(chunk_size, pages_per_task):
+    path = write_pdf("edital.pdf", pdf_pages())
+    progress = []
+    groups = asyncio.run(collect(iter_pdf_chunks(
+        path, "edital.pdf", chunk_size, pages_per_task=pages_per_task, on_pages=lambda *args: progress.append(args)
+    )))
+    chunks = [chunk for group in groups for chunk in group]
+
+    expected = full_text_chunks(path, "edital.pdf", chunk_size)
+    assert len(expected) > 1 and chunks == expected
+    assert [chunk["chunk_index"] for chunk in chunks] == list(range(len(chunks)))
+    with open(path, "rb") as f:
+        assert PDFProcessorService().process_pdf(f.read(), "edital.pdf", chunk_size) == expected
+    assert progress[0] == (0, 12) and progress[-1] == (12, 12)
+
+
+def source(groups, produced):
+    async def generate():
+        try:
+            for i in range(groups):
+                produced.append(i)
+                yield [f"Trecho {i}.{j} sobre o calendário acadêmico" for j in range(2)], None, None
+        finally:
+            produced.append("fechada")
+
+    return generate()
+
+
+def test_slow_writes_hold_back_the_source(open_collection):
+    vector_db = open_collection("lenta")
+    add_documents, gate, writes = vector_db.add_documents, threading.Event(), []
+
+    def slow_add(*args, **kwargs):
+        writes.append(len(args[0]))
+        gate.wait(10)
+        return add_documents(*args, **kwargs)
+
+    vector_db.add_documents = slow_add
+    produced = []
+    batch_size, max_pending_batches = 4, 2
+    pipeline = IngestionPipeline(vector_db, batch_size=batch_size, max_pending_batches=max_pending_batches)
+
+    async def run():
+        task = asyncio.create_task(pipeline.run(source(50, produced)))
+        await asyncio.sleep(0.3)
+        stalled = len(produced), len(writes)
+        gate.set()
+        return stalled, await task
+
+    (stalled, started_writes), report = asyncio.run(run())
+    # Presos: um lote gravando, `max_pending_batches` na fila, um completo esperando
+    # vaga e o grupo seguinte, já produzido (2 chunks por grupo)
+    assert started_writes == 1 and stalled <= (1 + max_pending_batches + 1) * batch_size // 2 + 1
+    assert report["documents"] == 100 and report["batches"] == 25 and len(report["ids"]) == 100
+    assert produced[-1] == "fechada" and len(produced) == 51
+
+
+def test_write_error_stops_the_source(open_collection):
+    vector_db = open_collection("falha")
+    add_documents = vector_db.add_documents
+
+    def failing_add(*args, **kwargs):
+        if vector_db.store.live_count >= 8:
+            raise OSError("disco cheio")
+        return add_documents(*args, **kwargs)
+
+    vector_db.add_documents = failing_add
+    produced = []
+    pipeline = IngestionPipeline(vector_db, batch_size=4, max_pending_batches=1)
+
+    with pytest.raises(OSError, match="disco cheio"):
+        asyncio.run(pipeline.run(source(50, produced)))
+    # A fonte foi encerrada sem ser consumida até o fim; os lotes gravados permanecem
+    assert produced[-1] == "fechada" and len(produced) < 20
+    assert vector_db.store.live_count == 8
+
+
+@pytest.fixture
+def pdf_jobs(monkeypatch):
+    """Fila de tarefas com o handler de PDFs, sobre um registro de coleções próprio do teste."""
+    monkeypatch.setattr(model_provider, "collections", CollectionManager(DEFAULT_COLLECTION))
+    queue = JobQueue("data/jobs/jobs.sqlite3", progress_interval=0.0)
+    queue.register(UPLOAD_PDF, upload_pdf)
+    queue.start()
+    yield queue
+    queue.stop(timeout=5)
+    for vector_db in model_provider.collections.opened().values():
+        vector_db.unload()
+
+
+def submit_pdf(queue, collection):
+    path = write_pdf("data/jobs/uploads/edital.pdf", pdf_pages())
+    job = queue.submit(UPLOAD_PDF, {"path": path, "filename": "edital.pdf", "chunk_size": 300, "collection": collection})
+    return asyncio.run(asyncio.wait_for(queue.wait(job["id"], poll_interval=0.05), 30))
+
+
+def test_pdf_job_indexes_every_chunk(pdf_jobs):
+    job = submit_pdf(pdf_jobs, "pdfs")
+    assert job["status"] == "completed", job["error"]
+    expected = full_text_chunks(job["params"]["path"], "edital.pdf", 300)
+    assert job["result"]["chunks_extracted"] == len(expected) == job["progress"]["chunks_indexed"]
+    assert job["progress"]["done"] == job["progress"]["total"] == 12
+
+    vector_db = model_provider.get_vector_db("pdfs")
+    assert vector_db.store.live_count == job["result"]["documents_added"]
+    assert sorted(vector_db.store.documents) == sorted(chunk["text"] for chunk in expected)
+
+
+def test_write_error_fails_the_job(pdf_jobs):
+    vector_db = model_provider.get_vector_db("pdfs")
+
+    def failing_add(*args, **kwargs):
+        raise OSError("disco cheio")
+
+    vector_db.add_documents = failing_add
+    job = submit_pdf(pdf_jobs, "pdfs")
+    assert job["status"] == "failed" and job["error_type"] == "OSError"
+    assert "disco cheio" in job["error"]
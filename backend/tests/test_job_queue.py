@@ -0,0 +1,194 @@
+import asyncio
+import os
+import threading
+import time
+import uuid
+import pytest
+from services.job_queue import JobQueue, JobStore
+
+PATH = "data/jobs/jobs.sqlite3"
+
+
+class Handlers:
+    """Handlers de teste: registram cada execução (e por qual fila) e podem ficar presos até `release`."""
+
+    def __init__(self):
+        self.runs = []
+        self.finished = []
+        self.release = threading.Event()
+        self._lock = threading.Lock()
+
+    def queue(self, lease_seconds=60.0, max_workers=2):
+        queue = JobQueue(PATH, max_workers=max_workers, progress_interval=0.0, lease_seconds=lease_seconds)
+
+        async def echo(context):
+            with self._lock:
+                self.runs.append((context.id, queue.owner))
+            return {"value": context.params["value"]}
+
+        async def blocking(context):
+            with self._lock:
+                self.runs.append((context.id, queue.owner))
+            while not self.release.is_set():
+                await asyncio.sleep(0.01)
+            return {}
+
+        async def failing(context):
+            raise ValueError("parâmetro inválido")
+
+        queue.register("echo", echo)
+        queue.register("blocking", blocking, on_finish=lambda job: self.finished.append(job["id"]))
+        queue.register("failing", failing)
+        return queue
+
+
+@pytest.fixture
+def handlers():
+    handlers = Handlers()
+    yield handlers
+    handlers.release.set()
+
+
+@pytest.fixture
+def open_queue(handlers):
+    """Cria JobQueues sobre o mesmo SQLite (como workers do uvicorn) e os encerra ao fim do teste."""
+    queues = []
+
+    def open_queue(**options):
+        queue = handlers.queue(**options)
+        queues.append(queue)
+        queue.start()
+        return queue
+
+    yield open_queue
+    for queue in queues:
+        queue.stop(timeout=5)
+
+
+def wait(queue, job_id, timeout=10):
+    return asyncio.run(asyncio.wait_for(queue.wait(job_id, poll_interval=0.05), timeout))
+
+
+def wait_for(condition, timeout=10):
+    deadline = time.time() + timeout
+    while not condition():
+        assert time.time() < deadline, "condição não atingida"
+        time.sleep(0.01)
+
+
+def open_store():
+    os.makedirs(os.path.dirname(PATH), exist_ok=True)
+    return JobStore(PATH)
+
+
+def running_job(store, owner, heartbeat):
+    now = time.time()
+    job = {
+        "id": uuid.uuid4().hex, "kind": "echo", "status": "running", "params": {"value": 1}, "progress": {},
+        "result": None, "error": None, "error_type": None, "attempts": 1, "created_at": now,
+        "started_at": now, "finished_at": None, "updated_at": now, "owner": owner, "heartbeat": heartbeat
+    }
+    store.insert(job)
+    return job["id"]
+
+
+def test_submit_and_wait(open_queue, handlers):
+    queue = open_queue()
+    job = wait(queue, queue.submit("echo", {"value": 3})["id"])
+    assert job["status"] == "completed" and job["result"] == {"value": 3}
+    assert job["attempts"] == 1 and job["owner"] == queue.owner
+
+    failed = wait(queue, queue.submit("failing", {})["id"])
+    assert failed["status"] == "failed" and failed["error_type"] == "ValueError"
+    with pytest.raises(ValueError):
+        queue.submit("desconhecido", {})
+
+
+def test_cancel_running_job(open_queue, handlers):
+    queue = open_queue()
+    job_id = queue.submit("blocking", {})["id"]
+    wait_for(lambda: handlers.runs)
+
+    assert queue.cancel(job_id)["status"] in ("running", "cancelled")
+    assert wait(queue, job_id)["status"] == "cancelled"
+    assert handlers.finished == [job_id]
+    with pytest.raises(ValueError):
+        queue.cancel(job_id)
+
+
+def test_stopped_job_is_resumed(open_queue, handlers):
+    queue = open_queue()
+    job_id = queue.submit("blocking", {})["id"]
+    wait_for(lambda: handlers.runs)
+    queue.stop(timeout=5)
+    store = open_store()
+    assert store.get(job_id)["status"] == "queued" and store.get(job_id)["owner"] is None
+    store.close()
+
+    handlers.release.set()
+    job = wait(open_queue(), job_id)
+    assert job["status"] == "completed" and job["attempts"] == 2
+
+
+def test_only_expired_leases_are_requeued(open_queue, handlers):
+    store = open_store()
+    live = running_job(store, "outro-processo", time.time())
+    expired = running_job(store, "processo-encerrado", time.time() - 120)
+    legacy = running_job(store, None, None)
+    store.close()
+
+    queue = open_queue(lease_seconds=60.0)
+    assert wait(queue, expired)["status"] == "completed"
+    assert wait(queue, legacy)["status"] == "completed"
+    # A tarefa de um processo que continua renovando a posse não é tocada
+    job = queue.get(live)
+    assert job["status"] == "running" and job["owner"] == "outro-processo"
+    assert live not in [job_id for job_id, _ in handlers.runs]
+
+
+def test_claim_is_atomic():
+    store = open_store()
+    job_ids = [running_job(store, None, None) for _ in range(20)]
+    for job_id in job_ids:
+        store.update(job_id, status="queued")
+    stores = [open_store() for _ in range(4)]
+    claims = []
+
+    def claim(store, owner):
+        for job_id in job_ids:
+            if store.claim(job_id, owner) is not None:
+                claims.append((job_id, owner))
+
+    threads = [threading.Thread(target=claim, args=(other, f"dono-{i}")) for i, other in enumerate(stores)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(job_id for job_id, _ in claims) == sorted(job_ids)
+    assert all(store.get(job_id)["owner"] == owner for job_id, owner in claims)
+    for other in stores + [store]:
+        other.close()
+
+
+def test_queues_sharing_a_store_run_each_job_once(open_queue, handlers):
+    first, second = open_queue(lease_seconds=0.3), open_queue(lease_seconds=0.3)
+    job_ids = [first.submit("echo", {"value": i})["id"] for i in range(6)]
+    job_ids += [second.submit("echo", {"value": i})["id"] for i in range(6)]
+
+    for job_id in job_ids:
+        assert wait(first, job_id)["status"] == "completed"
+    assert sorted(job_id for job_id, _ in handlers.runs) == sorted(job_ids)
+
+
+def test_cancel_from_another_queue(open_queue, handlers):
+    first, second = open_queue(lease_seconds=0.3), open_queue(lease_seconds=0.3)
+    job_id = first.submit("blocking", {})["id"]
+    wait_for(lambda: handlers.runs)
+    owner = handlers.runs[0][1]
+    other = second if owner == first.owner else first
+
+    other.cancel(job_id)
+    assert wait(other, job_id)["status"] == "cancelled"
+    # O processo que executava a tarefa a interrompe e chama on_finish
+    wait_for(lambda: handlers.finished == [job_id])
+    assert first.get(job_id)["status"] == "cancelled"
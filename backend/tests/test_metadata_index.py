@@ -0,0 +1,46 @@
+import pytest
+from services.metadata_index import MetadataIndex, INDEXED_METADATA
+
+
+def _index(rows):
+    index = MetadataIndex()
+    columns = {field: [row.get(field) for row in rows] for field in INDEXED_METADATA}
+    index.add(list(range(len(rows))), columns)
+    return index
+
+
+ROWS = [
+    {"url": "https://a.edu.br/1", "content_type": "website", "ingested_at": "2024-01-10T08:00:00"},
+    {"filename": "edital.pdf", "page_start": 1, "page": 2, "ingested_at": "2024-02-10T08:00:00"},
+    {"filename": "edital.pdf", "page_start": 3, "page": 3, "ingested_at": "2024-03-10T08:00:00"},
+]
+
+
+def test_date_range():
+    index = _index(ROWS)
+    assert index.select({"ingested_at": {"$gte": "2024-02-01"}}).tolist() == [1, 2]
+    assert index.select({"ingested_at": {"$lt": "2024-03-10T08:00:00"}}).tolist() == [0, 1]
+
+
+@pytest.mark.parametrize("condition", [
+    {"$gte": "2000"},
+    {"$lte": "ontem"},
+    "10/02/2024",
+    {"$gte": "2024-01-01", "$lt": None},
+])
+def test_invalid_date_in_filter_is_rejected(condition):
+    with pytest.raises(ValueError):
+        _index(ROWS).select({"ingested_at": condition})
+
+
+def test_invalid_ingest_date_is_not_indexed():
+    # Na inclusão, uma data inválida só deixa a linha sem data (fora das faixas)
+    index = _index([{"url": "https://a.edu.br/2", "ingested_at": "data ruim"}] + ROWS)
+    assert index.select({"ingested_at": {"$gte": "2000-01-01"}}).tolist() == [1, 2, 3]
+
+
+def test_invalid_date_in_query(open_collection):
+    vector_db = open_collection()
+    vector_db.add_documents(["calendário acadêmico"], [{"url": "https://a.edu.br/calendario"}])
+    with pytest.raises(ValueError):
+        vector_db.query("calendário", where={"ingested_at": {"$gte": "2000"}})
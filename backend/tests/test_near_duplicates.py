@@ -0,0 +1,91 @@
+import pytest
+
+MENU = (
+    "Início | Institucional | Ensino | Pesquisa | Extensão | Processos seletivos | Editais | "
+    "Assistência estudantil | Biblioteca | Contato | Acesso à informação | Ouvidoria"
+)
+NOTICE = (
+    "O campus Recife divulga o resultado preliminar da seleção de monitores para o semestre letivo, "
+    "com a lista dos aprovados, o prazo para recursos e as datas de assinatura dos termos de compromisso"
+)
+SCHEDULE = (
+    "A biblioteca funciona de segunda a sexta das 7h às 21h e aos sábados das 8h às 12h, com empréstimo "
+    "domiciliar de até cinco livros por estudante e renovação pelo sistema acadêmico"
+)
+
+
+def page(number, text=MENU):
+    return {"url": f"https://www.exemplo.edu.br/pagina-{number}", "title": f"Página {number}", "chunk": 0}, text
+
+
+def variant(text):
+    # Mesmos termos para o tokenizador (caixa e pontuação diferentes), mas outro conteúdo
+    return text.upper().replace("|", "·")
+
+
+def add(vector_db, pages, **options):
+    metadatas, texts = zip(*pages)
+    return vector_db.add_documents(list(texts), list(metadatas), **options)
+
+
+def test_keep_policy_adds_near_duplicates(open_collection):
+    vector_db = open_collection("manter")
+    first = add(vector_db, [page(1)])
+    second = add(vector_db, [page(2, variant(MENU))])
+    assert len(second["ids"]) == 1 and second["ids"] != first["ids"]
+    assert second["near_duplicates"] == []
+
+
+def test_skip_policy(open_collection):
+    vector_db = open_collection("descartar", near_duplicate_policy="skip")
+    first = add(vector_db, [page(1), page(1, NOTICE)])
+    menu_id = first["ids"][0]
+
+    # Quase duplicatas de um trecho existente e de outro trecho do mesmo lote
+    result = add(vector_db, [page(2, variant(MENU)), page(3, SCHEDULE), page(4, variant(SCHEDULE))])
+    assert result["near_duplicates"] == [menu_id, result["ids"][0]]
+    assert len(result["ids"]) == 1 and result["positions"] == [1]
+    assert result["resolved_ids"] == [menu_id, result["ids"][0], result["ids"][0]]
+    # A política "skip" não guarda as fontes descartadas
+    assert vector_db.merged_sources(menu_id) == []
+    assert len(vector_db.query("biblioteca ouvidoria", n_results=10)["ids"]) == 3
+
+    # O trecho removido deixa de absorver os novos
+    vector_db.delete([menu_id])
+    assert len(add(vector_db, [page(5, variant(MENU))])["ids"]) == 1
+
+    with pytest.raises(ValueError):
+        open_collection("invalida", near_duplicate_policy="ignorar")
+
+
+def test_merge_policy_keeps_sources_through_compaction(open_collection):
+    vector_db = open_collection("fundir", near_duplicate_policy="merge", compaction_threshold=1.0)
+    menu_id, notice_id = add(vector_db, [page(1), page(1, NOTICE)])["ids"]
+
+    add(vector_db, [page(2, variant(MENU)), page(3, variant(MENU)), page(2, variant(NOTICE))])
+    # A mesma fonte absorvida de novo não é repetida
+    add(vector_db, [page(2, variant(MENU))])
+    expected = [
+        {"url": "https://www.exemplo.edu.br/pagina-2", "title": "Página 2"},
+        {"url": "https://www.exemplo.edu.br/pagina-3", "title": "Página 3"},
+    ]
+    assert vector_db.merged_sources(menu_id) == expected
+    assert vector_db.merged_sources(notice_id) == expected[:1]
+
+    # As consultas citam as fontes absorvidas junto com a do próprio trecho
+    result = vector_db.query("biblioteca ouvidoria editais", n_results=1)
+    assert result["ids"] == [menu_id]
+    assert result["metadatas"][0]["url"] == "https://www.exemplo.edu.br/pagina-1"
+    assert result["metadatas"][0]["merged_sources"] == expected
+
+    # A compactação descarta as lápides, mas os IDs (e as fontes ligadas a eles) permanecem;
+    # só as fontes de trechos removidos são descartadas
+    vector_db.delete([notice_id])
+    assert vector_db.compact() == {"success": True}
+    assert vector_db.merged_sources(menu_id) == expected
+    assert vector_db.merged_sources(notice_id) == []
+    assert vector_db.query("biblioteca ouvidoria editais", n_results=1)["metadatas"][0]["merged_sources"] == expected
+
+    reopened = open_collection("fundir", near_duplicate_policy="merge")
+    assert reopened.merged_sources(menu_id) == expected and reopened.merged_sources(notice_id) == []
+    assert reopened.query("biblioteca ouvidoria editais", n_results=1)["metadatas"][0]["merged_sources"] == expected
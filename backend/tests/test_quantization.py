@@ -0,0 +1,92 @@
+import numpy as np
+import pytest
+from services import quantization
+from services.quantization import open_quantized_block, quantize
+from services.vector_index import FlatIndex
+
+DIMENSION = 64
+K = 10
+
+
+def _dataset(count=5000, queries=50, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((30, DIMENSION))
+    vectors = centers[rng.integers(0, 30, count)] + 0.5 * rng.standard_normal((count, DIMENSION))
+    vectors = (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+    picked = vectors[rng.integers(0, count, queries)] + 0.2 * rng.standard_normal((queries, DIMENSION))
+    return vectors, (picked / np.linalg.norm(picked, axis=1, keepdims=True)).astype(np.float32)
+
+
+@pytest.fixture(params=["faiss", "numpy"])
+def backend(request, monkeypatch):
+    """Cópia compacta gravada pelo faiss (se instalado) ou, sem ele, em arquivos .npy."""
+    if request.param == "faiss":
+        pytest.importorskip("faiss")
+    else:
+        monkeypatch.setattr(quantization, "faiss", None)
+    return request.param
+
+
+def _index(tmp_path, vectors, precision, rescore_factor=4, dead=()):
+    ids = np.arange(len(vectors), dtype=np.int64)
+    dead = np.asarray(sorted(dead), dtype=np.int64)
+    codes = open_quantized_block(str(tmp_path / "segment"), precision, lambda: vectors) if precision else None
+    return FlatIndex(DIMENSION, lambda: [(vectors, ids, dead, codes)], rescore_factor=rescore_factor)
+
+
+def _recall(expected, found):
+    return np.mean([len(set(a[1].tolist()) & set(b[1].tolist())) / len(a[1]) for a, b in zip(expected, found)])
+
+
+@pytest.mark.parametrize("precision, min_recall", [("float16", 1.0), ("int8", 0.98)])
+def test_recall_with_rescoring(tmp_path, backend, precision, min_recall):
+    vectors, queries = _dataset()
+    expected = _index(tmp_path, vectors, None).search_many(queries, K)
+    found = _index(tmp_path, vectors, precision).search_many(queries, K)
+
+    assert _recall(expected, found) >= min_recall
+    for query, (scores, ids) in zip(queries, found):
+        # Depois da repontuação, as pontuações são as exatas em float32, em ordem
+        np.testing.assert_allclose(scores, vectors[ids] @ query, rtol=1e-5, atol=1e-6)
+        assert np.all(np.diff(scores) <= 0)
+
+
+def test_rescoring_improves_int8_recall(tmp_path, backend):
+    vectors, queries = _dataset()
+    expected = _index(tmp_path, vectors, None).search_many(queries, K)
+    approximate = _index(tmp_path, vectors, "int8", rescore_factor=0).search_many(queries, K)
+    rescored = _index(tmp_path, vectors, "int8", rescore_factor=4).search_many(queries, K)
+    assert _recall(expected, rescored) >= _recall(expected, approximate) >= 0.8
+
+
+@pytest.mark.parametrize("precision", ["float16", "int8"])
+def test_removed_rows_are_excluded(tmp_path, backend, precision):
+    vectors, queries = _dataset(count=2000)
+    removed = {int(i) for _, ids in _index(tmp_path, vectors, None).search_many(queries, 3) for i in ids}
+    for _, ids in _index(tmp_path, vectors, precision, dead=removed).search_many(queries, K):
+        assert len(ids) == K and not removed & set(ids.tolist())
+
+
+def test_int8_codes_approximate_vectors():
+    vectors, _ = _dataset(count=1000)
+    codes, scales = quantize(vectors, "int8")
+    assert codes.dtype == np.int8 and scales.shape == (DIMENSION,)
+    # O erro de cada coordenada é de no máximo meio passo de quantização
+    assert np.all(np.abs(codes * scales - vectors) <= scales / 2 + 1e-6)
+    with pytest.raises(ValueError):
+        quantize(vectors, "int4")
+
+
+@pytest.mark.parametrize("precision", ["float16", "int8"])
+def test_quantized_collection_matches_float32(open_collection, precision):
+    texts = [f"Aviso {i}: inscrições do curso {i % 17} no campus {i % 5}, turma {i % 11}" for i in range(300)]
+    exact = open_collection("exata")
+    compact = open_collection(f"compacta_{precision}", precision=precision)
+    for vector_db in (exact, compact):
+        vector_db.add_documents(texts)
+        vector_db.checkpoint()
+    # Depois do checkpoint, a busca varre a cópia compacta do segmento
+    assert all(view[3] is not None for view in compact.store.views)
+
+    for query in ("inscrições do curso 3 no campus 1", "turma 7", "campus 4 curso 12"):
+        assert compact.query(query, n_results=5)["documents"] == exact.query(query, n_results=5)["documents"]
@@ -0,0 +1,38 @@
+import numpy as np
+from services.segment_store import SegmentStore
+
+
+def _vectors(count, seed=0, dimension=16):
+    return np.random.default_rng(seed).standard_normal((count, dimension)).astype(np.float32)
+
+
+def test_delete_from_fresh_store():
+    store = SegmentStore("data", "fresh", 16)
+    store.load()
+
+    ids = store.append(_vectors(5), [f"doc {i}" for i in range(5)], [{"i": i} for i in range(5)])
+    assert store.delete_ids([ids[1], ids[3]]) == 2
+    # Uma segunda inclusão e remoção, depois do checkpoint, caem no segmento certo
+    store.checkpoint()
+    more = store.append(_vectors(3, seed=1), ["doc 5", "doc 6", "doc 7"], [{}] * 3)
+    assert store.delete_ids([more[0]]) == 1
+    assert store.live_count == 5
+    store.close()
+
+    reloaded = SegmentStore("data", "fresh", 16)
+    reloaded.load()
+    live = reloaded.all_ids[reloaded.live_mask()].tolist()
+    assert live == [ids[0], ids[2], ids[4], more[1], more[2]]
+    reloaded.close()
+
+
+def test_delete_from_fresh_collection(open_collection):
+    vector_db = open_collection("fresh")
+    ids = vector_db.add_documents(["campus recife", "campus olinda", "campus paulista"])["ids"]
+
+    assert vector_db.delete([ids[1]]) == {"success": True}
+    assert vector_db.delete([ids[1]]) == {"success": False}
+
+    result = vector_db.query("campus olinda", n_results=3)
+    assert ids[1] not in result["ids"]
+    assert sorted(result["ids"]) == sorted([ids[0], ids[2]])
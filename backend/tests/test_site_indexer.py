@@ -0,0 +1,96 @@
+import asyncio
+from services.crawl_state import CrawlState
+from services.site_indexer import SiteIndexer
+from services.webscraper import WebScraperService
+
+SHARED = (
+    "Inscrições abertas para os cursos técnicos integrados e subsequentes do campus, com vagas para ampla "
+    "concorrência e cotas, conforme o edital publicado no portal do instituto."
+)
+# O parágrafo repetido forma um chunk inteiro
+CHUNK_SIZE = len(SHARED)
+
+
+def page(*paragraphs, links=()):
+    anchors = "".join(f'<a href="{link}">{link}</a> ' for link in links)
+    body = "".join(f"<p>{paragraph}</p>" for paragraph in paragraphs)
+    return f"<html><head><title>Campus</title></head><body><nav>{anchors}</nav><main>{body}</main></body></html>"
+
+
+def unique(name):
+    return f"A página {name} descreve a coordenação do curso de {name}, seus horários de atendimento e contatos."
+
+
+def index_site(vector_db, url):
+    indexer = SiteIndexer(WebScraperService(), vector_db)
+    return asyncio.run(indexer.index_site(url, max_pages=10, chunk_size=CHUNK_SIZE, respect_robots=False))
+
+
+def page_chunks(vector_db, url):
+    state = CrawlState(SiteIndexer(WebScraperService(), vector_db).state_path)
+    try:
+        return state.get(url)["chunk_ids"]
+    finally:
+        state.close()
+
+
+def chunk_with(vector_db, ids, text):
+    documents, _, all_ids = vector_db.rows()
+    return [doc_id for doc_id, document in zip(all_ids, documents) if doc_id in ids and text in document]
+
+
+def test_shared_chunk_survives_change_in_one_page(serve_site, open_collection):
+    vector_db = open_collection()
+    site = serve_site()
+    site.pages["/"] = page(SHARED, unique("informática"), links=["/quimica"])
+    site.pages["/quimica"] = page(SHARED, unique("química"), links=["/"])
+
+    first = index_site(vector_db, site.url("/"))
+    assert first["pages_new"] == 2 and first["chunks_added"] == 3
+    home, chemistry = page_chunks(vector_db, site.url("/")), page_chunks(vector_db, site.url("/quimica"))
+    # O trecho repetido é incluído uma vez e fica registrado nas duas páginas
+    shared = set(home) & set(chemistry)
+    assert len(shared) == 1 and chunk_with(vector_db, list(shared), "Inscrições abertas") == list(shared)
+
+    # Só a página inicial muda: o trecho continua na coleção para /quimica, que responde 304
+    site.pages["/"] = page(unique("informática"), unique("redes"), links=["/quimica"])
+    second = index_site(vector_db, site.url("/"))
+    assert second["pages_replaced"] == 1 and second["pages_not_modified"] == 1
+    assert vector_db.live_ids(list(shared)) == list(shared)
+    chemistry = page_chunks(vector_db, site.url("/quimica"))
+    assert len(vector_db.live_ids(chemistry)) == len(chemistry)
+    assert not shared & set(page_chunks(vector_db, site.url("/")))
+
+    # Quando nenhuma página cita mais o trecho, ele é removido
+    site.pages["/quimica"] = page(unique("química"), links=["/"])
+    third = index_site(vector_db, site.url("/"))
+    assert third["pages_replaced"] == 1 and third["chunks_deleted"] == 1
+    assert vector_db.live_ids(list(shared)) == []
+
+
+def test_merged_near_duplicate_is_recorded_in_page(serve_site, open_collection):
+    vector_db = open_collection()
+    site = serve_site()
+    site.pages["/"] = page(SHARED, links=["/edital"])
+    site.pages["/edital"] = page(SHARED.replace("portal do instituto", "portal do instituto federal"), links=["/"])
+
+    first = index_site(vector_db, site.url("/"))
+    assert first["pages_new"] == 2 and first["chunks_added"] == 1
+    home, notice = page_chunks(vector_db, site.url("/")), page_chunks(vector_db, site.url("/edital"))
+    assert home == notice and len(home) == 1
+
+    site.pages["/"] = page(unique("informática"), links=["/edital"])
+    second = index_site(vector_db, site.url("/"))
+    assert second["chunks_deleted"] == 0
+    assert vector_db.live_ids(notice) == notice
+
+
+def test_resolved_ids(open_collection):
+    vector_db = open_collection()
+    existing = vector_db.add_documents(["calendário acadêmico de 2024"])["ids"]
+
+    result = vector_db.add_documents(
+        ["horário da biblioteca", "calendário acadêmico de 2024", "horário da biblioteca"], skip_duplicates=True
+    )
+    assert len(result["ids"]) == 1
+    assert result["resolved_ids"] == [result["ids"][0], existing[0], result["ids"][0]]
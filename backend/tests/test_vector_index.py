@@ -0,0 +1,105 @@
+import numpy as np
+import pytest
+from services.vector_index import FlatIndex, create_index
+
+DIMENSION = 32
+K = 10
+
+
+def _normalized(vectors):
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+
+
+def _dataset(count=3000, queries=50, seed=0):
+    # Vetores agrupados (como embeddings de textos de poucos assuntos) e consultas próximas a eles
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((20, DIMENSION))
+    vectors = _normalized(centers[rng.integers(0, 20, count)] + 0.4 * rng.standard_normal((count, DIMENSION)))
+    picked = vectors[rng.integers(0, count, queries)]
+    return vectors, _normalized(picked + 0.1 * rng.standard_normal(picked.shape))
+
+
+def _flat(vectors, ids, dead=()):
+    dead = np.asarray(sorted(np.searchsorted(ids, list(dead))), dtype=np.int64)
+    return FlatIndex(DIMENSION, lambda: [(vectors, ids, dead, None)])
+
+
+def _approximate(index_type, vectors, ids, **params):
+    pytest.importorskip("faiss")
+    index = create_index(index_type, DIMENSION, None, **params)
+    index.add(vectors, ids)
+    return index
+
+
+def _overlap(expected, found):
+    return np.mean([len(set(a[1]) & set(b[1])) / len(a[1]) for a, b in zip(expected, found)])
+
+
+APPROXIMATE = [
+    ("hnsw", {}),
+    ("ivf", {"min_train_size": 1000, "nlist": 16, "nprobe": 8}),
+]
+
+
+@pytest.mark.parametrize("index_type, params", APPROXIMATE)
+def test_parity_with_flat(index_type, params):
+    vectors, queries = _dataset()
+    ids = np.arange(100, 100 + len(vectors), dtype=np.int64)
+    expected = _flat(vectors, ids).search_many(queries, K)
+    found = _approximate(index_type, vectors, ids, **params).search_many(queries, K)
+
+    assert _overlap(expected, found) >= 0.9
+    exact = dict(zip(ids.tolist(), vectors))
+    for query, (scores, found_ids) in zip(queries, found):
+        assert len(found_ids) == K and np.all(np.diff(scores) <= 1e-6)
+        # As pontuações são o produto interno exato dos vetores encontrados
+        np.testing.assert_allclose(scores, [exact[i] @ query for i in found_ids.tolist()], atol=1e-4)
+
+
+@pytest.mark.parametrize("index_type, params", [("flat", {})] + APPROXIMATE)
+def test_removed_rows_are_excluded(index_type, params):
+    vectors, queries = _dataset()
+    ids = np.arange(len(vectors), dtype=np.int64)
+    # Remove os melhores resultados de cada consulta
+    removed = {int(i) for _, best in _flat(vectors, ids).search_many(queries, 3) for i in best}
+
+    if index_type == "flat":
+        results = _flat(vectors, ids, dead=removed).search_many(queries, K)
+    else:
+        index = _approximate(index_type, vectors, ids, **params)
+        results = index.search_many(queries, K, exclude=np.array(sorted(removed)))
+    for _, found_ids in results:
+        assert len(found_ids) == K and not removed & set(found_ids.tolist())
+
+
+def test_ivf_bootstrap_is_exact_until_trained():
+    vectors, queries = _dataset(count=1500)
+    ids = np.arange(len(vectors), dtype=np.int64)
+    index = _approximate("ivf", vectors[:900], ids[:900], min_train_size=1000, nlist=16, nprobe=16)
+
+    # Abaixo de `min_train_size` a busca é exata, no índice provisório
+    assert not index.is_trained and index.ntotal == 900
+    expected = _flat(vectors[:900], ids[:900]).search_many(queries, K)
+    for (expected_scores, expected_ids), (scores, found_ids) in zip(expected, index.search_many(queries, K)):
+        assert found_ids.tolist() == expected_ids.tolist()
+        np.testing.assert_allclose(scores, expected_scores, atol=1e-5)
+
+    # Ao atingir o mínimo, o IVF é treinado com os vetores acumulados, sem perder nenhum
+    index.add(vectors[900:], ids[900:])
+    assert index.is_trained and index.ntotal == len(vectors)
+    # Com nprobe igual a nlist, todas as listas são visitadas: mesmo resultado da busca exata
+    expected = _flat(vectors, ids).search_many(queries, K)
+    assert _overlap(expected, index.search_many(queries, K)) == 1.0
+
+
+def test_approximate_index_round_trip(tmp_path):
+    vectors, queries = _dataset(count=1200)
+    ids = np.arange(len(vectors), dtype=np.int64)
+    index = _approximate("ivf", vectors, ids, min_train_size=1000, nlist=16, nprobe=4)
+    path = str(tmp_path / "index.faiss")
+    index.save(path)
+
+    reloaded = create_index("ivf", DIMENSION, None, min_train_size=1000, nlist=16, nprobe=4)
+    assert reloaded.load(path) and reloaded.is_trained
+    for (_, expected_ids), (_, found_ids) in zip(index.search_many(queries, K), reloaded.search_many(queries, K)):
+        assert found_ids.tolist() == expected_ids.tolist()
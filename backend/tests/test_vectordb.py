@@ -0,0 +1,164 @@
+import os
+import subprocess
+import sys
+import textwrap
+import pytest
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(TESTS_DIR)
+
+DOCUMENTS = [
+    "O calendário acadêmico define o início das aulas em março",
+    "A matrícula dos calouros acontece na secretaria do campus",
+    "O edital do PROEJA abre vagas para jovens e adultos",
+    "A biblioteca funciona das oito às vinte e duas horas",
+    "O auxílio estudantil é pago mensalmente aos selecionados",
+    "As aulas do curso técnico em informática são à noite",
+    "O restaurante estudantil serve almoço e jantar",
+    "A coordenação de estágio divulga vagas toda semana",
+]
+
+
+def _run_in_other_process(code):
+    """Executa `code` em outro processo, com o mesmo diretório de dados e o modelo de teste."""
+    script = "from conftest import HashingEmbedder\n" \
+             "from services.model_provider import model_provider, DEFAULT_MODEL\n" \
+             "model_provider._models[DEFAULT_MODEL] = HashingEmbedder()\n" \
+             "from services.vectordb import VectorDBService\n" + textwrap.dedent(code)
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join([BACKEND_DIR, TESTS_DIR])}
+    process = subprocess.run([sys.executable, "-c", script], env=env, capture_output=True, text=True)
+    assert process.returncode == 0, process.stderr
+
+
+def test_delete_then_compact(open_collection):
+    vector_db = open_collection(compaction_threshold=1.0)
+    ids = vector_db.add_documents(DOCUMENTS)["ids"]
+    removed = ids[1:5]
+    assert vector_db.delete(removed) == {"success": True}
+    assert vector_db.store.live_count == 4
+
+    assert vector_db.compact() == {"success": True}
+    assert vector_db.store.tombstones.tolist() == []
+    assert vector_db.store.all_ids.tolist() == [ids[0]] + ids[5:]
+    assert vector_db.compact() == {"success": False}
+
+    for mode in ("dense", "lexical", "hybrid"):
+        result = vector_db.query("matrícula biblioteca auxílio edital", n_results=8, mode=mode)
+        assert not set(result["ids"]) & set(removed)
+    result = vector_db.query(DOCUMENTS[5], n_results=1)
+    assert result["ids"] == [ids[5]] and result["documents"] == [DOCUMENTS[5]]
+
+    # A coleção reaberta vê o estado compactado, e os IDs não são reaproveitados
+    vector_db.unload()
+    reopened = open_collection()
+    assert set(reopened.query("aulas", n_results=8)["ids"]) <= set([ids[0]] + ids[5:])
+    assert reopened.store.all_ids.tolist() == [ids[0]] + ids[5:]
+    new_id = reopened.add_documents(["Documento novo depois da compactação"])["ids"][0]
+    assert new_id > max(ids)
+
+
+def test_where_filters(open_collection):
+    vector_db = open_collection()
+    vector_db.add_documents(
+        DOCUMENTS[:6],
+        [
+            {"url": "https://ifpe.edu.br/calendario", "ingested_at": "2024-01-10T10:00:00"},
+            {"url": "https://ifpe.edu.br/matricula", "ingested_at": "2024-02-10T10:00:00"},
+            {"filename": "edital.pdf", "page_start": 1, "page": 2, "ingested_at": "2024-03-10T10:00:00"},
+            {"filename": "edital.pdf", "page_start": 3, "page": 3, "ingested_at": "2024-03-10T10:00:00"},
+            {"filename": "manual.pdf", "page_start": 1, "page": 1, "ingested_at": "2024-04-10T10:00:00"},
+            {"title": "Informe", "ingested_at": "2024-05-10T10:00:00"},
+        ]
+    )
+
+    def sources(where, mode="dense"):
+        result = vector_db.query("aulas matrícula edital", n_results=10, where=where, mode=mode)
+        return sorted(result["documents"])
+
+    assert sources({"filename": "edital.pdf"}) == sorted(DOCUMENTS[2:4])
+    assert sources({"filename": "edital.pdf", "page": 3}) == [DOCUMENTS[3]]
+    assert sources({"page": {"$gte": 2, "$lte": 5}}) == sorted(DOCUMENTS[2:4])
+    assert sources({"url": ["https://ifpe.edu.br/calendario", "https://ifpe.edu.br/matricula"]}) == sorted(DOCUMENTS[:2])
+    assert sources({"content_type": "website"}) == sorted(DOCUMENTS[:2])
+    assert sources({"content_type": "pdf", "ingested_at": {"$gt": "2024-03-10T10:00:00"}}) == [DOCUMENTS[4]]
+    assert sources({"filename": "inexistente.pdf"}) == []
+    # O filtro vale também para as buscas lexical e híbrida
+    assert sources({"filename": "edital.pdf"}, mode="lexical") == [DOCUMENTS[2]]
+    assert set(sources({"filename": "edital.pdf"}, mode="hybrid")) <= set(DOCUMENTS[2:4])
+
+    # Documentos removidos saem do filtro
+    edital = vector_db.query("edital", n_results=1, where={"filename": "edital.pdf", "page": 3})["ids"]
+    vector_db.delete(edital)
+    assert sources({"filename": "edital.pdf"}) == [DOCUMENTS[2]]
+
+    with pytest.raises(ValueError):
+        vector_db.query("aulas", where={"autor": "x"})
+    with pytest.raises(ValueError):
+        vector_db.query("aulas", where={"page": {"$near": 2}})
+
+
+def test_hybrid_fusion(open_collection):
+    vector_db = open_collection(rrf_k=60, hybrid_candidates=50)
+    vector_db.add_documents(DOCUMENTS)
+    query = "vagas do edital PROEJA para estágio"
+
+    dense = vector_db.query(query, n_results=50, mode="dense")
+    lexical = vector_db.query(query, n_results=50, mode="lexical")
+    expected = {}
+    for ids in (dense["ids"], lexical["ids"]):
+        for rank, doc_id in enumerate(ids):
+            expected[doc_id] = expected.get(doc_id, 0.0) + 1.0 / (60 + rank + 1)
+    ranking = sorted(expected.items(), key=lambda item: item[1], reverse=True)[:4]
+
+    hybrid = vector_db.query(query, n_results=4, mode="hybrid")
+    assert hybrid["ids"] == [doc_id for doc_id, _ in ranking]
+    assert hybrid["scores"] == pytest.approx([score for _, score in ranking])
+    assert hybrid["scores"] == sorted(hybrid["scores"], reverse=True)
+    # O termo raro só aparece num documento, que fica entre os primeiros
+    assert DOCUMENTS[2] in hybrid["documents"][:2]
+    # "distances" traz a similaridade de cosseno de cada escolhido
+    positions = {doc_id: i for i, doc_id in enumerate(dense["ids"])}
+    for doc_id, similarity in zip(hybrid["ids"], hybrid["distances"]):
+        assert similarity == pytest.approx(dense["distances"][positions[doc_id]], abs=1e-5)
+
+    with pytest.raises(ValueError):
+        vector_db.query(query, mode="semantico")
+
+
+def test_changes_from_other_processes_are_visible(open_collection):
+    vector_db = open_collection("shared")
+    ids = vector_db.add_documents(DOCUMENTS[:4])["ids"]
+    assert vector_db.query(DOCUMENTS[6], n_results=1)["documents"] != [DOCUMENTS[6]]
+
+    # Outro worker inclui e remove documentos na mesma coleção (só no log, sem checkpoint)
+    _run_in_other_process(f"""
+        vector_db = VectorDBService("shared")
+        vector_db.add_documents({DOCUMENTS[4:]!r})
+        vector_db.delete([{ids[0]}])
+        vector_db.store.close()
+    """)
+    result = vector_db.query(DOCUMENTS[6], n_results=1)
+    assert result["documents"] == [DOCUMENTS[6]]
+    assert vector_db.store.live_count == len(DOCUMENTS) - 1
+    assert ids[0] not in vector_db.query(DOCUMENTS[0], n_results=8)["ids"]
+
+    # Depois de um checkpoint e de uma compactação no outro processo
+    _run_in_other_process("""
+        vector_db = VectorDBService("shared")
+        vector_db.checkpoint()
+        vector_db.compact()
+        vector_db.add_documents(["Documento incluído depois da compactação em outro processo"])
+        vector_db.unload()
+    """)
+    result = vector_db.query("Documento incluído depois da compactação em outro processo", n_results=1)
+    assert result["documents"] == ["Documento incluído depois da compactação em outro processo"]
+    assert vector_db.store.tombstones.tolist() == []
+    assert vector_db.store.live_count == len(DOCUMENTS)
+
+    # E as inclusões deste processo chegam ao outro
+    vector_db.add_documents(["Inclusão feita pelo primeiro processo"])
+    _run_in_other_process("""
+        vector_db = VectorDBService("shared")
+        result = vector_db.query("Inclusão feita pelo primeiro processo", n_results=1)
+        assert result["documents"] == ["Inclusão feita pelo primeiro processo"], result
+    """)
@@ -0,0 +1,101 @@
+import os
+import numpy as np
+from services.segment_store import SegmentStore
+from services.write_ahead_log import read_records
+
+
+def _open(**options):
+    # Checkpoint só quando pedido: tudo fica no log
+    store = SegmentStore("data", "wal", 8, checkpoint_rows=10 ** 6, **options)
+    store.load()
+    return store
+
+
+def _append(store, batch, rows=4):
+    vectors = np.random.default_rng(batch).standard_normal((rows, 8))
+    return store.append(vectors, [f"lote {batch} doc {i}" for i in range(rows)], [{"batch": batch}] * rows)
+
+
+def _wal_path(store):
+    return store._wal_path(store._wal_generation)
+
+
+def _check_rows(store, batches):
+    assert len(store) == len(store.documents) == len(store.metadata) == len(store.stack_vectors())
+    assert [meta["batch"] for meta in store.metadata] == [batch for batch in batches for _ in range(4)]
+    assert all(doc.startswith(f"lote {meta['batch']} ") for doc, meta in zip(store.documents, store.metadata))
+
+
+def test_log_is_replayed_on_load():
+    store = _open()
+    ids = _append(store, 0) + _append(store, 1)
+    store.delete_ids(ids[:2])
+    store.close()
+
+    reloaded = _open()
+    _check_rows(reloaded, [0, 1])
+    assert reloaded.all_ids.tolist() == ids
+    assert reloaded.live_count == 6 and reloaded.tombstones.tolist() == ids[:2]
+    reloaded.close()
+
+
+def test_torn_tail_is_discarded():
+    store = _open()
+    _append(store, 0)
+    _append(store, 1)
+    valid_size = os.path.getsize(_wal_path(store))
+    _append(store, 2)
+    store.close()
+
+    # Queda no meio da escrita do último registro
+    path = _wal_path(store)
+    with open(path, "r+b") as f:
+        f.truncate(valid_size + (os.path.getsize(path) - valid_size) // 2)
+
+    recovered = _open()
+    _check_rows(recovered, [0, 1])
+    assert os.path.getsize(path) == valid_size
+
+    # O log continua utilizável depois do corte
+    _append(recovered, 3)
+    recovered.close()
+    reloaded = _open()
+    _check_rows(reloaded, [0, 1, 3])
+    assert reloaded.all_ids.tolist() == list(range(12))
+    reloaded.close()
+
+
+def test_corrupted_record_stops_replay():
+    store = _open()
+    _append(store, 0)
+    valid_size = os.path.getsize(_wal_path(store))
+    _append(store, 1)
+    store.close()
+
+    with open(_wal_path(store), "r+b") as f:
+        f.seek(valid_size + 20)
+        byte = f.read(1)
+        f.seek(valid_size + 20)
+        f.write(bytes([byte[0] ^ 0xFF]))
+
+    records, position = read_records(_wal_path(store))
+    assert len(records) == 1 and position == valid_size
+
+    recovered = _open()
+    _check_rows(recovered, [0])
+    recovered.close()
+
+
+def test_checkpoint_moves_log_into_segments():
+    store = _open()
+    _append(store, 0)
+    _append(store, 1)
+    assert store.checkpoint()
+    assert store._pending_rows == 0 and os.path.getsize(_wal_path(store)) == 0
+    _append(store, 2)
+    store.close()
+
+    reloaded = _open()
+    _check_rows(reloaded, [0, 1, 2])
+    assert len(reloaded.segments) == 1
+    reloaded.close()
@@ -3,27 +3,42 @@ import { NextResponse } from 'next/server';
 // GET - Obter todos os documentos
 export async function GET() {
   try {
-    // Em um cenário real, faríamos uma chamada para o backend
-    // Neste caso, como o backend não tem um endpoint específico para listar,
-    // você pode implementar isso depois
-    
-    const response = await fetch('http://localhost:8000/api/documents/list', {
-      method: 'GET',
-      headers: {
-        'Content-Type': 'application/json',
-      },
-    });
+    // A listagem do backend é paginada: percorre as páginas seguindo o cursor
+    const documents = [];
+    let cursor = null;
+    let data = null;
 
-    if (!response.ok) {
-      // Fallback temporário se o endpoint não existir
-      return NextResponse.json(
-        { documents: [] },
-        { status: 200 }
-      );
-    }
+    do {
+      const params = new URLSearchParams({ limit: '1000', include_content: 'true' });
+      if (cursor !== null) {
+        params.set('cursor', String(cursor));
+      }
 
-    const data = await response.json();
-    return NextResponse.json(data);
+      const response = await fetch(`http://localhost:8000/api/documents/list?${params}`, {
+        method: 'GET',
+        headers: {
+          'Content-Type': 'application/json',
+        },
+      });
+
+      if (!response.ok) {
+        // Fallback temporário se o endpoint não existir
+        return NextResponse.json(
+          { documents: [] },
+          { status: 200 }
+        );
+      }
+
+      data = await response.json();
+      documents.push(...data.documents);
+      cursor = data.next_cursor;
+    } while (cursor !== null && cursor !== undefined);
+
+    return NextResponse.json({
+      documents,
+      total_documents: data.total_documents,
+      unique_sources: data.unique_sources,
+    });
   } catch (error) {
     console.error('Erro ao buscar documentos:', error);
     return NextResponse.json(
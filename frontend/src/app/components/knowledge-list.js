@@ -114,7 +114,13 @@ export function KnowledgeList({ documents, onDelete }) {
     let groupKey = 'Documentos manuais';
     let sourceType = 'manual';
     
-    if (doc.full_content || doc.content) {
+    if (doc.group_key) {
+      // Fonte informada pelo backend (lida dos metadados do documento)
+      if (doc.group_key !== 'Documentos manuais') {
+        groupKey = doc.url;
+        sourceType = doc.group_key.startsWith('PDF: ') ? 'pdf' : 'website';
+      }
+    } else if (doc.full_content || doc.content) {
       const content = doc.full_content || doc.content;
       
       if (content.includes('URL:')) {
@@ -211,14 +217,15 @@ export function KnowledgeList({ documents, onDelete }) {
                         <span>Chunk {index + 1}</span>
                         <span>•</span>
                         <span>{doc.content?.length || 0} caracteres</span>
-                        {group.type === 'pdf' && doc.full_content && (
+                        {group.type === 'pdf' && (doc.metadata?.page || doc.full_content) && (
                           <>
                             {(() => {
-                              const pageMatch = doc.full_content.match(/Página:\s*(\d+)\s*de\s*(\d+)/);
-                              return pageMatch ? (
+                              const pageMatch = doc.full_content?.match(/Página:\s*(\d+)\s*de\s*(\d+)/);
+                              const page = doc.metadata?.page ?? (pageMatch && pageMatch[1]);
+                              return page ? (
                                 <>
                                   <span>•</span>
-                                  <span>Página {pageMatch[1]}</span>
+                                  <span>Página {page}</span>
                                 </>
                               ) : null;
                             })()}